@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""
+Utilidades para medir el rendimiento de los conversores de circuitoEsquema.xml.
+
+@version 1.0 03/Noviembre/2025
+@author: Marcelo Díez Domínguez UO293820
+"""
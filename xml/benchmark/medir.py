@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+Mide cómo escalan los conversores con el número de tramos.
+
+Para cada tamaño genera (o reutiliza) un circuito sintético válido según
+circuito.xsd (ver benchmark/sintetico.py) y mide cada etapa:
+  - carga: circuito.cargarCircuito (análisis del XML, sin caché)
+  - cache: cache.leerCache (caché binaria, ya escrita al preparar los datos)
+  - valida: circuito.cargarCircuito validando contra circuito.xsd (validacion.py)
+  - kml:   xml2kml.generarKml
+  - svg:   xml2altimetria.generarAltimetria
+  - html:  xml2html.generar_html
+Por etapa se guarda el tiempo real, el tiempo de CPU y el pico de memoria
+reservada por Python (tracemalloc, en una segunda pasada para no alterar
+los tiempos). Los resultados se escriben en JSON para comparar versiones.
+
+Uso:
+  python -m benchmark.medir [-n 100 1000 ...] [-o resultados.json] [--datos dir]
+  python -m benchmark.medir --comparar anterior.json actual.json
+
+@version 1.0 09/Noviembre/2025
+@author: Marcelo Díez Domínguez UO293820
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmark.sintetico import generar
+from circuito import cargarCircuito
+from cache import escribirCache, leerCache
+import xml2kml
+import xml2altimetria
+import xml2html
+
+# Tamaños por defecto (10^2 .. 10^5); el generador admite hasta 10^7 o más
+TAMAÑOS = [10**2, 10**3, 10**4, 10**5]
+
+ETAPAS = ("carga", "cache", "valida", "kml", "svg", "html")
+
+
+def _etapas(archivoXML, destino):
+    """
+    Devuelve la lista [(etapa, función)] para 'archivoXML'; las funciones de
+    salida usan el modelo que deja la etapa de carga
+    """
+    estado = {}
+
+    def carga():
+        estado["modelo"] = cargarCircuito(archivoXML, usarCache=False)
+
+    return [
+        ("carga", carga),
+        ("cache", lambda: leerCache(archivoXML)),
+        ("valida", lambda: cargarCircuito(archivoXML, usarCache=False, validar=True)),
+        ("kml", lambda: xml2kml.generarKml(estado["modelo"], os.path.join(destino, "circuito.kml"))),
+        ("svg", lambda: xml2altimetria.generarAltimetria(estado["modelo"], os.path.join(destino, "altimetria.svg"))),
+        ("html", lambda: xml2html.generar_html(estado["modelo"], os.path.join(destino, "InfoCircuito.html"))),
+    ]
+
+
+def medirArchivo(archivoXML, memoria=True):
+    """
+    Mide las etapas sobre 'archivoXML'. Devuelve {etapa: {segundos, cpu, pico_bytes}}
+    """
+    resultados = {}
+    with tempfile.TemporaryDirectory() as destino, contextlib.redirect_stdout(io.StringIO()):
+        for etapa, funcion in _etapas(archivoXML, destino):
+            t0, c0 = time.perf_counter(), time.process_time()
+            funcion()
+            resultados[etapa] = {"segundos": time.perf_counter() - t0,
+                                 "cpu": time.process_time() - c0,
+                                 "pico_bytes": None}
+
+        if memoria:
+            for etapa, funcion in _etapas(archivoXML, destino):
+                tracemalloc.start()
+                funcion()
+                resultados[etapa]["pico_bytes"] = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+    return resultados
+
+
+def _archivoSintetico(n, datos):
+    """
+    Ruta del circuito sintético de 'n' tramos en 'datos' (se genera si no
+    existe, junto con su caché binaria)
+    """
+    ruta = os.path.join(datos, f"circuito-{n}.xml")
+    if not os.path.exists(ruta):
+        generar(n, ruta)
+    if leerCache(ruta) is None:
+        escribirCache(cargarCircuito(ruta, usarCache=False), ruta)
+    return ruta
+
+
+def medir(tamaños=TAMAÑOS, datos=None, memoria=True, informar=print):
+    """
+    Mide todos los tamaños y devuelve el informe (diccionario serializable a JSON)
+    """
+    informe = {
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "plataforma": platform.platform(),
+        "versiones": {"kml": xml2kml.VERSION, "svg": xml2altimetria.VERSION, "html": xml2html.VERSION},
+        "numpy": xml2altimetria.np is not None,
+        "resultados": [],
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        datos = datos or tmp
+        os.makedirs(datos, exist_ok=True)
+        for n in tamaños:
+            archivo = _archivoSintetico(n, datos)
+            for etapa, valores in medirArchivo(archivo, memoria).items():
+                fila = {"tramos": n, "etapa": etapa}
+                fila.update(valores)
+                informe["resultados"].append(fila)
+                pico = valores["pico_bytes"]
+                informar(f"{n:>10} {etapa:<6} {valores['segundos']:>9.4f} s "
+                         f"{valores['cpu']:>9.4f} s CPU "
+                         f"{(pico / 1e6 if pico is not None else float('nan')):>10.2f} MB")
+    return informe
+
+
+def comparar(anterior, actual, informar=print):
+    """
+    Muestra la relación actual/anterior de tiempo y memoria por tamaño y etapa
+    """
+    previos = {(r["tramos"], r["etapa"]): r for r in anterior["resultados"]}
+    informar(f"{'tramos':>10} {'etapa':<6} {'tiempo':>8} {'memoria':>8}")
+    for r in actual["resultados"]:
+        p = previos.get((r["tramos"], r["etapa"]))
+        if p is None:
+            continue
+        t = r["segundos"] / p["segundos"] if p["segundos"] else float("nan")
+        m = (r["pico_bytes"] / p["pico_bytes"]
+             if r["pico_bytes"] and p["pico_bytes"] else float("nan"))
+        informar(f"{r['tramos']:>10} {r['etapa']:<6} {t:>7.2f}x {m:>7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de los conversores de circuitos")
+    parser.add_argument("-n", "--tramos", type=int, nargs="+", default=TAMAÑOS,
+                        help="números de tramos a medir")
+    parser.add_argument("-o", "--salida", default="resultados.json", help="archivo JSON de resultados")
+    parser.add_argument("--datos", help="directorio donde guardar y reutilizar los circuitos sintéticos")
+    parser.add_argument("--sin-memoria", action="store_true", help="no medir la memoria (más rápido)")
+    parser.add_argument("--comparar", nargs=2, metavar=("ANTERIOR", "ACTUAL"),
+                        help="comparar dos archivos de resultados")
+    args = parser.parse_args()
+
+    if args.comparar:
+        with open(args.comparar[0], encoding="utf-8") as a, open(args.comparar[1], encoding="utf-8") as b:
+            comparar(json.load(a), json.load(b))
+        return
+
+    informe = medir(args.tramos, args.datos, not args.sin_memoria)
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(informe, f, indent=2)
+    print("Resultados guardados en", args.salida)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+Comprueba que la lectura en streaming de circuito.iterarTramos mantiene la
+memoria constante: mide el pico de memoria residente (RSS) de un proceso que
+recorre circuitos sintéticos de distinto tamaño, frente a ET.parse + findall.
+
+Uso: python -m benchmark.memoria_streaming [numTramos ...]
+
+@version 1.0 03/Noviembre/2025
+@author: Marcelo Díez Domínguez UO293820
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmark.sintetico import generar
+
+TAMAÑOS = [10**3, 10**4, 10**5, 10**6]
+
+# Programa que se ejecuta en un proceso nuevo para medir su pico de RSS (KiB)
+MEDIDOR = """
+import resource, sys
+import xml.etree.ElementTree as ET
+import circuito
+n = 0
+if sys.argv[1] == "iterparse":
+    for tramo in circuito.iterarTramos(sys.argv[2]):
+        n += 1
+else:
+    raiz = ET.parse(sys.argv[2]).getroot()
+    for tramo in raiz.findall('.//uniovi:tramo', circuito.NS):
+        n += 1
+print(n, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def medir(modo, archivoXML):
+    """
+    Devuelve (tramos leídos, pico de RSS en KiB) de recorrer 'archivoXML' con 'modo'
+    """
+    directorio = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    salida = subprocess.run([sys.executable, "-c", MEDIDOR, modo, archivoXML],
+                            cwd=directorio, capture_output=True, text=True, check=True)
+    n, rss = salida.stdout.split()
+    return int(n), int(rss)
+
+
+def main():
+    tamaños = [int(a) for a in sys.argv[1:]] or TAMAÑOS
+    print(f"{'tramos':>10} {'iterparse (KiB)':>16} {'ET.parse (KiB)':>16}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in tamaños:
+            archivo = os.path.join(tmp, f"circuito-{n}.xml")
+            generar(n, archivo)
+            _, rss_stream = medir("iterparse", archivo)
+            _, rss_arbol = medir("parse", archivo)
+            print(f"{n:>10} {rss_stream:>16} {rss_arbol:>16}")
+            os.remove(archivo)
+
+if __name__ == "__main__":
+    main()
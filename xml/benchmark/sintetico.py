@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Genera archivos circuitoEsquema.xml sintéticos con un número arbitrario de
+tramos (de 10^2 a 10^7 o más), válidos según circuito.xsd. El archivo se
+escribe en streaming, sin construir el árbol XML.
+
+Uso: python -m benchmark.sintetico <numTramos> <archivoSalida>
+
+@version 1.0 03/Noviembre/2025
+@author: Marcelo Díez Domínguez UO293820
+"""
+
+import sys
+from math import cos, sin, radians, pi, sqrt
+
+# Centro y radios (grados) de la elipse que sigue el trazado
+LON0, LAT0 = 12.6880, 50.7917
+RADIO_LON, RADIO_LAT = 0.0070, 0.0030
+
+CABECERA = """<?xml version="1.0" encoding="UTF-8"?>
+<circuito xmlns="http://www.uniovi.es"
+            xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"
+            xsi:schemaLocation="http://www.uniovi.es circuito.xsd">
+    <nombre>Circuito sintético</nombre>
+    <pais>Alemania</pais>
+    <localidad>Hohenstein-Ernstthal</localidad>
+    <longitudCircuito unidades="metros">{longitud:.0f}</longitudCircuito>
+    <anchuraMedia unidades="metros">12</anchuraMedia>
+    <carrera>
+        <fecha>2025-07-13</fecha>
+        <horaEspaña>14:00:00</horaEspaña>
+        <vueltas>30</vueltas>
+        <patrocinador>Patrocinador</patrocinador>
+        <resultado>
+            <vencedor>Piloto 1</vencedor>
+            <tiempo>PT40M42.854S</tiempo>
+        </resultado>
+        <clasificacionMundial>
+            <posicion numero="1">
+                <piloto>Piloto 1</piloto>
+            </posicion>
+        </clasificacionMundial>
+    </carrera>
+    <ubicacion>
+        <origen>
+            <longitud unidades="grados">{lon:.14f}</longitud>
+            <latitud unidades="grados">{lat:.14f}</latitud>
+            <altitud unidades="metros sobre el nivel del mar">{alt:.13f}</altitud>
+        </origen>
+        <trazado>
+"""
+
+TRAMO = """            <tramo>
+                <distancia unidades="metros">{dist:.2f}</distancia>
+                <coordenadas>
+                    <longitud unidades="grados">{lon:.14f}</longitud>
+                    <latitud unidades="grados">{lat:.14f}</latitud>
+                    <altitud unidades="metros sobre el nivel del mar">{alt:.13f}</altitud>
+                </coordenadas>
+                <sector>{sector}</sector>
+            </tramo>
+"""
+
+PIE = """        </trazado>
+    </ubicacion>
+    <referencias>
+        <ref>https://www.motogp.com/</ref>
+        <ref>https://www.racingcircuits.info/</ref>
+        <ref>https://en.wikipedia.org/wiki/Sachsenring</ref>
+    </referencias>
+    <media>
+        <fotos>
+            <foto descripción="Foto circuito">multimedia/sachsenring-circuito.png</foto>
+        </fotos>
+        <videos>
+            <video descripción="Video pilotos">multimedia/sachsenring.mp4</video>
+        </videos>
+    </media>
+</circuito>
+"""
+
+# Metros por grado (aproximación local)
+M_LAT = 111320.0
+M_LON = 111320.0 * cos(radians(LAT0))
+
+
+def punto(i, numTramos):
+    """
+    Devuelve (lon, lat, alt) del punto i de 'numTramos' (el punto 0 es el origen)
+    """
+    t = 2 * pi * i / numTramos
+    lon = LON0 + RADIO_LON * cos(t)
+    lat = LAT0 + RADIO_LAT * sin(t)
+    alt = 320.0 + 15.0 * sin(3 * t) + 5.0 * cos(7 * t)
+    return lon, lat, alt
+
+
+def generar(numTramos, archivoSalida):
+    """
+    Escribe en 'archivoSalida' un circuito cerrado de 'numTramos' tramos.
+    El último tramo vuelve al origen y cada cuarto de vuelta es un sector.
+    """
+    numTramos = max(1, int(numTramos))
+    lon0, lat0, alt0 = punto(0, numTramos)
+
+    # Perímetro aproximado de la elipse (Ramanujan) para <longitudCircuito>
+    a, b = RADIO_LON * M_LON, RADIO_LAT * M_LAT
+    longitud = pi * (3 * (a + b) - sqrt((3 * a + b) * (a + 3 * b)))
+
+    with open(archivoSalida, "w", encoding="utf-8", buffering=1 << 20) as f:
+        f.write(CABECERA.format(longitud=longitud, lon=lon0, lat=lat0, alt=alt0))
+        lon_ant, lat_ant = lon0, lat0
+        for i in range(1, numTramos + 1):
+            lon, lat, alt = punto(i % numTramos, numTramos)
+            dist = sqrt(((lon - lon_ant) * M_LON) ** 2 + ((lat - lat_ant) * M_LAT) ** 2)
+            sector = 1 + (4 * (i - 1)) // numTramos
+            f.write(TRAMO.format(dist=dist, lon=lon, lat=lat, alt=alt, sector=sector))
+            lon_ant, lat_ant = lon, lat
+        f.write(PIE)
+
+
+def main():
+    if len(sys.argv) != 3:
+        print("Uso: python -m benchmark.sintetico <numTramos> <archivoSalida>")
+        return
+    generar(int(sys.argv[1]), sys.argv[2])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+Caché binaria del circuito junto al XML (.<xml>.circuito.bin) para no
+volver a analizar circuitoEsquema.xml si no ha cambiado.
+
+Formato (little-endian):
+  - cabecera fija (struct CABECERA): firma b"MGPC", versión del formato,
+    versión del modelo (circuito.VERSION_MODELO), número de tramos, tamaño
+    y fecha de modificación (ns) del XML, SHA-256 del XML y longitud de
+    los metadatos
+  - metadatos del circuito (nombre, carrera, origen, media...) en JSON UTF-8
+  - relleno hasta múltiplo de 8 bytes
+  - columnas contiguas de n float64: longitudes, latitudes, altitudes y
+    distancias; después n bytes de sectores
+
+La caché se abre con mmap (copia en escritura) y las columnas del modelo
+son memoryviews sobre el mapa: no se copian ni se convierten, y
+np.frombuffer(modelo.longitudes) tampoco copia. El arranque en frío queda
+limitado por los fallos de página, no por el análisis del XML.
+
+La caché es válida si es de la misma versión del modelo (si cambia cómo
+carga el XML circuito.py, una caché anterior no vale aunque el XML no haya
+cambiado) y coinciden el tamaño y la fecha del XML o, si no, su SHA-256;
+en otro caso se vuelve a analizar el XML y se reescribe.
+
+@version 1.0 14/Noviembre/2025
+@author: Marcelo Díez Domínguez UO293820
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+
+from circuito import cargarCircuito, ModeloCircuito, Medida, Punto, Medio, VERSION_MODELO
+from instrumentacion import etapa
+
+FIRMA = b"MGPC"
+VERSION_FORMATO = 1
+
+# firma, versión del formato, versión del modelo, tramos, tamaño XML, mtime XML (ns), SHA-256,
+# bytes de metadatos
+CABECERA = struct.Struct("<4sHHQQq32sQ")
+
+# Columnas float64 del modelo, en el orden del archivo
+COLUMNAS = ("longitudes", "latitudes", "altitudes", "distancias")
+
+
+def rutaCache(archivoXML):
+    """
+    Ruta de la caché de 'archivoXML' (oculta, en el mismo directorio)
+    """
+    directorio, nombre = os.path.split(os.path.abspath(archivoXML))
+    return os.path.join(directorio, "." + os.path.splitext(nombre)[0] + ".circuito.bin")
+
+
+def _hashArchivo(ruta):
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloque)
+    return h.digest()
+
+
+# ---------- Metadatos ----------
+
+def _campos(objeto):
+    return {campo: getattr(objeto, campo) for campo in objeto.__slots__}
+
+
+def _metadatos(modelo):
+    """
+    Metadatos del modelo (todo salvo las columnas de tramos) como diccionario
+    """
+    origen = modelo.origen
+    return {
+        "nombre": modelo.nombre,
+        "pais": modelo.pais,
+        "localidad": modelo.localidad,
+        "longitudCircuito": _campos(modelo.longitudCircuito),
+        "anchuraMedia": _campos(modelo.anchuraMedia),
+        "carrera": _campos(modelo.carrera),
+        "origen": _campos(origen) if origen is not None else None,
+        "referencias": modelo.referencias,
+        "fotos": [_campos(m) for m in modelo.fotos],
+        "videos": [_campos(m) for m in modelo.videos],
+    }
+
+
+def _modelo(archivoXML, datos):
+    """
+    ModeloCircuito (sin columnas) a partir de los metadatos
+    """
+    modelo = ModeloCircuito(archivoXML)
+    modelo.nombre = datos["nombre"]
+    modelo.pais = datos["pais"]
+    modelo.localidad = datos["localidad"]
+    modelo.longitudCircuito = Medida(**datos["longitudCircuito"])
+    modelo.anchuraMedia = Medida(**datos["anchuraMedia"])
+    carrera = datos["carrera"]
+    carrera["posiciones"] = [tuple(p) for p in carrera["posiciones"]]
+    for campo, valor in carrera.items():
+        setattr(modelo.carrera, campo, valor)
+    modelo.origen = Punto(**datos["origen"]) if datos["origen"] is not None else None
+    modelo.referencias = datos["referencias"]
+    modelo.fotos = [Medio(**m) for m in datos["fotos"]]
+    modelo.videos = [Medio(**m) for m in datos["videos"]]
+    return modelo
+
+
+# ---------- Escritura y lectura ----------
+
+def escribirCache(modelo, archivoXML, ruta=None):
+    """
+    Escribe la caché de 'modelo' (cargado de 'archivoXML') de forma atómica
+    (archivo temporal + rename). Devuelve la ruta.
+    """
+    ruta = ruta or rutaCache(archivoXML)
+    st = os.stat(archivoXML)
+    meta = json.dumps(_metadatos(modelo), ensure_ascii=False).encode("utf-8")
+    relleno = -(CABECERA.size + len(meta)) % 8
+
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, "wb") as f:
+        f.write(CABECERA.pack(FIRMA, VERSION_FORMATO, VERSION_MODELO, len(modelo), st.st_size,
+                              st.st_mtime_ns, _hashArchivo(archivoXML), len(meta)))
+        f.write(meta)
+        f.write(b"\0" * relleno)
+        for columna in COLUMNAS:
+            f.write(memoryview(getattr(modelo, columna)).cast("B"))
+        f.write(modelo.sectores)
+    os.replace(temporal, ruta)
+    return ruta
+
+
+def _actualizarFirma(ruta, mapa, st):
+    """
+    Guarda en la cabecera el tamaño y la fecha actuales del XML
+    """
+    campos = list(CABECERA.unpack_from(mapa))
+    campos[4:6] = st.st_size, st.st_mtime_ns
+    try:
+        with open(ruta, "r+b") as f:
+            f.write(CABECERA.pack(*campos))
+    except OSError:
+        pass
+
+
+def leerCache(archivoXML, ruta=None):
+    """
+    Devuelve el ModeloCircuito de la caché de 'archivoXML', con las columnas
+    sobre un mmap, o None si no hay caché o no es válida
+    """
+    ruta = ruta or rutaCache(archivoXML)
+    try:
+        with open(ruta, "rb") as f:
+            mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        st = os.stat(archivoXML)
+    except (OSError, ValueError):
+        return None  # no existe (o está vacía)
+
+    if len(mapa) < CABECERA.size:
+        return None
+    firma, version, versionModelo, n, tamaño, mtime, sha, bytesMeta = CABECERA.unpack_from(mapa)
+    inicio = CABECERA.size + bytesMeta
+    inicio += -inicio % 8
+    if (firma != FIRMA or version != VERSION_FORMATO or versionModelo != VERSION_MODELO
+            or len(mapa) != inicio + n * (8 * len(COLUMNAS) + 1)):
+        return None
+    if (tamaño, mtime) != (st.st_size, st.st_mtime_ns):
+        if sha != _hashArchivo(archivoXML):
+            return None
+        _actualizarFirma(ruta, mapa, st)  # mismo contenido: no volver a calcular el hash
+
+    try:
+        modelo = _modelo(archivoXML, json.loads(bytes(mapa[CABECERA.size:CABECERA.size + bytesMeta])))
+    except (ValueError, KeyError, TypeError):
+        return None
+    vista = memoryview(mapa)
+    for columna in COLUMNAS:
+        setattr(modelo, columna, vista[inicio:inicio + 8 * n].cast("d"))
+        inicio += 8 * n
+    modelo.sectores = vista[inicio:inicio + n]
+    return modelo
+
+
+def cargarCacheado(archivoXML):
+    """
+    Carga 'archivoXML' desde su caché si es válida; si no, lo analiza y
+    escribe la caché (si el directorio no admite escritura, sin caché).
+    Lanza ErrorCircuito como cargarCircuito.
+    """
+    with etapa("carga.cache") as e:
+        modelo = leerCache(archivoXML)
+        if modelo is not None:
+            e.elementos = len(modelo)
+            return modelo
+
+    modelo = cargarCircuito(archivoXML, usarCache=False)
+    try:
+        escribirCache(modelo, archivoXML)
+    except OSError:
+        pass
+    return modelo
+
+
+def borrarCache(archivoXML):
+    """
+    Borra la caché de 'archivoXML' si existe
+    """
+    try:
+        os.remove(rutaCache(archivoXML))
+    except FileNotFoundError:
+        pass
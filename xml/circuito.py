@@ -0,0 +1,382 @@
+# -*- coding: utf-8 -*-
+"""
+Carga circuitoEsquema.xml (NS http://www.uniovi.es) una única vez y lo
+devuelve como un modelo compacto (clase ModeloCircuito) compartido por
+xml2kml.py, xml2altimetria.py y xml2html.py.
+
+Los datos de los tramos se guardan por columnas en array('d') (longitud,
+latitud, altitud y distancia) y los sectores en un bytearray; los metadatos
+del circuito se guardan en objetos con __slots__. Si el modelo se lee de la
+caché binaria (cache.py), las columnas son memoryviews de la misma forma.
+
+@version 1.0 03/Noviembre/2025
+@author: Marcelo Díez Domínguez UO293820
+"""
+
+import os
+import xml.etree.ElementTree as ET
+from array import array
+from math import nan
+
+from instrumentacion import etapa
+
+NS = {'uniovi': 'http://www.uniovi.es'}
+
+# Valor guardado en 'sectores' cuando un tramo no tiene <sector> válido
+SIN_SECTOR = 0
+
+# Versión del modelo: hay que incrementarla si cambia cómo se lee el XML o
+# qué guarda el modelo (invalida las cachés binarias de cache.py)
+VERSION_MODELO = 1
+
+# Usar la caché binaria junto al XML (cache.py); MOTOGP_CACHE=0 la desactiva
+USAR_CACHE = os.environ.get("MOTOGP_CACHE", "1") != "0"
+
+# Validar contra circuito.xsd al cargar (validacion.py); MOTOGP_VALIDAR=1 lo activa
+VALIDAR = os.environ.get("MOTOGP_VALIDAR", "0") != "0"
+
+
+class ErrorCircuito(Exception):
+    """
+    Error al cargar un archivo de circuito (no existe o no es XML válido)
+    """
+
+
+class Medida(object):
+    """
+    Valor textual con su atributo 'unidades' (p.ej. longitudCircuito)
+    """
+    __slots__ = ('valor', 'unidades')
+
+    def __init__(self, valor="", unidades=""):
+        self.valor = valor
+        self.unidades = unidades
+
+
+class Punto(object):
+    """
+    Punto geográfico (longitud, latitud, altitud)
+    """
+    __slots__ = ('longitud', 'latitud', 'altitud')
+
+    def __init__(self, longitud, latitud, altitud):
+        self.longitud = longitud
+        self.latitud = latitud
+        self.altitud = altitud
+
+
+class Carrera(object):
+    """
+    Datos de la carrera: fecha, hora, vueltas, patrocinador, resultado y
+    clasificación mundial (lista de tuplas (numero, piloto))
+    """
+    __slots__ = ('fecha', 'horaEspaña', 'vueltas', 'patrocinador',
+                 'vencedor', 'tiempo', 'posiciones')
+
+    def __init__(self):
+        self.fecha = ""
+        self.horaEspaña = ""
+        self.vueltas = ""
+        self.patrocinador = ""
+        self.vencedor = ""
+        self.tiempo = ""
+        self.posiciones = []
+
+
+class Medio(object):
+    """
+    Foto o vídeo de <media>: ruta y atributo 'descripción'
+    """
+    __slots__ = ('ruta', 'descripcion')
+
+    def __init__(self, ruta, descripcion=""):
+        self.ruta = ruta
+        self.descripcion = descripcion
+
+
+class ModeloCircuito(object):
+    """
+    Modelo compacto del circuito.
+
+    Una fila por <tramo>, en orden:
+      - longitudes, latitudes, altitudes, distancias: array('d')
+      - sectores: bytearray (SIN_SECTOR si falta o no es un entero 1..255)
+    Un tramo sin <coordenadas> tiene longitud y latitud NaN y altitud 0.0;
+    una <distancia> ausente se guarda como NaN.
+    """
+    __slots__ = ('archivo', 'nombre', 'pais', 'localidad',
+                 'longitudCircuito', 'anchuraMedia', 'carrera', 'origen',
+                 'longitudes', 'latitudes', 'altitudes', 'distancias', 'sectores',
+                 'referencias', 'fotos', 'videos')
+
+    def __init__(self, archivo=None):
+        self.archivo = archivo
+        self.nombre = ""
+        self.pais = ""
+        self.localidad = ""
+        self.longitudCircuito = Medida()
+        self.anchuraMedia = Medida()
+        self.carrera = Carrera()
+        self.origen = None
+        self.longitudes = array('d')
+        self.latitudes = array('d')
+        self.altitudes = array('d')
+        self.distancias = array('d')
+        self.sectores = bytearray()
+        self.referencias = []
+        self.fotos = []
+        self.videos = []
+
+    def __len__(self):
+        """
+        Número de tramos
+        """
+        return len(self.distancias)
+
+    def addTramo(self, distancia, longitud, latitud, altitud, sector):
+        """
+        Añade una fila a las columnas de tramos
+        """
+        self.distancias.append(distancia)
+        self.longitudes.append(longitud)
+        self.latitudes.append(latitud)
+        self.altitudes.append(altitud)
+        self.sectores.append(sector)
+
+    def sector(self, i):
+        """
+        Devuelve el sector del tramo i, o None si no tiene
+        """
+        s = self.sectores[i]
+        return None if s == SIN_SECTOR else s
+
+
+# ---------- Conversión de textos ----------
+
+def _texto(elemento):
+    """
+    Texto sin espacios de un elemento, o "" si no existe
+    """
+    if elemento is None or elemento.text is None:
+        return ""
+    return elemento.text.strip()
+
+
+def _decimal(texto, defecto):
+    """
+    Convierte un decimal del XML (admite coma decimal) a float
+    """
+    if not texto:
+        return defecto
+    return float(texto.replace(",", "."))
+
+
+def _sector(texto):
+    """
+    Convierte el texto de <sector> a un entero de un byte, o SIN_SECTOR
+    """
+    try:
+        s = int(texto)
+    except ValueError:
+        return SIN_SECTOR
+    return s if 0 < s < 256 else SIN_SECTOR
+
+
+def _medida(elemento):
+    if elemento is None:
+        return Medida()
+    return Medida(_texto(elemento), elemento.get("unidades", ""))
+
+
+def _leerTramo(tramo):
+    """
+    Devuelve (distancia, longitud, latitud, altitud, sector) de un <tramo>
+    """
+    distancia = _decimal(_texto(tramo.find('uniovi:distancia', NS)), nan)
+
+    coordenadas = tramo.find('uniovi:coordenadas', NS)
+    if coordenadas is not None:
+        lon = _decimal(_texto(coordenadas.find('uniovi:longitud', NS)), 0.0)
+        lat = _decimal(_texto(coordenadas.find('uniovi:latitud', NS)), 0.0)
+        alt = _decimal(_texto(coordenadas.find('uniovi:altitud', NS)), 0.0)
+    else:
+        lon, lat, alt = nan, nan, 0.0
+
+    sector = _sector(_texto(tramo.find('uniovi:sector', NS)))
+    return distancia, lon, lat, alt, sector
+
+
+# ---------- Lectura en streaming ----------
+
+def _etiqueta(nombre):
+    return '{' + NS['uniovi'] + '}' + nombre
+
+TRAMO = _etiqueta('tramo')
+
+
+def _recorrer(archivoXML, validador=None):
+    """
+    Recorre 'archivoXML' con iterparse sin mantener el árbol en memoria.
+    Genera tuplas (etiqueta, dato):
+      - (TRAMO, (distancia, longitud, latitud, altitud, sector)) por cada <tramo>
+      - (etiqueta, elemento) por cada hijo directo de la raíz, al cerrarse
+    Cada elemento procesado se vacía y se desengancha de su padre, así que la
+    memoria no crece con el número de tramos.
+    Con 'validador' (validacion.Validador) cada elemento entregado se valida
+    en la misma pasada, antes de vaciarlo; un <tramo> con un valor no
+    numérico que el validador ya ha anotado se omite.
+    Lanza ErrorCircuito si el archivo no existe, no es XML válido o tiene
+    un <tramo> con un valor no numérico (sin validador).
+    """
+    try:
+        pila = []
+        for evento, elem in ET.iterparse(archivoXML, events=('start', 'end')):
+            if evento == 'start':
+                pila.append(elem)
+                continue
+
+            pila.pop()
+            if elem.tag == TRAMO:
+                if validador is not None:
+                    errores = validador.total
+                    validador.unidad(elem, pila)
+                try:
+                    dato = _leerTramo(elem)
+                except ValueError as e:
+                    # Si el validador ya ha anotado el valor no válido (con su
+                    # línea) se omite el tramo; si no, es un error de carga
+                    if validador is None or validador.total == errores:
+                        raise ErrorCircuito("Tramo no válido en el archivo XML " + str(archivoXML)
+                                            + ": " + str(e)) from e
+                else:
+                    yield TRAMO, dato
+            elif len(pila) == 1:
+                if validador is not None:
+                    validador.unidad(elem, pila)
+                yield elem.tag, elem
+            else:
+                if validador is not None and not pila:
+                    validador.raiz(elem)
+                continue
+
+            elem.clear()
+            pila[-1].remove(elem)
+    except IOError:
+        raise ErrorCircuito("No se encuentra el archivo: " + str(archivoXML))
+    except ET.ParseError as e:
+        raise ErrorCircuito("Error procesando el archivo XML " + str(archivoXML) + ": " + str(e)) from e
+
+
+def iterarTramos(archivoXML):
+    """
+    Genera (distancia, longitud, latitud, altitud, sector) para cada <tramo>
+    de 'archivoXML', de uno en uno y con memoria constante.
+    """
+    for etiqueta, dato in _recorrer(archivoXML):
+        if etiqueta == TRAMO:
+            yield dato
+
+
+# ---------- Carga ----------
+
+def _leerCarrera(carrera, elem):
+    carrera.fecha = elem.findtext('uniovi:fecha', default="", namespaces=NS)
+    carrera.horaEspaña = elem.findtext('uniovi:horaEspaña', default="", namespaces=NS)
+    carrera.vueltas = elem.findtext('uniovi:vueltas', default="", namespaces=NS)
+    carrera.patrocinador = elem.findtext('uniovi:patrocinador', default="", namespaces=NS)
+    carrera.vencedor = elem.findtext('uniovi:resultado/uniovi:vencedor', default="", namespaces=NS)
+    carrera.tiempo = elem.findtext('uniovi:resultado/uniovi:tiempo', default="", namespaces=NS)
+    for pos in elem.findall('uniovi:clasificacionMundial/uniovi:posicion', NS):
+        numero = (pos.get("numero") or "").strip()
+        piloto = pos.findtext('uniovi:piloto', default="", namespaces=NS)
+        if numero or piloto:
+            carrera.posiciones.append((numero, piloto))
+
+
+def _leerOrigen(elem):
+    """
+    Devuelve el Punto de <ubicacion>/<origen>, o None si le falta longitud o latitud
+    """
+    origen = elem.find('uniovi:origen', NS)
+    if origen is None:
+        return None
+    lon = _texto(origen.find('uniovi:longitud', NS))
+    lat = _texto(origen.find('uniovi:latitud', NS))
+    if not lon or not lat:
+        return None
+    alt = _texto(origen.find('uniovi:altitud', NS))
+    return Punto(_decimal(lon, 0.0), _decimal(lat, 0.0), _decimal(alt, 0.0))
+
+
+def _leerMedios(elem, ruta):
+    return [Medio(_texto(m), (m.get("descripción") or "").strip())
+            for m in elem.findall(ruta, NS)]
+
+
+def cargarCircuito(archivoXML, usarCache=None, validar=None):
+    """
+    Analiza 'archivoXML' una sola vez (en streaming) y devuelve un ModeloCircuito.
+    Lanza ErrorCircuito si el archivo no existe o no es XML válido.
+    Con 'usarCache' (por defecto, USAR_CACHE) el modelo se lee de la caché
+    binaria si el XML no ha cambiado (ver cache.py).
+    Con 'validar' (por defecto, VALIDAR) el XML se valida contra circuito.xsd
+    en la misma pasada (sin caché) y se lanza validacion.ErrorValidacion,
+    subclase de ErrorCircuito, con los errores y sus líneas.
+    """
+    if usarCache is None:
+        usarCache = USAR_CACHE
+    if validar is None:
+        validar = VALIDAR
+    if usarCache and not validar:
+        from cache import cargarCacheado  # aquí: cache.py importa este módulo
+        return cargarCacheado(archivoXML)
+
+    validador = None
+    if validar:
+        from validacion import compilar  # aquí: validacion.py importa este módulo
+        validador = compilar().validador()
+
+    with etapa("carga") as e:
+        modelo = ModeloCircuito(archivoXML)
+        addTramo = modelo.addTramo
+
+        for etiqueta, dato in _recorrer(archivoXML, validador):
+            if etiqueta == TRAMO:
+                addTramo(*dato)
+            elif etiqueta == _etiqueta('nombre'):
+                modelo.nombre = dato.text or ""
+            elif etiqueta == _etiqueta('pais'):
+                modelo.pais = dato.text or ""
+            elif etiqueta == _etiqueta('localidad'):
+                modelo.localidad = dato.text or ""
+            elif etiqueta == _etiqueta('longitudCircuito'):
+                modelo.longitudCircuito = _medida(dato)
+            elif etiqueta == _etiqueta('anchuraMedia'):
+                modelo.anchuraMedia = _medida(dato)
+            elif etiqueta == _etiqueta('carrera'):
+                _leerCarrera(modelo.carrera, dato)
+            elif etiqueta == _etiqueta('ubicacion'):
+                modelo.origen = _leerOrigen(dato)
+            elif etiqueta in (_etiqueta('referencias'), 'referencias'):
+                # Referencias (con o sin namespace)
+                refs = dato.findall('uniovi:ref', NS) or dato.findall('ref')
+                modelo.referencias = [_texto(n) for n in refs if _texto(n)]
+            elif etiqueta == _etiqueta('media'):
+                modelo.fotos = _leerMedios(dato, 'uniovi:fotos/uniovi:foto')
+                modelo.videos = _leerMedios(dato, 'uniovi:videos/uniovi:video')
+        e.elementos = len(modelo)
+
+    if validador is not None and validador.incidencias:
+        from validacion import ErrorValidacion
+        raise ErrorValidacion(archivoXML, validador.terminar(archivoXML), validador.total)
+    return modelo
+
+
+def formatearCoordenada(valor):
+    """
+    Escribe una coordenada con la representación más corta que la reproduce
+    (igual que el texto del XML para valores con hasta 17 cifras)
+    """
+    if valor.is_integer() and abs(valor) < 1e15:
+        return str(int(valor))
+    return repr(valor)
@@ -0,0 +1,341 @@
+# -*- coding: utf-8 -*-
+"""
+Construcción incremental de circuito.kml, altimetria.svg e InfoCircuito.html.
+
+Por cada circuito se guarda un manifiesto (.<xml>.construccion.json junto a
+las salidas) con, para cada salida: el archivo fuente y su tamaño, fecha de
+modificación y hash, la versión del conversor, las opciones usadas y la
+huella de la parte del modelo de la que depende la salida:
+  - kml:  origen, coordenadas y sectores (con track, también distancias y
+          carrera)
+  - svg:  altitud del origen, distancias, altitudes y sectores
+  - html: metadatos, referencias y media
+Además se guarda el tamaño y la fecha de los archivos que lee cada
+conversor aparte del XML (ver dependencias): las fotos y vídeos que sondea
+el HTML y los posters de los vídeos, la altimetría que enlaza y los
+manifiestos o tiempos que se pasan como ruta.
+Una salida solo se regenera si falta, si cambia la versión o las opciones,
+si cambia alguna de sus dependencias o si cambia su huella; así, por
+ejemplo, editar solo <media> regenera solo el HTML. Si el XML no ha cambiado
+(mismo tamaño y fecha, o mismo hash) no se llega a analizar, y una
+construcción sin cambios tarda milisegundos.
+
+Uso: python construccion.py [archivoXML] [-f]
+
+@version 1.0 07/Noviembre/2025
+@author: Marcelo Díez Domínguez UO293820
+"""
+
+import argparse
+import hashlib
+import json
+import os
+
+from circuito import cargarCircuito, ErrorCircuito
+from medios import POSTERS
+from salida import escrituraAtomica
+import xml2kml
+import xml2altimetria
+import xml2html
+
+# Conversor -> (módulo, función generadora)
+CONVERSORES = {
+    "kml": (xml2kml, xml2kml.generarKml),
+    "svg": (xml2altimetria, xml2altimetria.generarAltimetria),
+    "html": (xml2html, xml2html.generar_html),
+}
+
+# Salidas por defecto de cada conversor (las de los main() de cada script)
+SALIDAS = {
+    "kml": "circuito.kml",
+    "svg": "altimetria.svg",
+    "html": "InfoCircuito.html",
+}
+
+GENERADO = "generado"
+AL_DIA = "al día"
+
+
+# ---------- Huellas ----------
+
+def hashArchivo(ruta):
+    """
+    SHA-256 del contenido de 'ruta' (leído por bloques)
+    """
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def _actualizar(h, *valores):
+    for v in valores:
+        if isinstance(v, (bytes, bytearray, memoryview)):
+            h.update(bytes(v) if not isinstance(v, bytes) else v)
+        elif hasattr(v, "tobytes"):
+            h.update(v.tobytes())
+        else:
+            h.update(repr(v).encode("utf-8"))
+        h.update(b"\0")
+
+
+def huella(modelo, conversor, opciones=None):
+    """
+    Hash de la parte del modelo de la que depende la salida de 'conversor'
+    con 'opciones'
+    """
+    h = hashlib.sha256()
+    origen = modelo.origen
+    if conversor == "kml":
+        _actualizar(h, origen and (origen.longitud, origen.latitud, origen.altitud),
+                    modelo.longitudes, modelo.latitudes, modelo.altitudes, modelo.sectores)
+        if (opciones or {}).get("track"):
+            # Los instantes del <gx:Track> salen de las distancias y la carrera
+            carrera = modelo.carrera
+            _actualizar(h, modelo.distancias, [getattr(carrera, campo) for campo in carrera.__slots__])
+    elif conversor == "svg":
+        _actualizar(h, origen and origen.altitud,
+                    modelo.distancias, modelo.altitudes, modelo.sectores)
+    elif conversor == "html":
+        carrera = modelo.carrera
+        _actualizar(h, modelo.nombre, modelo.pais, modelo.localidad,
+                    (modelo.longitudCircuito.valor, modelo.longitudCircuito.unidades),
+                    (modelo.anchuraMedia.valor, modelo.anchuraMedia.unidades),
+                    [getattr(carrera, campo) for campo in carrera.__slots__],
+                    modelo.referencias,
+                    [(m.ruta, m.descripcion) for m in modelo.fotos],
+                    [(m.ruta, m.descripcion) for m in modelo.videos])
+    else:
+        raise ValueError("Conversor desconocido: " + str(conversor))
+    return h.hexdigest()
+
+
+def _firmaArchivo(ruta):
+    """
+    [tamaño, fecha] de 'ruta', o None si no existe
+    """
+    try:
+        st = os.stat(ruta)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def dependencias(modelo, conversor, ruta, opciones=None):
+    """
+    Archivos (aparte del XML) que lee 'conversor' al generar 'ruta' con
+    'opciones', con su firma (ver _firmaArchivo): ruta absoluta -> firma.
+    Los que no existen también cuentan (p.ej. un poster que se añade luego).
+    """
+    opciones = opciones or {}
+    archivos = [opciones[o] for o in ("tiempos", "imagenes")
+                if isinstance(opciones.get(o), (str, os.PathLike))]
+    if conversor == "kml" and opciones.get("icono") and str(ruta).lower().endswith(".kmz"):
+        archivos.append(opciones["icono"])
+    elif conversor == "html" and opciones.get("sondeo", True):
+        # Mismas rutas que xml2html.generar_html
+        directorio = os.path.dirname(os.path.abspath(ruta))
+        if opciones.get("altimetria") and opciones.get("medida_altimetria") is None:
+            archivos.append(os.path.join(directorio, opciones["altimetria"]))
+        multimedia = os.path.join(directorio, os.pardir, "multimedia")
+        for medio in modelo.fotos + modelo.videos:
+            if medio.ruta:
+                archivos.append(os.path.join(multimedia, os.path.basename(medio.ruta.strip())))
+        for medio in modelo.videos:
+            if medio.ruta:
+                raiz = os.path.splitext(os.path.basename(medio.ruta.strip()))[0]
+                archivos.extend(os.path.join(multimedia, raiz + sufijo) for sufijo in POSTERS)
+    return {os.path.abspath(a): _firmaArchivo(a) for a in archivos}
+
+
+# ---------- Manifiesto ----------
+
+def rutaManifiesto(archivoXML, directorio):
+    """
+    Manifiesto del circuito 'archivoXML' en 'directorio' (uno por circuito,
+    para que varios procesos puedan construir circuitos distintos a la vez)
+    """
+    base = os.path.splitext(os.path.basename(archivoXML))[0]
+    return os.path.join(directorio, "." + base + ".construccion.json")
+
+
+def leerManifiesto(ruta):
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return {}
+
+
+def escribirManifiesto(ruta, manifiesto):
+    """
+    Escribe el manifiesto de forma atómica (archivo temporal + rename)
+    """
+    temporal = ruta + ".tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, indent=2, sort_keys=True, ensure_ascii=False)
+    os.replace(temporal, ruta)
+
+
+def _firmaFuente(archivoXML):
+    st = os.stat(archivoXML)
+    return {"tamaño": st.st_size, "mtime": st.st_mtime_ns}
+
+
+def _serializable(valor):
+    # Opciones que no son JSON (p.ej. salida.Compresion): su forma estable
+    if hasattr(valor, "comoDiccionario"):
+        return valor.comoDiccionario()
+    return repr(valor)
+
+
+def _normalizarOpciones(opciones):
+    """
+    Copia JSON de 'opciones' para el manifiesto (los conversores reciben
+    las originales)
+    """
+    return json.loads(json.dumps(opciones or {}, sort_keys=True, default=_serializable))
+
+
+# ---------- Construcción ----------
+
+class Construccion(object):
+    """
+    Construye las salidas de un circuito regenerando solo las desactualizadas.
+
+    'salidas': conversor -> ruta; 'opciones': conversor -> kwargs del conversor
+    (en el manifiesto se guarda su forma JSON, ver _normalizarOpciones).
+    'modelo' permite reutilizar un ModeloCircuito ya cargado (ver vigilar.py).
+    """
+
+    def __init__(self, archivoXML, salidas=None, opciones=None):
+        self.archivoXML = archivoXML
+        self.salidas = dict(salidas or SALIDAS)
+        self.argumentos = {c: dict((opciones or {}).get(c) or {}) for c in self.salidas}
+        self.opciones = {c: _normalizarOpciones(self.argumentos[c]) for c in self.salidas}
+        directorio = os.path.dirname(os.path.abspath(next(iter(self.salidas.values()))))
+        self.manifiesto = rutaManifiesto(archivoXML, directorio)
+        self.modelo = None
+        self._hashFuente = None
+
+    def _hash(self):
+        """
+        Hash del XML (se calcula como mucho una vez por construcción)
+        """
+        if self._hashFuente is None:
+            self._hashFuente = hashArchivo(self.archivoXML)
+        return self._hashFuente
+
+    def _entrada(self, conversor):
+        modulo = CONVERSORES[conversor][0]
+        return {
+            "fuente": os.path.abspath(self.archivoXML),
+            "version": modulo.VERSION,
+            "opciones": self.opciones[conversor],
+        }
+
+    def pendientes(self, manifiesto=None, forzar=False):
+        """
+        Conversores cuya salida hay que regenerar. Si el XML ha cambiado,
+        carga el modelo (self.modelo) para comparar las huellas.
+        """
+        if manifiesto is None:
+            manifiesto = leerManifiesto(self.manifiesto)
+        firma = _firmaFuente(self.archivoXML)
+
+        pendientes = []
+        for conversor, ruta in self.salidas.items():
+            registro = manifiesto.get(conversor)
+            esperado = self._entrada(conversor)
+            if (forzar or registro is None or not os.path.exists(ruta)
+                    or registro.get("salida") != os.path.abspath(ruta)
+                    or any(registro.get(k) != v for k, v in esperado.items())):
+                pendientes.append(conversor)
+                continue
+            if any(_firmaArchivo(a) != f for a, f in registro.get("dependencias", {}).items()):
+                pendientes.append(conversor)
+                continue
+            if registro.get("firma") == firma:
+                continue  # XML intacto: ni se lee
+            if registro.get("hash") == self._hash():
+                continue
+            if self.modelo is None:
+                self.modelo = cargarCircuito(self.archivoXML)
+            if registro.get("huella") != huella(self.modelo, conversor, self.argumentos[conversor]):
+                pendientes.append(conversor)
+        return pendientes
+
+    def construir(self, forzar=False):
+        """
+        Regenera las salidas desactualizadas (cada una con una escritura
+        atómica, ver salida.escrituraAtomica) y actualiza el manifiesto.
+        Devuelve un diccionario conversor -> GENERADO / AL_DIA / None (no generado).
+        Lanza ErrorCircuito si el XML no se puede cargar.
+        """
+        self._hashFuente = None
+        manifiesto = leerManifiesto(self.manifiesto)
+        pendientes = self.pendientes(manifiesto, forzar)
+        firma = _firmaFuente(self.archivoXML)
+        cambiado = any(manifiesto.get(c, {}).get("firma") != firma for c in self.salidas)
+        if not pendientes and not cambiado:
+            return {conversor: AL_DIA for conversor in self.salidas}
+        hashFuente = self._hash()
+
+        estados = {}
+        for conversor, ruta in self.salidas.items():
+            if conversor not in pendientes:
+                estados[conversor] = AL_DIA
+                manifiesto[conversor].update(firma=firma, hash=hashFuente)
+                continue
+
+            if self.modelo is None:
+                self.modelo = cargarCircuito(self.archivoXML)
+            generar = CONVERSORES[conversor][1]
+            argumentos = self.argumentos[conversor]
+            # En un temporal que se renombra al terminar: si el conversor falla,
+            # la salida anterior queda intacta (sus mensajes nombrarían el temporal)
+            with escrituraAtomica(ruta) as temporal:
+                generado = generar(self.modelo, temporal, **dict({"informar": None}, **argumentos))
+            if generado is None:
+                estados[conversor] = None
+                manifiesto.pop(conversor, None)
+                continue
+
+            registro = self._entrada(conversor)
+            registro.update(salida=os.path.abspath(ruta), firma=firma, hash=hashFuente,
+                            huella=huella(self.modelo, conversor, argumentos),
+                            dependencias=dependencias(self.modelo, conversor, ruta, argumentos))
+            manifiesto[conversor] = registro
+            estados[conversor] = GENERADO
+
+        escribirManifiesto(self.manifiesto, manifiesto)
+        return estados
+
+
+def construir(archivoXML, salidas=None, opciones=None, forzar=False, modelo=None):
+    """
+    Atajo: construye las salidas de 'archivoXML' (ver Construccion)
+    """
+    construccion = Construccion(archivoXML, salidas, opciones)
+    construccion.modelo = modelo
+    return construccion.construir(forzar)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Construcción incremental de KML, SVG y HTML")
+    parser.add_argument("archivoXML", nargs="?", default="circuitoEsquema.xml")
+    parser.add_argument("-f", "--forzar", action="store_true", help="regenerar todas las salidas")
+    args = parser.parse_args()
+
+    try:
+        estados = construir(args.archivoXML, forzar=args.forzar)
+    except ErrorCircuito as e:
+        print(e)
+        return
+
+    for conversor, estado in estados.items():
+        print(f"{SALIDAS[conversor]}: {estado or 'no generado'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+"""
+Empaquetado de InfoCircuito.html para publicarlo: etapa posterior a la
+generación que deja en un directorio de publicación (por defecto, publicar/
+junto al HTML):
+  - el HTML, con el mismo nombre, con las hojas de estilo críticas
+    (CRITICAS, por defecto layout.css) en línea en un <style> minificado y
+    la altimetría (<img src="*.svg">) en línea como <svg>, de modo que la
+    primera pintura no espera a ninguna petición
+  - en recursos/, el resto de estilo/*.css minificadas y los demás
+    recursos locales (fotos, vídeos, pósters, KML, icono), con el hash de
+    su contenido en el nombre (p.ej. estilo.3f2a9c81d0.css)
+Las referencias del HTML (href, src, srcset, poster) y las url() de las
+hojas de estilo se reescriben a los nombres con hash. Un nombre con hash
+solo cambia si cambia el contenido, así que los recursos se pueden servir
+con caché permanente (Cache-Control: immutable) y solo el HTML se
+revalida. Un recurso que ya está publicado no se vuelve a copiar.
+
+Las hojas críticas son una lista explícita (no se calcula qué reglas usa
+la primera pantalla): layout.css solo tiene la maquetación.
+
+Uso: python empaquetado.py [archivoHTML] [-o destino] [--criticas layout.css ...]
+
+@version 1.0 21/Noviembre/2025
+@author: Marcelo Díez Domínguez UO293820
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import shutil
+from html.parser import HTMLParser
+from urllib.parse import unquote, urlsplit
+
+from salida import abrirSalida, escrituraAtomica, escaparAtributoHtml
+
+# Hojas de estilo que se incluyen en línea en el HTML (por nombre)
+CRITICAS = ("layout.css",)
+
+# Directorio de los recursos con hash (dentro del destino)
+RECURSOS = "recursos"
+
+# Caracteres (hexadecimales) del hash en los nombres
+LONGITUD_HASH = 10
+
+# Tamaño máximo (bytes) de un SVG para incluirlo en línea; los mayores se
+# publican como recurso con hash
+LIMITE_SVG = 256 * 1024
+
+
+class ErrorEmpaquetado(Exception):
+    """
+    Error al empaquetar (HTML inexistente o recurso ilegible)
+    """
+
+
+# ---------- CSS ----------
+
+# Cadenas (se conservan tal cual) y comentarios (se eliminan)
+_CADENA_CSS = r"\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*'"
+_COMENTARIO_CSS = re.compile(rf"({_CADENA_CSS})|/\*.*?\*/", re.S)
+_PARTES_CSS = re.compile(rf"({_CADENA_CSS})", re.S)
+_URL_CSS = re.compile(r"url\(\s*([\"']?)([^\"')]*)\1\s*\)")
+
+
+def minificarCss(css):
+    """
+    Minifica la hoja de estilo 'css': quita comentarios y espacios
+    sobrantes (alrededor de { } ; , > y tras :) y el último ; de cada
+    bloque. Las cadenas no se tocan.
+    """
+    css = _COMENTARIO_CSS.sub(lambda m: m.group(1) or " ", css)
+    partes = _PARTES_CSS.split(css)
+    for i in range(0, len(partes), 2):
+        codigo = re.sub(r"\s+", " ", partes[i])
+        codigo = re.sub(r" ?([{};,>]) ?", r"\1", codigo)
+        codigo = codigo.replace(": ", ":").replace(";}", "}")
+        partes[i] = codigo
+    return "".join(partes).strip()
+
+
+# ---------- Recursos ----------
+
+def _local(referencia):
+    """
+    Ruta (sin consulta ni fragmento) de 'referencia' si es un archivo
+    local relativo, o None (URL absoluta, data:, fragmento...)
+    """
+    if not referencia:
+        return None
+    partes = urlsplit(referencia)
+    if partes.scheme or partes.netloc or not partes.path or partes.path.startswith("/"):
+        return None
+    return unquote(partes.path)
+
+
+def _pagina(referencia):
+    """
+    True si 'referencia' es otra página (se enlaza sin hash)
+    """
+    return urlsplit(referencia).path.lower().endswith((".html", ".htm", "/"))
+
+
+def nombreConHash(nombre, contenido):
+    """
+    'nombre' con el hash de 'contenido' (bytes) antes de la extensión
+    """
+    raiz, extension = os.path.splitext(nombre)
+    return f"{raiz}.{hashlib.sha256(contenido).hexdigest()[:LONGITUD_HASH]}{extension}"
+
+
+class Empaquetador(object):
+    """
+    Publica los recursos de un HTML en 'destino'/RECURSOS con nombres con
+    hash y recuerda los ya publicados (ruta original -> nombre con hash)
+    """
+
+    __slots__ = ("destino", "recursos", "publicados", "escritos")
+
+    def __init__(self, destino):
+        self.destino = destino
+        self.recursos = os.path.join(destino, RECURSOS)
+        self.publicados = {}
+        self.escritos = 0
+
+    def _escribir(self, nombre, contenido=None, origen=None):
+        ruta = os.path.join(self.recursos, nombre)
+        if os.path.exists(ruta):
+            return
+        os.makedirs(self.recursos, exist_ok=True)
+        with escrituraAtomica(ruta) as temporal:
+            if origen is not None:
+                shutil.copyfile(origen, temporal)
+            else:
+                with open(temporal, "wb") as f:
+                    f.write(contenido)
+        self.escritos += 1
+
+    def publicar(self, ruta):
+        """
+        Publica el archivo 'ruta' y devuelve su nombre con hash. Las hojas
+        de estilo se minifican (y se publican sus url()) antes del hash.
+        """
+        ruta = os.path.normpath(os.path.abspath(ruta))
+        nombre = self.publicados.get(ruta)
+        if nombre is not None:
+            return nombre
+        if ruta.lower().endswith(".css"):
+            contenido = self.hojaEstilo(ruta, "").encode("utf-8")
+            nombre = nombreConHash(os.path.basename(ruta), contenido)
+            self._escribir(nombre, contenido)
+        else:
+            h = hashlib.sha256()
+            try:
+                with open(ruta, "rb") as f:
+                    for bloque in iter(lambda: f.read(1 << 20), b""):
+                        h.update(bloque)
+            except IOError as e:
+                raise ErrorEmpaquetado(f"No se puede leer {ruta}: {e}") from e
+            raiz, extension = os.path.splitext(os.path.basename(ruta))
+            nombre = f"{raiz}.{h.hexdigest()[:LONGITUD_HASH]}{extension}"
+            self._escribir(nombre, origen=ruta)
+        self.publicados[ruta] = nombre
+        return nombre
+
+    def referencia(self, valor, base, prefijo):
+        """
+        'valor' (referencia relativa a 'base') apuntando al recurso
+        publicado, precedido de 'prefijo'; sin cambios si no es un archivo
+        local existente
+        """
+        local = _local(valor)
+        if local is None:
+            return valor
+        ruta = os.path.join(base, local)
+        if not os.path.isfile(ruta):
+            return valor
+        fragmento = urlsplit(valor).fragment
+        return prefijo + self.publicar(ruta) + (f"#{fragmento}" if fragmento else "")
+
+    def hojaEstilo(self, ruta, prefijo):
+        """
+        Hoja de estilo 'ruta' minificada, con sus url() a los recursos
+        publicados (precedidos de 'prefijo')
+        """
+        try:
+            with open(ruta, encoding="utf-8") as f:
+                css = f.read()
+        except IOError as e:
+            raise ErrorEmpaquetado(f"No se puede leer {ruta}: {e}") from e
+        base = os.path.dirname(ruta)
+
+        def url(m):
+            return f"url({self.referencia(m.group(2).strip(), base, prefijo)})"
+
+        return _URL_CSS.sub(url, minificarCss(css))
+
+
+# ---------- HTML ----------
+
+_DECLARACION_XML = re.compile(r"^\s*<\?xml[^>]*\?>\s*")
+_RAIZ_SVG = re.compile(r"<svg\b")
+
+
+def _etiqueta(nombre, atributos, cerrada=False):
+    partes = [nombre]
+    for clave, valor in atributos:
+        partes.append(clave if valor is None else f'{clave}="{escaparAtributoHtml(valor)}"')
+    return f"<{' '.join(partes)}{' /' if cerrada else ''}>"
+
+
+def _atributo(atributos, clave):
+    for k, v in atributos:
+        if k == clave:
+            return v
+    return None
+
+
+class _Reescritor(HTMLParser):
+    """
+    Recorre el HTML y anota, por cada etiqueta de apertura que hay que
+    cambiar, su posición en el texto y su sustituta
+    """
+
+    def __init__(self, empaquetador, base, criticas, limiteSvg):
+        super().__init__(convert_charrefs=True)
+        self.empaquetador = empaquetador
+        self.base = base
+        self.criticas = criticas
+        self.limiteSvg = limiteSvg
+        self.cambios = []
+        self._lineas = None
+
+    def reescribir(self, html):
+        inicios = [0]
+        for linea in html.splitlines(keepends=True):
+            inicios.append(inicios[-1] + len(linea))
+        self._lineas = inicios
+        self.feed(html)
+        self.close()
+        partes = []
+        posicion = 0
+        for inicio, fin, sustituta in self.cambios:
+            partes.append(html[posicion:inicio])
+            partes.append(sustituta)
+            posicion = fin
+        partes.append(html[posicion:])
+        return "".join(partes)
+
+    def _cambiar(self, sustituta):
+        linea, columna = self.getpos()
+        inicio = self._lineas[linea - 1] + columna
+        self.cambios.append((inicio, inicio + len(self.get_starttag_text()), sustituta))
+
+    def _recurso(self, valor):
+        return self.empaquetador.referencia(valor, self.base, RECURSOS + "/")
+
+    def _srcset(self, valor):
+        candidatos = []
+        for candidato in valor.split(","):
+            partes = candidato.split()
+            if partes:
+                partes[0] = self._recurso(partes[0])
+            candidatos.append(" ".join(partes))
+        return ", ".join(candidatos)
+
+    def _svgEnLinea(self, atributos):
+        local = _local(_atributo(atributos, "src"))
+        if local is None or not local.lower().endswith(".svg"):
+            return None
+        ruta = os.path.join(self.base, local)
+        if not os.path.isfile(ruta) or os.path.getsize(ruta) > self.limiteSvg:
+            return None
+        with open(ruta, encoding="utf-8") as f:
+            svg = _DECLARACION_XML.sub("", f.read(), count=1).rstrip()
+        accesible = ' role="img"'
+        alt = _atributo(atributos, "alt")
+        if alt:
+            accesible += f' aria-label="{escaparAtributoHtml(alt)}"'
+        return _RAIZ_SVG.sub("<svg" + accesible, svg, count=1)
+
+    def handle_starttag(self, tag, attrs):
+        self._etiqueta(tag, attrs, False)
+
+    def handle_startendtag(self, tag, attrs):
+        self._etiqueta(tag, attrs, True)
+
+    def _etiqueta(self, tag, attrs, cerrada):
+        if tag == "link":
+            href = _atributo(attrs, "href")
+            relaciones = (_atributo(attrs, "rel") or "").lower().split()
+            local = _local(href)
+            if "stylesheet" in relaciones and local is not None \
+                    and os.path.basename(local) in self.criticas \
+                    and os.path.isfile(os.path.join(self.base, local)):
+                css = self.empaquetador.hojaEstilo(os.path.join(self.base, local), RECURSOS + "/")
+                self._cambiar("<style>" + css.replace("</", "<\\/") + "</style>")
+                return
+        elif tag == "img":
+            svg = self._svgEnLinea(attrs)
+            if svg is not None:
+                self._cambiar(svg)
+                return
+
+        nuevos = []
+        for clave, valor in attrs:
+            if valor is not None:
+                if clave == "srcset":
+                    valor = self._srcset(valor)
+                elif clave in ("src", "poster") or (clave == "href" and tag == "link"):
+                    valor = self._recurso(valor)
+                elif clave == "href" and tag == "a" and not _pagina(valor):
+                    valor = self._recurso(valor)
+            nuevos.append((clave, valor))
+        if nuevos != attrs:
+            self._cambiar(_etiqueta(tag, nuevos, cerrada))
+
+
+def empaquetar(archivoHTML, destino=None, criticas=CRITICAS, limiteSvg=LIMITE_SVG):
+    """
+    Empaqueta 'archivoHTML' en 'destino' (por defecto, publicar/ junto al
+    HTML). Devuelve (ruta del HTML publicado, Empaquetador con los recursos
+    publicados). Lanza ErrorEmpaquetado.
+    """
+    archivoHTML = os.path.abspath(archivoHTML)
+    base = os.path.dirname(archivoHTML)
+    destino = destino or os.path.join(base, "publicar")
+    try:
+        with open(archivoHTML, encoding="utf-8") as f:
+            html = f.read()
+    except IOError as e:
+        raise ErrorEmpaquetado(f"No se puede leer {archivoHTML}: {e}") from e
+
+    empaquetador = Empaquetador(destino)
+    html = _Reescritor(empaquetador, base, frozenset(criticas), limiteSvg).reescribir(html)
+
+    os.makedirs(destino, exist_ok=True)
+    ruta = os.path.join(destino, os.path.basename(archivoHTML))
+    with escrituraAtomica(ruta) as temporal:
+        with abrirSalida(temporal) as f:
+            f.write(html)
+    return ruta, empaquetador
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Empaqueta el HTML del circuito para publicarlo")
+    parser.add_argument("archivoHTML", nargs="?", default="InfoCircuito.html")
+    parser.add_argument("-o", "--destino", help="directorio de publicación (por defecto, publicar/)")
+    parser.add_argument("--criticas", nargs="*", default=list(CRITICAS),
+                        help="hojas de estilo que se incluyen en línea")
+    args = parser.parse_args()
+
+    try:
+        ruta, empaquetador = empaquetar(args.archivoHTML, args.destino, args.criticas)
+    except ErrorEmpaquetado as e:
+        print(e)
+        return
+    for original, nombre in empaquetador.publicados.items():
+        print(f"{os.path.relpath(original)} -> {RECURSOS}/{nombre}")
+    print(f"Publicado: {ruta} ({empaquetador.escritos} recursos nuevos)")
+
+if __name__ == "__main__":
+    main()
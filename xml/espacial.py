@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+"""
+Índice espacial del trazado para situar puntos (lon, lat) sobre la pista:
+para cada consulta devuelve el punto más cercano del trazado, la distancia
+recorrida en la vuelta hasta él y su sector.
+
+El trazado (origen, tramos y cierre al origen) se proyecta a metros en un
+plano local (simplificacion.proyectarMetros) y sus segmentos se reparten en
+una rejilla uniforme de celdas cuadradas. Una consulta solo examina los
+segmentos de las celdas cercanas, ampliando la búsqueda por anillos hasta
+que el segmento encontrado está más cerca que cualquier celda sin examinar,
+así que el coste no depende del número de tramos sino de la densidad local.
+
+consultarLote() agrupa las consultas por celda y, con NumPy, resuelve cada
+grupo contra los segmentos de sus 3x3 celdas de una vez; las consultas
+alejadas de la pista se resuelven una a una por anillos.
+
+Uso: python espacial.py [archivoXML] lon lat
+
+@version 1.0 12/Noviembre/2025
+@author: Marcelo Díez Domínguez UO293820
+"""
+
+import argparse
+from array import array
+from math import floor, hypot, inf
+
+from circuito import cargarCircuito, ErrorCircuito, SIN_SECTOR
+from geodesia import haversine
+from simplificacion import proyectarMetros
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional: sin él se usa Python puro
+    np = None
+
+
+class Posicion(object):
+    """
+    Resultado de una consulta:
+      - tramo: índice del tramo en el que termina el segmento más cercano
+        (None para el cierre entre el último tramo y el origen)
+      - fraccion: posición (0..1) dentro del segmento
+      - distancia: metros recorridos en la vuelta desde el origen
+      - sector: sector del segmento (None si no tiene)
+      - longitud, latitud: punto del trazado más cercano
+      - separacion: metros entre la consulta y ese punto
+    """
+    __slots__ = ('tramo', 'fraccion', 'distancia', 'sector', 'longitud', 'latitud', 'separacion')
+
+    def __init__(self, tramo, fraccion, distancia, sector, longitud, latitud, separacion):
+        self.tramo = tramo
+        self.fraccion = fraccion
+        self.distancia = distancia
+        self.sector = sector
+        self.longitud = longitud
+        self.latitud = latitud
+        self.separacion = separacion
+
+    def __repr__(self):
+        return (f"Posicion(tramo={self.tramo}, distancia={self.distancia:.2f}, "
+                f"sector={self.sector}, separacion={self.separacion:.2f})")
+
+
+class IndiceEspacial(object):
+    """
+    Rejilla uniforme con los segmentos del trazado de un ModeloCircuito.
+    'celda' es el lado de la celda en metros; por defecto, el doble de la
+    longitud media de los segmentos, o mayor si hace falta para que haya del
+    orden de una celda por segmento en la caja envolvente del trazado.
+    """
+
+    def __init__(self, modelo, celda=None):
+        origen = modelo.origen
+        puntos = [(None, origen.longitud, origen.latitud)] if origen is not None else []
+        puntos += [(i, lon, lat) for i, (lon, lat) in enumerate(zip(modelo.longitudes, modelo.latitudes))
+                   if lon == lon and lat == lat]  # tramos sin coordenadas fuera
+        if len(puntos) < 2:
+            raise ValueError("El trazado necesita al menos dos puntos con coordenadas")
+
+        # Vértices: puntos del trazado y, al final, otra vez el primero (cierre)
+        puntos.append(puntos[0])
+        self.tramos = [p[0] for p in puntos[1:]]
+        self.tramos[-1] = None
+        lons = array('d', (p[1] for p in puntos))
+        lats = array('d', (p[2] for p in puntos))
+        self.lons, self.lats = lons, lats
+        self.lat0 = lats[0]
+        self.kx = float(proyectarMetros([1.0], [0.0], self.lat0)[0][0])
+        self.ky = float(proyectarMetros([0.0], [1.0], self.lat0)[1][0])
+        self.xs = array('d', (lon * self.kx for lon in lons))
+        self.ys = array('d', (lat * self.ky for lat in lats))
+
+        # Sector de cada segmento: el del tramo en el que termina (el cierre
+        # pertenece al sector del último tramo)
+        sectores = modelo.sectores
+        self.sectores = bytearray(sectores[i] if i is not None else SIN_SECTOR for i in self.tramos)
+        if len(self.sectores) > 1:
+            self.sectores[-1] = self.sectores[-2]
+
+        # Distancia recorrida en la vuelta hasta el inicio de cada segmento
+        longitudes = haversine(lons[:-1], lats[:-1], lons[1:], lats[1:])
+        self.longitudesSegmento = array('d', (float(d) for d in longitudes))
+        self.acumuladas = array('d', [0.0])
+        s = 0.0
+        for d in self.longitudesSegmento:
+            s += d
+            self.acumuladas.append(s)
+        self.longitudVuelta = s
+
+        n = len(self.longitudesSegmento)
+        if celda is None:
+            media = sum(hypot(self.xs[k + 1] - self.xs[k], self.ys[k + 1] - self.ys[k]) for k in range(n)) / n
+            area = (max(self.xs) - min(self.xs)) * (max(self.ys) - min(self.ys))
+            celda = max(2.0 * media, (area / n) ** 0.5) or 1.0
+        self.celda = float(celda)
+        self._construirRejilla()
+
+    def __len__(self):
+        return len(self.longitudesSegmento)
+
+    # ---------- Rejilla ----------
+
+    def _celdaDe(self, x, y):
+        return floor(x / self.celda), floor(y / self.celda)
+
+    def _construirRejilla(self):
+        """
+        Registra cada segmento en todas las celdas que toca su caja envolvente
+        """
+        xs, ys, c = self.xs, self.ys, self.celda
+        self.rejilla = {}
+        for k in range(len(self)):
+            x0, x1 = sorted((xs[k], xs[k + 1]))
+            y0, y1 = sorted((ys[k], ys[k + 1]))
+            for cx in range(floor(x0 / c), floor(x1 / c) + 1):
+                for cy in range(floor(y0 / c), floor(y1 / c) + 1):
+                    self.rejilla.setdefault((cx, cy), []).append(k)
+        claves = list(self.rejilla)
+        self.limites = (min(k[0] for k in claves), max(k[0] for k in claves),
+                        min(k[1] for k in claves), max(k[1] for k in claves))
+
+    def _anillo(self, cx, cy, r):
+        """
+        Segmentos de las celdas a distancia de Chebyshev exactamente 'r' de
+        (cx, cy), recorriendo solo las que caen dentro de la rejilla ocupada
+        """
+        rejilla = self.rejilla
+        if r == 0:
+            return rejilla.get((cx, cy), ())
+        xmin, xmax, ymin, ymax = self.limites
+        segmentos = []
+        i0, i1 = max(cx - r, xmin), min(cx + r, xmax)
+        for j in (cy - r, cy + r):
+            if ymin <= j <= ymax:
+                for i in range(i0, i1 + 1):
+                    segmentos.extend(rejilla.get((i, j), ()))
+        j0, j1 = max(cy - r + 1, ymin), min(cy + r - 1, ymax)
+        for i in (cx - r, cx + r):
+            if xmin <= i <= xmax:
+                for j in range(j0, j1 + 1):
+                    segmentos.extend(rejilla.get((i, j), ()))
+        return segmentos
+
+    def _proyectar(self, k, x, y):
+        """
+        (distancia², fracción) del punto (x, y) al segmento k
+        """
+        ax, ay = self.xs[k], self.ys[k]
+        dx, dy = self.xs[k + 1] - ax, self.ys[k + 1] - ay
+        l2 = dx * dx + dy * dy
+        t = 0.0
+        if l2 > 0.0:
+            t = min(1.0, max(0.0, ((x - ax) * dx + (y - ay) * dy) / l2))
+        px, py = ax + t * dx - x, ay + t * dy - y
+        return px * px + py * py, t
+
+    def _buscar(self, x, y):
+        """
+        (segmento, fracción, distancia) del segmento más cercano a (x, y),
+        por anillos de celdas crecientes
+        """
+        cx, cy = self._celdaDe(x, y)
+        xmin, xmax, ymin, ymax = self.limites
+        # Anillos útiles: desde el primero que toca la rejilla ocupada hasta
+        # el que alcanza su celda más lejana
+        rmax = max(abs(cx - xmin), abs(cx - xmax), abs(cy - ymin), abs(cy - ymax))
+        r = max(xmin - cx, cx - xmax, ymin - cy, cy - ymax, 0)
+        mejor, mejor_t, mejor_d2 = None, 0.0, inf
+        vistos = set()
+        while r <= rmax:
+            for k in self._anillo(cx, cy, r):
+                if k in vistos:
+                    continue
+                vistos.add(k)
+                d2, t = self._proyectar(k, x, y)
+                if d2 < mejor_d2:
+                    mejor, mejor_t, mejor_d2 = k, t, d2
+            # Todo lo no examinado está a más de r celdas completas
+            if mejor is not None and mejor_d2 <= (r * self.celda) ** 2:
+                break
+            r += 1
+        return mejor, mejor_t, mejor_d2 ** 0.5
+
+    def _posicion(self, k, t, separacion):
+        x = self.xs[k] + t * (self.xs[k + 1] - self.xs[k])
+        y = self.ys[k] + t * (self.ys[k + 1] - self.ys[k])
+        sector = self.sectores[k]
+        return Posicion(self.tramos[k], t, self.acumuladas[k] + t * self.longitudesSegmento[k],
+                        sector if sector != SIN_SECTOR else None,
+                        x / self.kx, y / self.ky, separacion)
+
+    # ---------- Consultas ----------
+
+    def consultar(self, longitud, latitud):
+        """
+        Posicion del trazado más cercana al punto (longitud, latitud)
+        """
+        k, t, separacion = self._buscar(longitud * self.kx, latitud * self.ky)
+        return self._posicion(k, t, separacion)
+
+    def consultarLote(self, longitudes, latitudes):
+        """
+        Consulta muchos puntos a la vez. Devuelve (segmentos, distancias,
+        sectores, separaciones): arrays de NumPy si está instalado (listas si
+        no), con el índice de segmento (ver 'tramos'), los metros recorridos
+        en la vuelta, el sector (SIN_SECTOR si no tiene) y la separación en
+        metros de cada punto.
+        """
+        if np is None:
+            resultados = [self._buscar(lon * self.kx, lat * self.ky)
+                          for lon, lat in zip(longitudes, latitudes)]
+            segmentos = [k for k, _, _ in resultados]
+            distancias = [self.acumuladas[k] + t * self.longitudesSegmento[k] for k, t, _ in resultados]
+            return (segmentos, distancias, [self.sectores[k] for k in segmentos],
+                    [s for _, _, s in resultados])
+
+        qx = np.asarray(longitudes, dtype=float) * self.kx
+        qy = np.asarray(latitudes, dtype=float) * self.ky
+        n = qx.size
+        segmentos = np.empty(n, dtype=np.intp)
+        fracciones = np.empty(n)
+        separaciones = np.empty(n)
+
+        ax = np.frombuffer(self.xs, dtype=np.float64)
+        ay = np.frombuffer(self.ys, dtype=np.float64)
+        dx, dy = ax[1:] - ax[:-1], ay[1:] - ay[:-1]
+        l2 = dx * dx + dy * dy
+
+        # Agrupar por celda y resolver cada grupo contra sus 3x3 celdas
+        cx = np.floor(qx / self.celda).astype(np.int64)
+        cy = np.floor(qy / self.celda).astype(np.int64)
+        celdas, grupo = np.unique(np.stack((cx, cy), axis=1), axis=0, return_inverse=True)
+        grupo = grupo.reshape(-1)
+        orden = np.argsort(grupo, kind="stable")
+        cortes = np.searchsorted(grupo[orden], np.arange(len(celdas) + 1))
+        pendientes = []
+        for g, (i, j) in enumerate(celdas.tolist()):
+            consultas = orden[cortes[g]:cortes[g + 1]]
+            candidatos = sorted({k for a in (i - 1, i, i + 1) for b in (j - 1, j, j + 1)
+                                 for k in self.rejilla.get((a, b), ())})
+            if not candidatos:
+                pendientes.extend(consultas.tolist())
+                continue
+            k = np.asarray(candidatos)
+            px = qx[consultas, None] - ax[k]
+            py = qy[consultas, None] - ay[k]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                t = np.where(l2[k] > 0.0, (px * dx[k] + py * dy[k]) / l2[k], 0.0)
+            t = np.clip(t, 0.0, 1.0)
+            ex, ey = px - t * dx[k], py - t * dy[k]
+            d2 = ex * ex + ey * ey
+            mejor = np.argmin(d2, axis=1)
+            filas = np.arange(len(consultas))
+            segmentos[consultas] = k[mejor]
+            fracciones[consultas] = t[filas, mejor]
+            separaciones[consultas] = np.sqrt(d2[filas, mejor])
+            # Solo es exacto si el segmento está a menos de una celda
+            lejos = separaciones[consultas] > self.celda
+            pendientes.extend(consultas[lejos].tolist())
+
+        for q in pendientes:
+            k, t, s = self._buscar(float(qx[q]), float(qy[q]))
+            segmentos[q], fracciones[q], separaciones[q] = k, t, s
+
+        acumuladas = np.frombuffer(self.acumuladas, dtype=np.float64)
+        longitudes = np.frombuffer(self.longitudesSegmento, dtype=np.float64)
+        distancias = acumuladas[segmentos] + fracciones * longitudes[segmentos]
+        sectores = np.frombuffer(self.sectores, dtype=np.uint8)[segmentos]
+        return segmentos, distancias, sectores, separaciones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sitúa un punto (lon, lat) sobre el trazado del circuito")
+    parser.add_argument("archivoXML", nargs="?", default="circuitoEsquema.xml")
+    parser.add_argument("longitud", type=float)
+    parser.add_argument("latitud", type=float)
+    args = parser.parse_args()
+
+    try:
+        modelo = cargarCircuito(args.archivoXML)
+    except ErrorCircuito as e:
+        print(e)
+        return
+
+    p = IndiceEspacial(modelo).consultar(args.longitud, args.latitud)
+    tramo = f"tramo {p.tramo + 1}" if p.tramo is not None else "cierre"
+    print(f"{tramo}, sector {p.sector if p.sector is not None else '-'}: "
+          f"{p.distancia:.2f} m de vuelta, a {p.separacion:.2f} m de la pista "
+          f"({p.longitud:.8f}, {p.latitud:.8f})")
+
+if __name__ == "__main__":
+    main()
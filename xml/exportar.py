@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+"""
+Exportaciones compactas de la geometría del circuito con precisión
+controlada, generadas en una sola pasada a partir de las columnas del
+modelo:
+  - GeoJSON (.geojson): el origen (Point) y el trazado cerrado (LineString)
+  - polilínea codificada de Google (.polyline): algoritmo estándar de Google
+    con 10^-5 grados (o 10^-6, "polyline6", según la precisión)
+  - binario delta/varint (.trazado): columnas de enteros cuantizados, cada
+    valor como diferencia con el anterior en zigzag + varint LEB128
+
+La precisión se indica como pasos (grados, metros), p.ej. (1e-6, 0.1): un
+micrograduado son ~11 cm, más que suficiente para un GPS. Los pasos deben
+ser potencias de diez menores que 1. Con NumPy la cuantización y las
+codificaciones se calculan sobre arrays completos; sin él, en Python puro.
+
+Uso: python exportar.py [archivoXML] [-o base] [-f geojson polyline trazado]
+                        [--grados 1e-6] [--metros 0.1]
+
+@version 1.0 15/Noviembre/2025
+@author: Marcelo Díez Domínguez UO293820
+"""
+
+import argparse
+import json
+import struct
+from math import log10
+
+from circuito import cargarCircuito, ErrorCircuito
+from salida import abrirSalida, abrirSalidaBinaria, escribirUnidos
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional: sin él se usa Python puro
+    np = None
+
+# Precisión por defecto: (grados, metros)
+PRECISION = (1e-6, 0.1)
+
+FORMATOS = {"geojson": ".geojson", "polyline": ".polyline", "trazado": ".trazado"}
+
+# Cabecera del binario: firma, versión, puntos, decimales de grados y de metros
+FIRMA = b"MGPT"
+CABECERA = struct.Struct("<4sHQBB")
+
+
+def decimales(paso):
+    """
+    Número de decimales de un paso potencia de diez menor que 1
+    (1e-6 -> 6, 0.1 -> 1). Lanza ValueError con cualquier otro paso.
+    """
+    if not 0.0 < paso < 1.0:
+        # Un paso de 1 o más daría 0 o menos decimales (y el binario los guarda sin signo)
+        raise ValueError(f"El paso de cuantización debe ser menor que 1: {paso}")
+    d = round(-log10(paso))
+    if abs(10.0 ** -d - paso) > 1e-9 * paso:
+        raise ValueError(f"El paso de cuantización debe ser una potencia de diez: {paso}")
+    return d
+
+
+# ---------- Cuantización ----------
+
+def cuantizar(modelo, precision=PRECISION):
+    """
+    Enteros cuantizados (lons, lats, alts) del trazado cerrado: origen,
+    tramos con coordenadas y otra vez el origen. Un valor v se guarda como
+    round(v * 10^decimales). Devuelve arrays int64 de NumPy o listas.
+    """
+    dg, dm = decimales(precision[0]), decimales(precision[1])
+    origen = modelo.origen
+    if np is not None:
+        lons = np.frombuffer(modelo.longitudes, dtype=np.float64)
+        lats = np.frombuffer(modelo.latitudes, dtype=np.float64)
+        alts = np.frombuffer(modelo.altitudes, dtype=np.float64)
+        validos = ~np.isnan(lons)
+        columnas = []
+        for columna, valor0, d in ((lons, origen.longitud, dg), (lats, origen.latitud, dg),
+                                   (alts, origen.altitud, dm)):
+            todo = np.concatenate(([valor0], columna[validos], [valor0]))
+            columnas.append(np.rint(todo * 10.0 ** d).astype(np.int64))
+        return tuple(columnas)
+
+    filas = [(lon, lat, alt) for lon, lat, alt in
+             zip(modelo.longitudes, modelo.latitudes, modelo.altitudes) if lon == lon]
+    punto0 = (origen.longitud, origen.latitud, origen.altitud)
+    filas = [punto0] + filas + [punto0]
+    return tuple([round(fila[k] * 10.0 ** d) for fila in filas]
+                 for k, d in ((0, dg), (1, dg), (2, dm)))
+
+
+def _diferencias(valores):
+    if np is not None:
+        return np.diff(valores, prepend=0)
+    return [b - a for a, b in zip([0] + list(valores[:-1]), valores)]
+
+
+def _zigzag(valores):
+    """
+    Enteros con signo a sin signo: 0, -1, 1, -2, 2... -> 0, 1, 2, 3, 4...
+    """
+    if np is not None:
+        return ((valores << 1) ^ (valores >> 63)).astype(np.uint64)
+    return [(v << 1) ^ -1 if v < 0 else v << 1 for v in valores]
+
+
+def _varint(valores, bits, marca, base):
+    """
+    Codifica enteros sin signo en grupos de 'bits' bits, de menor a mayor;
+    'marca' señala que sigue otro grupo y 'base' se suma a cada byte.
+    Con NumPy se construye una matriz (valores x grupos) y se seleccionan
+    los grupos usados en orden, sin bucles por valor.
+    """
+    mascara = (1 << bits) - 1
+    if np is not None:
+        v = np.asarray(valores, dtype=np.uint64)
+        if not v.size:
+            return b""
+        grupos = 1
+        while (int(v.max()) >> (bits * grupos)) > 0:
+            grupos += 1
+        desplazamientos = np.arange(grupos, dtype=np.uint64) * np.uint64(bits)
+        trozos = (v[:, None] >> desplazamientos) & np.uint64(mascara)
+        resto = v[:, None] >> (desplazamientos + np.uint64(bits))
+        usados = np.ones_like(trozos, dtype=bool)
+        usados[:, 1:] = (v[:, None] >> desplazamientos[1:]) > 0
+        bytes_ = trozos + np.where(resto > 0, np.uint64(marca), np.uint64(0)) + np.uint64(base)
+        return bytes_[usados].astype(np.uint8).tobytes()
+
+    salida = bytearray()
+    for v in valores:
+        while v > mascara:
+            salida.append(((v & mascara) | marca) + base)
+            v >>= bits
+        salida.append(v + base)
+    return bytes(salida)
+
+
+def _desvarint(datos, n):
+    """
+    Decodifica 'n' varints LEB128 (7 bits, marca 0x80) de 'datos'.
+    Devuelve (valores, bytes consumidos).
+    """
+    if np is not None:
+        b = np.frombuffer(datos, dtype=np.uint8)
+        finales = np.flatnonzero(b < 0x80)[:n]
+        if len(finales) < n:
+            raise ValueError("Binario truncado")
+        fin = int(finales[-1]) + 1 if n else 0
+        b = b[:fin].astype(np.uint64)
+        inicios = np.concatenate(([0], finales[:-1] + 1))
+        posicion = np.arange(fin) - np.repeat(inicios, finales - inicios + 1)
+        partes = (b & np.uint64(0x7F)) << (posicion.astype(np.uint64) * np.uint64(7))
+        return np.add.reduceat(partes, inicios) if n else partes[:0], fin
+
+    valores, v, k, i = [], 0, 0, 0
+    while len(valores) < n:
+        if i >= len(datos):
+            raise ValueError("Binario truncado")
+        byte = datos[i]
+        v |= (byte & 0x7F) << (7 * k)
+        i += 1
+        k += 1
+        if byte < 0x80:
+            valores.append(v)
+            v, k = 0, 0
+    return valores, i
+
+
+def _deszigzag(valores):
+    if np is not None:
+        v = np.asarray(valores, dtype=np.uint64)
+        return (v >> np.uint64(1)).astype(np.int64) ^ -(v & np.uint64(1)).astype(np.int64)
+    return [(v >> 1) ^ -(v & 1) for v in valores]
+
+
+# ---------- Formatos ----------
+
+def polilineaCodificada(lats, lons, decimalesGrados):
+    """
+    Polilínea codificada de Google a partir de latitudes y longitudes ya
+    cuantizadas a 'decimalesGrados' (5 en el formato estándar, 6 en polyline6)
+    """
+    if np is not None:
+        pares = np.column_stack((_diferencias(lats), _diferencias(lons))).ravel()
+    else:
+        pares = [v for par in zip(_diferencias(lats), _diferencias(lons)) for v in par]
+    # Google: zigzag, grupos de 5 bits, marca 0x20 y se suma 63
+    return _varint(_zigzag(pares), 5, 0x20, 63).decode("ascii")
+
+
+def escribirPolilinea(columnas, archivo, precision, compresion=None):
+    """
+    Polilínea codificada de Google del trazado (polyline6 si la precisión
+    es de 10^-6 grados; con menos decimales, la estándar de 10^-5)
+    """
+    lons, lats, _ = columnas
+    dg = decimales(precision[0])
+    if dg > 6:
+        raise ValueError("La polilínea codificada admite como mucho 6 decimales")
+    if dg < 5 and np is not None:
+        lons, lats = lons * 10 ** (5 - dg), lats * 10 ** (5 - dg)
+        dg = 5
+    elif dg < 5:
+        lons, lats = [v * 10 ** (5 - dg) for v in lons], [v * 10 ** (5 - dg) for v in lats]
+        dg = 5
+    with abrirSalida(archivo, compresion) as f:
+        f.write(polilineaCodificada(lats, lons, dg))
+    return archivo
+
+
+def escribirGeoJSON(columnas, archivo, precision, compresion=None, propiedades=None):
+    """
+    FeatureCollection con el origen y el trazado. Las coordenadas se
+    escriben por bloques con el número de decimales de la precisión.
+    """
+    lons, lats, alts = columnas
+    dg, dm = decimales(precision[0]), decimales(precision[1])
+    eg, em = 10.0 ** -dg, 10.0 ** -dm
+    punto = f"[%.{dg}f,%.{dg}f,%.{dm}f]"
+
+    def bloques():
+        n = len(lons)
+        for i in range(0, n, 4096):
+            j = min(i + 4096, n)
+            if np is not None:
+                valores = np.column_stack((lons[i:j] * eg, lats[i:j] * eg, alts[i:j] * em)).ravel().tolist()
+            else:
+                valores = [v for k in range(i, j) for v in (lons[k] * eg, lats[k] * eg, alts[k] * em)]
+            yield ",".join([punto] * (j - i)) % tuple(valores)
+
+    propiedades = json.dumps(propiedades or {}, ensure_ascii=False)
+    origen = punto % (lons[0] * eg, lats[0] * eg, alts[0] * em)
+    with abrirSalida(archivo, compresion) as f:
+        f.write('{"type":"FeatureCollection","features":[')
+        f.write('{"type":"Feature","properties":{"nombre":"Origen"},'
+                f'"geometry":{{"type":"Point","coordinates":{origen}}}}},')
+        f.write(f'{{"type":"Feature","properties":{propiedades},'
+                '"geometry":{"type":"LineString","coordinates":[')
+        escribirUnidos(f, bloques(), ",")
+        f.write("]}}]}\n")
+    return archivo
+
+
+def escribirTrazado(columnas, archivo, precision, compresion=None):
+    """
+    Binario delta/varint: cabecera CABECERA y, por columna (lon, lat, alt),
+    las diferencias zigzag en varint LEB128
+    """
+    dg, dm = decimales(precision[0]), decimales(precision[1])
+    with abrirSalidaBinaria(archivo, compresion) as f:
+        f.write(CABECERA.pack(FIRMA, 1, len(columnas[0]), dg, dm))
+        for columna in columnas:
+            f.write(_varint(_zigzag(_diferencias(columna)), 7, 0x80, 0))
+    return archivo
+
+
+def leerTrazado(archivo):
+    """
+    Lee un binario .trazado. Devuelve (lons, lats, alts) en grados y metros.
+    """
+    with open(archivo, "rb") as f:
+        datos = f.read()
+    firma, version, n, dg, dm = CABECERA.unpack_from(datos)
+    if firma != FIRMA or version != 1:
+        raise ValueError(f"{archivo} no es un trazado binario válido")
+    resto = memoryview(datos)[CABECERA.size:]
+    columnas = []
+    for d in (dg, dg, dm):
+        valores, usados = _desvarint(resto, n)
+        resto = resto[usados:]
+        enteros = _deszigzag(valores)
+        if np is not None:
+            columnas.append(np.cumsum(enteros) * 10.0 ** -d)
+        else:
+            acumulado, columna = 0, []
+            for v in enteros:
+                acumulado += v
+                columna.append(acumulado * 10.0 ** -d)
+            columnas.append(columna)
+    return tuple(columnas)
+
+
+ESCRITORES = {"geojson": escribirGeoJSON, "polyline": escribirPolilinea, "trazado": escribirTrazado}
+
+
+def exportar(modelo, base, formatos=tuple(FORMATOS), precision=PRECISION, compresion=None):
+    """
+    Cuantiza el trazado una vez y escribe los 'formatos' pedidos como
+    base + extensión. Devuelve la lista de archivos generados.
+    Con 'compresion' (salida.Compresion) se escriben también sus .gz/.br.
+    """
+    if modelo.origen is None:
+        raise ValueError("El circuito no tiene origen")
+    columnas = cuantizar(modelo, precision)
+    archivos = []
+    for formato in formatos:
+        archivo = base + FORMATOS[formato]
+        if formato == "geojson":
+            escribirGeoJSON(columnas, archivo, precision, compresion, {"nombre": modelo.nombre})
+        else:
+            ESCRITORES[formato](columnas, archivo, precision, compresion)
+        archivos.append(archivo)
+    return archivos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporta el trazado del circuito en formatos compactos")
+    parser.add_argument("archivoXML", nargs="?", default="circuitoEsquema.xml")
+    parser.add_argument("-o", "--base", default="circuito", help="nombre base de las salidas")
+    parser.add_argument("-f", "--formatos", nargs="+", choices=list(FORMATOS), default=list(FORMATOS))
+    parser.add_argument("--grados", type=float, default=PRECISION[0], help="paso de cuantización (grados)")
+    parser.add_argument("--metros", type=float, default=PRECISION[1], help="paso de cuantización (m)")
+    args = parser.parse_args()
+
+    try:
+        modelo = cargarCircuito(args.archivoXML)
+        archivos = exportar(modelo, args.base, args.formatos, (args.grados, args.metros))
+    except (ErrorCircuito, ValueError) as e:
+        print(e)
+        return
+    for archivo in archivos:
+        print("Creado el archivo:", archivo)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+"""
+Distancias geodésicas entre puntos consecutivos del trazado, calculadas
+sobre arrays completos, y verificación de las <distancia> de los tramos:
+  - haversine: esfera de radio medio terrestre (rápido, error < 0,5 %).
+  - vincenty:  fórmula inversa de Vincenty sobre el elipsoide WGS84
+    (precisión milimétrica). Los pares casi antipodales, que no convergen,
+    se resuelven con haversine; en un trazado no aparecen nunca.
+Con NumPy instalado cada fórmula se evalúa de una vez sobre todos los
+puntos (decenas de millones en segundos); sin él, en Python puro.
+
+verificarDistancias() compara las distancias declaradas con las calculadas,
+rellena las que faltan y comprueba el total frente a <longitudCircuito>.
+
+Uso: python geodesia.py [archivoXML] [-m haversine|vincenty] [-t metros]
+
+@version 1.0 11/Noviembre/2025
+@author: Marcelo Díez Domínguez UO293820
+"""
+
+import argparse
+from math import radians, sin, cos, tan, atan, atan2, sqrt, asin, isnan, nan
+
+from circuito import cargarCircuito, ErrorCircuito
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional: sin él se usa Python puro
+    np = None
+
+METODOS = ("haversine", "vincenty")
+
+# Radio medio terrestre (m) y elipsoide WGS84
+RADIO_TIERRA = 6371008.8
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+WGS84_B = WGS84_A * (1 - WGS84_F)
+
+# Factores de conversión a metros de las unidades de <longitudCircuito>
+UNIDADES = {"": 1.0, "m": 1.0, "metros": 1.0, "km": 1000.0,
+            "kilometros": 1000.0, "kilómetros": 1000.0}
+
+
+# ---------- Fórmulas ----------
+
+def haversine(lon1, lat1, lon2, lat2):
+    """
+    Distancias (m) entre los puntos (lon1, lat1) y (lon2, lat2), en grados.
+    Acepta arrays de NumPy (devuelve un array) o secuencias (devuelve una lista).
+    """
+    if np is not None:
+        lon1, lat1, lon2, lat2 = (np.radians(np.asarray(v, dtype=float))
+                                  for v in (lon1, lat1, lon2, lat2))
+        a = (np.sin((lat2 - lat1) * 0.5) ** 2
+             + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) * 0.5) ** 2)
+        return 2.0 * RADIO_TIERRA * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+    return [_haversine(*p) for p in zip(lon1, lat1, lon2, lat2)]
+
+
+def _haversine(lon1, lat1, lon2, lat2):
+    lon1, lat1, lon2, lat2 = radians(lon1), radians(lat1), radians(lon2), radians(lat2)
+    a = sin((lat2 - lat1) * 0.5) ** 2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) * 0.5) ** 2
+    return 2.0 * RADIO_TIERRA * asin(sqrt(min(a, 1.0)))
+
+
+def vincenty(lon1, lat1, lon2, lat2, iteraciones=100, precision=1e-12):
+    """
+    Distancias (m) sobre el elipsoide WGS84 con la fórmula inversa de Vincenty.
+    Con NumPy se itera sobre todo el array a la vez, actualizando solo los
+    puntos que aún no han convergido.
+    """
+    if np is None:
+        return [_vincenty(*p, iteraciones, precision) for p in zip(lon1, lat1, lon2, lat2)]
+
+    lon1, lat1, lon2, lat2 = (np.asarray(v, dtype=float) for v in (lon1, lat1, lon2, lat2))
+    L = np.radians(lon2 - lon1)
+    U1 = np.arctan((1 - WGS84_F) * np.tan(np.radians(lat1)))
+    U2 = np.arctan((1 - WGS84_F) * np.tan(np.radians(lat2)))
+    sinU1, cosU1, sinU2, cosU2 = np.sin(U1), np.cos(U1), np.sin(U2), np.cos(U2)
+
+    lam = L.copy()
+    sinSigma = np.zeros_like(L)
+    cosSigma = np.ones_like(L)
+    sigma = np.zeros_like(L)
+    cos2Alpha = np.ones_like(L)
+    cos2SigmaM = np.zeros_like(L)
+    activos = np.arange(L.size)
+    for _ in range(iteraciones):
+        if not activos.size:
+            break
+        # Mientras no converja ningún punto se evita la indexación por índices
+        sel = slice(None) if activos.size == L.size else activos
+        l = lam[sel]
+        s1, c1, s2, c2 = sinU1[sel], cosU1[sel], sinU2[sel], cosU2[sel]
+        sinLam, cosLam = np.sin(l), np.cos(l)
+        sS = np.hypot(c2 * sinLam, c1 * s2 - s1 * c2 * cosLam)
+        cS = s1 * s2 + c1 * c2 * cosLam
+        sg = np.arctan2(sS, cS)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            sinAlpha = np.where(sS == 0.0, 0.0, c1 * c2 * sinLam / sS)
+            c2A = 1.0 - sinAlpha * sinAlpha
+            c2SM = np.where(c2A == 0.0, 0.0, cS - 2.0 * s1 * s2 / c2A)
+        C = WGS84_F / 16.0 * c2A * (4.0 + WGS84_F * (4.0 - 3.0 * c2A))
+        nueva = L[sel] + (1.0 - C) * WGS84_F * sinAlpha * (
+            sg + C * sS * (c2SM + C * cS * (-1.0 + 2.0 * c2SM * c2SM)))
+
+        sinSigma[sel], cosSigma[sel], sigma[sel] = sS, cS, sg
+        cos2Alpha[sel], cos2SigmaM[sel] = c2A, c2SM
+        convergidos = np.abs(nueva - l) <= precision  # antes de escribir: 'l' puede ser una vista
+        lam[sel] = nueva
+        activos = activos[~convergidos]
+
+    u2 = cos2Alpha * (WGS84_A ** 2 - WGS84_B ** 2) / WGS84_B ** 2
+    A = 1.0 + u2 / 16384.0 * (4096.0 + u2 * (-768.0 + u2 * (320.0 - 175.0 * u2)))
+    B = u2 / 1024.0 * (256.0 + u2 * (-128.0 + u2 * (74.0 - 47.0 * u2)))
+    deltaSigma = B * sinSigma * (cos2SigmaM + B / 4.0 * (
+        cosSigma * (-1.0 + 2.0 * cos2SigmaM ** 2)
+        - B / 6.0 * cos2SigmaM * (-3.0 + 4.0 * sinSigma ** 2) * (-3.0 + 4.0 * cos2SigmaM ** 2)))
+    distancias = WGS84_B * A * (sigma - deltaSigma)
+
+    if activos.size:  # sin convergencia (casi antipodales)
+        distancias[activos] = haversine(lon1[activos], lat1[activos], lon2[activos], lat2[activos])
+    return distancias
+
+
+def _vincenty(lon1, lat1, lon2, lat2, iteraciones=100, precision=1e-12):
+    """
+    Vincenty para un par de puntos (versión en Python puro)
+    """
+    L = radians(lon2 - lon1)
+    U1 = atan((1 - WGS84_F) * tan(radians(lat1)))
+    U2 = atan((1 - WGS84_F) * tan(radians(lat2)))
+    sinU1, cosU1, sinU2, cosU2 = sin(U1), cos(U1), sin(U2), cos(U2)
+
+    lam = L
+    for _ in range(iteraciones):
+        sinLam, cosLam = sin(lam), cos(lam)
+        sinSigma = sqrt((cosU2 * sinLam) ** 2 + (cosU1 * sinU2 - sinU1 * cosU2 * cosLam) ** 2)
+        if sinSigma == 0.0:
+            return 0.0  # puntos coincidentes
+        cosSigma = sinU1 * sinU2 + cosU1 * cosU2 * cosLam
+        sigma = atan2(sinSigma, cosSigma)
+        sinAlpha = cosU1 * cosU2 * sinLam / sinSigma
+        cos2Alpha = 1.0 - sinAlpha * sinAlpha
+        cos2SigmaM = cosSigma - 2.0 * sinU1 * sinU2 / cos2Alpha if cos2Alpha else 0.0
+        C = WGS84_F / 16.0 * cos2Alpha * (4.0 + WGS84_F * (4.0 - 3.0 * cos2Alpha))
+        anterior = lam
+        lam = L + (1.0 - C) * WGS84_F * sinAlpha * (
+            sigma + C * sinSigma * (cos2SigmaM + C * cosSigma * (-1.0 + 2.0 * cos2SigmaM ** 2)))
+        if abs(lam - anterior) <= precision:
+            break
+    else:
+        return _haversine(lon1, lat1, lon2, lat2)
+    if isnan(lam):
+        return nan
+
+    u2 = cos2Alpha * (WGS84_A ** 2 - WGS84_B ** 2) / WGS84_B ** 2
+    A = 1.0 + u2 / 16384.0 * (4096.0 + u2 * (-768.0 + u2 * (320.0 - 175.0 * u2)))
+    B = u2 / 1024.0 * (256.0 + u2 * (-128.0 + u2 * (74.0 - 47.0 * u2)))
+    deltaSigma = B * sinSigma * (cos2SigmaM + B / 4.0 * (
+        cosSigma * (-1.0 + 2.0 * cos2SigmaM ** 2)
+        - B / 6.0 * cos2SigmaM * (-3.0 + 4.0 * sinSigma ** 2) * (-3.0 + 4.0 * cos2SigmaM ** 2)))
+    return WGS84_B * A * (sigma - deltaSigma)
+
+
+FORMULAS = {"haversine": haversine, "vincenty": vincenty}
+
+
+# ---------- Distancias del trazado ----------
+
+def _puntos(modelo):
+    """
+    (lons, lats) del origen seguido de los tramos (arrays de NumPy o listas)
+    """
+    origen = modelo.origen
+    lon0, lat0 = (origen.longitud, origen.latitud) if origen is not None else (nan, nan)
+    if np is not None:
+        lons = np.concatenate(([lon0], np.frombuffer(modelo.longitudes, dtype=np.float64)))
+        lats = np.concatenate(([lat0], np.frombuffer(modelo.latitudes, dtype=np.float64)))
+        return lons, lats
+    return [lon0] + list(modelo.longitudes), [lat0] + list(modelo.latitudes)
+
+
+def distanciasTramos(modelo, metodo="haversine"):
+    """
+    Distancia calculada de cada tramo: desde el punto anterior (el origen
+    para el primero) hasta el tramo. NaN si falta alguna coordenada.
+    """
+    if metodo not in FORMULAS:
+        raise ValueError("Método geodésico desconocido: " + str(metodo))
+    lons, lats = _puntos(modelo)
+    return FORMULAS[metodo](lons[:-1], lats[:-1], lons[1:], lats[1:])
+
+
+def distanciaCierre(modelo, metodo="haversine"):
+    """
+    Distancia del último tramo de vuelta al origen (cierre de la vuelta)
+    """
+    if not len(modelo) or modelo.origen is None:
+        return 0.0
+    origen = modelo.origen
+    d = FORMULAS[metodo]([modelo.longitudes[-1]], [modelo.latitudes[-1]],
+                         [origen.longitud], [origen.latitud])
+    return float(d[0])
+
+
+def rellenarDistancias(modelo, metodo="haversine", calculadas=None):
+    """
+    Sustituye las <distancia> ausentes (NaN) del modelo por las calculadas.
+    Devuelve el número de distancias rellenadas.
+    """
+    distancias = modelo.distancias
+    faltan = [i for i, d in enumerate(distancias) if d != d]
+    if not faltan:
+        return 0
+    if calculadas is None:
+        calculadas = distanciasTramos(modelo, metodo)
+    for i in faltan:
+        distancias[i] = float(calculadas[i])
+    return len(faltan)
+
+
+def longitudMetros(medida):
+    """
+    Valor de una Medida de longitud en metros (None si no es numérico)
+    """
+    try:
+        valor = float(str(medida.valor).replace(",", "."))
+    except (TypeError, ValueError):
+        return None
+    factor = UNIDADES.get((medida.unidades or "").strip().lower())
+    return valor * factor if factor is not None else None
+
+
+# ---------- Verificación ----------
+
+class Verificacion(object):
+    """
+    Resultado de verificarDistancias():
+      - calculadas: distancia calculada de cada tramo
+      - discrepancias: [(índice, declarada, calculada)] fuera de tolerancia
+      - rellenadas: número de distancias ausentes que se han rellenado
+      - total: suma de las distancias calculadas más el cierre al origen
+      - declarada: <longitudCircuito> en metros (None si no se puede leer)
+    """
+    __slots__ = ('metodo', 'calculadas', 'discrepancias', 'rellenadas', 'total', 'declarada',
+                 'tolerancia')
+
+    def __init__(self, metodo, calculadas, discrepancias, rellenadas, total, declarada, tolerancia):
+        self.metodo = metodo
+        self.calculadas = calculadas
+        self.discrepancias = discrepancias
+        self.rellenadas = rellenadas
+        self.total = total
+        self.declarada = declarada
+        self.tolerancia = tolerancia
+
+    @property
+    def diferenciaTotal(self):
+        if self.declarada is None:
+            return None
+        return self.total - self.declarada
+
+    @property
+    def totalCorrecto(self):
+        """
+        True si el total calculado coincide con <longitudCircuito> salvo
+        la tolerancia relativa
+        """
+        if self.declarada is None:
+            return None
+        return abs(self.total - self.declarada) <= self.tolerancia * self.declarada
+
+    @property
+    def correcta(self):
+        return not self.discrepancias and self.totalCorrecto is not False
+
+
+def verificarDistancias(modelo, metodo="haversine", tolerancia=5.0, relativa=0.05,
+                        rellenar=True):
+    """
+    Compara cada <distancia> con la calculada. Se marca como discrepancia si
+    difiere más de 'tolerancia' metros y más de 'relativa' (fracción) de la
+    calculada. Con 'rellenar' se completan en el modelo las distancias que
+    faltan. El total (con el cierre al origen) se compara con
+    <longitudCircuito> con la tolerancia 'relativa'.
+    """
+    calculadas = distanciasTramos(modelo, metodo)
+    if np is not None:
+        declaradas = np.frombuffer(modelo.distancias, dtype=np.float64)
+        error = np.abs(declaradas - calculadas)
+        fuera = (error > tolerancia) & (error > relativa * calculadas)
+        discrepancias = [(int(i), float(declaradas[i]), float(calculadas[i]))
+                         for i in np.flatnonzero(fuera)]
+        total = float(np.nansum(calculadas))
+    else:
+        discrepancias = []
+        for i, (d, c) in enumerate(zip(modelo.distancias, calculadas)):
+            error = abs(d - c)
+            if error > tolerancia and error > relativa * c:
+                discrepancias.append((i, d, c))
+        total = sum(c for c in calculadas if c == c)
+
+    rellenadas = rellenarDistancias(modelo, metodo, calculadas) if rellenar else 0
+    total += distanciaCierre(modelo, metodo)
+    return Verificacion(metodo, calculadas, discrepancias, rellenadas, total,
+                        longitudMetros(modelo.longitudCircuito), relativa)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verifica las distancias de los tramos del circuito")
+    parser.add_argument("archivoXML", nargs="?", default="circuitoEsquema.xml")
+    parser.add_argument("-m", "--metodo", choices=METODOS, default="haversine")
+    parser.add_argument("-t", "--tolerancia", type=float, default=5.0,
+                        help="diferencia máxima admitida por tramo (m)")
+    parser.add_argument("-r", "--relativa", type=float, default=0.05,
+                        help="diferencia relativa máxima admitida (por tramo y total)")
+    args = parser.parse_args()
+
+    try:
+        modelo = cargarCircuito(args.archivoXML)
+    except ErrorCircuito as e:
+        print(e)
+        return
+
+    declaradas = sum(d for d in modelo.distancias if d == d)
+    v = verificarDistancias(modelo, args.metodo, args.tolerancia, args.relativa)
+    for i, declarada, calculada in v.discrepancias:
+        print(f"Tramo {i + 1}: declarada {declarada:.2f} m, calculada {calculada:.2f} m")
+    if v.rellenadas:
+        print(f"Distancias ausentes rellenadas: {v.rellenadas}")
+    print(f"Tramos: {len(modelo)}  discrepancias: {len(v.discrepancias)}")
+    print(f"Suma de distancias declaradas: {declaradas:.2f} m")
+    print(f"Longitud calculada ({v.metodo}, con cierre): {v.total:.2f} m")
+    if v.declarada is not None:
+        estado = "correcta" if v.totalCorrecto else "no coincide"
+        print(f"longitudCircuito: {v.declarada:.2f} m ({estado}, diferencia {v.diferenciaTotal:+.2f} m)")
+
+if __name__ == "__main__":
+    main()
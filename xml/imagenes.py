@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""
+Variantes adaptativas de las fotos de <media>.
+
+Para cada <foto> de circuitoEsquema.xml (p.ej. multimedia/foto.png) se
+generan en el directorio multimedia, a partir de la foto original:
+  - foto-movil.png  (ANCHOS["movil"] píxeles de ancho)
+  - foto-tablet.png (ANCHOS["tablet"] píxeles de ancho)
+  - con --webp, además foto.webp, foto-movil.webp y foto-tablet.webp
+La original es la variante de escritorio y nunca se reescribe ni se amplía
+ninguna foto. Las fotos se reparten entre varios procesos con
+ProcessPoolExecutor y cada variante se escribe de forma atómica.
+
+El resultado es un manifiesto (multimedia/imagenes.json) con, por foto, el
+SHA-256 de la original, las opciones usadas y el archivo, ancho, alto y
+tipo MIME de cada variante. xml2html.generar_html lo usa (opción
+'imagenes') para los srcset con anchos reales y el width/height del <img>.
+Una foto solo se vuelve a procesar si cambia su contenido (hash), las
+opciones, o falta alguna variante: cada imagen se redimensiona una vez.
+
+Necesita Pillow (pip install pillow).
+
+Uso: python imagenes.py [archivoXML] [-m multimedia] [--webp] [-j procesos] [-f]
+
+@version 1.0 19/Noviembre/2025
+@author: Marcelo Díez Domínguez UO293820
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from circuito import cargarCircuito, ErrorCircuito
+from salida import abrirSalida, escrituraAtomica
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow es opcional: sin él no se generan variantes
+    Image = None
+
+# Versión del formato del manifiesto
+VERSION = 1
+
+# Nombre del manifiesto (en el directorio multimedia)
+MANIFIESTO = "imagenes.json"
+
+# Ancho máximo de cada variante (sufijo -> píxeles), de mayor a menor
+ANCHOS = {
+    "tablet": 750,
+    "movil": 300,
+}
+
+# Calidad de compresión (JPEG y WebP)
+CALIDAD = 85
+CALIDAD_WEBP = 80
+
+# Tipo MIME por extensión
+TIPOS = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".webp": "image/webp",
+}
+
+
+class ErrorImagenes(Exception):
+    """
+    Error al generar las variantes (sin Pillow o imagen no válida)
+    """
+
+
+def rutaManifiesto(directorio):
+    return os.path.join(directorio, MANIFIESTO)
+
+
+def leerManifiesto(ruta):
+    """
+    Manifiesto de 'ruta' como diccionario (vacío si no existe o no es válido)
+    """
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            manifiesto = json.load(f)
+    except (IOError, ValueError):
+        return {"version": VERSION, "imagenes": {}}
+    if manifiesto.get("version") != VERSION:
+        return {"version": VERSION, "imagenes": {}}
+    return manifiesto
+
+
+def escribirManifiesto(ruta, manifiesto):
+    """
+    Escribe el manifiesto de forma atómica (archivo temporal + rename)
+    """
+    with escrituraAtomica(ruta) as temporal:
+        with abrirSalida(temporal) as f:
+            json.dump(manifiesto, f, indent=2, sort_keys=True, ensure_ascii=False)
+
+
+def _hashArchivo(ruta):
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def _opciones(webp):
+    return {"anchos": ANCHOS, "webp": bool(webp), "calidad": CALIDAD, "calidadWebp": CALIDAD_WEBP}
+
+
+def nombresFotos(fotos):
+    """
+    Nombres (sin directorio y sin repetir) de las rutas de <foto> 'fotos'
+    """
+    return list(dict.fromkeys(os.path.basename(f.strip()) for f in fotos if f and f.strip()))
+
+
+def _nombre(archivo, sufijo, extension):
+    raiz = os.path.splitext(archivo)[0]
+    return f"{raiz}-{sufijo}{extension}" if sufijo else f"{raiz}{extension}"
+
+
+# ---------- Redimensionado (en los procesos trabajadores) ----------
+
+def _guardar(imagen, ruta):
+    """
+    Guarda 'imagen' en 'ruta' (formato según la extensión) de forma atómica
+    """
+    extension = os.path.splitext(ruta)[1].lower()
+    if extension in (".jpg", ".jpeg"):
+        if imagen.mode not in ("RGB", "L"):
+            imagen = imagen.convert("RGB")
+        opciones = {"quality": CALIDAD, "optimize": True, "progressive": True}
+    elif extension == ".webp":
+        opciones = {"quality": CALIDAD_WEBP, "method": 4}
+    else:
+        opciones = {}
+    with escrituraAtomica(ruta) as temporal:
+        imagen.save(temporal, **opciones)
+
+
+def procesarFoto(archivo, directorio, webp=False):
+    """
+    Genera las variantes de la foto 'archivo' (nombre dentro de
+    'directorio') y devuelve su entrada del manifiesto (sin el hash).
+    Cada variante se obtiene de la anterior (de mayor a menor), que ya es
+    más pequeña que la original.
+    """
+    if Image is None:
+        raise ErrorImagenes("Para generar las variantes hace falta Pillow (pip install pillow)")
+    ruta = os.path.join(directorio, archivo)
+    try:
+        imagen = Image.open(ruta)
+        imagen.load()
+    except (OSError, SyntaxError) as e:
+        raise ErrorImagenes(f"No se puede leer la imagen {ruta}: {e}") from e
+    # Orientación EXIF aplicada (como la muestra el navegador) y paletas a
+    # RGBA para que el redimensionado no sea por vecino más próximo
+    imagen = ImageOps.exif_transpose(imagen)
+    if imagen.mode in ("1", "P"):
+        imagen = imagen.convert("RGBA")
+
+    extension = os.path.splitext(archivo)[1]
+    ancho, alto = imagen.size
+    variantes = [{"archivo": archivo, "ancho": ancho, "alto": alto,
+                  "tipo": TIPOS.get(extension.lower(), "")}]
+    if webp:
+        nombre = _nombre(archivo, "", ".webp")
+        _guardar(imagen, os.path.join(directorio, nombre))
+        variantes.append({"archivo": nombre, "ancho": ancho, "alto": alto, "tipo": TIPOS[".webp"]})
+
+    actual = imagen
+    for sufijo, maximo in ANCHOS.items():
+        if actual.width > maximo:
+            actual = actual.resize((maximo, max(1, round(actual.height * maximo / actual.width))),
+                                   Image.LANCZOS, reducing_gap=3.0)
+        for ext in (extension, ".webp") if webp else (extension,):
+            nombre = _nombre(archivo, sufijo, ext)
+            _guardar(actual, os.path.join(directorio, nombre))
+            variantes.append({"archivo": nombre, "ancho": actual.width, "alto": actual.height,
+                              "tipo": TIPOS.get(ext.lower(), "")})
+    return {"ancho": ancho, "alto": alto, "variantes": variantes}
+
+
+# ---------- Pipeline ----------
+
+def _alDia(entrada, hashFoto, opciones, directorio):
+    return (entrada is not None and entrada.get("hash") == hashFoto
+            and entrada.get("opciones") == opciones
+            and all(os.path.exists(os.path.join(directorio, v["archivo"]))
+                    for v in entrada.get("variantes", ())))
+
+
+def generarVariantes(fotos, directorio, webp=False, trabajadores=None, forzar=False):
+    """
+    Genera las variantes de las fotos 'fotos' (rutas como las de <foto>;
+    se usa su nombre dentro de 'directorio') con 'trabajadores' procesos
+    (por defecto, uno por núcleo) y actualiza el manifiesto. Devuelve
+    (manifiesto, lista de fotos procesadas). Lanza ErrorImagenes.
+    """
+    ruta = rutaManifiesto(directorio)
+    manifiesto = leerManifiesto(ruta)
+    entradas = manifiesto["imagenes"]
+    opciones = json.loads(json.dumps(_opciones(webp)))
+
+    pendientes = {}
+    for foto in nombresFotos(fotos):
+        try:
+            hashFoto = _hashArchivo(os.path.join(directorio, foto))
+        except IOError as e:
+            raise ErrorImagenes(f"No se puede leer la imagen {foto}: {e}") from e
+        if forzar or not _alDia(entradas.get(foto), hashFoto, opciones, directorio):
+            pendientes[foto] = hashFoto
+    if not pendientes:
+        return manifiesto, []
+    if Image is None:
+        raise ErrorImagenes("Para generar las variantes hace falta Pillow (pip install pillow)")
+
+    if trabajadores == 1 or len(pendientes) == 1:
+        resultados = [procesarFoto(foto, directorio, webp) for foto in pendientes]
+    else:
+        with ProcessPoolExecutor(max_workers=trabajadores) as pool:
+            resultados = list(pool.map(procesarFoto, pendientes,
+                                       [directorio] * len(pendientes), [webp] * len(pendientes)))
+
+    for (foto, hashFoto), entrada in zip(pendientes.items(), resultados):
+        entrada.update(hash=hashFoto, opciones=opciones)
+        entradas[foto] = entrada
+    escribirManifiesto(ruta, manifiesto)
+    return manifiesto, list(pendientes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera las variantes adaptativas de las fotos del circuito")
+    parser.add_argument("archivoXML", nargs="?", default="circuitoEsquema.xml")
+    parser.add_argument("-m", "--multimedia", help="directorio de las fotos (por defecto, ../multimedia)")
+    parser.add_argument("--webp", action="store_true", help="generar también las variantes WebP")
+    parser.add_argument("-j", "--trabajadores", type=int, default=None,
+                        help="número de procesos (por defecto, uno por núcleo)")
+    parser.add_argument("-f", "--forzar", action="store_true", help="regenerar todas las variantes")
+    args = parser.parse_args()
+
+    directorio = args.multimedia or os.path.join(os.path.dirname(os.path.abspath(args.archivoXML)),
+                                                 os.pardir, "multimedia")
+    try:
+        modelo = cargarCircuito(args.archivoXML)
+        fotos = [f.ruta for f in modelo.fotos]
+        _, procesadas = generarVariantes(fotos, directorio, args.webp, args.trabajadores, args.forzar)
+    except (ErrorCircuito, ErrorImagenes) as e:
+        print(e)
+        return
+    for foto in nombresFotos(fotos):
+        print(f"{foto}: {'generada' if foto in procesadas else 'al día'}")
+    print("Manifiesto:", rutaManifiesto(directorio))
+
+if __name__ == "__main__":
+    main()
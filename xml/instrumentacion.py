@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+Instrumentación por etapas de los conversores (carga, construcción del
+árbol, indentación, escritura...).
+
+Cada etapa se envuelve con:
+
+    with etapa("kml.escritura") as e:
+        ...
+        e.elementos = n     # opcional: número de elementos procesados
+
+Si la instrumentación está activa se emite una línea JSON por etapa con el
+tiempo real, el tiempo de CPU, los bloques de memoria reservados (y el pico
+de tracemalloc si está activo) y el número de elementos. Si está inactiva,
+etapa() devuelve siempre el mismo objeto vacío y el coste es despreciable.
+
+Las etapas se pueden anidar: el pico de una etapa incluye el de las etapas
+que contiene. El tiempo de CPU es el del hilo que ejecuta la etapa
+(time.thread_time), así que las etapas que corren a la vez en varios hilos
+(ver orquestador.py) no se cuentan unas a otras. Los bloques y el pico de
+tracemalloc son del proceso entero: con etapas concurrentes incluyen lo que
+reservan las demás.
+
+Se activa con variables de entorno o con opciones de línea de comandos:
+  MOTOGP_PERFIL=1            / --perfil           activa la instrumentación
+  MOTOGP_PERFIL=memoria      / --perfil=memoria   además activa tracemalloc
+  MOTOGP_PERFIL_SALIDA=ruta  / --perfil-salida=ruta   archivo JSON lines
+                                                  (por defecto, stderr)
+  MOTOGP_PERFIL_CPROFILE=etapa / --cprofile=etapa  guarda un volcado de
+                                cProfile de esa etapa en perfil-<etapa>.prof
+
+@version 1.0 10/Noviembre/2025
+@author: Marcelo Díez Domínguez UO293820
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+ACTIVO = False
+_salida = None
+_etapaCProfile = None
+
+# Etapas abiertas (de cualquier hilo) mientras tracemalloc está activo: al
+# reiniciar el pico global para una etapa nueva, el pico hasta ese momento
+# se guarda antes en todas ellas
+_abiertas = []
+_cerrojo = threading.Lock()
+
+
+class _EtapaNula(object):
+    """
+    Etapa usada con la instrumentación desactivada: no mide nada
+    """
+    __slots__ = ('elementos',)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        return False
+
+
+_NULA = _EtapaNula()
+
+
+class _Etapa(object):
+    """
+    Etapa medida: tiempo real, CPU, bloques reservados y elementos
+    """
+    __slots__ = ('nombre', 'elementos', '_t0', '_c0', '_b0', '_perfil', '_pico')
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self.elementos = None
+        self._perfil = None
+        self._pico = None
+
+    def __enter__(self):
+        if tracemalloc.is_tracing():
+            with _cerrojo:
+                actual, pico = tracemalloc.get_traced_memory()
+                for abierta in _abiertas:
+                    abierta._pico = max(abierta._pico, pico)
+                tracemalloc.reset_peak()
+                self._pico = actual
+                _abiertas.append(self)
+        if self.nombre == _etapaCProfile:
+            import cProfile
+            self._perfil = cProfile.Profile()
+            self._perfil.enable()
+        self._b0 = sys.getallocatedblocks()
+        self._c0 = time.thread_time()
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        segundos = time.perf_counter() - self._t0
+        cpu = time.thread_time() - self._c0
+        bloques = sys.getallocatedblocks() - self._b0
+        if self._pico is not None:
+            # El pico global no se reinicia al salir: sigue valiendo para
+            # las etapas que contienen a esta
+            with _cerrojo:
+                self._pico = max(self._pico, tracemalloc.get_traced_memory()[1])
+                _abiertas.remove(self)
+        if self._perfil is not None:
+            self._perfil.disable()
+            self._perfil.dump_stats(f"perfil-{self.nombre}.prof")
+
+        registro = {"etapa": self.nombre, "segundos": segundos, "cpu": cpu, "bloques": bloques}
+        if self._pico is not None:
+            registro["pico_bytes"] = self._pico
+        if self.elementos is not None:
+            registro["elementos"] = self.elementos
+        if tipo is not None:
+            registro["error"] = tipo.__name__
+        _emitir(registro)
+        return False
+
+
+def etapa(nombre):
+    """
+    Context manager que mide la etapa 'nombre' (o no hace nada si la
+    instrumentación está desactivada)
+    """
+    if not ACTIVO:
+        return _NULA
+    return _Etapa(nombre)
+
+
+def _emitir(registro):
+    linea = json.dumps(registro, ensure_ascii=False)
+    if _salida is None:
+        print(linea, file=sys.stderr)
+    else:
+        with open(_salida, "a", encoding="utf-8") as f:
+            f.write(linea + "\n")
+
+
+def activar(modo="1", salida=None, cprofile=None):
+    """
+    Activa la instrumentación. Con modo "memoria" también activa tracemalloc.
+    """
+    global ACTIVO, _salida, _etapaCProfile
+    ACTIVO = bool(modo) and modo != "0"
+    _salida = salida
+    _etapaCProfile = cprofile
+    if ACTIVO and modo == "memoria" and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def desactivar():
+    global ACTIVO
+    ACTIVO = False
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def configurar(argv=None):
+    """
+    Lee las opciones --perfil[=memoria], --perfil-salida=ruta y
+    --cprofile=etapa de 'argv' (por defecto sys.argv), las quita de la
+    lista y activa la instrumentación. Las variables de entorno se usan
+    como valores por defecto.
+    """
+    if argv is None:
+        argv = sys.argv
+    modo = os.environ.get("MOTOGP_PERFIL")
+    salida = os.environ.get("MOTOGP_PERFIL_SALIDA")
+    cprofile = os.environ.get("MOTOGP_PERFIL_CPROFILE")
+
+    restantes = []
+    for arg in argv:
+        if arg == "--perfil":
+            modo = "1"
+        elif arg.startswith("--perfil="):
+            modo = arg.split("=", 1)[1]
+        elif arg.startswith("--perfil-salida="):
+            salida = arg.split("=", 1)[1]
+        elif arg.startswith("--cprofile="):
+            cprofile = arg.split("=", 1)[1]
+            modo = modo or "1"
+        else:
+            restantes.append(arg)
+    argv[:] = restantes
+
+    if modo:
+        activar(modo, salida, cprofile)
+
+
+# Activación por variables de entorno al importar el módulo
+if os.environ.get("MOTOGP_PERFIL"):
+    activar(os.environ["MOTOGP_PERFIL"], os.environ.get("MOTOGP_PERFIL_SALIDA"),
+            os.environ.get("MOTOGP_PERFIL_CPROFILE"))
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+Conversión por lotes: genera el KML, la altimetría SVG y el HTML de todos
+los circuitos (un XML con el esquema de circuitoEsquema.xml por Gran Premio)
+de un directorio o patrón glob, repartiendo los archivos entre varios
+procesos con ProcessPoolExecutor.
+
+Por cada circuito <nombre>.xml se generan, en el directorio de destino:
+  - <nombre>.kml
+  - <nombre>-altimetria.svg
+  - <nombre>.html
+
+Los errores se informan por archivo y no detienen el lote. La construcción
+es incremental (ver construccion.py): solo se regeneran las salidas
+desactualizadas, salvo con -f.
+
+Uso: python lote.py <directorio|patrón> [-d destino] [-j trabajadores] [-f]
+
+@version 1.0 06/Noviembre/2025
+@author: Marcelo Díez Domínguez UO293820
+"""
+
+import argparse
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from circuito import ErrorCircuito
+from construccion import Construccion, GENERADO, AL_DIA
+
+# Conversores disponibles: nombre -> sufijo del archivo de salida
+CONVERSORES = {
+    "kml": ".kml",
+    "svg": "-altimetria.svg",
+    "html": ".html",
+}
+
+
+class Resultado(object):
+    """
+    Resultado de convertir un circuito: salidas generadas, salidas que ya
+    estaban al día, errores por conversor y tiempo empleado
+    """
+    __slots__ = ('archivo', 'salidas', 'al_dia', 'errores', 'segundos')
+
+    def __init__(self, archivo):
+        self.archivo = archivo
+        self.salidas = []
+        self.al_dia = []
+        self.errores = []
+        self.segundos = 0.0
+
+    @property
+    def correcto(self):
+        return not self.errores
+
+
+def buscarCircuitos(entrada):
+    """
+    Lista ordenada de archivos XML: todos los *.xml de 'entrada' si es un
+    directorio, o los que casen con 'entrada' si es un patrón glob
+    """
+    if os.path.isdir(entrada):
+        entrada = os.path.join(entrada, "*.xml")
+    return sorted(f for f in glob.glob(entrada) if os.path.isfile(f))
+
+
+def rutasSalida(archivoXML, destino=None, conversores=tuple(CONVERSORES)):
+    """
+    Diccionario conversor -> ruta de salida para 'archivoXML'
+    """
+    destino = destino or os.path.dirname(archivoXML)
+    base = os.path.splitext(os.path.basename(archivoXML))[0]
+    return {c: os.path.join(destino, base + CONVERSORES[c]) for c in conversores}
+
+
+def convertirCircuito(archivoXML, destino=None, conversores=tuple(CONVERSORES), forzar=False):
+    """
+    Construye las salidas desactualizadas de 'archivoXML' (cargándolo como
+    mucho una vez). Nunca lanza excepciones: los fallos quedan en el Resultado.
+    """
+    resultado = Resultado(archivoXML)
+    inicio = time.perf_counter()
+    salidas = rutasSalida(archivoXML, destino, conversores)
+
+    # Los conversores no imprimen nada: Construccion los llama sin mensajes
+    try:
+        estados = Construccion(archivoXML, salidas).construir(forzar)
+    except ErrorCircuito as e:
+        resultado.errores.append(("carga", str(e)))
+        estados = {}
+    except Exception as e:  # se informa y se sigue con el siguiente archivo
+        resultado.errores.append(("construcción", f"{type(e).__name__}: {e}"))
+        estados = {}
+
+    for conversor, estado in estados.items():
+        if estado == GENERADO:
+            resultado.salidas.append(salidas[conversor])
+        elif estado == AL_DIA:
+            resultado.al_dia.append(salidas[conversor])
+        else:
+            resultado.errores.append((conversor, "no se generó " + salidas[conversor]))
+
+    resultado.segundos = time.perf_counter() - inicio
+    return resultado
+
+
+def convertirLote(entrada, destino=None, trabajadores=None, conversores=tuple(CONVERSORES), forzar=False):
+    """
+    Convierte todos los circuitos de 'entrada' (directorio o patrón glob) con
+    'trabajadores' procesos (por defecto, uno por núcleo). Genera los
+    Resultado a medida que terminan.
+    """
+    archivos = buscarCircuitos(entrada)
+    if destino:
+        os.makedirs(destino, exist_ok=True)
+
+    if trabajadores == 1 or len(archivos) <= 1:
+        for archivo in archivos:
+            yield convertirCircuito(archivo, destino, conversores, forzar)
+        return
+
+    with ProcessPoolExecutor(max_workers=trabajadores) as pool:
+        futuros = {pool.submit(convertirCircuito, archivo, destino, conversores, forzar): archivo
+                   for archivo in archivos}
+        for futuro in as_completed(futuros):
+            try:
+                yield futuro.result()
+            except Exception as e:  # p.ej. el proceso trabajador murió
+                resultado = Resultado(futuros[futuro])
+                resultado.errores.append(("proceso", f"{type(e).__name__}: {e}"))
+                yield resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convierte un lote de circuitos XML a KML, SVG y HTML")
+    parser.add_argument("entrada", help="directorio con los XML o patrón glob (p.ej. 'gp/*.xml')")
+    parser.add_argument("-d", "--destino", help="directorio de salida (por defecto, el de cada XML)")
+    parser.add_argument("-j", "--trabajadores", type=int, default=None,
+                        help="número de procesos (por defecto, uno por núcleo)")
+    parser.add_argument("-c", "--conversores", nargs="+", choices=list(CONVERSORES),
+                        default=list(CONVERSORES), help="conversores a ejecutar")
+    parser.add_argument("-f", "--forzar", action="store_true",
+                        help="regenerar todas las salidas aunque estén al día")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    correctos = fallidos = 0
+    for r in convertirLote(args.entrada, args.destino, args.trabajadores,
+                           tuple(args.conversores), args.forzar):
+        if r.correcto:
+            correctos += 1
+            estado = "al día" if not r.salidas else f"{len(r.salidas)} generadas"
+            print(f"[OK]    {r.archivo}: {estado} ({r.segundos:.2f} s)")
+        else:
+            fallidos += 1
+            print(f"[ERROR] {r.archivo} ({r.segundos:.2f} s)")
+            for conversor, error in r.errores:
+                print(f"        {conversor}: {error}")
+
+    print(f"{correctos} circuitos convertidos, {fallidos} con errores "
+          f"en {time.perf_counter() - inicio:.2f} s")
+
+if __name__ == "__main__":
+    main()
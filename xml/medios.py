@@ -0,0 +1,476 @@
+# -*- coding: utf-8 -*-
+"""
+Sondeo de los archivos multimedia sin decodificarlos: dimensiones de las
+imágenes leyendo solo su cabecera (PNG, JPEG, GIF, WebP y el elemento raíz
+de SVG) y dimensiones y duración de los vídeos leyendo solo los metadatos
+del contenedor (cajas moov/mvhd/tkhd de MP4 y elementos Info/Tracks de
+WebM/Matroska; los datos de los fotogramas se saltan con seek).
+
+Los resultados se guardan en <directorio>/.medios.json (ver CacheMedios):
+una entrada vale mientras no cambien el tamaño ni la fecha del archivo, así
+que cada archivo se sondea una vez. xml2html.generar_html los usa para el
+width/height de <img> y <video> y el poster de los vídeos (una imagen con
+el mismo nombre que el vídeo: <video>-poster.jpg, <video>.jpg...); lee la
+caché, pero solo la escribe si se le pide (guardar_medios).
+
+Uso: python medios.py [directorio] [archivo ...]
+
+@version 1.0 20/Noviembre/2025
+@author: Marcelo Díez Domínguez UO293820
+"""
+
+import argparse
+import json
+import os
+import re
+import struct
+
+from salida import abrirSalida, escrituraAtomica
+
+# Versión del formato de la caché
+VERSION = 1
+
+# Nombre de la caché (oculta, en el directorio multimedia)
+CACHE = ".medios.json"
+
+# Bytes que se leen de la cabecera de las imágenes (salvo JPEG, por segmentos)
+CABECERA = 32
+
+# Bytes que se leen de un SVG para encontrar el elemento raíz
+CABECERA_SVG = 4096
+
+# Tamaño máximo de la caja moov de un MP4 que se lee en memoria
+MAX_MOOV = 64 << 20
+
+# Sufijos de las imágenes que sirven de poster a un vídeo, por preferencia
+POSTERS = ("-poster.webp", "-poster.jpg", "-poster.png", ".webp", ".jpg", ".jpeg", ".png")
+
+
+class ErrorMedio(Exception):
+    """
+    Archivo multimedia truncado o con una cabecera no válida
+    """
+
+
+def _medida(tipo, ancho, alto, duracion=None):
+    medida = {"tipo": tipo, "ancho": int(ancho), "alto": int(alto)}
+    if duracion is not None:
+        medida["duracion"] = round(duracion, 3)
+    return medida
+
+
+# ---------- Imágenes ----------
+
+def _orientacionExif(datos):
+    """
+    Orientación EXIF (1-8) del segmento APP1 'datos' (sin b"Exif\\0\\0"),
+    o 1 si no la tiene
+    """
+    orden = {b"II": "<", b"MM": ">"}.get(datos[:2])
+    if orden is None or len(datos) < 8:
+        return 1
+    ifd = struct.unpack_from(orden + "I", datos, 4)[0]
+    if ifd + 2 > len(datos):
+        return 1
+    for i in range(struct.unpack_from(orden + "H", datos, ifd)[0]):
+        entrada = ifd + 2 + 12 * i
+        if entrada + 12 > len(datos):
+            break
+        if struct.unpack_from(orden + "H", datos, entrada)[0] == 0x0112:
+            return struct.unpack_from(orden + "H", datos, entrada + 8)[0]
+    return 1
+
+
+def _jpeg(f):
+    """
+    Recorre los segmentos de un JPEG hasta el SOF (Start Of Frame) sin
+    leer los datos de imagen. Con orientación EXIF 5-8 (girada 90°) se
+    intercambian ancho y alto, como al mostrarla.
+    """
+    f.seek(2)
+    orientacion = 1
+    while True:
+        marca = f.read(1)
+        while marca == b"\xff":
+            marca = f.read(1)  # relleno entre segmentos
+        if not marca:
+            raise ErrorMedio("JPEG sin cabecera de fotograma")
+        m = marca[0]
+        if m == 0x01 or 0xD0 <= m <= 0xD8:
+            continue  # marcas sin longitud
+        if m in (0xD9, 0xDA):
+            raise ErrorMedio("JPEG sin cabecera de fotograma")
+        longitud = f.read(2)
+        if len(longitud) < 2:
+            raise ErrorMedio("JPEG truncado")
+        longitud = struct.unpack(">H", longitud)[0] - 2
+        if 0xC0 <= m <= 0xCF and m not in (0xC4, 0xC8, 0xCC):
+            datos = f.read(5)
+            if len(datos) < 5:
+                raise ErrorMedio("JPEG truncado")
+            alto, ancho = struct.unpack(">xHH", datos)
+            if orientacion >= 5:
+                ancho, alto = alto, ancho
+            return _medida("image/jpeg", ancho, alto)
+        if m == 0xE1:
+            datos = f.read(longitud)
+            if datos.startswith(b"Exif\0\0"):
+                orientacion = _orientacionExif(datos[6:])
+        else:
+            f.seek(longitud, 1)
+
+
+def _webp(cabecera):
+    formato = cabecera[12:16]
+    if formato == b"VP8 " and cabecera[23:26] == b"\x9d\x01\x2a":
+        ancho, alto = struct.unpack_from("<HH", cabecera, 26)
+        return _medida("image/webp", ancho & 0x3FFF, alto & 0x3FFF)
+    if formato == b"VP8L" and cabecera[20] == 0x2F:
+        bits = struct.unpack_from("<I", cabecera, 21)[0]
+        return _medida("image/webp", (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1)
+    if formato == b"VP8X":
+        ancho = int.from_bytes(cabecera[24:27], "little") + 1
+        alto = int.from_bytes(cabecera[27:30], "little") + 1
+        return _medida("image/webp", ancho, alto)
+    raise ErrorMedio("WebP no reconocido")
+
+
+_RAIZ_SVG = re.compile(rb"<svg\b[^>]*>")
+_ATRIBUTO_SVG = re.compile(rb"""\s(width|height|viewBox)\s*=\s*["']([^"']*)["']""")
+_LONGITUD_SVG = re.compile(rb"\s*([0-9]+(?:\.[0-9]*)?)\s*(?:px)?\s*$")
+
+
+def _svg(cabecera):
+    """
+    Dimensiones de un SVG: width/height del elemento raíz (en píxeles) o,
+    si no, las del viewBox. None si no las tiene.
+    """
+    raiz = _RAIZ_SVG.search(cabecera)
+    if raiz is None:
+        raise ErrorMedio("SVG sin elemento raíz")
+    atributos = dict(_ATRIBUTO_SVG.findall(raiz.group()))
+    ancho, alto = (_LONGITUD_SVG.match(atributos.get(a, b"")) for a in (b"width", b"height"))
+    if ancho and alto:
+        return _medida("image/svg+xml", round(float(ancho.group(1))), round(float(alto.group(1))))
+    caja = atributos.get(b"viewBox", b"").replace(b",", b" ").split()
+    if len(caja) == 4:
+        return _medida("image/svg+xml", round(float(caja[2])), round(float(caja[3])))
+    return None
+
+
+def _imagen(f, cabecera):
+    """
+    Dimensiones de una imagen a partir de su cabecera, o None si no es una
+    imagen conocida
+    """
+    if cabecera.startswith(b"\x89PNG\r\n\x1a\n") and cabecera[12:16] == b"IHDR":
+        return _medida("image/png", *struct.unpack_from(">II", cabecera, 16))
+    if cabecera[:6] in (b"GIF87a", b"GIF89a"):
+        return _medida("image/gif", *struct.unpack_from("<HH", cabecera, 6))
+    if cabecera[:4] == b"RIFF" and cabecera[8:12] == b"WEBP":
+        return _webp(cabecera)
+    if cabecera[:2] == b"\xff\xd8":
+        return _jpeg(f)
+    if cabecera.lstrip(b"\xef\xbb\xbf \t\r\n").startswith(b"<"):
+        cabecera += f.read(CABECERA_SVG - len(cabecera))
+        if b"<svg" in cabecera:
+            return _svg(cabecera)
+    return None
+
+
+# ---------- MP4 ----------
+
+def _cajas(datos, inicio=0, fin=None):
+    """
+    Genera (tipo, inicio del contenido, fin) de las cajas ISO BMFF de 'datos'
+    """
+    fin = len(datos) if fin is None else fin
+    while inicio + 8 <= fin:
+        tamaño, tipo = struct.unpack_from(">I4s", datos, inicio)
+        cabecera = 8
+        if tamaño == 1:
+            tamaño = struct.unpack_from(">Q", datos, inicio + 8)[0]
+            cabecera = 16
+        elif tamaño == 0:
+            tamaño = fin - inicio
+        if tamaño < cabecera or inicio + tamaño > fin:
+            return
+        yield tipo, inicio + cabecera, inicio + tamaño
+        inicio += tamaño
+
+
+def _moov(f):
+    """
+    Contenido de la caja moov del archivo, saltando (seek) las demás
+    cajas de primer nivel (mdat puede estar antes o después)
+    """
+    posicion = 0
+    while True:
+        f.seek(posicion)
+        cabecera = f.read(16)
+        if len(cabecera) < 8:
+            raise ErrorMedio("MP4 sin caja moov")
+        tamaño, tipo = struct.unpack_from(">I4s", cabecera)
+        inicio = 8
+        if tamaño == 1:
+            tamaño = struct.unpack_from(">Q", cabecera, 8)[0]
+            inicio = 16
+        if tipo == b"moov":
+            if tamaño == 0:
+                return cabecera[inicio:] + f.read(MAX_MOOV)
+            if tamaño > MAX_MOOV:
+                raise ErrorMedio("caja moov demasiado grande")
+            return cabecera[inicio:] + f.read(tamaño - len(cabecera))
+        if tamaño < inicio:
+            raise ErrorMedio("MP4 sin caja moov")
+        posicion += tamaño
+
+
+def _mp4(f):
+    moov = _moov(f)
+    duracion = None
+    ancho = alto = None
+    for tipo, inicio, fin in _cajas(moov):
+        if tipo == b"mvhd":
+            if moov[inicio] == 1:
+                escala, total = struct.unpack_from(">IQ", moov, inicio + 20)
+            else:
+                escala, total = struct.unpack_from(">II", moov, inicio + 12)
+            if escala:
+                duracion = total / escala
+        elif tipo == b"trak" and ancho is None:
+            tkhd = video = None
+            for t, i, j in _cajas(moov, inicio, fin):
+                if t == b"tkhd":
+                    tkhd = (i, j)
+                elif t == b"mdia":
+                    video = any(moov[k + 8:k + 12] == b"vide"
+                                for tt, k, _ in _cajas(moov, i, j) if tt == b"hdlr")
+            if video and tkhd is not None:
+                # width y height (16.16) son los 8 últimos bytes de tkhd
+                w, h = struct.unpack_from(">II", moov, tkhd[1] - 8)
+                ancho, alto = w >> 16, h >> 16
+    if ancho is None:
+        raise ErrorMedio("MP4 sin pista de vídeo")
+    return _medida("video/mp4", ancho, alto, duracion)
+
+
+# ---------- WebM / Matroska ----------
+
+# Identificadores EBML
+SEGMENTO, INFO, ESCALA, DURACION = 0x18538067, 0x1549A966, 0x2AD7B1, 0x4489
+PISTAS, PISTA, TIPO_PISTA, VIDEO = 0x1654AE6B, 0xAE, 0x83, 0xE0
+ANCHO, ALTO, ANCHO_VISTA, ALTO_VISTA = 0xB0, 0xBA, 0x54B0, 0x54BA
+CLUSTER = 0x1F43B675
+
+
+def _vint(datos, posicion, marca):
+    """
+    Entero de longitud variable EBML en 'posicion': (valor, siguiente).
+    Con 'marca' se conserva el bit de longitud (identificadores); un tamaño
+    con todos los bits a 1 (desconocido) se devuelve como None.
+    """
+    if posicion >= len(datos):
+        raise ErrorMedio("WebM truncado")
+    primero = datos[posicion]
+    longitud = 1
+    while longitud <= 8 and not primero & (0x80 >> (longitud - 1)):
+        longitud += 1
+    if longitud > 8 or posicion + longitud > len(datos):
+        raise ErrorMedio("WebM no válido")
+    valor = int.from_bytes(datos[posicion:posicion + longitud], "big")
+    if not marca:
+        valor &= (1 << (7 * longitud)) - 1
+        if valor == (1 << (7 * longitud)) - 1:
+            valor = None
+    return valor, posicion + longitud
+
+
+def _elementos(datos, inicio=0, fin=None):
+    """
+    Genera (id, inicio del contenido, fin) de los elementos EBML de 'datos'
+    (un tamaño desconocido llega hasta 'fin')
+    """
+    fin = len(datos) if fin is None else fin
+    while inicio < fin:
+        ident, i = _vint(datos, inicio, True)
+        tamaño, i = _vint(datos, i, False)
+        final = fin if tamaño is None else min(i + tamaño, fin)
+        yield ident, i, final
+        inicio = final
+
+
+def _entero(datos, inicio, fin):
+    return int.from_bytes(datos[inicio:fin], "big")
+
+
+def _webm(f):
+    """
+    Lee los elementos del Segment uno a uno (solo sus cabeceras y los que
+    interesan) hasta tener Info y Tracks; los Cluster se saltan con seek
+    """
+    cabecera = f.read(64)
+    ident, i = _vint(cabecera, 0, True)
+    tamaño, i = _vint(cabecera, i, False)
+    f.seek(i + (tamaño or 0))  # cabecera EBML
+    cabecera = f.read(12)
+    ident, i = _vint(cabecera, 0, True)
+    if ident != SEGMENTO:
+        raise ErrorMedio("WebM sin Segment")
+    _, i = _vint(cabecera, i, False)
+    posicion = f.seek(f.tell() - len(cabecera) + i)
+
+    escala, duracion, ancho, alto = 1000000, None, None, None
+    while ancho is None or duracion is None:
+        cabecera = f.read(12)
+        if len(cabecera) < 2:
+            break
+        ident, i = _vint(cabecera, 0, True)
+        tamaño, i = _vint(cabecera, i, False)
+        if tamaño is None:
+            break  # Cluster de tamaño desconocido: no hay más metadatos delante
+        if ident in (INFO, PISTAS):
+            f.seek(posicion + i)
+            datos = f.read(tamaño)
+            if ident == INFO:
+                for e, j, k in _elementos(datos):
+                    if e == ESCALA:
+                        escala = _entero(datos, j, k)
+                    elif e == DURACION:
+                        duracion = struct.unpack(">d" if k - j == 8 else ">f", datos[j:k])[0]
+            else:
+                for e, j, k in _elementos(datos):
+                    if e != PISTA:
+                        continue
+                    campos = {ee: (jj, kk) for ee, jj, kk in _elementos(datos, j, k)}
+                    if TIPO_PISTA not in campos or _entero(datos, *campos[TIPO_PISTA]) != 1:
+                        continue
+                    video = {ee: _entero(datos, jj, kk)
+                             for ee, jj, kk in _elementos(datos, *campos.get(VIDEO, (0, 0)))}
+                    ancho = video.get(ANCHO_VISTA, video.get(ANCHO))
+                    alto = video.get(ALTO_VISTA, video.get(ALTO))
+                    break
+            if ident == PISTAS and ancho is None:
+                raise ErrorMedio("WebM sin pista de vídeo")
+        posicion += i + tamaño
+        f.seek(posicion)
+    if ancho is None or alto is None:
+        raise ErrorMedio("WebM sin pista de vídeo")
+    return _medida("video/webm", ancho, alto,
+                   duracion * escala / 1e9 if duracion is not None else None)
+
+
+def sondear(ruta):
+    """
+    Devuelve {'tipo', 'ancho', 'alto'[, 'duracion']} del archivo 'ruta'
+    (según su contenido, no su extensión), o None si no es un formato
+    conocido. Lanza ErrorMedio si la cabecera no es válida y OSError si no
+    se puede leer.
+    """
+    with open(ruta, "rb") as f:
+        cabecera = f.read(CABECERA)
+        try:
+            medida = _imagen(f, cabecera)
+            if medida is not None:
+                return medida
+            if cabecera[4:8] == b"ftyp":
+                return _mp4(f)
+            if cabecera[:4] == b"\x1a\x45\xdf\xa3":
+                f.seek(0)
+                return _webm(f)
+        except (struct.error, IndexError) as e:
+            raise ErrorMedio(f"{ruta}: cabecera truncada") from e
+    return None
+
+
+# ---------- Caché ----------
+
+class CacheMedios(object):
+    """
+    Resultados del sondeo de los archivos de un directorio multimedia,
+    guardados en <directorio>/.medios.json. Una entrada vale mientras no
+    cambien el tamaño ni la fecha de modificación de su archivo.
+    """
+    __slots__ = ('directorio', 'ruta', 'entradas', 'cambiada')
+
+    def __init__(self, directorio):
+        self.directorio = directorio
+        self.ruta = os.path.join(directorio, CACHE)
+        self.cambiada = False
+        try:
+            with open(self.ruta, encoding="utf-8") as f:
+                datos = json.load(f)
+            self.entradas = datos["medios"] if datos.get("version") == VERSION else {}
+        except (IOError, ValueError, KeyError, AttributeError):
+            self.entradas = {}
+
+    def sondear(self, archivo):
+        """
+        Medida del archivo 'archivo' (nombre dentro del directorio), o None
+        si no existe, no es un formato conocido o no es válido
+        """
+        ruta = os.path.join(self.directorio, archivo)
+        try:
+            st = os.stat(ruta)
+        except OSError:
+            return None
+        firma = [st.st_size, st.st_mtime_ns]
+        entrada = self.entradas.get(archivo)
+        if entrada is not None and entrada.get("firma") == firma:
+            return entrada.get("medida")
+        try:
+            medida = sondear(ruta)
+        except (OSError, ErrorMedio):
+            medida = None
+        self.entradas[archivo] = {"firma": firma, "medida": medida}
+        self.cambiada = True
+        return medida
+
+    def poster(self, video):
+        """
+        Nombre de la imagen que sirve de poster al vídeo 'video' (ver
+        POSTERS), o None si no hay ninguna
+        """
+        raiz = os.path.splitext(video)[0]
+        for sufijo in POSTERS:
+            if os.path.isfile(os.path.join(self.directorio, raiz + sufijo)):
+                return raiz + sufijo
+        return None
+
+    def guardar(self):
+        """
+        Escribe la caché si ha cambiado (sin error si el directorio no
+        admite escritura)
+        """
+        if not self.cambiada:
+            return
+        try:
+            with escrituraAtomica(self.ruta) as temporal:
+                with abrirSalida(temporal) as f:
+                    json.dump({"version": VERSION, "medios": self.entradas}, f,
+                              indent=1, sort_keys=True, ensure_ascii=False)
+        except OSError:
+            return
+        self.cambiada = False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sondea las dimensiones de las imágenes y los vídeos")
+    parser.add_argument("directorio", nargs="?", default=os.path.join(os.pardir, "multimedia"))
+    parser.add_argument("archivos", nargs="*", help="archivos a sondear (por defecto, todos)")
+    args = parser.parse_args()
+
+    cache = CacheMedios(args.directorio)
+    archivos = args.archivos or sorted(a for a in os.listdir(args.directorio)
+                                       if not a.startswith(".")
+                                       and os.path.isfile(os.path.join(args.directorio, a)))
+    for archivo in archivos:
+        medida = cache.sondear(archivo)
+        if medida is None:
+            continue
+        duracion = f" {medida['duracion']:.1f} s" if medida.get("duracion") is not None else ""
+        print(f"{archivo}: {medida['tipo']} {medida['ancho']}x{medida['alto']}{duracion}")
+    cache.guardar()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Generación concurrente de circuito.kml, altimetria.svg e InfoCircuito.html
+con asyncio: el XML se analiza una sola vez y los conversores se lanzan a
+la vez, cada uno en un hilo de un ThreadPoolExecutor, sobre el mismo
+ModeloCircuito (de solo lectura).
+
+Cada conversor escribe en un archivo temporal junto a su salida, que se
+renombra sobre ella al terminar (ver salida.escrituraAtomica): otro proceso
+nunca ve una salida a medias y, si un conversor falla, su salida anterior
+queda intacta. Un fallo no interrumpe a los demás conversores.
+
+El HTML recibe el tamaño de la altimetría (xml2altimetria.ANCHO y ALTO) en
+lugar de sondear altimetria.svg, que se está escribiendo a la vez. Los
+mensajes de los conversores (que nombran los archivos temporales) no se
+muestran.
+
+Los conversores sueltan el GIL mientras escriben, comprimen (KMZ) o
+calculan con NumPy (altimetría), así que esas partes se solapan; el formato
+de los textos en Python puro sigue siendo secuencial.
+
+Con -z cada salida se escribe también comprimida (.gz y, si está instalado
+brotli, .br) en la misma pasada; los comprimidos no se reescriben si el
+contenido no cambia (ver salida.Compresion).
+
+Uso: python orquestador.py [archivoXML] [-d destino] [-c kml svg html] [-j hilos]
+                           [-z] [--nivel-gzip N] [--nivel-brotli N]
+
+@version 1.0 18/Noviembre/2025
+@author: Marcelo Díez Domínguez UO293820
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from circuito import cargarCircuito, ErrorCircuito
+from construccion import CONVERSORES, SALIDAS
+from instrumentacion import etapa, configurar
+from salida import Compresion, escrituraAtomica, NIVEL_BROTLI, NIVEL_GZIP
+import xml2altimetria
+
+
+def _generar(conversor, modelo, ruta, opciones):
+    """
+    Ejecuta un conversor (en un hilo) escribiendo en un temporal que se
+    renombra a 'ruta' al terminar. Devuelve 'ruta', o None si el conversor
+    no generó nada. Los mensajes del conversor se descartan (salvo que
+    'opciones' indique otro 'informar').
+    """
+    generar = CONVERSORES[conversor][1]
+    opciones = dict(opciones)
+    opciones.setdefault("informar", None)
+    with etapa(f"orquestador.{conversor}"):
+        with escrituraAtomica(ruta) as temporal:
+            if generar(modelo, temporal, **opciones) is None:
+                return None
+    return ruta
+
+
+async def generarSalidas(modelo, salidas=None, opciones=None, ejecutor=None):
+    """
+    Genera a la vez las salidas 'salidas' (conversor -> ruta; por defecto
+    SALIDAS) del ModeloCircuito 'modelo' en 'ejecutor' (por defecto, el del
+    bucle de eventos). 'opciones': conversor -> kwargs del conversor; si se
+    genera el HTML con el SVG o el KML, el HTML los enlaza (ver
+    xml2html.generar_html) y toma el tamaño de la altimetría de
+    xml2altimetria, sin leer el SVG que se está escribiendo.
+    Devuelve un diccionario conversor -> ruta generada (o None). Si algún
+    conversor falla, se espera a los demás y se relanza el primer error.
+    """
+    salidas = dict(salidas or SALIDAS)
+    opciones = {c: dict(o or {}) for c, o in (opciones or {}).items()}
+    # El HTML enlaza la altimetría y el KML que se generan con él
+    if "html" in salidas:
+        directorio = os.path.dirname(os.path.abspath(salidas["html"]))
+        html = opciones.setdefault("html", {})
+        for conversor, opcion in (("svg", "altimetria"), ("kml", "kml")):
+            if conversor in salidas:
+                html.setdefault(opcion, os.path.relpath(os.path.abspath(salidas[conversor]), directorio))
+        if "svg" in salidas:
+            html.setdefault("medida_altimetria", {"tipo": "image/svg+xml", "ancho": xml2altimetria.ANCHO,
+                                                  "alto": xml2altimetria.ALTO})
+    bucle = asyncio.get_running_loop()
+    tareas = [bucle.run_in_executor(ejecutor, _generar, conversor, modelo, ruta,
+                                    opciones.get(conversor) or {})
+              for conversor, ruta in salidas.items()]
+    resultados = await asyncio.gather(*tareas, return_exceptions=True)
+    for resultado in resultados:
+        if isinstance(resultado, BaseException):
+            raise resultado
+    return dict(zip(salidas, resultados))
+
+
+async def convertirAsync(archivoXML, salidas=None, opciones=None, ejecutor=None):
+    """
+    Carga 'archivoXML' una sola vez (fuera del bucle de eventos) y genera
+    sus salidas a la vez (ver generarSalidas). Lanza ErrorCircuito si el
+    XML no se puede cargar.
+    """
+    bucle = asyncio.get_running_loop()
+    modelo = await bucle.run_in_executor(ejecutor, cargarCircuito, archivoXML)
+    return await generarSalidas(modelo, salidas, opciones, ejecutor)
+
+
+def convertir(archivoXML, salidas=None, opciones=None, hilos=None):
+    """
+    Atajo síncrono de convertirAsync con un ThreadPoolExecutor de 'hilos'
+    hilos (por defecto, uno por salida)
+    """
+    salidas = dict(salidas or SALIDAS)
+    with ThreadPoolExecutor(max_workers=hilos or len(salidas)) as ejecutor:
+        return asyncio.run(convertirAsync(archivoXML, salidas, opciones, ejecutor))
+
+
+def main():
+    configurar()
+    parser = argparse.ArgumentParser(description="Genera a la vez el KML, el SVG y el HTML de un circuito")
+    parser.add_argument("archivoXML", nargs="?", default="circuitoEsquema.xml")
+    parser.add_argument("-d", "--destino", help="directorio de salida (por defecto, el actual)")
+    parser.add_argument("-c", "--conversores", nargs="+", choices=list(SALIDAS),
+                        default=list(SALIDAS), help="conversores a ejecutar")
+    parser.add_argument("-j", "--hilos", type=int, default=None,
+                        help="número de hilos (por defecto, uno por salida)")
+    parser.add_argument("-z", "--comprimir", action="store_true",
+                        help="escribir también las salidas comprimidas (.gz, .br)")
+    parser.add_argument("--nivel-gzip", type=int, default=NIVEL_GZIP, help="nivel de gzip (1-9)")
+    parser.add_argument("--nivel-brotli", type=int, default=NIVEL_BROTLI, help="nivel de brotli (0-11)")
+    args = parser.parse_args()
+
+    salidas = {c: os.path.join(args.destino or "", SALIDAS[c]) for c in args.conversores}
+    opciones = None
+    if args.comprimir:
+        compresion = Compresion(args.nivel_gzip, args.nivel_brotli)
+        opciones = {c: {"compresion": compresion} for c in salidas}
+    if args.destino:
+        os.makedirs(args.destino, exist_ok=True)
+
+    inicio = time.perf_counter()
+    try:
+        estados = convertir(args.archivoXML, salidas, opciones, hilos=args.hilos)
+    except ErrorCircuito as e:
+        print(e)
+        return
+    for conversor, ruta in estados.items():
+        print(f"{salidas[conversor]}: {'generado' if ruta else 'no generado'}")
+    print(f"{len(estados)} salidas en {time.perf_counter() - inicio:.2f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""
+Altimetría multirresolución por teselas: pirámide de niveles de zoom del
+perfil de altitud, cada nivel dividido en teselas SVG a lo largo de la
+distancia, más un índice JSON para que un visor pida solo el rango visible.
+
+  - El nivel z mide ANCHO * 2^z píxeles para toda la vuelta y tiene 2^z
+    teselas de ANCHO x ALTO píxeles (<directorio>/<z>/<x>.svg).
+  - Cada píxel (columna) guarda el mínimo y el máximo de las altitudes que
+    caen en él, así que ningún pico se pierde al alejar el zoom; en la
+    tesela se dibuja como un trazo vertical del mínimo al máximo.
+  - Solo se recorren los tramos una vez, para el nivel más fino; cada nivel
+    se obtiene del siguiente juntando columnas de dos en dos (mínimo de los
+    mínimos, máximo de los máximos). Todos los niveles juntos suman menos
+    del doble de columnas que el más fino, que no tiene más columnas que
+    tramos, así que generar la pirámide cuesta lo mismo que una pasada a
+    resolución completa.
+
+El índice (indice.json) describe la distancia total, el rango de
+altitudes (la escala vertical es común a todas las teselas), los límites de
+sector y, por nivel, los metros por tesela y el rango de altitudes de cada
+tesela.
+
+Uso: python piramide.py [archivoXML] [-o directorio] [--ancho 256] [--alto 200]
+                        [--niveles N]
+
+@version 1.0 16/Noviembre/2025
+@author: Marcelo Díez Domínguez UO293820
+"""
+
+import argparse
+import json
+import os
+from array import array
+from bisect import bisect_left, bisect_right
+from math import floor, inf
+
+from circuito import cargarCircuito, ErrorCircuito
+from salida import abrirSalida
+from instrumentacion import etapa
+from xml2altimetria import obtenerTramos, SvgFlujo, bloquesPuntos
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional: sin él se usa Python puro
+    np = None
+
+# Tamaño de las teselas (píxeles)
+ANCHO = 256
+ALTO = 200
+
+# Margen vertical dentro de cada tesela (píxeles)
+MARGEN = 8
+
+# Nombre del índice y plantilla de las teselas (relativa al directorio)
+INDICE = "indice.json"
+PLANTILLA = "{z}/{x}.svg"
+
+
+# ---------- Agregación mínimo/máximo ----------
+
+def _nivelMasFino(acum, alts, columnas):
+    """
+    (mínimos, máximos) por columna de las altitudes 'alts' situadas en las
+    distancias acumuladas 'acum' (crecientes), repartidas en 'columnas'.
+    Las columnas sin tramos quedan con mínimo inf y máximo -inf.
+    """
+    total = acum[-1]
+    escala = columnas / total if total > 0 else 0.0
+    if np is not None and isinstance(acum, np.ndarray):
+        cols = np.minimum((acum * escala).astype(np.int64), columnas - 1)
+        inicios = np.flatnonzero(np.concatenate(([True], cols[1:] != cols[:-1])))
+        minimos = np.full(columnas, inf)
+        maximos = np.full(columnas, -inf)
+        minimos[cols[inicios]] = np.minimum.reduceat(alts, inicios)
+        maximos[cols[inicios]] = np.maximum.reduceat(alts, inicios)
+        return minimos, maximos
+
+    minimos = array('d', [inf]) * columnas
+    maximos = array('d', [-inf]) * columnas
+    for d, a in zip(acum, alts):
+        c = min(int(d * escala), columnas - 1)
+        if a < minimos[c]:
+            minimos[c] = a
+        if a > maximos[c]:
+            maximos[c] = a
+    return minimos, maximos
+
+
+def _reducir(minimos, maximos):
+    """
+    Nivel con la mitad de columnas: cada columna junta dos consecutivas
+    """
+    if np is not None and isinstance(minimos, np.ndarray):
+        return minimos.reshape(-1, 2).min(axis=1), maximos.reshape(-1, 2).max(axis=1)
+    return (array('d', map(min, minimos[0::2], minimos[1::2])),
+            array('d', map(max, maximos[0::2], maximos[1::2])))
+
+
+def niveles(acum, alts, ancho=ANCHO, numero=None):
+    """
+    Lista de (mínimos, máximos) por columna de los niveles 0..z, donde el
+    nivel z tiene ancho * 2^z columnas. Sin 'numero', el nivel más fino es
+    el último con al menos un tramo por columna (de media).
+    """
+    if numero is None:
+        numero = 1
+        while ancho << numero <= len(acum):
+            numero += 1
+    with etapa("piramide.agregacion") as e:
+        piramide = [_nivelMasFino(acum, alts, ancho << (numero - 1))]
+        for _ in range(numero - 1):
+            piramide.append(_reducir(*piramide[-1]))
+        piramide.reverse()
+        e.elementos = len(acum)
+    return piramide
+
+
+# ---------- Teselas ----------
+
+def _trazos(minimos, maximos, fy):
+    """
+    Puntos (columna, y) de un nivel: para cada columna con tramos, (mínimo,
+    máximo), o un solo punto si coinciden a la precisión de las teselas
+    (0.1 px). Las columnas quedan ordenadas.
+    """
+    if np is not None and isinstance(minimos, np.ndarray):
+        llenas = np.flatnonzero(minimos <= maximos)
+        inferiores, superiores = fy(minimos[llenas]), fy(maximos[llenas])
+        distintos = np.floor(inferiores * 10 + 0.5) != np.floor(superiores * 10 + 0.5)
+        conservar = np.column_stack((np.ones(len(llenas), bool), distintos)).ravel()
+        cols = np.repeat(llenas, 2)[conservar]
+        ys = np.column_stack((inferiores, superiores)).ravel()[conservar]
+        return cols, ys
+
+    cols, ys = array('l'), array('d')
+    for c, (mn, mx) in enumerate(zip(minimos, maximos)):
+        if mn <= mx:
+            inferior, superior = fy(mn), fy(mx)
+            cols.append(c)
+            ys.append(inferior)
+            if floor(inferior * 10 + 0.5) != floor(superior * 10 + 0.5):
+                cols.append(c)
+                ys.append(superior)
+    return cols, ys
+
+
+def _rangosTeselas(minimos, maximos, ancho):
+    """
+    [mínimo, máximo] de altitud de cada tesela de un nivel (None si vacía)
+    """
+    if np is not None and isinstance(minimos, np.ndarray):
+        inferiores = minimos.reshape(-1, ancho).min(axis=1).tolist()
+        superiores = maximos.reshape(-1, ancho).max(axis=1).tolist()
+    else:
+        inferiores = [min(minimos[i:i + ancho]) for i in range(0, len(minimos), ancho)]
+        superiores = [max(maximos[i:i + ancho]) for i in range(0, len(maximos), ancho)]
+    return [[round(mn, 1), round(mx, 1)] if mn <= mx else None
+            for mn, mx in zip(inferiores, superiores)]
+
+
+def _escribirTesela(ruta, xs, ys, limites, ancho, alto):
+    """
+    Escribe una tesela: área bajo el perfil, trazos mínimo/máximo y límites
+    de sector ('limites': posiciones x dentro de la tesela)
+    """
+    with SvgFlujo(ruta, ancho, alto) as svg:
+        svg.addRect('0', '0', str(ancho), str(alto), '#ffffff', '0', 'none')
+        for x in limites:
+            svg.addLine(f"{x:.1f}", '0', f"{x:.1f}", str(alto), '#d0d0d0', '1')
+        if len(xs):
+            # Los puntos se formatean una vez para el área y para el perfil
+            puntos = " ".join(bloquesPuntos(xs, ys, 1))
+            svg.addPolyline(f"{xs[0]:.1f},{alto} {puntos} {xs[-1]:.1f},{alto}", 'none', '0', '#ffebee')
+            svg.addPolyline(puntos, 'red', '1', 'none')
+
+
+def generarPiramide(modelo, directorio, ancho=ANCHO, alto=ALTO, numero=None):
+    """
+    Genera en 'directorio' las teselas de todos los niveles y el índice, y
+    devuelve la ruta del índice. 'numero' es el número de niveles (por
+    defecto, hasta uno o más tramos por columna).
+    """
+    # 1) Datos: distancia acumulada y altitudes (cerrando con el origen)
+    dists, alts, sects = obtenerTramos(modelo)
+    if np is not None:
+        acum = np.cumsum(np.frombuffer(dists, dtype=np.float64))
+        alts = np.append(np.frombuffer(alts, dtype=np.float64), alts[0])
+        acum = np.append(acum, acum[-1])
+        amin, amax = float(alts.min()), float(alts.max())
+    else:
+        acum, s = array('d'), 0.0
+        for d in dists:
+            s += d
+            acum.append(s)
+        acum.append(s)
+        alts.append(alts[0])
+        amin, amax = min(alts), max(alts)
+    total = float(acum[-1])
+    if total <= 0:
+        raise ValueError("El circuito no tiene distancias para la altimetría")
+
+    # 2) Escala vertical común a todas las teselas
+    rango = (amax - amin) or 1.0
+    util = alto - 2 * MARGEN
+
+    def fy(alt):
+        return MARGEN + (amax - alt) / rango * util
+
+    # 3) Límites de sector (m)
+    sectores = [(float(acum[i]), sects[i]) for i in range(len(sects))
+                if i == 0 or sects[i] != sects[i - 1]]
+
+    # 4) Niveles y teselas
+    piramide = niveles(acum, alts, ancho, numero)
+    descripcion = []
+    with etapa("piramide.escritura") as e:
+        for z, (minimos, maximos) in enumerate(piramide):
+            teselas = 1 << z
+            columnas = ancho * teselas
+            cols, ys = _trazos(minimos, maximos, fy)
+            os.makedirs(os.path.join(directorio, str(z)), exist_ok=True)
+            for x in range(teselas):
+                # Una columna más a cada lado para que el perfil siga entre teselas
+                izq = x * ancho
+                i = bisect_left(cols, izq - 1)
+                j = bisect_right(cols, izq + ancho)
+                xs = cols[i:j] - (izq - 0.5) if np is not None else array('d', (c - izq + 0.5 for c in cols[i:j]))
+                limites = [p - izq for p in (m * columnas / total for m, _ in sectores[1:])
+                           if izq <= p < izq + ancho]
+                _escribirTesela(os.path.join(directorio, PLANTILLA.format(z=z, x=x)),
+                                xs, ys[i:j], limites, ancho, alto)
+            descripcion.append({
+                "z": z,
+                "teselas": teselas,
+                "metrosPorTesela": total / teselas,
+                "metrosPorPixel": total / columnas,
+                "altitudes": _rangosTeselas(minimos, maximos, ancho),
+            })
+        e.elementos = (1 << len(piramide)) - 1
+
+    # 5) Índice
+    ruta = os.path.join(directorio, INDICE)
+    with abrirSalida(ruta) as f:
+        json.dump({
+            "circuito": modelo.nombre,
+            "distancia": total,
+            "altitud": [amin, amax],
+            "margen": MARGEN,
+            "ancho": ancho,
+            "alto": alto,
+            "plantilla": PLANTILLA,
+            "sectores": [[m, s] for m, s in sectores],
+            "niveles": descripcion,
+        }, f, ensure_ascii=False, indent=1)
+    return ruta
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera la altimetría por teselas y niveles de zoom")
+    parser.add_argument("archivoXML", nargs="?", default="circuitoEsquema.xml")
+    parser.add_argument("-o", "--directorio", default="altimetria", help="directorio de las teselas")
+    parser.add_argument("--ancho", type=int, default=ANCHO, help="ancho de las teselas (px)")
+    parser.add_argument("--alto", type=int, default=ALTO, help="alto de las teselas (px)")
+    parser.add_argument("--niveles", type=int, help="número de niveles (por defecto, automático)")
+    args = parser.parse_args()
+
+    try:
+        modelo = cargarCircuito(args.archivoXML)
+        ruta = generarPiramide(modelo, args.directorio, args.ancho, args.alto, args.niveles)
+    except (ErrorCircuito, ValueError) as e:
+        print(e)
+        return
+    print("Creado el archivo:", ruta)
+
+if __name__ == "__main__":
+    main()
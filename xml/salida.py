@@ -0,0 +1,446 @@
+# -*- coding: utf-8 -*-
+"""
+Utilidades comunes para los escritores en streaming (KML, SVG, HTML):
+apertura de archivos de salida con buffer, escritura atómica (archivo
+temporal + rename, también como archivo abierto con abrirSalidaAtomica)
+y escapado de textos y atributos con las mismas reglas que
+xml.etree.ElementTree.
+
+Con una Compresion, la salida se comprime en la misma pasada en hermanos
+.gz y .br (p.ej. circuito.kml.gz) para servirlos ya comprimidos. El hash
+del contenido se guarda junto a la salida (.circuito.kml.comprimidos.json):
+si no cambia, los comprimidos existentes no se reescriben (conservan su
+fecha). El hash solo se conoce al final del flujo, así que una salida sin
+cambios se comprime igualmente y solo se ahorra la escritura; para no
+llegar a comprimir, construccion.py no vuelve a generar las salidas al día.
+Si la escritura falla (se sale del 'with' con una excepción, o el archivo
+se recoge sin cerrar), los comprimidos se descartan.
+
+@version 1.0 04/Noviembre/2025
+@author: Marcelo Díez Domínguez UO293820
+"""
+
+import hashlib
+import io
+import json
+import os
+import threading
+import zlib
+from contextlib import contextmanager, suppress
+from itertools import islice
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él solo se genera el .gz
+    brotli = None
+
+# Tamaño del buffer de escritura (bytes)
+TAMAÑO_BUFFER = 1 << 16
+
+# Número de elementos que se unen en cada bloque al escribir secuencias largas
+TAMAÑO_BLOQUE = 4096
+
+# Niveles de compresión por defecto de los comprimidos (gzip 1-9, brotli 0-11)
+NIVEL_GZIP = 9
+NIVEL_BROTLI = 11
+
+# Sufijos de los comprimidos que acompañan a una salida
+SUFIJOS_COMPRIMIDOS = (".gz", ".br")
+
+# Salidas que se están escribiendo en un temporal (temporal -> salida final)
+_destinos = {}
+
+
+def abrirSalida(nombreArchivo, compresion=None):
+    """
+    Abre 'nombreArchivo' para escribir texto UTF-8 con un buffer grande
+    (mismo modo que ElementTree.write). Con 'compresion' se escriben además
+    sus comprimidos (ver abrirSalidaBinaria).
+    """
+    if compresion is None:
+        return open(nombreArchivo, "w", encoding="utf-8",
+                    errors="xmlcharrefreplace", buffering=TAMAÑO_BUFFER)
+    return _TextoComprimido(abrirSalidaBinaria(nombreArchivo, compresion),
+                            encoding="utf-8", errors="xmlcharrefreplace")
+
+
+def abrirSalidaBinaria(nombreArchivo, compresion=None):
+    """
+    Abre 'nombreArchivo' para escribir bytes con un buffer grande. Con
+    'compresion' lo escrito se comprime a la vez en los hermanos .gz/.br,
+    sin volver a leer la salida; al cerrar se guardan los que hayan cambiado.
+    """
+    if compresion is None:
+        return open(nombreArchivo, "wb", buffering=TAMAÑO_BUFFER)
+    return _BinarioComprimido(_SalidaComprimida(nombreArchivo, compresion), TAMAÑO_BUFFER)
+
+
+def _rutaTemporal(nombreArchivo):
+    directorio, nombre = os.path.split(nombreArchivo)
+    raiz, extension = os.path.splitext(nombre)
+    return os.path.join(directorio, f".{raiz}.{os.getpid()}.{threading.get_ident()}.tmp{extension}")
+
+
+@contextmanager
+def escrituraAtomica(nombreArchivo):
+    """
+    Da una ruta temporal (en el mismo directorio y con la misma extensión)
+    donde escribir 'nombreArchivo'. Al salir sin errores se renombra sobre
+    'nombreArchivo' (os.replace, atómico): nadie ve nunca una salida a
+    medias. Si hay errores se borra. Si no se llegó a escribir, no se toca
+    'nombreArchivo'. Los comprimidos del temporal siguen a la salida.
+    """
+    temporal = _rutaTemporal(nombreArchivo)
+    _destinos[temporal] = nombreArchivo
+    try:
+        yield temporal
+    except BaseException:
+        for ruta in [temporal] + _compañeros(temporal) + _temporalesComprimidos(temporal):
+            with suppress(FileNotFoundError):
+                os.remove(ruta)
+        raise
+    finally:
+        _destinos.pop(temporal, None)
+    huellaNueva = os.path.exists(_rutaHuella(temporal))
+    with suppress(FileNotFoundError):
+        os.replace(temporal, nombreArchivo)
+    for origen, destino in zip(_compañeros(temporal), _compañeros(nombreArchivo)):
+        with suppress(FileNotFoundError):
+            os.replace(origen, destino)
+    if huellaNueva:
+        _borrarObsoletos(nombreArchivo)
+
+
+def abrirSalidaAtomica(nombreArchivo, compresion=None, binario=False):
+    """
+    Como abrirSalida (o un archivo binario con buffer, con 'binario'), pero
+    se escribe en el temporal de una escrituraAtomica: al cerrar se
+    renombra sobre 'nombreArchivo'. Si se sale de su 'with' con una
+    excepción, el temporal y sus comprimidos se borran y la salida
+    anterior queda intacta.
+    """
+    if binario:
+        return _SalidaAtomica(nombreArchivo, lambda temporal: open(temporal, "wb", buffering=TAMAÑO_BUFFER))
+    return _SalidaAtomica(nombreArchivo, lambda temporal: abrirSalida(temporal, compresion))
+
+
+class _SalidaAtomica(object):
+    """
+    Archivo abierto con 'abrir' sobre el temporal de una escrituraAtomica
+    de 'nombreArchivo' (el resto de operaciones se delegan en él)
+    """
+
+    def __init__(self, nombreArchivo, abrir):
+        self.atomica = escrituraAtomica(nombreArchivo)
+        temporal = self.atomica.__enter__()
+        try:
+            self.archivo = abrir(temporal)
+        except BaseException as error:
+            self.atomica.__exit__(type(error), error, error.__traceback__)
+            raise
+
+    def __getattr__(self, nombre):
+        return getattr(self.__dict__["archivo"], nombre)
+
+    def close(self):
+        """
+        Cierra el temporal y lo renombra sobre la salida
+        """
+        atomica, self.atomica = self.atomica, None
+        if atomica is None:
+            return
+        try:
+            self.archivo.close()
+        except BaseException as error:
+            atomica.__exit__(type(error), error, error.__traceback__)
+            raise
+        atomica.__exit__(None, None, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        if tipo is None:
+            self.close()
+            return
+        atomica, self.atomica = self.atomica, None
+        if atomica is not None:
+            self.archivo.__exit__(tipo, valor, traza)
+            atomica.__exit__(tipo, valor, traza)
+
+
+# ---------- Comprimidos ----------
+
+class Compresion(object):
+    """
+    Comprimidos que se escriben junto a una salida: .gz con 'nivelGzip' y
+    .br con 'nivelBrotli' (si está instalado brotli). Con None no se
+    genera ese formato.
+    """
+
+    __slots__ = ("nivelGzip", "nivelBrotli")
+
+    def __init__(self, nivelGzip=NIVEL_GZIP, nivelBrotli=NIVEL_BROTLI):
+        self.nivelGzip = nivelGzip
+        self.nivelBrotli = nivelBrotli
+
+    def __repr__(self):
+        return f"Compresion({self.nivelGzip!r}, {self.nivelBrotli!r})"
+
+    def comoDiccionario(self):
+        """
+        Forma estable y serializable (formato -> nivel de los comprimidos
+        que se generan), p.ej. para el manifiesto de construccion.py
+        """
+        return {sufijo.lstrip("."): nivel for sufijo, nivel in self.niveles().items()}
+
+    def niveles(self):
+        """
+        Diccionario sufijo -> nivel de los comprimidos que se generan
+        """
+        niveles = {}
+        if self.nivelGzip is not None:
+            niveles[".gz"] = self.nivelGzip
+        if self.nivelBrotli is not None and brotli is not None:
+            niveles[".br"] = self.nivelBrotli
+        return niveles
+
+
+def _rutaHuella(nombreArchivo):
+    directorio, nombre = os.path.split(nombreArchivo)
+    return os.path.join(directorio, f".{nombre}.comprimidos.json")
+
+
+def _compañeros(nombreArchivo):
+    return [nombreArchivo + sufijo for sufijo in SUFIJOS_COMPRIMIDOS] + [_rutaHuella(nombreArchivo)]
+
+
+def _temporalesComprimidos(nombreArchivo):
+    return [_rutaTemporal(nombreArchivo + sufijo) for sufijo in SUFIJOS_COMPRIMIDOS]
+
+
+def _borrarObsoletos(nombreArchivo):
+    """
+    Borra los comprimidos de 'nombreArchivo' que no están en su huella
+    (de un contenido anterior)
+    """
+    niveles = _leerHuella(nombreArchivo).get("niveles", {})
+    for sufijo in SUFIJOS_COMPRIMIDOS:
+        if sufijo not in niveles:
+            with suppress(FileNotFoundError):
+                os.remove(nombreArchivo + sufijo)
+
+
+def _leerHuella(nombreArchivo):
+    try:
+        with open(_rutaHuella(nombreArchivo), encoding="utf-8") as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return {}
+
+
+def _compresor(sufijo, nivel):
+    """
+    (comprimir, terminar) del formato 'sufijo'
+    """
+    if sufijo == ".gz":
+        # wbits 31: formato gzip, con fecha 0 (mismo contenido, mismo .gz)
+        compresor = zlib.compressobj(nivel, zlib.DEFLATED, 31)
+        return compresor.compress, compresor.flush
+    compresor = brotli.Compressor(mode=brotli.MODE_TEXT, quality=nivel)
+    return compresor.process, compresor.finish
+
+
+class _SalidaComprimida(io.RawIOBase):
+    """
+    Archivo binario que escribe la salida y, en la misma pasada, calcula
+    su hash y la comprime en un temporal por formato. Al cerrar, un
+    comprimido se guarda solo si cambia el hash o su nivel, o si falta;
+    los de formatos que ya no se generan y quedarían obsoletos se borran
+    (tras guardar la salida). Si se ha abortado, los temporales se borran
+    sin guardar nada.
+    """
+
+    def __init__(self, nombreArchivo, compresion):
+        super().__init__()
+        self.nombre = nombreArchivo
+        self.hash = hashlib.sha256()
+        self.niveles = compresion.niveles()
+        self.abortada = False
+        self.compresores = []
+        self.archivo = open(nombreArchivo, "wb")
+        try:
+            for sufijo, nivel in self.niveles.items():
+                temporal = _rutaTemporal(nombreArchivo + sufijo)
+                self.compresores.append((sufijo, _compresor(sufijo, nivel), open(temporal, "wb"), temporal))
+        except BaseException:
+            self.abortar()
+            self.close()
+            raise
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        self.archivo.write(datos)
+        self.hash.update(datos)
+        for _, (comprimir, _), archivo, _ in self.compresores:
+            archivo.write(comprimir(datos))
+        return len(datos)
+
+    def abortar(self):
+        """
+        Al cerrar, descarta los comprimidos (la escritura ha fallado)
+        """
+        self.abortada = True
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            self.archivo.close()
+            if not self.abortada:
+                self._guardar()
+        finally:
+            for _, _, archivo, temporal in self.compresores:
+                archivo.close()
+                with suppress(FileNotFoundError):
+                    os.remove(temporal)
+            super().close()
+
+    def _guardar(self):
+        huella = self.hash.hexdigest()
+        # Los comprimidos vigentes son los de la salida final (si la salida
+        # se escribe en un temporal de escrituraAtomica, que puede estar a
+        # su vez dentro de otra, p.ej. KmlFlujo desde construccion.py)
+        destino = self.nombre
+        while destino in _destinos:
+            destino = _destinos[destino]
+        anterior = _leerHuella(destino)
+        igual = anterior.get("hash") == huella
+        nivelesAnteriores = anterior.get("niveles", {})
+
+        cambios = False
+        for sufijo, (_, terminar), archivo, temporal in self.compresores:
+            if igual and nivelesAnteriores.get(sufijo) == self.niveles[sufijo] \
+                    and os.path.exists(destino + sufijo):
+                continue  # se borra al cerrar
+            archivo.write(terminar())
+            archivo.close()
+            os.replace(temporal, self.nombre + sufijo)
+            cambios = True
+        if cambios or not igual:
+            # Con el mismo contenido siguen valiendo los comprimidos de
+            # otros formatos; si ha cambiado, quedan obsoletos
+            niveles = dict(nivelesAnteriores) if igual else {}
+            niveles.update(self.niveles)
+            with open(_rutaHuella(self.nombre), "w", encoding="utf-8") as f:
+                json.dump({"hash": huella, "niveles": niveles}, f, indent=2, sort_keys=True)
+            # Escribiendo en un temporal, escrituraAtomica los borra tras
+            # el rename; si no, la salida ya está en su sitio
+            if destino == self.nombre:
+                _borrarObsoletos(self.nombre)
+
+
+class _BinarioComprimido(io.BufferedWriter):
+    """
+    Buffer de una _SalidaComprimida: si se sale de su 'with' con una
+    excepción o se recoge sin cerrar, los comprimidos se descartan
+    """
+
+    def __exit__(self, tipo, valor, traza):
+        if tipo is not None:
+            self.raw.abortar()
+        return super().__exit__(tipo, valor, traza)
+
+    def __del__(self):
+        if not self.closed:
+            self.raw.abortar()
+        super().__del__()
+
+
+class _TextoComprimido(io.TextIOWrapper):
+    """
+    Flujo de texto sobre un _BinarioComprimido, con el mismo descarte
+    """
+
+    def __exit__(self, tipo, valor, traza):
+        if tipo is not None:
+            self.buffer.raw.abortar()
+        return super().__exit__(tipo, valor, traza)
+
+    def __del__(self):
+        if not self.closed:
+            self.buffer.raw.abortar()
+        super().__del__()
+
+
+def envolverSalida(binario):
+    """
+    Envuelve un flujo binario ya abierto (p.ej. una entrada de un zip) para
+    escribir texto con las mismas opciones que abrirSalida
+    """
+    return io.TextIOWrapper(binario, encoding="utf-8", errors="xmlcharrefreplace")
+
+
+def escaparTexto(texto):
+    """
+    Escapa el contenido de un elemento XML
+    """
+    if "&" in texto:
+        texto = texto.replace("&", "&amp;")
+    if "<" in texto:
+        texto = texto.replace("<", "&lt;")
+    if ">" in texto:
+        texto = texto.replace(">", "&gt;")
+    return texto
+
+
+def escaparAtributo(texto):
+    """
+    Escapa el valor de un atributo XML
+    """
+    texto = escaparTexto(texto)
+    if "\"" in texto:
+        texto = texto.replace("\"", "&quot;")
+    if "\r" in texto:
+        texto = texto.replace("\r", "&#13;")
+    if "\n" in texto:
+        texto = texto.replace("\n", "&#10;")
+    if "\t" in texto:
+        texto = texto.replace("\t", "&#09;")
+    return texto
+
+
+def escaparAtributoHtml(texto):
+    """
+    Escapa el valor de un atributo HTML (método "html" de ElementTree)
+    """
+    if "&" in texto:
+        texto = texto.replace("&", "&amp;")
+    if ">" in texto:
+        texto = texto.replace(">", "&gt;")
+    if "\"" in texto:
+        texto = texto.replace("\"", "&quot;")
+    return texto
+
+
+def escribirUnidos(archivo, elementos, separador, escapar=None):
+    """
+    Escribe en 'archivo' los strings de 'elementos' separados por 'separador',
+    uniendo bloques de TAMAÑO_BLOQUE para no materializar la secuencia entera.
+    Devuelve el número de elementos escritos.
+    """
+    iterador = iter(elementos)
+    total = 0
+    while True:
+        bloque = list(islice(iterador, TAMAÑO_BLOQUE))
+        if not bloque:
+            return total
+        texto = separador.join(bloque)
+        if escapar is not None:
+            texto = escapar(texto)
+        if total:
+            archivo.write(separador)
+        archivo.write(texto)
+        total += len(bloque)
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""
+Simplificación de polilíneas (nivel de detalle) para las salidas KML y SVG:
+  - Douglas-Peucker ("dp"): conserva los puntos que se separan más de
+    'tolerancia' del segmento que los aproxima.
+  - Visvalingam-Whyatt ("vw"): elimina los puntos cuyo triángulo efectivo
+    tiene un área menor que tolerancia².
+
+Las dos devuelven los índices de los puntos que se conservan, en orden. Los
+índices 'fijos' (límites de sector, extremos...) se conservan siempre, y el
+primer y último punto también. Sin NumPy todo se calcula en Python puro.
+
+Con NumPy, Douglas-Peucker procesa por niveles: en cada pasada se calculan
+a la vez las distancias de todos los puntos de todos los tramos abiertos,
+así que el bucle de Python da tantas vueltas como profundidad tenga la
+subdivisión (~log n en un trazado normal), no una por punto conservado. El
+coste sigue siendo O(n²) en el peor caso (cada pasada separa un solo
+punto), como en el algoritmo original. En Visvalingam-Whyatt NumPy solo
+calcula las áreas iniciales: la eliminación es secuencial (cada punto
+eliminado cambia el área de sus vecinos) y se hace con un montículo en
+Python, O(n log n).
+
+@version 1.0 05/Noviembre/2025
+@author: Marcelo Díez Domínguez UO293820
+"""
+
+import heapq
+from math import cos, radians, inf
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional: sin él se usa Python puro
+    np = None
+
+METODOS = ("dp", "vw")
+
+# Metros por grado de latitud (esfera de radio medio terrestre)
+METROS_GRADO = 6371008.8 * 3.141592653589793 / 180.0
+
+
+def proyectarMetros(lons, lats, lat0=None):
+    """
+    Proyecta longitudes y latitudes (grados) a metros en un plano local
+    equirectangular centrado en 'lat0' (por defecto, la primera latitud).
+    Devuelve (xs, ys).
+    """
+    if lat0 is None:
+        lat0 = lats[0] if len(lats) else 0.0
+    kx = METROS_GRADO * cos(radians(lat0))
+    if np is not None:
+        return np.asarray(lons, dtype=float) * kx, np.asarray(lats, dtype=float) * METROS_GRADO
+    return [lon * kx for lon in lons], [lat * METROS_GRADO for lat in lats]
+
+
+def _distancias2(xs, ys, a, b):
+    """
+    Distancias al cuadrado de los puntos a+1..b-1 al segmento a-b
+    """
+    ax, ay, bx, by = xs[a], ys[a], xs[b], ys[b]
+    dx, dy = bx - ax, by - ay
+    l2 = dx * dx + dy * dy
+    d2 = []
+    for i in range(a + 1, b):
+        px, py = xs[i] - ax, ys[i] - ay
+        if l2 > 0.0:
+            t = min(1.0, max(0.0, (px * dx + py * dy) / l2))
+            px, py = px - t * dx, py - t * dy
+        d2.append(px * px + py * py)
+    return d2
+
+
+def _douglasPeuckerNiveles(xs, ys, tol2, cortes):
+    """
+    Douglas-Peucker con NumPy, por niveles: en cada pasada se calculan las
+    distancias de los puntos interiores de todos los tramos abiertos (con las
+    mismas operaciones que _distancias2) y se parten los que superan tol2
+    por su punto más lejano (el primero si hay empate).
+    """
+    x = np.asarray(xs, dtype=float)
+    y = np.asarray(ys, dtype=float)
+    conservar = np.zeros(len(x), dtype=bool)
+    conservar[cortes] = True
+    a, b = np.asarray(cortes[:-1]), np.asarray(cortes[1:])
+    while True:
+        abiertos = b - a >= 2
+        a, b = a[abiertos], b[abiertos]
+        if not len(a):
+            break
+        # Índices interiores de cada tramo, seguidos, y el tramo de cada uno
+        interiores = b - a - 1
+        inicios = np.concatenate(([0], np.cumsum(interiores)[:-1]))
+        tramo = np.repeat(np.arange(len(a)), interiores)
+        indices = np.arange(len(tramo)) - inicios[tramo] + a[tramo] + 1
+
+        ax, ay = x[a], y[a]
+        dx, dy = x[b] - ax, y[b] - ay
+        l2 = dx * dx + dy * dy
+        px = x[indices] - ax[tramo]
+        py = y[indices] - ay[tramo]
+        proyectar = (l2 > 0.0)[tramo]
+        t = np.clip((px * dx[tramo] + py * dy[tramo])
+                    / np.where(proyectar, l2[tramo], 1.0), 0.0, 1.0)
+        px = np.where(proyectar, px - t * dx[tramo], px)
+        py = np.where(proyectar, py - t * dy[tramo], py)
+        d2 = px * px + py * py
+
+        maximos = np.maximum.reduceat(d2, inicios)
+        lejanos = np.minimum.reduceat(np.where(d2 == maximos[tramo], indices, len(x)), inicios)
+        partir = maximos > tol2
+        k = lejanos[partir]
+        conservar[k] = True
+        a = np.concatenate((a[partir], k))
+        b = np.concatenate((k, b[partir]))
+    return np.flatnonzero(conservar).tolist()
+
+
+def douglasPeucker(xs, ys, tolerancia, fijos=()):
+    """
+    Índices conservados por Douglas-Peucker con 'tolerancia' (unidades de xs/ys).
+    La polilínea se parte en los puntos fijos y cada tramo se simplifica por
+    separado: con NumPy, por niveles (ver _douglasPeuckerNiveles); sin él,
+    con una pila (sin recursión).
+    """
+    n = len(xs)
+    if n <= 2:
+        return list(range(n))
+    tol2 = tolerancia * tolerancia
+    cortes = sorted({0, n - 1} | {i for i in fijos if 0 <= i < n})
+    if np is not None:
+        return _douglasPeuckerNiveles(xs, ys, tol2, cortes)
+    conservar = set(cortes)
+
+    pila = list(zip(cortes[:-1], cortes[1:]))
+    while pila:
+        a, b = pila.pop()
+        if b - a < 2:
+            continue
+        d2 = _distancias2(xs, ys, a, b)
+        k = max(range(len(d2)), key=d2.__getitem__)
+        if d2[k] > tol2:
+            k += a + 1
+            conservar.add(k)
+            pila.append((a, k))
+            pila.append((k, b))
+
+    return sorted(conservar)
+
+
+def _areas(xs, ys):
+    """
+    Área del triángulo que forma cada punto interior con sus vecinos
+    (inf para el primero y el último)
+    """
+    n = len(xs)
+    if np is not None:
+        x = np.asarray(xs, dtype=float)
+        y = np.asarray(ys, dtype=float)
+        areas = np.full(n, inf)
+        areas[1:-1] = 0.5 * np.abs((x[:-2] - x[2:]) * (y[1:-1] - y[:-2])
+                                   - (x[:-2] - x[1:-1]) * (y[2:] - y[:-2]))
+        return areas.tolist()
+    return [inf] + [_area(xs, ys, i - 1, i, i + 1) for i in range(1, n - 1)] + [inf]
+
+
+def _area(xs, ys, a, b, c):
+    return 0.5 * abs((xs[a] - xs[c]) * (ys[b] - ys[a]) - (xs[a] - xs[b]) * (ys[c] - ys[a]))
+
+
+def visvalingam(xs, ys, tolerancia, fijos=()):
+    """
+    Índices conservados por Visvalingam-Whyatt: se eliminan, de menor a mayor
+    área efectiva, los puntos cuya área sea menor que tolerancia².
+    Usa un montículo con entradas perezosas: O(n log n), en Python (la
+    eliminación es secuencial; NumPy solo calcula las áreas iniciales).
+    """
+    n = len(xs)
+    if n <= 2:
+        return list(range(n))
+    umbral = tolerancia * tolerancia
+
+    if np is not None:
+        xs = np.asarray(xs, dtype=float).tolist()
+        ys = np.asarray(ys, dtype=float).tolist()
+    areas = _areas(xs, ys)
+    for i in fijos:
+        if 0 <= i < n:
+            areas[i] = inf
+
+    anterior = list(range(-1, n - 1))
+    siguiente = list(range(1, n + 1))
+    eliminado = bytearray(n)
+    monticulo = [(a, i) for i, a in enumerate(areas) if a < umbral]
+    heapq.heapify(monticulo)
+
+    heappop, heappush = heapq.heappop, heapq.heappush
+    while monticulo:
+        area, i = heappop(monticulo)
+        if eliminado[i] or area != areas[i]:
+            continue  # entrada obsoleta
+        eliminado[i] = 1
+        a, c = anterior[i], siguiente[i]
+        siguiente[a] = c
+        anterior[c] = a
+        # Recalcular los vecinos (el área efectiva nunca baja de la eliminada)
+        for j in (a, c):
+            if areas[j] == inf:
+                continue
+            p, q = anterior[j], siguiente[j]
+            nueva = 0.5 * abs((xs[p] - xs[q]) * (ys[j] - ys[p]) - (xs[p] - xs[j]) * (ys[q] - ys[p]))
+            if nueva < area:
+                nueva = area
+            areas[j] = nueva
+            if nueva < umbral:
+                heappush(monticulo, (nueva, j))
+
+    return [i for i in range(n) if not eliminado[i]]
+
+
+def simplificar(xs, ys, tolerancia, metodo="dp", fijos=()):
+    """
+    Índices de los puntos conservados con el 'metodo' indicado ("dp" o "vw")
+    """
+    if metodo == "dp":
+        return douglasPeucker(xs, ys, tolerancia, fijos)
+    if metodo == "vw":
+        return visvalingam(xs, ys, tolerancia, fijos)
+    raise ValueError("Método de simplificación desconocido: " + str(metodo))
+
+
+def cambiosDeSector(sectores):
+    """
+    Índices en los que empieza un sector nuevo (el valor cambia respecto al anterior)
+    """
+    return [i for i in range(1, len(sectores)) if sectores[i] != sectores[i - 1]]
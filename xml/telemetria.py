@@ -0,0 +1,375 @@
+# -*- coding: utf-8 -*-
+"""
+Cronometraje a partir de la telemetría GPS de los pilotos.
+
+Lee registros CSV o GPX por lotes (sin cargarlos enteros), sitúa cada
+posición sobre el trazado de circuitoEsquema.xml con el índice espacial
+(espacial.IndiceEspacial) y calcula los pasos por meta y por los límites
+de sector (los cambios de <sector> entre tramos), interpolando el instante
+de paso entre las dos posiciones que lo rodean. La memoria usada no depende
+de la longitud de los registros: por piloto solo se guarda la última
+posición y las vueltas completadas.
+
+CSV: una fila por posición con columnas de tiempo, longitud y latitud
+(tiempo/time/timestamp, longitud/lon/longitude, latitud/lat/latitude) y,
+opcionalmente, piloto/rider. El tiempo puede ir en segundos o en ISO 8601.
+GPX: puntos <trkpt lat lon><time>; el piloto es el <name> del <trk>.
+Sin columna de piloto se usa el nombre del archivo.
+
+El resultado se guarda en JSON (tiempos.json) y xml2html.generar_html lo
+puede añadir al informe con la opción 'tiempos'.
+
+Uso: python telemetria.py registro.csv [registro.gpx ...] [-x circuitoEsquema.xml] [-o tiempos.json]
+
+@version 1.0 13/Noviembre/2025
+@author: Marcelo Díez Domínguez UO293820
+"""
+
+import argparse
+import csv
+import json
+import os
+import xml.etree.ElementTree as ET
+from array import array
+from datetime import datetime
+
+from circuito import cargarCircuito, ErrorCircuito, SIN_SECTOR
+from espacial import IndiceEspacial
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional: sin él se usa Python puro
+    np = None
+
+# Posiciones por lote
+TAMAÑO_LOTE = 1 << 16
+
+# Separación máxima (m) a la pista para usar una posición (fuera: boxes, errores)
+SEPARACION_MAXIMA = 30.0
+
+# Nombres de columna admitidos en los CSV
+COLUMNAS = {
+    "tiempo": ("tiempo", "time", "timestamp", "t"),
+    "longitud": ("longitud", "lon", "lng", "longitude"),
+    "latitud": ("latitud", "lat", "latitude"),
+    "piloto": ("piloto", "rider", "driver"),
+}
+
+
+class ErrorTelemetria(Exception):
+    """
+    Registro de telemetría ilegible o sin las columnas necesarias
+    """
+    pass
+
+
+# ---------- Lectura por lotes ----------
+
+def _segundos(texto):
+    """
+    Instante en segundos: número o fecha ISO 8601 (admite la 'Z' final)
+    """
+    try:
+        return float(texto)
+    except ValueError:
+        return datetime.fromisoformat(texto.strip().replace("Z", "+00:00")).timestamp()
+
+
+def _columna(cabecera, campo, obligatoria=True):
+    nombres = [c.strip().lower() for c in cabecera]
+    for alias in COLUMNAS[campo]:
+        if alias in nombres:
+            return nombres.index(alias)
+    if obligatoria:
+        raise ErrorTelemetria(f"Falta la columna '{campo}' ({', '.join(COLUMNAS[campo])})")
+    return None
+
+
+def leerCSV(archivo, tamaño=TAMAÑO_LOTE):
+    """
+    Genera lotes (pilotos, tiempos, longitudes, latitudes) de hasta 'tamaño'
+    posiciones. 'pilotos' es una lista de nombres (o None si el CSV no tiene
+    columna de piloto).
+    """
+    with open(archivo, newline="", encoding="utf-8") as f:
+        filas = csv.reader(f)
+        try:
+            cabecera = next(filas)
+        except StopIteration:
+            return
+        it, ilon, ilat = (_columna(cabecera, c) for c in ("tiempo", "longitud", "latitud"))
+        ipil = _columna(cabecera, "piloto", obligatoria=False)
+
+        pilotos, tiempos, lons, lats = [], array('d'), array('d'), array('d')
+        for numero, fila in enumerate(filas, 2):
+            if not fila:
+                continue
+            try:
+                tiempos.append(_segundos(fila[it]))
+                lons.append(float(fila[ilon]))
+                lats.append(float(fila[ilat]))
+            except (ValueError, IndexError):
+                raise ErrorTelemetria(f"{archivo}:{numero}: fila no válida") from None
+            if ipil is not None:
+                pilotos.append(fila[ipil])
+            if len(tiempos) == tamaño:
+                yield (pilotos if ipil is not None else None), tiempos, lons, lats
+                pilotos, tiempos, lons, lats = [], array('d'), array('d'), array('d')
+        if tiempos:
+            yield (pilotos if ipil is not None else None), tiempos, lons, lats
+
+
+def _local(etiqueta):
+    return etiqueta.rsplit("}", 1)[-1]
+
+
+def leerGPX(archivo, tamaño=TAMAÑO_LOTE):
+    """
+    Genera lotes (pilotos, tiempos, longitudes, latitudes) de los <trkpt>
+    de un GPX (1.0 o 1.1), analizándolo en streaming: cada punto se
+    descarta del árbol en cuanto se ha leído
+    """
+    pilotos, tiempos, lons, lats = [], array('d'), array('d'), array('d')
+    piloto = None
+    pila = []
+    try:
+        for evento, elem in ET.iterparse(archivo, events=("start", "end")):
+            if evento == "start":
+                pila.append(elem)
+                continue
+            pila.pop()
+            etiqueta = _local(elem.tag)
+            if etiqueta == "name" and pila and _local(pila[-1].tag) == "trk":
+                piloto = (elem.text or "").strip() or None
+            elif etiqueta == "trkpt":
+                tiempo = next((h.text for h in elem if _local(h.tag) == "time"), None)
+                if tiempo:
+                    tiempos.append(_segundos(tiempo))
+                    lons.append(float(elem.get("lon")))
+                    lats.append(float(elem.get("lat")))
+                    pilotos.append(piloto)
+                del pila[-1][:]  # los puntos anteriores del <trkseg> ya están leídos
+                if len(tiempos) == tamaño:
+                    yield pilotos, tiempos, lons, lats
+                    pilotos, tiempos, lons, lats = [], array('d'), array('d'), array('d')
+            elif etiqueta == "trk":
+                del pila[-1][:]
+                piloto = None
+    except (IOError, ET.ParseError) as e:
+        raise ErrorTelemetria(f"Error leyendo {archivo}: {e}") from e
+    if tiempos:
+        yield pilotos, tiempos, lons, lats
+
+
+def leerTelemetria(archivo, tamaño=TAMAÑO_LOTE):
+    """
+    Lotes de un registro CSV o GPX (según la extensión). Los pilotos sin
+    nombre toman el del archivo.
+    """
+    lector = leerGPX if archivo.lower().endswith(".gpx") else leerCSV
+    defecto = os.path.splitext(os.path.basename(archivo))[0]
+    try:
+        for pilotos, tiempos, lons, lats in lector(archivo, tamaño):
+            if pilotos is None:
+                pilotos = [defecto] * len(tiempos)
+            else:
+                pilotos = [p or defecto for p in pilotos]
+            yield pilotos, tiempos, lons, lats
+    except IOError as e:
+        raise ErrorTelemetria(f"Error leyendo {archivo}: {e}") from e
+
+
+# ---------- Cronometraje ----------
+
+class Vuelta(object):
+    """
+    Vuelta completa: número, instante de inicio (paso por meta), tiempo
+    total y tiempos de cada sector (en orden de paso)
+    """
+    __slots__ = ('numero', 'inicio', 'tiempo', 'sectores')
+
+    def __init__(self, numero, inicio, tiempo, sectores):
+        self.numero = numero
+        self.inicio = inicio
+        self.tiempo = tiempo
+        self.sectores = sectores
+
+    def comoDiccionario(self):
+        return {"numero": self.numero, "inicio": self.inicio, "tiempo": self.tiempo,
+                "sectores": self.sectores}
+
+
+def limitesSector(indice):
+    """
+    Distancias de vuelta (m) en las que empieza cada sector, sin contar la
+    meta (0.0): [(distancia, sector)]
+    """
+    sectores = indice.sectores
+    return [(indice.acumuladas[k], sectores[k]) for k in range(1, len(sectores))
+            if sectores[k] != sectores[k - 1] and sectores[k] != SIN_SECTOR]
+
+
+class Cronometro(object):
+    """
+    Estado del cronometraje de un piloto. Se alimenta con las posiciones ya
+    situadas sobre la pista (tiempos y distancias de vuelta), lote a lote.
+
+    Un paso por meta es un salto de la distancia de vuelta hacia atrás de
+    más de media vuelta; solo cuenta si antes se ha pasado por la mitad de
+    la vuelta, para que las oscilaciones del GPS junto a la meta no cuenten
+    vueltas de más. Los límites de sector cuentan solo en orden.
+    """
+
+    def __init__(self, longitudVuelta, limites):
+        self.longitudVuelta = longitudVuelta
+        self.limites = [d for d, _ in limites]
+        self.mitad = longitudVuelta / 2.0
+        self.anterior = None        # (tiempo, distancia) de la última posición
+        self.inicio = None          # instante del último paso por meta
+        self.pasos = []             # instantes de paso por los límites de esta vuelta
+        self.pasadaMitad = False
+        self.vueltas = []
+
+    def _meta(self, instante):
+        if self.inicio is not None and self.pasadaMitad and len(self.pasos) == len(self.limites):
+            marcas = [self.inicio] + self.pasos + [instante]
+            self.vueltas.append(Vuelta(len(self.vueltas) + 1, self.inicio, instante - self.inicio,
+                                       [b - a for a, b in zip(marcas, marcas[1:])]))
+        if self.inicio is None or self.pasadaMitad:
+            self.inicio = instante
+            self.pasos = []
+            self.pasadaMitad = False
+
+    def _avance(self, t0, d0, t1, d1):
+        """
+        Pasos por límites de sector y por la mitad de la vuelta entre dos
+        posiciones sin paso por meta (d0 < d1)
+        """
+        if self.inicio is not None:
+            # Puede haber varios límites entre dos posiciones (huecos en el registro)
+            while len(self.pasos) < len(self.limites):
+                limite = self.limites[len(self.pasos)]
+                if not d0 < limite <= d1:
+                    break
+                self.pasos.append(t0 + (limite - d0) / (d1 - d0) * (t1 - t0))
+        if d0 < self.mitad <= d1:
+            self.pasadaMitad = True
+
+    def procesar(self, tiempos, distancias):
+        """
+        Procesa un lote de posiciones ordenadas en el tiempo. Con NumPy solo
+        se recorren en Python las parejas de posiciones en las que hay un paso.
+        """
+        if not len(tiempos):
+            return
+        L = self.longitudVuelta
+        if self.anterior is not None:
+            t = [self.anterior[0]] + list(tiempos) if np is None else np.concatenate(([self.anterior[0]], tiempos))
+            d = [self.anterior[1]] + list(distancias) if np is None else np.concatenate(([self.anterior[1]], distancias))
+        else:
+            t, d = tiempos, distancias
+        self.anterior = (float(t[-1]), float(d[-1]))
+
+        if np is not None:
+            t = np.asarray(t, dtype=float)
+            d = np.asarray(d, dtype=float)
+            d0, d1 = d[:-1], d[1:]
+            marcas = [L / 2.0] + self.limites
+            hay = d1 - d0 < -L / 2.0  # pasos por meta
+            for m in marcas:
+                hay |= (d0 < m) & (m <= d1)
+            parejas = np.flatnonzero(hay).tolist()
+        else:
+            parejas = range(len(t) - 1)
+
+        for i in parejas:
+            t0, d0, t1, d1 = float(t[i]), float(d[i]), float(t[i + 1]), float(d[i + 1])
+            if d1 - d0 < -L / 2.0:
+                # Paso por meta: interpolar con la distancia desenrollada
+                recorrido = (L - d0) + d1
+                cruce = t0 + ((L - d0) / recorrido if recorrido > 0.0 else 0.0) * (t1 - t0)
+                self._avance(t0, d0, cruce, L)
+                self._meta(cruce)
+                self._avance(cruce, 0.0, t1, d1)
+            elif d1 - d0 > L / 2.0:
+                continue  # retroceso sobre la meta (ruido): se ignora
+            elif d1 > d0:
+                self._avance(t0, d0, t1, d1)
+
+
+def cronometrar(archivos, modelo, separacion=SEPARACION_MAXIMA, tamaño=TAMAÑO_LOTE, indice=None):
+    """
+    Procesa los registros 'archivos' sobre el circuito 'modelo'. Devuelve un
+    diccionario piloto -> Cronometro (con sus vueltas completas).
+    """
+    indice = indice or IndiceEspacial(modelo)
+    limites = limitesSector(indice)
+    cronometros = {}
+    for archivo in archivos:
+        for pilotos, tiempos, lons, lats in leerTelemetria(archivo, tamaño):
+            _, distancias, _, separaciones = indice.consultarLote(lons, lats)
+            # Agrupar el lote por piloto, conservando el orden de las posiciones
+            grupos = {}
+            for i, piloto in enumerate(pilotos):
+                grupos.setdefault(piloto, []).append(i)
+            for piloto, filas in grupos.items():
+                filas = [i for i in filas if separaciones[i] <= separacion]
+                if not filas:
+                    continue
+                crono = cronometros.get(piloto)
+                if crono is None:
+                    crono = cronometros[piloto] = Cronometro(indice.longitudVuelta, limites)
+                if np is not None:
+                    filas = np.asarray(filas)
+                    crono.procesar(np.frombuffer(tiempos, dtype=np.float64)[filas], distancias[filas])
+                else:
+                    crono.procesar([tiempos[i] for i in filas], [distancias[i] for i in filas])
+    return cronometros
+
+
+def resumen(cronometros, modelo, indice):
+    """
+    Diccionario serializable a JSON con las vueltas de cada piloto, su
+    mejor vuelta y sus mejores sectores (el formato de tiempos.json)
+    """
+    pilotos = {}
+    for piloto, crono in sorted(cronometros.items()):
+        vueltas = crono.vueltas
+        datos = {"vueltas": [v.comoDiccionario() for v in vueltas]}
+        if vueltas:
+            datos["mejorVuelta"] = min(vueltas, key=lambda v: v.tiempo).numero
+            datos["mejoresSectores"] = [min(tiempos) for tiempos in zip(*(v.sectores for v in vueltas))]
+        pilotos[piloto] = datos
+    return {
+        "circuito": modelo.nombre,
+        "sectores": [indice.sectores[0]] + [sector for _, sector in limitesSector(indice)],
+        "pilotos": pilotos,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempos por vuelta y por sector a partir de telemetría GPS")
+    parser.add_argument("registros", nargs="+", help="archivos CSV o GPX")
+    parser.add_argument("-x", "--xml", default="circuitoEsquema.xml", help="circuito")
+    parser.add_argument("-o", "--salida", default="tiempos.json")
+    parser.add_argument("-s", "--separacion", type=float, default=SEPARACION_MAXIMA,
+                        help="separación máxima a la pista (m)")
+    args = parser.parse_args()
+
+    try:
+        modelo = cargarCircuito(args.xml)
+        indice = IndiceEspacial(modelo)
+        cronometros = cronometrar(args.registros, modelo, args.separacion, indice=indice)
+    except (ErrorCircuito, ErrorTelemetria) as e:
+        print(e)
+        return
+
+    datos = resumen(cronometros, modelo, indice)
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(datos, f, indent=2, ensure_ascii=False)
+    for piloto, d in datos["pilotos"].items():
+        print(f"{piloto}: {len(d['vueltas'])} vueltas")
+    print("Tiempos guardados en", args.salida)
+
+if __name__ == "__main__":
+    main()
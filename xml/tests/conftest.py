@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""
+Configuración común de las pruebas: los módulos de xml/ se importan por su
+nombre (como al ejecutarlos desde xml/) y los datos de ejemplo son los de
+circuitoEsquema.xml.
+"""
+
+import os
+import shutil
+import sys
+
+import pytest
+
+DIRECTORIO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if DIRECTORIO not in sys.path:
+    sys.path.insert(0, DIRECTORIO)
+
+EJEMPLO = os.path.join(DIRECTORIO, "circuitoEsquema.xml")
+
+
+@pytest.fixture
+def ejemplo(tmp_path):
+    """
+    Copia de circuitoEsquema.xml en un directorio temporal (las cachés y
+    manifiestos que se escriben junto al XML no tocan el repositorio)
+    """
+    ruta = tmp_path / "circuitoEsquema.xml"
+    shutil.copyfile(EJEMPLO, ruta)
+    return str(ruta)
+
+
+@pytest.fixture
+def modelo(ejemplo):
+    from circuito import cargarCircuito
+    return cargarCircuito(ejemplo, usarCache=False, validar=False)
+
+
+@pytest.fixture
+def indice(modelo):
+    from espacial import IndiceEspacial
+    return IndiceEspacial(modelo)
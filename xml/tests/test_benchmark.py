@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de benchmark/sintetico.py: los circuitos generados son válidos
+según circuito.xsd y se cargan con el número de tramos pedido.
+"""
+
+import pytest
+
+from benchmark.sintetico import generar, punto
+from circuito import cargarCircuito
+from validacion import validar
+
+
+@pytest.mark.parametrize("numTramos", [1, 7, 1000])
+def test_sintetico_valido(tmp_path, numTramos):
+    ruta = str(tmp_path / "sintetico.xml")
+    generar(numTramos, ruta)
+    assert validar(ruta) == []
+
+    modelo = cargarCircuito(ruta, usarCache=False, validar=True)
+    assert len(modelo) == numTramos
+    # Circuito cerrado: el último tramo vuelve al origen
+    lon0, lat0, _ = punto(0, numTramos)
+    assert modelo.longitudes[-1] == pytest.approx(lon0, abs=1e-12)
+    assert modelo.latitudes[-1] == pytest.approx(lat0, abs=1e-12)
+    assert sorted(set(modelo.sectores)) == list(range(1, min(numTramos, 4) + 1))
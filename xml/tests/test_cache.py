@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de cache.py: el modelo leído de la caché binaria es igual al del
+XML, y la caché se invalida al cambiar el contenido del XML o la versión
+del modelo.
+"""
+
+import os
+
+import pytest
+
+import cache
+from cache import borrarCache, cargarCacheado, escribirCache, leerCache, rutaCache
+from circuito import cargarCircuito
+
+COLUMNAS = ("longitudes", "latitudes", "altitudes", "distancias")
+
+
+def _nan(valores):
+    # NaN != NaN: se comparan como None
+    return [None if v != v else v for v in valores]
+
+
+def _igual(a, b):
+    for columna in COLUMNAS:
+        assert _nan(getattr(a, columna)) == _nan(getattr(b, columna)), columna
+    assert bytes(a.sectores) == bytes(b.sectores)
+    for campo in ("nombre", "pais", "localidad", "referencias"):
+        assert getattr(a, campo) == getattr(b, campo)
+    assert [(m.ruta, m.descripcion) for m in a.fotos] == [(m.ruta, m.descripcion) for m in b.fotos]
+    assert [(m.ruta, m.descripcion) for m in a.videos] == [(m.ruta, m.descripcion) for m in b.videos]
+    assert (a.origen.longitud, a.origen.latitud, a.origen.altitud) == \
+           (b.origen.longitud, b.origen.latitud, b.origen.altitud)
+    for campo in a.carrera.__slots__:
+        assert getattr(a.carrera, campo) == getattr(b.carrera, campo)
+    assert (a.longitudCircuito.valor, a.longitudCircuito.unidades) == \
+           (b.longitudCircuito.valor, b.longitudCircuito.unidades)
+
+
+def test_ida_y_vuelta(ejemplo, modelo):
+    escribirCache(modelo, ejemplo)
+    leido = leerCache(ejemplo)
+    assert leido is not None
+    assert len(leido) == len(modelo)
+    _igual(leido, modelo)
+
+
+def test_sin_cache(ejemplo):
+    assert leerCache(ejemplo) is None
+    modelo = cargarCacheado(ejemplo)
+    assert os.path.exists(rutaCache(ejemplo))
+    _igual(leerCache(ejemplo), modelo)
+    borrarCache(ejemplo)
+    assert not os.path.exists(rutaCache(ejemplo))
+
+
+def test_misma_fecha_distinto_contenido(ejemplo, modelo):
+    escribirCache(modelo, ejemplo)
+    with open(ejemplo, encoding="utf-8") as f:
+        texto = f.read()
+    with open(ejemplo, "w", encoding="utf-8") as f:
+        f.write(texto.replace("<nombre>", "<nombre>X", 1))
+    assert leerCache(ejemplo) is None
+    assert cargarCacheado(ejemplo).nombre == "X" + modelo.nombre
+
+
+def test_solo_cambia_la_fecha(ejemplo, modelo):
+    escribirCache(modelo, ejemplo)
+    st = os.stat(ejemplo)
+    os.utime(ejemplo, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    leido = leerCache(ejemplo)
+    assert leido is not None
+    _igual(leido, modelo)
+
+
+@pytest.mark.parametrize("contenido", [b"", b"MGPC", b"basura" * 100])
+def test_cache_no_valida(ejemplo, contenido):
+    with open(rutaCache(ejemplo), "wb") as f:
+        f.write(contenido)
+    assert leerCache(ejemplo) is None
+    _igual(cargarCacheado(ejemplo), cargarCircuito(ejemplo, usarCache=False))
+
+
+def test_otra_version_del_modelo(ejemplo, modelo, monkeypatch):
+    # Mismo XML, pero circuito.py lo lee de otra forma: la caché no vale
+    escribirCache(modelo, ejemplo)
+    monkeypatch.setattr(cache, "VERSION_MODELO", cache.VERSION_MODELO + 1)
+    assert leerCache(ejemplo) is None
+    _igual(cargarCacheado(ejemplo), modelo)
+    assert leerCache(ejemplo) is not None
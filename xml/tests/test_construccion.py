@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de construccion.py: solo se regeneran las salidas desactualizadas
+y los conversores reciben las opciones tal cual; los cambios en los
+archivos que lee un conversor (medios, posters) también lo regeneran.
+"""
+
+import json
+import os
+import struct
+
+import pytest
+
+import xml2altimetria
+from construccion import AL_DIA, GENERADO, Construccion, rutaManifiesto
+from salida import Compresion
+
+
+def _salidas(directorio):
+    return {"kml": os.path.join(directorio, "circuito.kml"),
+            "svg": os.path.join(directorio, "altimetria.svg")}
+
+
+def test_sin_cambios_no_regenera(ejemplo, tmp_path):
+    salidas = _salidas(tmp_path)
+    assert Construccion(ejemplo, salidas).construir() == {"kml": GENERADO, "svg": GENERADO}
+    assert Construccion(ejemplo, salidas).construir() == {"kml": AL_DIA, "svg": AL_DIA}
+
+
+def test_opciones_no_json_llegan_al_conversor(ejemplo, tmp_path):
+    salidas = _salidas(tmp_path)
+    opciones = {"kml": {"compresion": Compresion(6, None)}}
+    assert Construccion(ejemplo, salidas, opciones).construir()["kml"] == GENERADO
+    assert os.path.getsize(salidas["kml"]) > 0
+    assert os.path.exists(salidas["kml"] + ".gz")
+
+    with open(rutaManifiesto(ejemplo, str(tmp_path)), encoding="utf-8") as f:
+        manifiesto = json.load(f)
+    assert manifiesto["kml"]["opciones"] == {"compresion": {"gz": 6}}
+
+    # Forma estable: las mismas opciones dejan la salida al día
+    assert Construccion(ejemplo, salidas, {"kml": {"compresion": Compresion(6, None)}}).construir() \
+        == {"kml": AL_DIA, "svg": AL_DIA}
+    assert Construccion(ejemplo, salidas, {"kml": {"compresion": Compresion(9, None)}}).construir() \
+        == {"kml": GENERADO, "svg": AL_DIA}
+
+
+def _png(ancho, alto):
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I4sII", 13, b"IHDR", ancho, alto) + b"\0" * 40
+
+
+def test_cambios_en_los_medios_regeneran_el_html(ejemplo, tmp_path):
+    directorio = tmp_path / "xml"
+    multimedia = tmp_path / "multimedia"
+    directorio.mkdir()
+    multimedia.mkdir()
+    foto = multimedia / "sachsenring-circuito.png"
+    foto.write_bytes(_png(1280, 720))
+    salidas = dict(_salidas(str(directorio)), html=str(directorio / "InfoCircuito.html"))
+    opciones = {"html": {"altimetria": "altimetria.svg"}}
+
+    assert set(Construccion(ejemplo, salidas, opciones).construir().values()) == {GENERADO}
+    assert 'width="1280"' in (directorio / "InfoCircuito.html").read_text(encoding="utf-8")
+    assert set(Construccion(ejemplo, salidas, opciones).construir().values()) == {AL_DIA}
+
+    # Otra foto con el mismo nombre: solo cambia el HTML
+    foto.write_bytes(_png(640, 360) + b"\0")
+    assert Construccion(ejemplo, salidas, opciones).construir() == \
+        {"kml": AL_DIA, "svg": AL_DIA, "html": GENERADO}
+    assert 'width="640"' in (directorio / "InfoCircuito.html").read_text(encoding="utf-8")
+
+    # Un poster nuevo para el vídeo también
+    (multimedia / "sachsenring-poster.jpg").write_bytes(b"\xff\xd8")
+    assert Construccion(ejemplo, salidas, opciones).construir()["html"] == GENERADO
+    assert "sachsenring-poster.jpg" in (directorio / "InfoCircuito.html").read_text(encoding="utf-8")
+
+    # Sin sondeo los medios no son dependencias
+    opciones = {"html": {"sondeo": False}}
+    assert Construccion(ejemplo, salidas, opciones).construir()["html"] == GENERADO
+    foto.write_bytes(_png(1280, 720))
+    assert Construccion(ejemplo, salidas, opciones).construir()["html"] == AL_DIA
+
+
+def test_track_depende_de_la_carrera(ejemplo, tmp_path):
+    salidas = _salidas(str(tmp_path))
+    with open(ejemplo, encoding="utf-8") as f:
+        texto = f.read()
+
+    def editar(fecha):
+        with open(ejemplo, "w", encoding="utf-8") as f:
+            f.write(texto.replace("<fecha>2025-07-13</fecha>", f"<fecha>{fecha}</fecha>"))
+
+    assert Construccion(ejemplo, salidas).construir()["kml"] == GENERADO
+    editar("2025-07-14")
+    assert Construccion(ejemplo, salidas).construir()["kml"] == AL_DIA
+
+    opciones = {"kml": {"track": True}}
+    assert Construccion(ejemplo, salidas, opciones).construir()["kml"] == GENERADO
+    editar("2025-07-15")
+    assert Construccion(ejemplo, salidas, opciones).construir() == {"kml": GENERADO, "svg": AL_DIA}
+
+
+def test_fallo_conserva_la_salida_anterior(ejemplo, tmp_path, monkeypatch):
+    salidas = _salidas(str(tmp_path))
+    Construccion(ejemplo, salidas).construir()
+    with open(salidas["svg"], "rb") as f:
+        anterior = f.read()
+
+    def fallo(*args, **kwargs):
+        raise RuntimeError("fallo a mitad de la escritura")
+
+    monkeypatch.setattr(xml2altimetria, "bloquesPuntos", fallo)
+    with pytest.raises(RuntimeError):
+        Construccion(ejemplo, salidas).construir(forzar=True)
+    with open(salidas["svg"], "rb") as f:
+        assert f.read() == anterior
+    assert not [n for n in os.listdir(tmp_path) if ".tmp" in n]
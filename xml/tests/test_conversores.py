@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de los conversores: la escritura en streaming (KmlFlujo, KmzFlujo,
+SvgFlujo, HtmlFlujo) debe producir exactamente los mismos bytes que el
+árbol completo de ElementTree (Kml, Svg, Html).
+"""
+
+import gzip
+import os
+import zipfile
+
+import pytest
+
+import xml2altimetria
+import xml2html
+import xml2kml
+from geodesia import distanciasTramos
+from salida import Compresion
+from xml2altimetria import generarAltimetria
+from xml2html import generar_html
+from xml2kml import generarKml, instantesTrack
+
+TIEMPOS = {
+    "circuito": "Sachsenring",
+    "sectores": [1, 2, 3, 4],
+    "pilotos": {
+        "Piloto A": {
+            "vueltas": [{"numero": 1, "inicio": 0.0, "tiempo": 81.25, "sectores": [20.0, 20.5, 20.25, 20.5]},
+                        {"numero": 2, "inicio": 81.25, "tiempo": 80.75, "sectores": [20.0, 20.25, 20.0, 20.5]}],
+            "mejorVuelta": 2,
+            "mejoresSectores": [20.0, 20.25, 20.0, 20.5],
+        },
+        "Piloto B": {"vueltas": []},
+    },
+}
+
+
+def _fallo(*args, **kwargs):
+    raise RuntimeError("fallo a mitad de la escritura")
+
+
+def _par(tmp_path, nombre, generar):
+    """
+    Genera 'nombre' en streaming y con el árbol completo; devuelve los bytes
+    """
+    flujo, arbol = tmp_path / ("flujo-" + nombre), tmp_path / ("arbol-" + nombre)
+    generar(str(flujo), True)
+    generar(str(arbol), False)
+    return flujo.read_bytes(), arbol.read_bytes()
+
+
+# ---------- KML ----------
+
+@pytest.mark.parametrize("opciones", [
+    {},
+    {"simplificacion": "dp", "tolerancia": 5.0},
+    {"simplificacion": "vw", "tolerancia": 5.0},
+    {"precision": (1e-5, 0.1)},
+    {"track": True},
+])
+def test_kml_flujo_igual_al_arbol(tmp_path, modelo, opciones):
+    flujo, arbol = _par(tmp_path, "circuito.kml",
+                        lambda ruta, f: generarKml(modelo, ruta, flujo=f, **opciones))
+    assert flujo == arbol
+    assert b"<coordinates>" in flujo
+
+
+def test_kmz_doc_igual_al_arbol(tmp_path, modelo):
+    icono = tmp_path / "icono.png"
+    icono.write_bytes(b"\x89PNG\r\n\x1a\n")
+    documentos = []
+    for f in (True, False):
+        ruta = tmp_path / f"circuito-{f}.kmz"
+        generarKml(modelo, str(ruta), flujo=f, icono=str(icono))
+        with zipfile.ZipFile(ruta) as zf:
+            documentos.append((zf.read("doc.kml"), zf.namelist()))
+    assert documentos[0] == documentos[1]
+    assert documentos[0][1][0] == "doc.kml"
+
+
+def test_track_distancia_ausente(modelo):
+    # Solo se calcula la distancia que falta: las declaradas se conservan
+    calculada = float(distanciasTramos(modelo)[3])
+    modelo.distancias[3] = float("nan")
+    instantes = list(instantesTrack(modelo))
+    modelo.distancias[3] = calculada
+    assert instantes == list(instantesTrack(modelo))
+
+
+def test_kml_sin_origen(tmp_path, modelo):
+    modelo.origen = None
+    assert generarKml(modelo, str(tmp_path / "circuito.kml")) is None
+    assert not (tmp_path / "circuito.kml").exists()
+
+
+def test_kml_comprimido(tmp_path, modelo):
+    ruta = tmp_path / "circuito.kml"
+    generarKml(modelo, str(ruta), compresion=Compresion(6, None))
+    assert gzip.decompress((tmp_path / "circuito.kml.gz").read_bytes()) == ruta.read_bytes()
+
+
+# ---------- Altimetría ----------
+
+@pytest.mark.parametrize("opciones", [
+    {},
+    {"cerrar_polilinea": False},
+    {"simplificacion": "dp", "tolerancia": 1.0},
+    {"decimales": 1},
+])
+def test_svg_flujo_igual_al_arbol(tmp_path, modelo, opciones):
+    flujo, arbol = _par(tmp_path, "altimetria.svg",
+                        lambda ruta, f: generarAltimetria(modelo, ruta, flujo=f, **opciones))
+    assert flujo == arbol
+    assert b"<polyline" in flujo
+
+
+@pytest.mark.skipif(xml2altimetria.np is None, reason="NumPy no está instalado")
+def test_svg_numpy_igual_a_python(tmp_path, modelo):
+    con, sin = tmp_path / "numpy.svg", tmp_path / "python.svg"
+    generarAltimetria(modelo, str(con), usar_numpy=True)
+    generarAltimetria(modelo, str(sin), usar_numpy=False)
+    assert con.read_bytes() == sin.read_bytes()
+
+
+# ---------- HTML ----------
+
+@pytest.mark.parametrize("opciones", [
+    {},
+    {"tiempos": TIEMPOS},
+    {"altimetria": "altimetria.svg", "kml": "circuito.kml"},
+])
+def test_html_flujo_igual_al_arbol(tmp_path, modelo, opciones):
+    flujo, arbol = _par(tmp_path, "InfoCircuito.html",
+                        lambda ruta, f: generar_html(modelo, ruta, flujo=f, sondeo=False, **opciones))
+    assert flujo == arbol
+    assert flujo.startswith(b"<!DOCTYPE html>")
+
+
+def test_html_tiempos(tmp_path, modelo):
+    ruta = tmp_path / "InfoCircuito.html"
+    generar_html(modelo, str(ruta), tiempos=TIEMPOS, sondeo=False)
+    html = ruta.read_text(encoding="utf-8")
+    assert "Piloto A" in html
+    assert "1:20.750" in html
+    assert "Mejor vuelta: 2 (1:20.750)" in html
+
+
+def test_html_mejor_vuelta_inexistente(tmp_path, modelo):
+    piloto = dict(TIEMPOS["pilotos"]["Piloto A"], mejorVuelta=7)
+    tiempos = dict(TIEMPOS, pilotos={"Piloto A": piloto})
+    flujo, arbol = _par(tmp_path, "InfoCircuito.html",
+                        lambda ruta, f: generar_html(modelo, ruta, flujo=f, tiempos=tiempos, sondeo=False))
+    assert flujo == arbol
+    assert b"Mejor vuelta" not in flujo
+    assert "1:20.750".encode() in flujo
+
+
+# ---------- Errores ----------
+
+@pytest.mark.parametrize("modulo, funcion, nombre, generar", [
+    (xml2kml, "escaparTexto", "circuito.kml",
+     lambda modelo, ruta, c: generarKml(modelo, ruta, compresion=c)),
+    (xml2kml, "instantesTrack", "circuito.kmz",
+     lambda modelo, ruta, c: generarKml(modelo, ruta, track=True)),
+    (xml2altimetria, "bloquesPuntos", "altimetria.svg",
+     lambda modelo, ruta, c: generarAltimetria(modelo, ruta, compresion=c)),
+    (xml2html, "segundos_to_str", "InfoCircuito.html",
+     lambda modelo, ruta, c: generar_html(modelo, ruta, tiempos=TIEMPOS, sondeo=False, compresion=c)),
+])
+def test_error_conserva_la_salida_anterior(tmp_path, monkeypatch, modelo, modulo, funcion, nombre, generar):
+    directorio = tmp_path / "salida"
+    directorio.mkdir()
+    (directorio / nombre).write_bytes(b"anterior")
+    monkeypatch.setattr(modulo, funcion, _fallo)
+    with pytest.raises(RuntimeError):
+        generar(modelo, str(directorio / nombre), Compresion(6, None))
+    # Se escribía en un temporal: se borra (con sus comprimidos) y la salida
+    # anterior queda intacta
+    assert os.listdir(directorio) == [nombre]
+    assert (directorio / nombre).read_bytes() == b"anterior"
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de empaquetado.py: CSS minificado, referencias (url(), srcset,
+href, src) reescritas a los nombres con hash y altimetría SVG en línea.
+"""
+
+import hashlib
+import os
+import re
+
+import pytest
+
+from empaquetado import RECURSOS, empaquetar, minificarCss, nombreConHash
+
+LAYOUT = """/* Maquetación */
+body {
+    margin: 0;
+    background: url( '../multimedia/fondo.png' );
+}
+"""
+
+ESTILO = """h1 > a ,
+p::before {
+    content: "  /* no es un comentario */  ";
+    color: red;
+}
+main { background: url("../multimedia/fondo.png") }
+"""
+
+SVG = """<?xml version="1.0" encoding="UTF-8"?>
+<svg xmlns="http://www.w3.org/2000/svg" width="10" height="10"><rect width="10" height="10"/></svg>
+"""
+
+HTML = """<!DOCTYPE html>
+<html lang="es">
+<head>
+    <link rel="stylesheet" href="estilo/layout.css" />
+    <link rel="stylesheet" href="estilo/estilo.css" />
+</head>
+<body>
+    <img src="altimetria.svg" alt="Altimetría" />
+    <img src="multimedia/foto.jpg" srcset="multimedia/foto-movil.jpg 300w, multimedia/foto.jpg 1000w" alt="Foto" />
+    <a href="circuito.kml">KML</a>
+    <a href="otra.html">Otra página</a>
+    <a href="https://www.motogp.com/">MotoGP</a>
+</body>
+</html>
+"""
+
+
+def _escribir(ruta, contenido):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with open(ruta, "wb") as f:
+        f.write(contenido.encode("utf-8") if isinstance(contenido, str) else contenido)
+
+
+@pytest.fixture
+def sitio(tmp_path):
+    """
+    HTML con hojas de estilo, fotos, altimetría SVG y KML locales
+    """
+    for nombre, contenido in {
+        "estilo/layout.css": LAYOUT,
+        "estilo/estilo.css": ESTILO,
+        "multimedia/fondo.png": b"fondo",
+        "multimedia/foto.jpg": b"foto grande",
+        "multimedia/foto-movil.jpg": b"foto movil",
+        "altimetria.svg": SVG,
+        "circuito.kml": "<kml/>",
+        "InfoCircuito.html": HTML,
+    }.items():
+        _escribir(str(tmp_path / nombre), contenido)
+    return tmp_path
+
+
+def _hash(nombre, contenido):
+    return f"{RECURSOS}/{nombreConHash(nombre, contenido)}"
+
+
+def test_minificar_css():
+    assert minificarCss(ESTILO) == (
+        'h1>a,p::before{content:"  /* no es un comentario */  ";color:red}'
+        'main{background:url("../multimedia/fondo.png")}')
+
+
+def test_referencias_con_hash(sitio):
+    ruta, empaquetador = empaquetar(str(sitio / "InfoCircuito.html"))
+    assert ruta == str(sitio / "publicar" / "InfoCircuito.html")
+    with open(ruta, encoding="utf-8") as f:
+        html = f.read()
+    fondo = _hash("fondo.png", b"fondo")
+    foto = _hash("foto.jpg", b"foto grande")
+    movil = _hash("foto-movil.jpg", b"foto movil")
+
+    # La hoja crítica va en línea y minificada, con su url() reescrita
+    assert f"<style>body{{margin:0;background:url({fondo})}}</style>" in html
+    assert "layout" not in html
+
+    # La otra hoja se publica minificada con hash y sus url() apuntan al
+    # mismo directorio de recursos
+    estilo, = re.findall(r'href="(recursos/estilo\.[0-9a-f]+\.css)"', html)
+    with open(sitio / "publicar" / estilo, "rb") as f:
+        css = f.read()
+    assert estilo == _hash("estilo.css", css)
+    assert css.decode("utf-8") == minificarCss(ESTILO).replace(
+        'url("../multimedia/fondo.png")', f"url({os.path.basename(fondo)})")
+
+    assert f'src="{foto}"' in html
+    assert f'srcset="{movil} 300w, {foto} 1000w"' in html
+    assert f'href="{_hash("circuito.kml", b"<kml/>")}"' in html
+    assert 'href="otra.html"' in html
+    assert 'href="https://www.motogp.com/"' in html
+
+    # Cada nombre lleva el hash de lo publicado
+    for nombre in os.listdir(sitio / "publicar" / RECURSOS):
+        with open(sitio / "publicar" / RECURSOS / nombre, "rb") as f:
+            assert hashlib.sha256(f.read()).hexdigest().startswith(nombre.split(".")[-2]), nombre
+    assert empaquetador.escritos == 5
+
+
+def test_svg_en_linea(sitio):
+    ruta, _ = empaquetar(str(sitio / "InfoCircuito.html"))
+    with open(ruta, encoding="utf-8") as f:
+        html = f.read()
+    assert "altimetria.svg" not in html
+    assert "<?xml" not in html
+    assert ('<svg role="img" aria-label="Altimetría" xmlns="http://www.w3.org/2000/svg"'
+            ' width="10" height="10"><rect width="10" height="10"/></svg>') in html
+
+    # Por encima del límite se publica como recurso con hash
+    ruta, _ = empaquetar(str(sitio / "InfoCircuito.html"), str(sitio / "grande"), limiteSvg=10)
+    with open(ruta, encoding="utf-8") as f:
+        assert f'src="{_hash("altimetria.svg", SVG.encode("utf-8"))}"' in f.read()
+
+
+def test_segunda_pasada_no_copia(sitio):
+    empaquetar(str(sitio / "InfoCircuito.html"))
+    _, empaquetador = empaquetar(str(sitio / "InfoCircuito.html"))
+    assert empaquetador.escritos == 0
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de espacial.py: la posición de los vértices del trazado y la
+consulta por lotes igual a la consulta de un punto.
+"""
+
+import pytest
+
+
+def test_consultar_vertices(modelo, indice):
+    for k in (0, 10, len(modelo) - 1):
+        posicion = indice.consultar(modelo.longitudes[k], modelo.latitudes[k])
+        assert posicion.separacion == pytest.approx(0.0, abs=1e-6)
+        assert posicion.distancia == pytest.approx(indice.acumuladas[k + 1])
+        assert posicion.sector == modelo.sector(k)
+
+
+def test_consultar_lote_igual_a_consultar(modelo, indice):
+    lons = [lon + 1e-5 for lon in modelo.longitudes[::7]]
+    lats = [lat - 1e-5 for lat in modelo.latitudes[::7]]
+    _, distancias, sectores, separaciones = indice.consultarLote(lons, lats)
+    for i, (lon, lat) in enumerate(zip(lons, lats)):
+        posicion = indice.consultar(lon, lat)
+        assert float(distancias[i]) == pytest.approx(posicion.distancia)
+        assert float(separaciones[i]) == pytest.approx(posicion.separacion)
+        assert int(sectores[i]) == posicion.sector
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de exportar.py: la polilínea de Google con el ejemplo de su
+documentación, la ida y vuelta del binario .trazado, mismos bytes con
+NumPy y en Python puro y los comprimidos de todos los formatos.
+"""
+
+import gzip
+import json
+
+import pytest
+
+import exportar
+from exportar import cuantizar, decimales, exportar as exportarModelo, leerTrazado, polilineaCodificada
+from salida import Compresion
+
+
+def test_decimales():
+    assert decimales(1e-6) == 6
+    assert decimales(0.1) == 1
+    with pytest.raises(ValueError):
+        decimales(2e-5)
+
+
+@pytest.mark.parametrize("paso", [1.0, 10.0, 100.0, 0.0, -0.1])
+def test_decimales_paso_no_valido(paso):
+    with pytest.raises(ValueError):
+        decimales(paso)
+
+
+def test_polilinea_de_google():
+    # Ejemplo de la documentación del algoritmo
+    lats = [round(v * 1e5) for v in (38.5, 40.7, 43.252)]
+    lons = [round(v * 1e5) for v in (-120.2, -120.95, -126.453)]
+    assert polilineaCodificada(lats, lons, 5) == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+
+
+def test_trazado_ida_y_vuelta(tmp_path, modelo):
+    precision = (1e-6, 0.1)
+    lons, lats, alts = cuantizar(modelo, precision)
+    base = str(tmp_path / "circuito")
+    archivo, = exportarModelo(modelo, base, ["trazado"], precision)
+    leidos = leerTrazado(archivo)
+    for original, leido, paso in ((lons, leidos[0], 1e-6), (lats, leidos[1], 1e-6), (alts, leidos[2], 0.1)):
+        assert [round(v / paso) for v in leido] == [int(v) for v in original]
+    assert leidos[0][0] == pytest.approx(modelo.origen.longitud, abs=1e-6)
+    assert leidos[2][-1] == pytest.approx(modelo.origen.altitud, abs=0.1)
+
+
+def test_geojson(tmp_path, modelo):
+    archivo, = exportarModelo(modelo, str(tmp_path / "circuito"), ["geojson"])
+    with open(archivo, encoding="utf-8") as f:
+        datos = json.load(f)
+    origen, trazado = datos["features"]
+    puntos = trazado["geometry"]["coordinates"]
+    assert origen["geometry"]["coordinates"] == puntos[0] == puntos[-1]
+    assert len(puntos) == sum(1 for v in modelo.longitudes if v == v) + 2
+    assert puntos[1][0] == pytest.approx(modelo.longitudes[0], abs=1e-6)
+    assert trazado["properties"]["nombre"] == modelo.nombre
+
+
+def test_sin_numpy_mismos_bytes(tmp_path, monkeypatch, modelo):
+    if exportar.np is None:
+        pytest.skip("NumPy no está instalado")
+    formatos = list(exportar.FORMATOS)
+    con = exportarModelo(modelo, str(tmp_path / "numpy"), formatos)
+    monkeypatch.setattr(exportar, "np", None)
+    sin = exportarModelo(modelo, str(tmp_path / "python"), formatos)
+    for a, b in zip(con, sin):
+        with open(a, "rb") as fa, open(b, "rb") as fb:
+            assert fa.read() == fb.read(), a
+    lons, _, _ = leerTrazado(sin[formatos.index("trazado")])
+    assert isinstance(lons, list)
+
+
+def test_comprimidos_de_todos_los_formatos(tmp_path, modelo):
+    formatos = list(exportar.FORMATOS)
+    planos = exportarModelo(modelo, str(tmp_path / "plano"), formatos)
+    comprimidos = exportarModelo(modelo, str(tmp_path / "gz"), formatos, compresion=Compresion(6, None))
+    for plano, archivo in zip(planos, comprimidos):
+        with open(plano, "rb") as fp, open(archivo, "rb") as fa, gzip.open(archivo + ".gz") as fg:
+            contenido = fp.read()
+            assert fa.read() == contenido, archivo
+            assert fg.read() == contenido, archivo
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de geodesia.py: valores de referencia conocidos y mismos
+resultados con NumPy y en Python puro.
+"""
+
+from math import pi
+
+import pytest
+
+import geodesia
+from geodesia import RADIO_TIERRA, haversine, verificarDistancias, vincenty
+from xml2altimetria import obtenerTramos
+
+
+def _dms(grados, minutos, segundos):
+    signo = -1 if grados < 0 else 1
+    return signo * (abs(grados) + minutos / 60.0 + segundos / 3600.0)
+
+
+def test_haversine_un_grado_de_meridiano():
+    d = haversine([0.0], [0.0], [0.0], [1.0])
+    assert float(d[0]) == pytest.approx(RADIO_TIERRA * pi / 180.0, rel=1e-12)
+
+
+def test_vincenty_flinders_peak_buninyong():
+    # Ejemplo del artículo de Vincenty (1975): 54972.271 m
+    lat1, lon1 = _dms(-37, 57, 3.72030), _dms(144, 25, 29.52440)
+    lat2, lon2 = _dms(-37, 39, 10.15610), _dms(143, 55, 35.38390)
+    d = vincenty([lon1], [lat1], [lon2], [lat2])
+    assert float(d[0]) == pytest.approx(54972.271, abs=1e-3)
+
+
+@pytest.mark.parametrize("formula", [haversine, vincenty])
+def test_geodesia_sin_numpy(monkeypatch, modelo, formula):
+    lons, lats = list(modelo.longitudes), list(modelo.latitudes)
+    con = [float(d) for d in formula(lons[:-1], lats[:-1], lons[1:], lats[1:])]
+    monkeypatch.setattr(geodesia, "np", None)
+    sin = formula(lons[:-1], lats[:-1], lons[1:], lats[1:])
+    assert sin == pytest.approx(con, rel=1e-9)
+
+
+def test_verificar_distancias(modelo):
+    verificacion = verificarDistancias(modelo)
+    assert verificacion.declarada is not None
+    assert verificacion.total == pytest.approx(sum(verificacion.calculadas)
+                                               + geodesia.distanciaCierre(modelo))
+    assert verificacion.totalCorrecto
+
+
+def test_distancia_ausente_en_la_altimetria(modelo):
+    # Solo se calcula la distancia que falta: las declaradas se conservan
+    declaradas = list(modelo.distancias)
+    modelo.distancias[3] = float("nan")
+    calculada = float(geodesia.distanciasTramos(modelo)[3])
+    dists, _, _ = obtenerTramos(modelo)
+    assert list(dists) == [0.0] + declaradas[:3] + [calculada] + declaradas[4:]
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de imagenes.py: anchos y altos de las variantes en el manifiesto y
+segunda pasada sin trabajo gracias al hash de las originales. Necesitan
+Pillow.
+"""
+
+import json
+import os
+
+import pytest
+
+pytest.importorskip("PIL")
+from PIL import Image
+
+import imagenes
+from imagenes import generarVariantes
+
+
+@pytest.fixture
+def multimedia(tmp_path):
+    """
+    Directorio con una foto grande (PNG) y una pequeña (JPEG)
+    """
+    Image.new("RGB", (1000, 500), (200, 30, 30)).save(tmp_path / "grande.png")
+    Image.new("RGB", (200, 100), (30, 30, 200)).save(tmp_path / "pequena.jpg")
+    return str(tmp_path)
+
+
+def _manifiesto(directorio):
+    with open(imagenes.rutaManifiesto(directorio), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_anchos_y_altos_en_el_manifiesto(multimedia):
+    _, procesadas = generarVariantes(["multimedia/grande.png", "multimedia/pequena.jpg"],
+                                     multimedia, webp=True, trabajadores=1)
+    assert procesadas == ["grande.png", "pequena.jpg"]
+    entradas = _manifiesto(multimedia)["imagenes"]
+
+    grande = entradas["grande.png"]
+    assert (grande["ancho"], grande["alto"]) == (1000, 500)
+    medidas = {v["archivo"]: (v["ancho"], v["alto"], v["tipo"]) for v in grande["variantes"]}
+    assert medidas == {
+        "grande.png": (1000, 500, "image/png"),
+        "grande.webp": (1000, 500, "image/webp"),
+        "grande-tablet.png": (750, 375, "image/png"),
+        "grande-tablet.webp": (750, 375, "image/webp"),
+        "grande-movil.png": (300, 150, "image/png"),
+        "grande-movil.webp": (300, 150, "image/webp"),
+    }
+    # Nunca se amplía: la pequeña conserva su tamaño en todas las variantes
+    assert {(v["ancho"], v["alto"]) for v in entradas["pequena.jpg"]["variantes"]} == {(200, 100)}
+
+    for entrada in entradas.values():
+        for v in entrada["variantes"]:
+            with Image.open(os.path.join(multimedia, v["archivo"])) as imagen:
+                assert imagen.size == (v["ancho"], v["alto"]), v["archivo"]
+
+
+def test_segunda_pasada_sin_trabajo(multimedia, monkeypatch):
+    fotos = ["grande.png", "pequena.jpg"]
+    generarVariantes(fotos, multimedia, trabajadores=1)
+    antes = {n: os.stat(os.path.join(multimedia, n)).st_mtime_ns for n in os.listdir(multimedia)}
+
+    def procesarFoto(*args):
+        raise AssertionError("no se debe redimensionar ninguna foto")
+
+    monkeypatch.setattr(imagenes, "procesarFoto", procesarFoto)
+    _, procesadas = generarVariantes(fotos, multimedia, trabajadores=1)
+    assert procesadas == []
+    assert {n: os.stat(os.path.join(multimedia, n)).st_mtime_ns for n in os.listdir(multimedia)} == antes
+
+
+def test_solo_se_procesa_la_foto_cambiada(multimedia):
+    fotos = ["grande.png", "pequena.jpg"]
+    generarVariantes(fotos, multimedia, trabajadores=1)
+    Image.new("RGB", (400, 400), (0, 0, 0)).save(os.path.join(multimedia, "pequena.jpg"))
+    _, procesadas = generarVariantes(fotos, multimedia, trabajadores=1)
+    assert procesadas == ["pequena.jpg"]
+    variantes = _manifiesto(multimedia)["imagenes"]["pequena.jpg"]["variantes"]
+    assert [(v["ancho"], v["alto"]) for v in variantes] == [(400, 400), (400, 400), (300, 300)]
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de instrumentacion.py: la etapa nula sin instrumentación, los
+campos de cada línea JSON, el pico de memoria de las etapas anidadas y el
+tiempo de CPU por hilo.
+"""
+
+import json
+import threading
+import time
+
+import pytest
+
+import instrumentacion
+from instrumentacion import activar, configurar, desactivar, etapa
+
+MB = 1 << 20
+
+
+@pytest.fixture
+def registros(tmp_path):
+    """
+    Función que activa la instrumentación hacia un archivo y devuelve la
+    que lee sus líneas
+    """
+    ruta = tmp_path / "perfil.jsonl"
+
+    def leer():
+        with open(ruta, encoding="utf-8") as f:
+            return [json.loads(linea) for linea in f]
+
+    def iniciar(modo="1"):
+        activar(modo, str(ruta))
+        return leer
+
+    yield iniciar
+    desactivar()
+
+
+def test_desactivada(capsys):
+    assert not instrumentacion.ACTIVO
+    assert etapa("kml.escritura") is etapa("svg.escritura") is instrumentacion._NULA
+    with etapa("kml.escritura") as e:
+        e.elementos = 10
+    assert capsys.readouterr().err == ""
+
+
+def test_campos(registros):
+    leer = registros()
+    with etapa("kml.escritura") as e:
+        e.elementos = 42
+    with pytest.raises(ValueError):
+        with etapa("svg.calculo"):
+            raise ValueError("fallo")
+    escritura, calculo = leer()
+    assert escritura["etapa"] == "kml.escritura"
+    assert escritura["elementos"] == 42
+    assert escritura["segundos"] >= 0.0 and escritura["cpu"] >= 0.0
+    assert isinstance(escritura["bloques"], int)
+    assert "pico_bytes" not in escritura and "error" not in escritura
+    assert calculo["error"] == "ValueError"
+    assert "elementos" not in calculo
+
+
+def test_pico_de_etapas_anidadas(registros):
+    leer = registros("memoria")
+    with etapa("orquestador.kml"):
+        datos = bytearray(8 * MB)
+        del datos
+        # La etapa interior reinicia el pico de tracemalloc: el de la
+        # exterior no se debe perder
+        with etapa("kml.escritura"):
+            datos = bytearray(2 * MB)
+            del datos
+    interior, exterior = leer()
+    assert exterior["etapa"] == "orquestador.kml"
+    assert 2 * MB <= interior["pico_bytes"] < 8 * MB
+    assert exterior["pico_bytes"] >= 8 * MB
+
+
+def test_cpu_del_hilo(registros):
+    leer = registros()
+    parar = threading.Event()
+
+    def ocupar():
+        while not parar.is_set():
+            sum(range(1000))
+
+    hilo = threading.Thread(target=ocupar)
+    hilo.start()
+    try:
+        with etapa("espera"):
+            time.sleep(0.3)
+    finally:
+        parar.set()
+        hilo.join()
+    registro, = leer()
+    # Con el tiempo de CPU del proceso contaría el del otro hilo
+    assert registro["segundos"] >= 0.3
+    assert registro["cpu"] < 0.1
+
+
+def test_configurar_quita_las_opciones(tmp_path, monkeypatch):
+    monkeypatch.delenv("MOTOGP_PERFIL", raising=False)
+    salida = tmp_path / "perfil.jsonl"
+    argv = ["xml2kml.py", "--perfil", f"--perfil-salida={salida}", "circuito.xml"]
+    try:
+        configurar(argv)
+        assert argv == ["xml2kml.py", "circuito.xml"]
+        assert instrumentacion.ACTIVO
+        with etapa("carga"):
+            pass
+    finally:
+        desactivar()
+    assert json.loads(salida.read_text(encoding="utf-8"))["etapa"] == "carga"
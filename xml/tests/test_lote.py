@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de lote.py: un lote con un circuito correcto y otro mal formado,
+convertido en varios procesos, informa del error por archivo y genera las
+salidas del correcto.
+"""
+
+import os
+import shutil
+import sys
+
+import lote
+
+
+def test_lote_con_un_archivo_mal_formado(tmp_path, monkeypatch, capsys, ejemplo):
+    entrada, destino = tmp_path / "gp", tmp_path / "salidas"
+    entrada.mkdir()
+    shutil.copyfile(ejemplo, entrada / "sachsenring.xml")
+    (entrada / "roto.xml").write_text("<circuito><nombre>Roto</nombre>", encoding="utf-8")
+
+    monkeypatch.setattr(sys, "argv", ["lote.py", str(entrada), "-d", str(destino), "-j", "2"])
+    lote.main()
+    salida = capsys.readouterr().out.splitlines()
+
+    correcto = next(linea for linea in salida if "sachsenring.xml" in linea)
+    assert correcto.startswith("[OK]") and "3 generadas" in correcto
+    error = salida.index(next(linea for linea in salida if "roto.xml" in linea))
+    assert salida[error].startswith("[ERROR]")
+    assert salida[error + 1].strip().startswith("carga:")
+    assert salida[-1].startswith("1 circuitos convertidos, 1 con errores")
+    assert sorted(n for n in os.listdir(destino) if not n.startswith(".")) == \
+        ["sachsenring-altimetria.svg", "sachsenring.html", "sachsenring.kml"]
+
+    # Segunda pasada: el correcto ya está al día
+    lote.main()
+    salida = capsys.readouterr().out
+    assert "sachsenring.xml: al día" in salida
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de medios.py con cabeceras sintéticas de cada formato (solo los
+bytes que se leen: el resto del archivo no hace falta).
+"""
+
+import json
+import os
+import struct
+
+import pytest
+
+import medios
+from medios import CacheMedios, ErrorMedio, sondear
+from xml2html import generar_html
+
+
+# ---------- Cabeceras ----------
+
+def _png(ancho, alto):
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I4sII", 13, b"IHDR", ancho, alto) + b"\0" * 40
+
+
+def _gif(ancho, alto):
+    return b"GIF89a" + struct.pack("<HH", ancho, alto) + b"\0" * 40
+
+
+def _segmento(marca, datos):
+    return bytes((0xFF, marca)) + struct.pack(">H", len(datos) + 2) + datos
+
+
+def _jpeg(ancho, alto, orientacion=None):
+    datos = b"\xff\xd8" + _segmento(0xE0, b"JFIF\0\1\1\0\0\1\0\1\0\0")
+    if orientacion is not None:
+        # TIFF little-endian con un IFD de una entrada (0x0112, SHORT)
+        tiff = b"II*\0" + struct.pack("<IHHHIHH", 8, 1, 0x0112, 3, 1, orientacion, 0) + b"\0" * 4
+        datos += _segmento(0xE1, b"Exif\0\0" + tiff)
+    datos += _segmento(0xC0, struct.pack(">BHHB", 8, alto, ancho, 3) + b"\0" * 9)
+    return datos + b"\xff\xda" + b"\0" * 100
+
+
+def _webp(ancho, alto):
+    vp8x = b"VP8X" + struct.pack("<I", 10) + b"\0" * 4 + (ancho - 1).to_bytes(3, "little") \
+        + (alto - 1).to_bytes(3, "little")
+    return b"RIFF" + struct.pack("<I", len(vp8x) + 4) + b"WEBP" + vp8x
+
+
+def _caja(tipo, contenido):
+    return struct.pack(">I", len(contenido) + 8) + tipo + contenido
+
+
+def _mp4(ancho, alto, escala, duracion):
+    mvhd = _caja(b"mvhd", b"\0" * 12 + struct.pack(">II", escala, duracion) + b"\0" * 80)
+    tkhd = _caja(b"tkhd", b"\0" * 76 + struct.pack(">II", ancho << 16, alto << 16))
+    hdlr = _caja(b"hdlr", b"\0" * 8 + b"vide" + b"\0" * 13)
+    moov = _caja(b"moov", mvhd + _caja(b"trak", tkhd + _caja(b"mdia", hdlr)))
+    # mdat delante de moov: se salta con seek
+    return _caja(b"ftyp", b"isom\0\0\2\0isomiso2mp41") + _caja(b"mdat", b"\0" * 5000) + moov
+
+
+def _ebml(ident, contenido):
+    return ident.to_bytes((ident.bit_length() + 7) // 8, "big") + bytes((0x80 | len(contenido),)) + contenido
+
+
+def _webm(ancho, alto, duracionMs):
+    cabecera = _ebml(0x1A45DFA3, _ebml(0x4282, b"webm"))
+    info = _ebml(0x1549A966, _ebml(0x2AD7B1, (1000000).to_bytes(3, "big"))
+                 + _ebml(0x4489, struct.pack(">d", duracionMs)))
+    video = _ebml(0xE0, _ebml(0xB0, ancho.to_bytes(2, "big")) + _ebml(0xBA, alto.to_bytes(2, "big")))
+    pistas = _ebml(0x1654AE6B, _ebml(0xAE, _ebml(0x83, b"\1") + video))
+    # Segment y Cluster de tamaño desconocido, como al grabar en directo
+    segmento = (0x18538067).to_bytes(4, "big") + b"\x01" + b"\xff" * 7
+    cluster = (0x1F43B675).to_bytes(4, "big") + b"\x01" + b"\xff" * 7 + b"\0" * 100
+    return cabecera + segmento + info + pistas + cluster
+
+
+CASOS = [
+    ("foto.png", _png(1280, 720), {"tipo": "image/png", "ancho": 1280, "alto": 720}),
+    ("logo.gif", _gif(64, 32), {"tipo": "image/gif", "ancho": 64, "alto": 32}),
+    ("foto.jpg", _jpeg(800, 600), {"tipo": "image/jpeg", "ancho": 800, "alto": 600}),
+    ("girada.jpg", _jpeg(800, 600, orientacion=6), {"tipo": "image/jpeg", "ancho": 600, "alto": 800}),
+    ("foto.webp", _webp(1920, 1080), {"tipo": "image/webp", "ancho": 1920, "alto": 1080}),
+    ("plano.svg", b'<?xml version="1.0"?>\n<svg xmlns="http://www.w3.org/2000/svg" width="1000px" height="400">',
+     {"tipo": "image/svg+xml", "ancho": 1000, "alto": 400}),
+    ("caja.svg", b'<svg viewBox="0 0 300,150"><rect/></svg>',
+     {"tipo": "image/svg+xml", "ancho": 300, "alto": 150}),
+    ("video.mp4", _mp4(1920, 1080, 600, 7500), {"tipo": "video/mp4", "ancho": 1920, "alto": 1080, "duracion": 12.5}),
+    ("video.webm", _webm(640, 360, 2500.0), {"tipo": "video/webm", "ancho": 640, "alto": 360, "duracion": 2.5}),
+]
+
+
+@pytest.mark.parametrize("nombre, datos, medida", CASOS, ids=[c[0] for c in CASOS])
+def test_sondear(tmp_path, nombre, datos, medida):
+    ruta = tmp_path / nombre
+    ruta.write_bytes(datos)
+    assert sondear(str(ruta)) == medida
+
+
+def test_formato_desconocido(tmp_path):
+    ruta = tmp_path / "sonido.mp3"
+    ruta.write_bytes(b"ID3\3\0" + b"\0" * 100)
+    assert sondear(str(ruta)) is None
+
+
+@pytest.mark.parametrize("datos", [_mp4(10, 10, 1, 1)[:40], _jpeg(10, 10)[:24],
+                                   b"\x89PNG\r\n\x1a\n\0\0\0\rIHDR\0\0"])
+def test_truncado(tmp_path, datos):
+    ruta = tmp_path / "truncado.bin"
+    ruta.write_bytes(datos)
+    with pytest.raises(ErrorMedio):
+        sondear(str(ruta))
+
+
+# ---------- Caché ----------
+
+def test_cache(tmp_path, monkeypatch):
+    (tmp_path / "foto.png").write_bytes(_png(1280, 720))
+    (tmp_path / "video.mp4").write_bytes(_mp4(1920, 1080, 600, 7500))
+    (tmp_path / "video-poster.jpg").write_bytes(_jpeg(1920, 1080))
+    cache = CacheMedios(str(tmp_path))
+    assert cache.sondear("foto.png")["ancho"] == 1280
+    assert cache.sondear("no-existe.png") is None
+    assert cache.poster("video.mp4") == "video-poster.jpg"
+    assert cache.poster("otro.mp4") is None
+    cache.guardar()
+    with open(tmp_path / medios.CACHE, encoding="utf-8") as f:
+        assert "foto.png" in json.load(f)["medios"]
+
+    # Sin cambios en el archivo la medida sale de la caché, sin leerlo
+    monkeypatch.setattr(medios, "sondear", lambda ruta: pytest.fail("no se debe sondear " + ruta))
+    otra = CacheMedios(str(tmp_path))
+    assert otra.sondear("foto.png")["alto"] == 720
+    assert not otra.cambiada
+
+
+def test_cache_invalida_al_cambiar(tmp_path):
+    ruta = tmp_path / "foto.png"
+    ruta.write_bytes(_png(1280, 720))
+    cache = CacheMedios(str(tmp_path))
+    cache.sondear("foto.png")
+    cache.guardar()
+    ruta.write_bytes(_png(640, 480) + b"\0")
+    assert CacheMedios(str(tmp_path)).sondear("foto.png")["ancho"] == 640
+
+
+def test_generar_html_no_escribe_la_cache(tmp_path, modelo):
+    directorio, multimedia = tmp_path / "xml", tmp_path / "multimedia"
+    directorio.mkdir()
+    multimedia.mkdir()
+    (multimedia / "sachsenring-circuito.png").write_bytes(_png(1280, 720))
+    generar_html(modelo, str(directorio / "InfoCircuito.html"), informar=None)
+    assert 'width="1280"' in (directorio / "InfoCircuito.html").read_text(encoding="utf-8")
+    assert os.listdir(multimedia) == ["sachsenring-circuito.png"]
+
+    generar_html(modelo, str(directorio / "InfoCircuito.html"), informar=None, guardar_medios=True)
+    assert (multimedia / medios.CACHE).exists()
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de orquestador.py: las salidas generadas a la vez son las mismas
+que generadas una a una, y los hilos no escriben en la salida estándar.
+"""
+
+import os
+
+from orquestador import convertir
+from xml2altimetria import generarAltimetria
+from xml2html import generar_html
+from xml2kml import generarKml
+
+
+def test_igual_que_en_secuencia(tmp_path, ejemplo, modelo, capsys):
+    concurrente, secuencial = tmp_path / "concurrente", tmp_path / "secuencial"
+    concurrente.mkdir()
+    secuencial.mkdir()
+    salidas = {"kml": str(concurrente / "circuito.kml"), "svg": str(concurrente / "altimetria.svg"),
+               "html": str(concurrente / "InfoCircuito.html")}
+    opciones = {"html": {"sondeo": False}}
+    assert convertir(ejemplo, salidas, opciones) == salidas
+    assert capsys.readouterr().out == ""
+
+    generarKml(modelo, str(secuencial / "circuito.kml"), informar=None)
+    generarAltimetria(modelo, str(secuencial / "altimetria.svg"), informar=None)
+    # En secuencia el SVG ya está escrito y se puede sondear
+    generar_html(modelo, str(secuencial / "InfoCircuito.html"), altimetria="altimetria.svg",
+                 kml="circuito.kml", informar=None)
+    for nombre in ("circuito.kml", "altimetria.svg", "InfoCircuito.html"):
+        assert (concurrente / nombre).read_bytes() == (secuencial / nombre).read_bytes(), nombre
+    assert 'src="altimetria.svg" alt="Altimetría del circuito Sachsenring" width="1000" height="400"' \
+        in (concurrente / "InfoCircuito.html").read_text(encoding="utf-8")
+    assert sorted(os.listdir(concurrente)) == ["InfoCircuito.html", "altimetria.svg", "circuito.kml"]
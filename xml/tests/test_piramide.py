@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de piramide.py: columnas y mínimo/máximo de cada nivel, número de
+teselas por nivel y contenido de indice.json.
+"""
+
+import json
+import os
+from math import inf
+
+import pytest
+
+import piramide
+from piramide import generarPiramide, niveles
+
+ANCHO = 4
+
+
+def _datos(n=50):
+    acum = [10.0 * (i + 1) for i in range(n)]
+    alts = [100.0 + (i * 37) % 23 for i in range(n)]
+    return acum, alts
+
+
+def _esperado(acum, alts, columnas):
+    """
+    (mínimos, máximos) por columna calculados sin agregar niveles
+    """
+    minimos, maximos = [inf] * columnas, [-inf] * columnas
+    for d, a in zip(acum, alts):
+        c = min(int(d * columnas / acum[-1]), columnas - 1)
+        minimos[c] = min(minimos[c], a)
+        maximos[c] = max(maximos[c], a)
+    return minimos, maximos
+
+
+@pytest.mark.parametrize("numpy", [True, False])
+def test_niveles(monkeypatch, numpy):
+    acum, alts = _datos()
+    if numpy:
+        if piramide.np is None:
+            pytest.skip("NumPy no está instalado")
+        acum, alts = piramide.np.array(acum), piramide.np.array(alts)
+    else:
+        monkeypatch.setattr(piramide, "np", None)
+    resultado = niveles(acum, alts, ANCHO, 3)
+    assert len(resultado) == 3
+    for z, (minimos, maximos) in enumerate(resultado):
+        columnas = ANCHO << z
+        assert len(minimos) == len(maximos) == columnas
+        esperados = _esperado(list(acum), list(alts), columnas)
+        assert list(minimos) == esperados[0], z
+        assert list(maximos) == esperados[1], z
+    assert min(resultado[0][0]) == min(alts)
+    assert max(resultado[0][1]) == max(alts)
+
+
+def test_numero_de_niveles_automatico():
+    acum, alts = _datos(40)
+    # 4, 8, 16 y 32 columnas: el nivel siguiente tendría más que tramos
+    assert len(niveles(acum, alts, ANCHO)) == 4
+
+
+def test_teselas_e_indice(tmp_path, modelo):
+    directorio = str(tmp_path / "altimetria")
+    ruta = generarPiramide(modelo, directorio, ancho=32, alto=50, numero=3)
+    assert ruta == os.path.join(directorio, piramide.INDICE)
+    with open(ruta, encoding="utf-8") as f:
+        indice = json.load(f)
+
+    assert indice["circuito"] == modelo.nombre
+    assert (indice["ancho"], indice["alto"]) == (32, 50)
+    assert indice["plantilla"] == piramide.PLANTILLA
+    assert indice["distancia"] > 0
+    amin, amax = indice["altitud"]
+    assert amin <= amax
+    assert indice["sectores"][0][0] == 0.0
+    assert [m for m, _ in indice["sectores"]] == sorted(m for m, _ in indice["sectores"])
+
+    assert [n["z"] for n in indice["niveles"]] == [0, 1, 2]
+    for nivel in indice["niveles"]:
+        z, teselas = nivel["z"], nivel["teselas"]
+        assert teselas == 1 << z
+        assert sorted(os.listdir(os.path.join(directorio, str(z)))) == sorted(f"{x}.svg" for x in range(teselas))
+        assert nivel["metrosPorTesela"] == pytest.approx(indice["distancia"] / teselas)
+        assert nivel["metrosPorPixel"] == pytest.approx(indice["distancia"] / (32 * teselas))
+        assert len(nivel["altitudes"]) == teselas
+        for rango in nivel["altitudes"]:
+            if rango is not None:
+                assert amin - 0.05 <= rango[0] <= rango[1] <= amax + 0.05
+    # El nivel 0 es una sola tesela con todo el rango de altitudes
+    assert indice["niveles"][0]["altitudes"] == [[round(amin, 1), round(amax, 1)]]
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de salida.py: escritura atómica y comprimidos .gz/.br escritos en
+la misma pasada que la salida.
+"""
+
+import gc
+import gzip
+import os
+
+import pytest
+
+import salida
+from salida import Compresion, abrirSalida, abrirSalidaAtomica, escrituraAtomica
+
+TEXTO = "<kml>\n" + "  <coordinates>-3.8,43.5,12</coordinates>\n" * 2000 + "</kml>"
+
+
+def _escribir(ruta, texto=TEXTO, compresion=Compresion(6, None)):
+    with abrirSalida(str(ruta), compresion) as f:
+        f.write(texto)
+
+
+def _restos(directorio):
+    return sorted(n for n in os.listdir(directorio) if ".tmp" in n)
+
+
+def test_gz_igual_a_la_salida(tmp_path):
+    ruta = tmp_path / "circuito.kml"
+    _escribir(ruta)
+    assert ruta.read_text(encoding="utf-8") == TEXTO
+    assert gzip.decompress((tmp_path / "circuito.kml.gz").read_bytes()) == ruta.read_bytes()
+    assert _restos(tmp_path) == []
+
+
+@pytest.mark.skipif(salida.brotli is None, reason="brotli no está instalado")
+def test_br_igual_a_la_salida(tmp_path):
+    ruta = tmp_path / "circuito.kml"
+    _escribir(ruta, compresion=Compresion(6, 5))
+    assert salida.brotli.decompress((tmp_path / "circuito.kml.br").read_bytes()) == ruta.read_bytes()
+
+
+def test_gz_determinista(tmp_path):
+    _escribir(tmp_path / "a.kml")
+    _escribir(tmp_path / "b.kml")
+    assert (tmp_path / "a.kml.gz").read_bytes() == (tmp_path / "b.kml.gz").read_bytes()
+
+
+def test_sin_cambios_no_reescribe(tmp_path):
+    ruta = tmp_path / "circuito.kml"
+    _escribir(ruta)
+    antes = os.stat(str(ruta) + ".gz")
+    _escribir(ruta)
+    despues = os.stat(str(ruta) + ".gz")
+    assert (antes.st_ino, antes.st_mtime_ns) == (despues.st_ino, despues.st_mtime_ns)
+
+    _escribir(ruta, TEXTO + "\n")
+    assert gzip.decompress((tmp_path / "circuito.kml.gz").read_bytes()) == ruta.read_bytes()
+
+
+def test_cambio_de_nivel_reescribe(tmp_path):
+    ruta = tmp_path / "circuito.kml"
+    _escribir(ruta, compresion=Compresion(1, None))
+    pequeño = os.path.getsize(str(ruta) + ".gz")
+    _escribir(ruta, compresion=Compresion(9, None))
+    assert os.path.getsize(str(ruta) + ".gz") < pequeño
+
+
+def test_error_descarta_comprimidos(tmp_path):
+    ruta = tmp_path / "circuito.kml"
+    with pytest.raises(RuntimeError):
+        with abrirSalida(str(ruta), Compresion(6, None)) as f:
+            f.write(TEXTO)
+            raise RuntimeError("fallo")
+    assert not os.path.exists(str(ruta) + ".gz")
+    assert _restos(tmp_path) == []
+
+
+def test_sin_cerrar_descarta_comprimidos(tmp_path):
+    ruta = tmp_path / "circuito.kml"
+    f = abrirSalida(str(ruta), Compresion(6, None))
+    f.write(TEXTO)
+    del f
+    gc.collect()
+    assert not os.path.exists(str(ruta) + ".gz")
+    assert _restos(tmp_path) == []
+
+
+def test_escritura_atomica_mueve_comprimidos(tmp_path):
+    ruta = tmp_path / "circuito.kml"
+    with escrituraAtomica(str(ruta)) as temporal:
+        _escribir(temporal)
+    assert ruta.read_text(encoding="utf-8") == TEXTO
+    assert gzip.decompress((tmp_path / "circuito.kml.gz").read_bytes()) == ruta.read_bytes()
+    assert sorted(os.listdir(tmp_path)) == [".circuito.kml.comprimidos.json",
+                                            "circuito.kml", "circuito.kml.gz"]
+
+
+def test_escritura_atomica_fallida_conserva_la_anterior(tmp_path):
+    ruta = tmp_path / "circuito.kml"
+    _escribir(ruta)
+    anterior = (tmp_path / "circuito.kml.gz").read_bytes()
+    with pytest.raises(RuntimeError):
+        with escrituraAtomica(str(ruta)) as temporal:
+            # Sin comprimidos y con otro contenido: el .gz quedaría obsoleto,
+            # pero solo se borra si la salida nueva llega a su sitio
+            _escribir(temporal, "otro", Compresion(None, None))
+            raise RuntimeError("fallo")
+    assert ruta.read_text(encoding="utf-8") == TEXTO
+    assert (tmp_path / "circuito.kml.gz").read_bytes() == anterior
+    assert _restos(tmp_path) == []
+
+
+def test_escritura_atomica_borra_obsoletos_tras_el_rename(tmp_path):
+    ruta = tmp_path / "circuito.kml"
+    _escribir(ruta)
+    with escrituraAtomica(str(ruta)) as temporal:
+        _escribir(temporal, "otro", Compresion(None, None))
+    assert ruta.read_text(encoding="utf-8") == "otro"
+    assert not os.path.exists(str(ruta) + ".gz")
+
+
+def test_salida_atomica(tmp_path):
+    ruta = tmp_path / "circuito.kml"
+    _escribir(ruta)
+    with abrirSalidaAtomica(str(ruta), Compresion(6, None)) as f:
+        f.write("otro")
+        assert ruta.read_text(encoding="utf-8") == TEXTO
+    assert ruta.read_text(encoding="utf-8") == "otro"
+    assert gzip.decompress((tmp_path / "circuito.kml.gz").read_bytes()) == b"otro"
+    assert _restos(tmp_path) == []
+
+
+def test_salida_atomica_fallida_conserva_la_anterior(tmp_path):
+    ruta = tmp_path / "circuito.kml"
+    _escribir(ruta)
+    anterior = (tmp_path / "circuito.kml.gz").read_bytes()
+    with pytest.raises(RuntimeError):
+        with abrirSalidaAtomica(str(ruta), Compresion(6, None)) as f:
+            f.write("otro")
+            raise RuntimeError("fallo")
+    assert ruta.read_text(encoding="utf-8") == TEXTO
+    assert (tmp_path / "circuito.kml.gz").read_bytes() == anterior
+    assert _restos(tmp_path) == []
+
+
+def test_salida_atomica_anidada_sin_cambios_no_reescribe(tmp_path):
+    # Como KmlFlujo dentro de la escrituraAtomica de construccion.py
+    ruta = tmp_path / "circuito.kml"
+    _escribir(ruta)
+    antes = os.stat(str(ruta) + ".gz")
+    with escrituraAtomica(str(ruta)) as temporal:
+        with abrirSalidaAtomica(temporal, Compresion(6, None)) as f:
+            f.write(TEXTO)
+    despues = os.stat(str(ruta) + ".gz")
+    assert (antes.st_ino, antes.st_mtime_ns) == (despues.st_ino, despues.st_mtime_ns)
+    assert ruta.read_text(encoding="utf-8") == TEXTO
+    assert _restos(tmp_path) == []
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de simplificacion.py: casos conocidos de Douglas-Peucker y
+Visvalingam-Whyatt y mismos resultados con NumPy y en Python puro.
+"""
+
+import pytest
+
+import simplificacion
+from simplificacion import douglasPeucker, proyectarMetros, simplificar, visvalingam
+
+
+def test_douglas_peucker_conocido():
+    # Una "L" con ruido de 0.1 en el primer lado: quedan los extremos y la esquina
+    xs = [0.0, 1.0, 2.0, 3.0, 3.0, 3.0, 3.0]
+    ys = [0.0, 0.1, -0.1, 0.0, 1.0, 2.0, 3.0]
+    assert douglasPeucker(xs, ys, 1.0) == [0, 3, 6]
+    assert douglasPeucker(xs, ys, 0.01) == [0, 1, 2, 3, 6]  # 4 y 5 están sobre la recta
+
+
+def test_simplificacion_conserva_los_fijos():
+    xs = [float(i) for i in range(20)]
+    ys = [0.0] * 20
+    for metodo in ("dp", "vw"):
+        assert simplificar(xs, ys, 1.0, metodo, fijos=(7, 13)) == [0, 7, 13, 19]
+
+
+def test_visvalingam_areas():
+    # Área del punto 1: 1; al quitarlo, la del punto 2 pasa a 4
+    xs = [0.0, 1.0, 2.0, 4.0, 6.0]
+    ys = [0.0, 1.0, 0.0, 4.0, 0.0]
+    assert visvalingam(xs, ys, 1.2) == [0, 2, 3, 4]
+    assert visvalingam(xs, ys, 0.1) == [0, 1, 2, 3, 4]
+
+
+@pytest.mark.parametrize("metodo", ["dp", "vw"])
+def test_simplificacion_sin_numpy(monkeypatch, modelo, metodo):
+    lons = [v for v in modelo.longitudes if v == v]
+    lats = [v for v in modelo.latitudes if v == v]
+    xs, ys = proyectarMetros(lons, lats)
+    con = simplificar(xs, ys, 5.0, metodo)
+    monkeypatch.setattr(simplificacion, "np", None)
+    xs, ys = proyectarMetros(lons, lats)
+    assert simplificar(xs, ys, 5.0, metodo) == con
+    assert 2 < len(con) < len(lons)
+
+
+@pytest.mark.skipif(simplificacion.np is None, reason="NumPy no está instalado")
+def test_douglas_peucker_por_niveles_igual_a_la_pila(monkeypatch):
+    # Paseo aleatorio con segmentos repetidos (l2 = 0) y empates de distancia
+    np = simplificacion.np
+    generador = np.random.default_rng(2025)
+    xs = np.cumsum(generador.normal(size=20000)).round(1)
+    ys = np.cumsum(generador.normal(size=20000)).round(1)
+    xs[100:110] = xs[100]
+    ys[100:110] = ys[100]
+    fijos = (5000, 12345, 19998)
+    for tolerancia in (0.0, 0.5, 3.0, 50.0):
+        con = douglasPeucker(xs, ys, tolerancia, fijos)
+        with monkeypatch.context() as m:
+            m.setattr(simplificacion, "np", None)
+            sin = douglasPeucker(xs.tolist(), ys.tolist(), tolerancia, fijos)
+        assert con == sin
+        assert set(fijos) <= set(con)
+
+
+def test_metodo_desconocido():
+    with pytest.raises(ValueError):
+        simplificar([0.0, 1.0, 2.0], [0.0, 1.0, 0.0], 1.0, "rdp")
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de telemetria.py con registros sintéticos: pilotos que recorren
+los vértices del trazado a velocidad constante, así que los tiempos de
+vuelta y de sector se conocen de antemano.
+"""
+
+import csv
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import telemetria
+from telemetria import ErrorTelemetria, cronometrar, limitesSector, resumen
+
+VUELTAS = 3
+
+
+def _recorrido(modelo, indice, velocidad):
+    """
+    (tiempo, lon, lat) de VUELTAS + 2 pasadas por los vértices de los tramos
+    (sin el origen, para que la meta siempre se cruce entre dos posiciones):
+    la primera y la última vuelta están incompletas
+    """
+    L = indice.longitudVuelta
+    for vuelta in range(VUELTAS + 2):
+        for k in range(len(modelo)):
+            t = (vuelta * L + indice.acumuladas[k + 1]) / velocidad
+            yield t, modelo.longitudes[k], modelo.latitudes[k]
+
+
+def _esperado(indice, velocidad):
+    marcas = [0.0] + [d for d, _ in limitesSector(indice)] + [indice.longitudVuelta]
+    return indice.longitudVuelta / velocidad, [(b - a) / velocidad for a, b in zip(marcas, marcas[1:])]
+
+
+@pytest.mark.parametrize("numpy", [True, False])
+def test_vueltas_csv(tmp_path, monkeypatch, modelo, indice, numpy):
+    if not numpy:
+        monkeypatch.setattr(telemetria, "np", None)
+    velocidades = {"Piloto A": 45.0, "Piloto B": 40.0}
+    filas = sorted((t, lon, lat, piloto) for piloto, v in velocidades.items()
+                   for t, lon, lat in _recorrido(modelo, indice, v))
+    registro = tmp_path / "carrera.csv"
+    with open(registro, "w", newline="", encoding="utf-8") as f:
+        escritor = csv.writer(f)
+        escritor.writerow(["time", "lon", "lat", "rider"])
+        escritor.writerows(filas)
+
+    # Lotes pequeños: las vueltas cruzan los límites entre lotes
+    cronometros = cronometrar([str(registro)], modelo, tamaño=50, indice=indice)
+    assert sorted(cronometros) == sorted(velocidades)
+    for piloto, velocidad in velocidades.items():
+        tiempo, sectores = _esperado(indice, velocidad)
+        vueltas = cronometros[piloto].vueltas
+        assert [v.numero for v in vueltas] == list(range(1, VUELTAS + 1))
+        for vuelta in vueltas:
+            assert vuelta.tiempo == pytest.approx(tiempo, rel=1e-9)
+            assert vuelta.sectores == pytest.approx(sectores, rel=1e-6)
+
+    datos = resumen(cronometros, modelo, indice)
+    assert datos["sectores"] == [1, 2, 3, 4]
+    assert datos["pilotos"]["Piloto A"]["mejoresSectores"] == pytest.approx(_esperado(indice, 45.0)[1])
+
+
+def test_vueltas_gpx(tmp_path, modelo, indice):
+    inicio = datetime(2025, 7, 13, 12, 0, tzinfo=timezone.utc)
+    puntos = "".join(
+        f'<trkpt lat="{lat!r}" lon="{lon!r}"><time>{(inicio + timedelta(seconds=t)).isoformat()}</time></trkpt>'
+        for t, lon, lat in _recorrido(modelo, indice, 50.0))
+    registro = tmp_path / "vuelta.gpx"
+    registro.write_text('<gpx xmlns="http://www.topografix.com/GPX/1/1" version="1.1">'
+                        f"<trk><name>Piloto C</name><trkseg>{puntos}</trkseg></trk></gpx>",
+                        encoding="utf-8")
+    cronometros = cronometrar([str(registro)], modelo, indice=indice)
+    tiempo, _ = _esperado(indice, 50.0)
+    assert [v.tiempo for v in cronometros["Piloto C"].vueltas] == pytest.approx([tiempo] * VUELTAS, rel=1e-6)
+
+
+def test_posiciones_fuera_de_pista(tmp_path, modelo, indice):
+    registro = tmp_path / "boxes.csv"
+    registro.write_text("t,lon,lat\n0,0.0,0.0\n1,0.0,0.0\n", encoding="utf-8")
+    assert cronometrar([str(registro)], modelo, indice=indice) == {}
+
+
+def test_csv_sin_columnas(tmp_path, modelo):
+    registro = tmp_path / "mal.csv"
+    registro.write_text("t,x,y\n0,1,2\n", encoding="utf-8")
+    with pytest.raises(ErrorTelemetria):
+        cronometrar([str(registro)], modelo)
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de validacion.py: validación contra circuito.xsd en la misma pasada
+que la carga, con la línea y la columna de cada incidencia.
+"""
+
+import pytest
+
+from circuito import cargarCircuito
+from validacion import ErrorValidacion, validar
+
+
+def _modificar(ejemplo, tmp_path, antes, despues):
+    with open(ejemplo, encoding="utf-8") as f:
+        texto = f.read()
+    assert antes in texto
+    ruta = tmp_path / "modificado.xml"
+    ruta.write_text(texto.replace(antes, despues, 1), encoding="utf-8")
+    return str(ruta)
+
+
+def _linea(ruta, fragmento):
+    with open(ruta, encoding="utf-8") as f:
+        for numero, linea in enumerate(f, 1):
+            if fragmento in linea:
+                return numero
+    raise AssertionError(fragmento)
+
+
+def test_ejemplo_valido(ejemplo):
+    assert validar(ejemplo) == []
+
+
+def test_carga_validada_igual_que_sin_validar(ejemplo):
+    validado = cargarCircuito(ejemplo, usarCache=False, validar=True)
+    normal = cargarCircuito(ejemplo, usarCache=False, validar=False)
+    assert len(validado) == len(normal)
+    assert list(validado.distancias) == list(normal.distancias)
+
+
+def test_tramo_con_decimal_no_valido(ejemplo, tmp_path):
+    ruta = _modificar(ejemplo, tmp_path, ">78.72<", ">x78.72<")
+    incidencias = validar(ruta)
+    assert len(incidencias) == 1
+    assert "x78.72" in incidencias[0].mensaje
+    assert incidencias[0].linea == _linea(ruta, "x78.72")
+    assert incidencias[0].columna > 0
+
+
+def test_carga_con_tramo_no_valido_lanza_error_validacion(ejemplo, tmp_path):
+    ruta = _modificar(ejemplo, tmp_path, ">78.72<", ">x78.72<")
+    with pytest.raises(ErrorValidacion) as error:
+        cargarCircuito(ruta, usarCache=False, validar=True)
+    assert error.value.total == 1
+    assert "x78.72" in str(error.value)
+
+
+def test_elemento_que_falta(ejemplo, tmp_path):
+    ruta = _modificar(ejemplo, tmp_path, "<sector>1</sector>", "")
+    incidencias = validar(ruta)
+    assert incidencias
+    assert all(i.linea > 0 for i in incidencias)
+
+
+def test_xml_mal_formado(ejemplo, tmp_path):
+    ruta = _modificar(ejemplo, tmp_path, "</distancia>", "</distanci>")
+    incidencias = validar(ruta)
+    assert incidencias[-1].elemento == "?"
+    assert incidencias[-1].linea > 0
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Pruebas de vigilar.py: cambios() detecta las entradas modificadas y
+reconstruir() regenera solo las salidas afectadas, sin volver a cargar el
+modelo si el XML no ha cambiado.
+"""
+
+import os
+
+import pytest
+
+import vigilar
+from construccion import AL_DIA, GENERADO
+from vigilar import Vigilante
+
+
+@pytest.fixture
+def vigilante(ejemplo, tmp_path, monkeypatch):
+    """
+    Vigilante del ejemplo con una hoja de estilo y las tres salidas en un
+    directorio temporal. Cuenta las cargas del XML en 'cargas'.
+    """
+    estilo = tmp_path / "estilo"
+    estilo.mkdir()
+    (estilo / "estilo.css").write_text("body { margin: 0; }\n", encoding="utf-8")
+    salidas = {"kml": str(tmp_path / "circuito.kml"),
+               "svg": str(tmp_path / "altimetria.svg"),
+               "html": str(tmp_path / "InfoCircuito.html")}
+    cargas = []
+
+    def cargarCircuito(ruta, *args, **kwargs):
+        cargas.append(ruta)
+        return cargar(ruta, *args, **kwargs)
+
+    cargar = vigilar.cargarCircuito
+    monkeypatch.setattr(vigilar, "cargarCircuito", cargarCircuito)
+    v = Vigilante(ejemplo, str(estilo / "*.css"), salidas)
+    v.cargas = cargas
+    return v
+
+
+def _reemplazar(ruta, antes, despues):
+    with open(ruta, encoding="utf-8") as f:
+        texto = f.read()
+    assert antes in texto
+    with open(ruta, "w", encoding="utf-8") as f:
+        f.write(texto.replace(antes, despues))
+
+
+def test_cambios(vigilante):
+    estilo, = vigilante.entradas()[1:]
+    assert vigilante.cambios() == {vigilante.archivoXML, estilo}
+    assert vigilante.cambios() == set()
+
+    with open(estilo, "a", encoding="utf-8") as f:
+        f.write("h1 { color: red; }\n")
+    assert vigilante.cambios() == {estilo}
+
+    os.remove(estilo)
+    assert vigilante.cambios() == {estilo}
+    assert vigilante.entradas() == [vigilante.archivoXML]
+
+
+def test_reconstruir_solo_lo_afectado(vigilante):
+    estilo, = vigilante.entradas()[1:]
+    estados, segundos = vigilante.reconstruir(vigilante.cambios())
+    assert estados == {"kml": GENERADO, "svg": GENERADO, "html": GENERADO}
+    assert segundos >= 0.0
+    assert len(vigilante.cargas) == 1
+
+    estados, _ = vigilante.reconstruir(vigilante.cambios())
+    assert estados == {"kml": AL_DIA, "svg": AL_DIA, "html": AL_DIA}
+
+    # Una hoja de estilo solo regenera el HTML, con el modelo en memoria
+    with open(estilo, "a", encoding="utf-8") as f:
+        f.write("h1 { color: red; }\n")
+    estados, _ = vigilante.reconstruir(vigilante.cambios())
+    assert estados == {"kml": AL_DIA, "svg": AL_DIA, "html": GENERADO}
+    assert len(vigilante.cargas) == 1
+
+    # Un dato que solo usa el HTML: se recarga el XML y solo cambia el HTML
+    _reemplazar(vigilante.archivoXML, "<localidad>Hohenstein-Ernstthal</localidad>",
+                "<localidad>Hohenstein</localidad>")
+    estados, _ = vigilante.reconstruir(vigilante.cambios())
+    assert estados == {"kml": AL_DIA, "svg": AL_DIA, "html": GENERADO}
+    assert len(vigilante.cargas) == 2
+    with open(vigilante.construccion.salidas["html"], encoding="utf-8") as f:
+        assert "Hohenstein-Ernstthal" not in f.read()
+
+    # La altitud del origen afecta al KML y al SVG, no al HTML
+    _reemplazar(vigilante.archivoXML, ">330.9438399535764</altitud>", ">331.5</altitud>")
+    estados, _ = vigilante.reconstruir(vigilante.cambios())
+    assert estados == {"kml": GENERADO, "svg": GENERADO, "html": AL_DIA}
@@ -0,0 +1,767 @@
+# -*- coding: utf-8 -*-
+"""
+Validación de circuitoEsquema.xml contra circuito.xsd en la misma pasada
+en streaming con la que se carga (circuito._recorrer), sin lxml.
+
+El esquema se compila una sola vez (compilar):
+  - cada elemento con contenido complejo se convierte en un autómata
+    determinista sobre la secuencia de hijos (xs:sequence con minOccurs y
+    maxOccurs): estados numerados, transiciones por etiqueta y estados
+    finales
+  - cada contenido simple (xs:decimal, xs:integer, xs:positiveInteger,
+    xs:date, xs:time, xs:duration... con minInclusive/maxInclusive, tipos
+    con nombre y xs:extension) se convierte en una función de comprobación
+  - cada atributo guarda si es obligatorio, su tipo y su valor fijo
+
+Al validar, cada evento de inicio avanza el autómata del padre y comprueba
+los atributos, y cada evento de fin comprueba que el autómata está en un
+estado final o el tipo del texto. Las incidencias se guardan con el número
+de orden del elemento; solo si hay alguna se vuelve a leer el archivo con
+expat para obtener su línea y columna, así que un archivo válido no paga
+ese coste.
+
+circuito.dtd describe la misma estructura con menos restricciones, así que
+solo se compila el XSD.
+
+Uso: python validacion.py [archivoXML] [--esquema circuito.xsd]
+
+@version 1.0 17/Noviembre/2025
+@author: Marcelo Díez Domínguez UO293820
+"""
+
+import argparse
+import os
+import re
+import sys
+import xml.etree.ElementTree as ET
+from functools import lru_cache
+from math import inf, nextafter
+from operator import attrgetter, itemgetter, ge, gt, le, lt
+from xml.parsers import expat
+
+from circuito import ErrorCircuito, _recorrer
+from instrumentacion import etapa
+
+# Esquema por defecto (junto a este módulo)
+ESQUEMA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "circuito.xsd")
+
+XS = "{http://www.w3.org/2001/XMLSchema}"
+XSI = "{http://www.w3.org/2001/XMLSchema-instance}"
+
+_ETIQUETA = attrgetter("tag")
+_TEXTO = attrgetter("text")
+_ATRIBUTOS = attrgetter("attrib")
+
+# Máximo de incidencias guardadas (las demás solo se cuentan)
+MAX_INCIDENCIAS = 100
+
+# Máximo de secuencias de hijos y de atributos distintos memorizados
+MAX_MEMORIA = 1024
+
+# Incidencias mostradas en el mensaje de ErrorValidacion
+INCIDENCIAS_MENSAJE = 10
+
+
+class ErrorEsquema(Exception):
+    """
+    El XSD usa una construcción que el compilador no admite
+    """
+
+
+class Incidencia(object):
+    """
+    Error de validación: línea y columna (1..n, 0 si no se conocen), nombre
+    del elemento y mensaje. 'ruta' son los índices de hijo desde la raíz
+    hasta el elemento (() para la raíz; None si no se conoce).
+    """
+    __slots__ = ('linea', 'columna', 'elemento', 'mensaje', 'ruta')
+
+    def __init__(self, ruta, elemento, mensaje, linea=0, columna=0):
+        self.ruta = ruta
+        self.elemento = elemento
+        self.mensaje = mensaje
+        self.linea = linea
+        self.columna = columna
+
+    def __str__(self):
+        return f"línea {self.linea}, columna {self.columna}: <{self.elemento}> {self.mensaje}"
+
+    def comoDiccionario(self):
+        return {campo: getattr(self, campo) for campo in self.__slots__}
+
+
+class ErrorValidacion(ErrorCircuito):
+    """
+    El archivo no es válido según el esquema; 'incidencias' es la lista de
+    Incidencia (hasta MAX_INCIDENCIAS) y 'total' el número de errores
+    """
+
+    def __init__(self, archivoXML, incidencias, total=None):
+        self.archivo = archivoXML
+        self.incidencias = incidencias
+        self.total = len(incidencias) if total is None else total
+        lineas = [f"El archivo {archivoXML} no es válido ({self.total} errores):"]
+        lineas.extend("  " + str(i) for i in incidencias[:INCIDENCIAS_MENSAJE])
+        if self.total > INCIDENCIAS_MENSAJE:
+            lineas.append(f"  ... y {self.total - INCIDENCIAS_MENSAJE} más")
+        super().__init__("\n".join(lineas))
+
+
+# ---------- Tipos simples ----------
+
+_LEXICOS = {
+    "string": None,
+    "anyURI": None,
+    "decimal": r"[+-]?(?:[0-9]+(?:\.[0-9]*)?|\.[0-9]+)",
+    "integer": r"[+-]?[0-9]+",
+    "positiveInteger": r"\+?0*[1-9][0-9]*",
+    "nonNegativeInteger": r"\+?[0-9]+",
+    "date": r"-?[0-9]{4,}-(?:0[1-9]|1[0-2])-(?:0[1-9]|[12][0-9]|3[01])(?:Z|[+-][0-9]{2}:[0-9]{2})?",
+    "time": r"(?:[01][0-9]|2[0-3]):[0-5][0-9]:[0-5][0-9](?:\.[0-9]+)?(?:Z|[+-][0-9]{2}:[0-9]{2})?",
+    "duration": r"-?P(?=[0-9]|T[0-9])(?:[0-9]+Y)?(?:[0-9]+M)?(?:[0-9]+D)?"
+                r"(?:T(?=[0-9])(?:[0-9]+H)?(?:[0-9]+M)?(?:[0-9]+(?:\.[0-9]+)?S)?)?",
+}
+
+# Tipos cuyo valor se compara con las facetas numéricas
+_NUMERICOS = {"decimal", "integer", "positiveInteger", "nonNegativeInteger"}
+
+# Facetas admitidas: nombre -> (comparación que debe cumplirse, mensaje si no)
+_FACETAS = {
+    "minInclusive": (ge, "menor que"),
+    "maxInclusive": (le, "mayor que"),
+    "minExclusive": (gt, "menor o igual que"),
+    "maxExclusive": (lt, "mayor o igual que"),
+}
+
+
+class _Tipo(object):
+    """
+    Tipo simple compilado: expresión regular del espacio léxico y límites
+    de las facetas numéricas. Llamado con un texto devuelve el mensaje de
+    error, o None si es válido.
+    """
+    __slots__ = ('base', 'lexico', 'coincide', 'limites', 'intervalo')
+
+    def __init__(self, base, facetas=()):
+        # whiteSpace="collapse" en todos estos tipos: se admiten espacios alrededor
+        self.base = base
+        self.lexico = r"\s*(?:" + _LEXICOS[base] + r")\s*"
+        self.coincide = re.compile(self.lexico).fullmatch
+        self.limites = tuple((_FACETAS[nombre][0], float(limite), f"{_FACETAS[nombre][1]} {limite}")
+                             for nombre, limite in facetas)
+        if self.limites and base not in _NUMERICOS:
+            raise ErrorEsquema(f"facetas numéricas sobre xs:{base}")
+        # Las facetas como intervalo cerrado [mínimo, máximo] de floats (un
+        # límite exclusivo es el float siguiente o el anterior)
+        minimo, maximo = -inf, inf
+        for nombre, limite in facetas:
+            limite = float(limite)
+            if nombre == "minInclusive":
+                minimo = max(minimo, limite)
+            elif nombre == "minExclusive":
+                minimo = max(minimo, nextafter(limite, inf))
+            elif nombre == "maxInclusive":
+                maximo = min(maximo, limite)
+            else:
+                maximo = min(maximo, nextafter(limite, -inf))
+        self.intervalo = (minimo, maximo)
+
+    def __call__(self, texto):
+        if self.coincide(texto) is None:
+            return f"'{texto.strip()}' no es un xs:{self.base} válido"
+        if self.limites:
+            valor = float(texto)
+            for cumple, limite, mensaje in self.limites:
+                if not cumple(valor, limite):
+                    return f"'{texto.strip()}' es {mensaje}"
+        return None
+
+
+def _comprobador(base, facetas=()):
+    """
+    _Tipo del tipo predefinido 'base' con las 'facetas' [(nombre, límite)],
+    o None si cualquier texto es válido
+    """
+    if base not in _LEXICOS:
+        raise ErrorEsquema(f"tipo no soportado: xs:{base}")
+    if _LEXICOS[base] is None:
+        return None
+    return _Tipo(base, facetas)
+
+
+# ---------- Compilación ----------
+
+def _local(etiqueta):
+    return etiqueta.rpartition("}")[2]
+
+
+def _esperados(etiquetas):
+    return ", ".join(f"<{_local(e)}>" for e in etiquetas)
+
+
+class _Declaracion(object):
+    """
+    Elemento compilado:
+      - transiciones: lista (una por estado) de dict etiqueta -> estado, o
+        None si el contenido es simple
+      - saltos: transiciones de recuperación (ver _automata)
+      - finales: estados en los que el elemento puede cerrarse
+      - comprobar: _Tipo del contenido simple (None si no se comprueba)
+      - atributos: dict nombre -> (obligatorio, comprobar, fijo)
+    """
+    __slots__ = ('nombre', 'transiciones', 'saltos', 'finales', 'comprobar', 'atributos', 'obligatorios')
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self.transiciones = None
+        self.saltos = None
+        self.finales = frozenset()
+        self.comprobar = None
+        self.atributos = {}
+        self.obligatorios = ()
+
+
+def _automata(particulas):
+    """
+    Autómata determinista de una secuencia de partículas (etiqueta,
+    mínimo, máximo) (máximo None = unbounded). Los estados son pares
+    (partícula, apariciones) numerados desde (0, 0).
+    Devuelve (transiciones, saltos, finales). 'saltos' son las transiciones
+    de recuperación: por estado, dict etiqueta -> (estado, partículas
+    obligatorias que faltan), para seguir validando tras un elemento ausente.
+    """
+    numeros = {(0, 0): 0}
+    pendientes = [(0, 0)]
+    transiciones, saltos, finales = [], [], set()
+    while pendientes:
+        i, c = pendientes.pop()
+        salidas, recuperacion, faltan = {}, {}, []
+        j, cuenta = i, c
+        while j < len(particulas):
+            etiqueta, minimo, maximo = particulas[j]
+            if maximo is None or cuenta < maximo:
+                # Con unbounded basta contar hasta el mínimo
+                destino = (j, min(cuenta + 1, minimo if maximo is None else maximo))
+                if destino not in numeros:
+                    numeros[destino] = len(numeros)
+                    pendientes.append(destino)
+                if not faltan:
+                    salidas.setdefault(etiqueta, numeros[destino])
+                elif etiqueta not in salidas:
+                    recuperacion.setdefault(etiqueta, (numeros[destino], _esperados(faltan)))
+            if cuenta < minimo:
+                faltan.append(etiqueta)
+            j, cuenta = j + 1, 0
+        estado = numeros[(i, c)]
+        transiciones.extend([None] * (estado + 1 - len(transiciones)))
+        saltos.extend([None] * (estado + 1 - len(saltos)))
+        transiciones[estado] = salidas
+        saltos[estado] = recuperacion
+        if not faltan:
+            finales.add(estado)
+    return transiciones, saltos, frozenset(finales)
+
+
+class _Compilador(object):
+    __slots__ = ('ns', 'globales', 'tipos', 'declaraciones')
+
+    def __init__(self, raiz):
+        ns = raiz.get("targetNamespace")
+        self.ns = "{" + ns + "}" if ns else ""
+        self.globales = {e.get("name"): e for e in raiz.findall(XS + "element")}
+        self.tipos = {t.get("name"): t for t in raiz.findall(XS + "simpleType")}
+        self.declaraciones = {}
+
+    def etiqueta(self, nombre):
+        return self.ns + nombre
+
+    def tipoSimple(self, nombre=None, nodo=None):
+        """
+        Comprobador de un tipo por nombre (xs:... o con nombre en el esquema)
+        o de un xs:simpleType en línea
+        """
+        if nodo is None:
+            prefijo, _, local = nombre.rpartition(":")
+            if local in self.tipos and not prefijo.startswith("xs"):
+                nodo = self.tipos[local]
+            else:
+                return _comprobador(local)
+        restriccion = nodo.find(XS + "restriction")
+        if restriccion is None:
+            raise ErrorEsquema("xs:simpleType sin xs:restriction (list/union no soportados)")
+        base = restriccion.get("base").rpartition(":")[2]
+        if base in self.tipos:
+            raise ErrorEsquema(f"restricción sobre el tipo con nombre {base}")
+        facetas = []
+        for faceta in restriccion:
+            nombreFaceta = faceta.tag[len(XS):]
+            if nombreFaceta not in _FACETAS:
+                raise ErrorEsquema(f"faceta no soportada: xs:{nombreFaceta}")
+            facetas.append((nombreFaceta, faceta.get("value")))
+        return _comprobador(base, facetas)
+
+    def atributos(self, declaracion, nodo):
+        for atributo in nodo.findall(XS + "attribute"):
+            nombre = atributo.get("name")
+            comprobar = self.tipoSimple(atributo.get("type", "xs:string"))
+            declaracion.atributos[nombre] = (atributo.get("use") == "required",
+                                             comprobar, atributo.get("fixed"))
+        declaracion.obligatorios = tuple(n for n, (obligatorio, _, _) in declaracion.atributos.items()
+                                         if obligatorio)
+
+    def particulas(self, secuencia):
+        particulas = []
+        for hijo in secuencia:
+            if hijo.tag != XS + "element":
+                raise ErrorEsquema(f"construcción no soportada: xs:{hijo.tag[len(XS):]}")
+            nombre = hijo.get("ref") or hijo.get("name")
+            if hijo.get("name") is not None:
+                self.declarar(hijo)
+            maximo = hijo.get("maxOccurs", "1")
+            particulas.append((self.etiqueta(nombre), int(hijo.get("minOccurs", "1")),
+                               None if maximo == "unbounded" else int(maximo)))
+        return particulas
+
+    def declarar(self, nodo):
+        nombre = nodo.get("name")
+        declaracion = _Declaracion(nombre)
+        self.declaraciones[self.etiqueta(nombre)] = declaracion
+
+        complejo = nodo.find(XS + "complexType")
+        simple = nodo.find(XS + "simpleType")
+        if simple is not None:
+            declaracion.comprobar = self.tipoSimple(nodo=simple)
+        elif complejo is None:
+            declaracion.comprobar = self.tipoSimple(nodo.get("type", "xs:string"))
+        elif complejo.find(XS + "simpleContent") is not None:
+            extension = complejo.find(XS + "simpleContent/" + XS + "extension")
+            if extension is None:
+                raise ErrorEsquema(f"xs:simpleContent de {nombre} sin xs:extension")
+            declaracion.comprobar = self.tipoSimple(extension.get("base"))
+            self.atributos(declaracion, extension)
+        else:
+            secuencia = complejo.find(XS + "sequence")
+            particulas = self.particulas(secuencia) if secuencia is not None else []
+            declaracion.transiciones, declaracion.saltos, declaracion.finales = _automata(particulas)
+            self.atributos(declaracion, complejo)
+        return declaracion
+
+
+class Esquema(object):
+    """
+    Esquema compilado: declaraciones por etiqueta ({ns}nombre)
+    """
+    __slots__ = ('archivo', 'declaraciones', 'raices')
+
+    def __init__(self, archivoXSD=ESQUEMA):
+        try:
+            raiz = ET.parse(archivoXSD).getroot()
+        except (OSError, ET.ParseError) as e:
+            raise ErrorEsquema(f"No se puede leer el esquema {archivoXSD}: {e}")
+        compilador = _Compilador(raiz)
+        for nodo in compilador.globales.values():
+            compilador.declarar(nodo)
+        self.archivo = archivoXSD
+        self.declaraciones = compilador.declaraciones
+        self.raices = frozenset(compilador.etiqueta(n) for n in compilador.globales)
+
+    def validador(self):
+        return Validador(self)
+
+
+@lru_cache(maxsize=4)
+def compilar(archivoXSD=ESQUEMA):
+    """
+    Esquema compilado de 'archivoXSD' (se compila una vez por proceso)
+    """
+    return Esquema(archivoXSD)
+
+
+# ---------- Validación en streaming ----------
+
+def _seleccion(indices):
+    """
+    Función secuencia -> tupla de los elementos en 'indices'
+    """
+    if len(indices) > 1:
+        return itemgetter(*indices)
+    return lambda secuencia: tuple(secuencia[i] for i in indices)
+
+
+class _Plan(object):
+    """
+    Comprobaciones de una forma de subárbol ya validada sin errores, sobre
+    la lista de sus nodos en preorden:
+      - textos: los nodos con contenido simple tipado y los de contenido
+        complejo (cuyo texto solo puede ser espacio); 'coincide' valida
+        todos sus textos unidos por el carácter nulo con una sola expresión regular
+      - rangos: (posición en textos, mínimo, máximo) de los que tienen
+        facetas numéricas
+      - conAtributos/atributos: los nodos con atributos y los atributos ya
+        validados, que en un circuito se repiten en cada tramo
+    """
+    __slots__ = ('textos', 'coincide', 'rangos', 'conAtributos', 'atributos')
+
+    def __init__(self, nodos, declaraciones):
+        textos, lexicos, rangos, conAtributos = [], [], [], []
+        for i, nodo in enumerate(nodos):
+            declaracion = declaraciones[nodo.tag]
+            if nodo.attrib or declaracion.obligatorios:
+                conAtributos.append(i)
+            tipo = declaracion.comprobar
+            if declaracion.transiciones is not None:
+                textos.append(i)
+                lexicos.append(r"\s*")
+            elif tipo is not None:
+                if tipo.limites:
+                    rangos.append((len(textos),) + tipo.intervalo)
+                textos.append(i)
+                lexicos.append(tipo.lexico)
+        self.textos = _seleccion(textos)
+        self.coincide = re.compile("\0".join(lexicos)).fullmatch
+        self.rangos = tuple(rangos)
+        self.conAtributos = _seleccion(conAtributos)
+        self.atributos = tuple(dict(nodos[i].attrib) for i in conAtributos)
+
+    def cumple(self, nodos):
+        textos = self.textos(nodos)
+        try:
+            unidos = "\0".join(map(_TEXTO, textos))
+        except TypeError:  # algún texto es None
+            unidos = "\0".join([nodo.text or "" for nodo in textos])
+        if self.coincide(unidos) is None:
+            return False
+        if self.rangos:
+            valores = unidos.split("\0")
+            for k, minimo, maximo in self.rangos:
+                if not minimo <= float(valores[k]) <= maximo:
+                    return False
+        return tuple(map(_ATRIBUTOS, self.conAtributos(nodos))) == self.atributos
+
+
+class Validador(object):
+    """
+    Estado de una validación en streaming. circuito._recorrer llama a
+    'unidad' con cada elemento que entrega (cada <tramo> y cada hijo de la
+    raíz) justo antes de vaciarlo, y a 'raiz' al cerrarse la raíz:
+      - el elemento avanza el autómata de su padre (un "contenedor", cuyos
+        hijos se van retirando del árbol), guardado en 'contenedores'
+      - la primera vez que aparece una forma de subárbol (etiquetas en
+        preorden y número de hijos de cada nodo) se valida entera y, si es
+        correcta, se guarda un plan: qué textos comprobar con qué tipo y
+        qué atributos son los ya validados. En un circuito todos los tramos
+        tienen la misma forma, así que por tramo solo quedan las
+        comprobaciones de tipo y una comparación de atributos.
+      - si el plan falla, el subárbol se vuelve a validar entero para
+        obtener los errores
+    Las incidencias se guardan con su ruta (índices de hijo desde la raíz);
+    'terminar' les añade la línea y la columna.
+    """
+    __slots__ = ('esquema', 'declaraciones', 'contenedores', 'pila', 'actual', 'camino',
+                 'planes', 'secuencias', 'atributos', 'incidencias', 'total')
+
+    def __init__(self, esquema):
+        self.esquema = esquema
+        self.declaraciones = esquema.declaraciones
+        self.contenedores = {}  # elemento -> [declaración, estado, hijos retirados]
+        self.pila = []          # antepasados de la unidad actual (pila de _recorrer)
+        self.actual = None      # unidad actual
+        self.camino = []        # índices desde la unidad hasta el elemento actual
+        self.planes = {}
+        self.secuencias = {}
+        self.atributos = {}
+        self.incidencias = []
+        self.total = 0
+
+    # -> Errores y rutas
+
+    def _indice(self, padre, hijo):
+        """
+        Índice original de 'hijo' en 'padre', contando los hijos retirados
+        """
+        contenedor = self.contenedores.get(padre)
+        for i, elem in enumerate(padre, contenedor[2] if contenedor else 0):
+            if elem is hijo:
+                return i
+        return -1
+
+    def _ruta(self, nivel=None):
+        """
+        Ruta de self.pila[nivel] o, sin 'nivel', del elemento actual de la
+        unidad actual
+        """
+        cadena = self.pila[:nivel + 1] if nivel is not None else self.pila + [self.actual]
+        ruta = [self._indice(padre, hijo) for padre, hijo in zip(cadena, cadena[1:])]
+        if nivel is None:
+            ruta.extend(self.camino)
+        return tuple(ruta)
+
+    def _error(self, etiqueta, mensaje, nivel=None):
+        self.total += 1
+        if len(self.incidencias) < MAX_INCIDENCIAS:
+            self.incidencias.append(Incidencia(self._ruta(nivel), _local(etiqueta), mensaje))
+
+    # -> Comprobaciones
+
+    @staticmethod
+    def _paso(declaracion, estado, etiqueta):
+        """
+        Avanza el autómata de 'declaracion' con 'etiqueta'. Devuelve
+        (estado, mensaje de error o None)
+        """
+        siguiente = declaracion.transiciones[estado].get(etiqueta)
+        if siguiente is not None:
+            return siguiente, None
+        salto = declaracion.saltos[estado].get(etiqueta)
+        if salto is not None:
+            # Falta algún elemento obligatorio: se sigue tras él
+            return salto[0], f"falta {salto[1]} antes de este elemento"
+        esperados = declaracion.transiciones[estado]
+        if esperados:
+            return estado, "no se esperaba aquí; se esperaba " + _esperados(esperados)
+        return estado, f"sobra: <{declaracion.nombre}> no admite más elementos"
+
+    def _secuencia(self, declaracion, etiquetas):
+        """
+        (estado final, ((índice, mensaje), ...)) de una secuencia de hijos
+        """
+        estado, errores = 0, []
+        for i, etiqueta in enumerate(etiquetas):
+            estado, mensaje = self._paso(declaracion, estado, etiqueta)
+            if mensaje is not None:
+                errores.append((i, mensaje))
+        return estado, tuple(errores)
+
+    def _erroresAtributos(self, declaracion, atributos):
+        errores = []
+        for nombre in declaracion.obligatorios:
+            if nombre not in atributos:
+                errores.append(f"falta el atributo obligatorio '{nombre}'")
+        for nombre, valor in atributos.items():
+            if nombre.startswith(XSI):
+                continue
+            regla = declaracion.atributos.get(nombre)
+            if regla is None:
+                errores.append(f"atributo no declarado '{nombre}'")
+                continue
+            _, comprobar, fijo = regla
+            if fijo is not None and valor != fijo:
+                errores.append(f"el atributo '{nombre}' debe valer '{fijo}'")
+            elif comprobar is not None:
+                mensaje = comprobar(valor)
+                if mensaje is not None:
+                    errores.append(f"atributo '{nombre}': {mensaje}")
+        return tuple(errores)
+
+    def _atributos(self, declaracion, elem, nivel=None):
+        clave = (declaracion, tuple(elem.attrib.items()))
+        errores = self.atributos.get(clave)
+        if errores is None:
+            errores = self._erroresAtributos(declaracion, elem.attrib)
+            if len(self.atributos) < MAX_MEMORIA:
+                self.atributos[clave] = errores
+        for mensaje in errores:
+            self._error(elem.tag, mensaje, nivel)
+
+    def _final(self, declaracion, estado, etiqueta, nivel=None):
+        if estado not in declaracion.finales:
+            self._error(etiqueta, "está incompleto; falta "
+                        + _esperados(declaracion.transiciones[estado]), nivel)
+
+    def _elemento(self, elem, declaracion):
+        """
+        Valida el subárbol de 'elem' (ya retirado de su contenedor o no)
+        """
+        if declaracion is None:
+            self._error(elem.tag, "no está declarado en el esquema")
+            return
+        if elem.attrib or declaracion.obligatorios:
+            self._atributos(declaracion, elem)
+
+        if declaracion.transiciones is None:
+            if len(elem):
+                self._error(elem.tag, "no admite elementos hijos")
+            elif declaracion.comprobar is not None:
+                mensaje = declaracion.comprobar(elem.text or "")
+                if mensaje is not None:
+                    self._error(elem.tag, mensaje)
+            return
+
+        if elem.text is not None and not elem.text.isspace():
+            self._error(elem.tag, "no admite texto")
+        camino = self.camino
+        contenedor = self.contenedores.pop(elem, None)
+        if contenedor is None:
+            primero = 0
+            clave = (declaracion, tuple([hijo.tag for hijo in elem]))
+            resultado = self.secuencias.get(clave)
+            if resultado is None:
+                resultado = self._secuencia(declaracion, clave[1])
+                if len(self.secuencias) < MAX_MEMORIA:
+                    self.secuencias[clave] = resultado
+            estado, errores = resultado
+            for i, mensaje in errores:
+                camino.append(i)
+                self._error(elem[i].tag, mensaje)
+                camino.pop()
+        else:
+            # Hijos ya validados uno a uno ('unidad') y retirados; quedan los demás
+            _, estado, primero = contenedor
+            for i, hijo in enumerate(elem, primero):
+                estado, mensaje = self._paso(declaracion, estado, hijo.tag)
+                if mensaje is not None:
+                    camino.append(i)
+                    self._error(hijo.tag, mensaje)
+                    camino.pop()
+        self._final(declaracion, estado, elem.tag)
+
+        declaraciones = self.declaraciones
+        for i, hijo in enumerate(elem, primero):
+            camino.append(i)
+            self._elemento(hijo, declaraciones.get(hijo.tag))
+            camino.pop()
+
+    # -> Eventos de circuito._recorrer
+
+    def _contenedor(self, padre):
+        nivel = len(self.pila) - 1
+        declaracion = self.declaraciones.get(padre.tag)
+        if nivel == 0 and padre.tag not in self.esquema.raices:
+            self._error(padre.tag, "no es un elemento raíz del esquema", 0)
+        if declaracion is None or declaracion.transiciones is None:
+            return [None, 0, 0]
+        if nivel == 0 and (padre.attrib or declaracion.obligatorios):
+            self._atributos(declaracion, padre, 0)  # el resto, al validar su subárbol
+        return [declaracion, 0, 0]
+
+    def unidad(self, elem, pila):
+        """
+        Valida 'elem', hijo de pila[-1] ('pila': sus antepasados), antes de
+        que se retire del árbol
+        """
+        self.pila = pila
+        self.actual = elem
+        padre = pila[-1]
+        contenedor = self.contenedores.get(padre)
+        if contenedor is None:
+            contenedor = self.contenedores[padre] = self._contenedor(padre)
+        if contenedor[0] is not None:
+            contenedor[1], mensaje = self._paso(contenedor[0], contenedor[1], elem.tag)
+            if mensaje is not None:
+                self._error(elem.tag, mensaje)
+
+        nodos = list(elem.iter())
+        forma = (tuple(map(_ETIQUETA, nodos)), tuple(map(len, nodos)))
+        plan = self.planes.get(forma)
+        if plan is None:
+            total = self.total
+            contiene = any(nodo in self.contenedores for nodo in nodos)
+            self._elemento(elem, self.declaraciones.get(elem.tag))
+            if not contiene and len(self.planes) < MAX_MEMORIA:
+                self.planes[forma] = _Plan(nodos, self.declaraciones) if self.total == total else False
+        elif plan is False or not plan.cumple(nodos):
+            self._elemento(elem, self.declaraciones.get(elem.tag))
+        contenedor[2] += 1
+
+    def raiz(self, elem):
+        """
+        Cierre de la raíz: comprueba que su secuencia de hijos está completa
+        """
+        self.pila = [elem]
+        contenedor = self.contenedores.pop(elem, None)
+        if contenedor is None:  # raíz sin hijos
+            contenedor = self._contenedor(elem)
+        if contenedor[0] is not None:
+            self._final(contenedor[0], contenedor[1], elem.tag, 0)
+
+    def terminar(self, archivoXML):
+        """
+        Localiza (línea y columna) las incidencias en 'archivoXML' y las
+        devuelve
+        """
+        if self.incidencias:
+            localizar(archivoXML, self.incidencias)
+        return self.incidencias
+
+
+class _Localizadas(Exception):
+    pass
+
+
+def localizar(archivoXML, incidencias):
+    """
+    Rellena la línea y la columna de las 'incidencias' leyendo 'archivoXML'
+    con expat hasta que aparecen todas sus rutas
+    """
+    pendientes = {}
+    for incidencia in incidencias:
+        if incidencia.ruta is not None:
+            pendientes.setdefault(incidencia.ruta, []).append(incidencia)
+    if not pendientes:
+        return
+    parser = expat.ParserCreate()
+    ruta, hijos = [], [0]
+
+    def inicio(nombre, atributos):
+        ruta.append(hijos[-1])
+        hijos[-1] += 1
+        hijos.append(0)
+        encontradas = pendientes.pop(tuple(ruta[1:]), ())
+        for incidencia in encontradas:
+            incidencia.linea = parser.CurrentLineNumber
+            incidencia.columna = parser.CurrentColumnNumber + 1
+        if encontradas and not pendientes:
+            raise _Localizadas()
+
+    def fin(nombre):
+        ruta.pop()
+        hijos.pop()
+
+    parser.StartElementHandler = inicio
+    parser.EndElementHandler = fin
+    try:
+        with open(archivoXML, "rb") as f:
+            parser.ParseFile(f)
+    except (_Localizadas, expat.ExpatError, OSError):
+        pass
+
+
+def validar(archivoXML, esquema=None):
+    """
+    Valida 'archivoXML' contra 'esquema' (por defecto, circuito.xsd
+    compilado) y devuelve la lista de Incidencia (vacía si es válido).
+    Un XML mal formado se devuelve como una incidencia con su posición.
+    """
+    esquema = esquema or compilar()
+    validador = esquema.validador()
+    with etapa("validacion"):
+        try:
+            for _ in _recorrer(archivoXML, validador):
+                pass
+        except ErrorCircuito as error:
+            # XML mal formado o inexistente: los errores anteriores y este
+            linea, columna = getattr(error.__cause__, "position", (0, -1))
+            return validador.terminar(archivoXML) + [
+                Incidencia(None, "?", str(error), linea, columna + 1)]
+    return validador.terminar(archivoXML)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Valida un circuito contra circuito.xsd")
+    parser.add_argument("archivoXML", nargs="?", default="circuitoEsquema.xml")
+    parser.add_argument("--esquema", default=ESQUEMA, help="XSD con el que validar")
+    args = parser.parse_args()
+
+    try:
+        incidencias = validar(args.archivoXML, compilar(args.esquema))
+    except ErrorEsquema as e:
+        print(e)
+        sys.exit(2)
+    for incidencia in incidencias:
+        print(incidencia)
+    if incidencias:
+        sys.exit(1)
+    print("El archivo", args.archivoXML, "es válido")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+Modo vigilancia: observa circuitoEsquema.xml y las hojas de estilo
+(../estilo/*.css) y regenera solo las salidas afectadas por cada cambio.
+
+  - Los cambios se detectan consultando periódicamente la fecha y el tamaño
+    de los archivos (sin dependencias externas).
+  - Las ráfagas de guardados se agrupan: se espera a que pasen 'espera'
+    segundos sin cambios antes de reconstruir.
+  - El modelo del circuito se mantiene en memoria entre reconstrucciones y
+    solo se vuelve a cargar si cambia el XML; las salidas que regenerar se
+    deciden con las huellas de construccion.py.
+  - Un cambio en las hojas de estilo solo regenera el HTML.
+Se informa de la latencia de cada reconstrucción.
+
+Uso: python vigilar.py [archivoXML] [--intervalo s] [--espera s]
+
+@version 1.0 08/Noviembre/2025
+@author: Marcelo Díez Domínguez UO293820
+"""
+
+import argparse
+import glob
+import os
+import time
+
+from circuito import cargarCircuito, ErrorCircuito
+from construccion import Construccion, GENERADO
+
+ESTILOS = os.path.join("..", "estilo", "*.css")
+
+
+def firmas(rutas):
+    """
+    Diccionario ruta -> (mtime_ns, tamaño) de las rutas que existen
+    """
+    resultado = {}
+    for ruta in rutas:
+        try:
+            st = os.stat(ruta)
+        except OSError:
+            continue
+        resultado[ruta] = (st.st_mtime_ns, st.st_size)
+    return resultado
+
+
+class Vigilante(object):
+    """
+    Mantiene el modelo cargado y reconstruye las salidas cuando cambian sus entradas
+    """
+
+    def __init__(self, archivoXML, estilos=ESTILOS, salidas=None):
+        self.archivoXML = archivoXML
+        self.estilos = estilos
+        self.construccion = Construccion(archivoXML, salidas)
+        self.modelo = None
+        self.vistos = {}
+
+    def entradas(self):
+        return [self.archivoXML] + sorted(glob.glob(self.estilos))
+
+    def cambios(self):
+        """
+        Rutas que han cambiado (o aparecido o desaparecido) desde la última consulta
+        """
+        actuales = firmas(self.entradas())
+        cambiadas = {r for r in set(actuales) | set(self.vistos)
+                     if actuales.get(r) != self.vistos.get(r)}
+        self.vistos = actuales
+        return cambiadas
+
+    def reconstruir(self, cambiadas, forzar=False):
+        """
+        Reconstruye lo afectado por 'cambiadas'. Devuelve (estados, segundos).
+        """
+        inicio = time.perf_counter()
+        if self.archivoXML in cambiadas or self.modelo is None:
+            self.modelo = cargarCircuito(self.archivoXML)
+        self.construccion.modelo = self.modelo
+
+        # Las hojas de estilo solo afectan al HTML
+        forzar_html = any(r != self.archivoXML for r in cambiadas)
+        estados = self.construccion.construir(forzar=forzar)
+        if forzar_html and "html" in self.construccion.salidas and estados.get("html") != GENERADO:
+            solo_html = Construccion(self.archivoXML, {"html": self.construccion.salidas["html"]},
+                                     {"html": self.construccion.argumentos["html"]})
+            solo_html.modelo = self.modelo
+            estados.update(solo_html.construir(forzar=True))
+        return estados, time.perf_counter() - inicio
+
+    def vigilar(self, intervalo=0.25, espera=0.3, informar=print):
+        """
+        Bucle de vigilancia (hasta Ctrl+C). Espera a que no haya cambios
+        durante 'espera' segundos antes de reconstruir.
+        """
+        self.cambios()
+        try:
+            estados, segundos = self.reconstruir(set())
+            informar(self._resumen(estados, segundos, set()))
+        except ErrorCircuito as e:
+            informar(str(e))
+
+        pendientes = set()
+        ultimo = 0.0
+        while True:
+            time.sleep(intervalo)
+            nuevos = self.cambios()
+            if nuevos:
+                pendientes |= nuevos
+                ultimo = time.monotonic()
+                continue
+            if pendientes and time.monotonic() - ultimo >= espera:
+                try:
+                    estados, segundos = self.reconstruir(pendientes)
+                    informar(self._resumen(estados, segundos, pendientes))
+                except ErrorCircuito as e:
+                    informar(str(e))
+                pendientes = set()
+
+    def _resumen(self, estados, segundos, cambiadas):
+        generados = [c for c, e in estados.items() if e == GENERADO]
+        origen = ", ".join(sorted(os.path.basename(r) for r in cambiadas)) or "inicio"
+        return (f"[{time.strftime('%H:%M:%S')}] {origen}: "
+                f"{', '.join(generados) or 'nada que regenerar'} ({segundos * 1000:.1f} ms)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regenera KML, SVG y HTML al cambiar sus entradas")
+    parser.add_argument("archivoXML", nargs="?", default="circuitoEsquema.xml")
+    parser.add_argument("--intervalo", type=float, default=0.25, help="segundos entre consultas")
+    parser.add_argument("--espera", type=float, default=0.3,
+                        help="segundos sin cambios antes de reconstruir")
+    args = parser.parse_args()
+
+    print(f"Vigilando {args.archivoXML} y {ESTILOS} (Ctrl+C para terminar)")
+    try:
+        Vigilante(args.archivoXML).vigilar(args.intervalo, args.espera)
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -8,15 +8,43 @@ siguiendo la estructura del ejemplo 02030-SVG.py (clase Svg).
 """
 
 import xml.etree.ElementTree as ET
-from math import isclose
+from array import array
+from contextlib import nullcontext
+from functools import lru_cache
+from itertools import chain
+
+from circuito import cargarCircuito, ErrorCircuito, SIN_SECTOR
+from salida import abrirSalidaAtomica, abrirSalidaBinaria, escaparAtributo, escaparTexto, escribirUnidos, TAMAÑO_BLOQUE
+from instrumentacion import etapa, configurar
+from geodesia import distanciasTramos
+from simplificacion import simplificar, cambiosDeSector
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional: sin él se usa Python puro
+    np = None
+
+# Usar NumPy por defecto si está instalado
+USAR_NUMPY = np is not None
+
+# Versión del conversor (invalida las salidas de construccion.py si cambia)
+VERSION = "1.1"
+
+# Tamaño del lienzo (px): el width/height del SVG
+ANCHO, ALTO = 1000, 400
 
 class Svg(object):
 
-    def __init__(self):
+    def __init__(self, ancho=None, alto=None):
         """
         Crea el elemento raíz, el espacio de nombres y la versión
+        (con width, height y viewBox si se indican 'ancho' y 'alto')
         """
         self.raiz = ET.Element('svg', xmlns="http://www.w3.org/2000/svg", version="1.1")
+        if ancho is not None and alto is not None:
+            self.raiz.set('width', str(ancho))
+            self.raiz.set('height', str(alto))
+            self.raiz.set('viewBox', f"0 0 {ancho} {alto}")
     
     def addRect(self, x, y, width, height, fill, strokeWidth, stroke):
         """
@@ -43,8 +71,11 @@ class Svg(object):
     
     def addPolyline(self, points, stroke, strokeWidth, fill):
         """
-        Añade un elemento polyline
+        Añade un elemento polyline. 'points' es un string o un iterable de
+        puntos (pares (x, y) o strings 'x,y')
         """
+        if not isinstance(points, str):
+            points = " ".join(textoPuntos(points))
         ET.SubElement(self.raiz, 'polyline',
                                     points=points, stroke=stroke,
                                     **{"strokeWidth": str(strokeWidth)}, fill=fill)
@@ -57,17 +88,24 @@ class Svg(object):
                                     x=str(x), y=str(y),
                                     **{"fontFamily": fontFamily, "fontSize": str(fontSize), "style": style}).text=texto
 
-    def escribir(self,nombreArchivoSVG):
+    def escribir(self,nombreArchivoSVG, compresion=None):
         """
-        Escribe el archivo SVG con declaración y codificación
+        Escribe el archivo SVG con declaración y codificación.
+        Con 'compresion' (salida.Compresion) se escriben también sus .gz/.br
         """
         arbol = ET.ElementTree(self.raiz)
         
         """
         Introduce indentacióon y saltos de línea para generar XML en modo texto
         """
-        ET.indent(arbol)
-        arbol.write(nombreArchivoSVG, encoding='utf-8', xml_declaration=True)
+        with etapa("svg.indent"):
+            ET.indent(arbol)
+        with etapa("svg.escritura"):
+            if compresion is not None:
+                with abrirSalidaBinaria(nombreArchivoSVG, compresion) as archivo:
+                    arbol.write(archivo, encoding='utf-8', xml_declaration=True)
+            else:
+                arbol.write(nombreArchivoSVG, encoding='utf-8', xml_declaration=True)
 
 
     def ver(self):
@@ -92,172 +130,339 @@ class Svg(object):
             print("Atributos = ", hijo.attrib)
 
 
-def obtenerTramos(archivoXML):
+class SvgFlujo(object):
     """
-    Devuelve lista de dicts: [{'dist': float, 'alt': float, 'sector': int}, ...]
-    a partir de //trazado/tramo/(distancia, coordenadas/altitud, sector)
+    Escritor de SVG en streaming con la misma interfaz que Svg.
+
+    Cada elemento se escribe en el archivo en cuanto se añade, con la misma
+    estructura e indentación que Svg.escribir, sin construir el árbol. Los
+    puntos de addPolyline se formatean y escriben por bloques.
     """
-    try:
-        arbol = ET.parse(archivoXML)
-    except IOError:
-        print("No se encuentra el archivo ", archivoXML)
-        return []
-    except ET.ParseError:
-        print("Error procesando el archivo XML ", archivoXML)
-        return []
 
-    ns = {'uniovi': 'http://www.uniovi.es'}
-    raiz = arbol.getroot()
+    def __init__(self, nombreArchivoSVG, ancho=None, alto=None, compresion=None):
+        """
+        Abre el archivo y escribe la declaración y el elemento raíz
+        (con width, height y viewBox si se indican 'ancho' y 'alto').
+        El archivo se escribe en un temporal que solo sustituye a la salida
+        al cerrarlo sin errores. Con 'compresion' se escriben también sus
+        .gz/.br (ver salida.abrirSalidaAtomica)
+        """
+        self.archivo = abrirSalidaAtomica(nombreArchivoSVG, compresion)
+        tamaño = ""
+        if ancho is not None and alto is not None:
+            tamaño = f' width="{ancho}" height="{alto}" viewBox="0 0 {ancho} {alto}"'
+        self.archivo.write("<?xml version='1.0' encoding='utf-8'?>\n"
+                           f'<svg xmlns="http://www.w3.org/2000/svg" version="1.1"{tamaño}>')
+
+    def _elemento(self, etiqueta, atributos, texto=None):
+        """
+        Escribe un elemento hijo de la raíz con sus atributos (en orden)
+        """
+        attrs = "".join(f' {nombre}="{escaparAtributo(str(valor))}"' for nombre, valor in atributos)
+        if texto is None:
+            self.archivo.write(f"\n  <{etiqueta}{attrs} />")
+        else:
+            self.archivo.write(f"\n  <{etiqueta}{attrs}>{escaparTexto(texto)}</{etiqueta}>")
+
+    def addRect(self, x, y, width, height, fill, strokeWidth, stroke):
+        """
+        Añade un elemento rect
+        """
+        self._elemento('rect', (('x', x), ('y', y), ('width', width), ('height', height),
+                                ('fill', fill), ('strokeWidth', strokeWidth), ('stroke', stroke)))
+
+    def addCircle(self, cx, cy, r, fill):
+        """
+        Añade un elemento circle
+        """
+        self._elemento('circle', (('cx', cx), ('cy', cy), ('r', r), ('fill', fill)))
+
+    def addLine(self, x1, y1, x2, y2, stroke, strokeWidth):
+        """
+        Añade un elemento line
+        """
+        self._elemento('line', (('x1', x1), ('y1', y1), ('x2', x2), ('y2', y2),
+                                ('stroke', stroke), ('strokeWidth', strokeWidth)))
+
+    def addPolyline(self, points, stroke, strokeWidth, fill):
+        """
+        Añade un elemento polyline. 'points' es un string o un iterable de
+        puntos (pares (x, y) o strings 'x,y')
+        """
+        self.archivo.write('\n  <polyline points="')
+        if isinstance(points, str):
+            self.archivo.write(escaparAtributo(points))
+        else:
+            escribirUnidos(self.archivo, textoPuntos(points), " ", escaparAtributo)
+        resto = "".join(f' {nombre}="{escaparAtributo(str(valor))}"'
+                        for nombre, valor in (('stroke', stroke), ('strokeWidth', strokeWidth), ('fill', fill)))
+        self.archivo.write(f'"{resto} />')
+
+    def addText(self, texto, x, y, fontFamily, fontSize, style):
+        """
+        Añade un elemento texto
+        """
+        self._elemento('text', (('x', x), ('y', y), ('fontFamily', fontFamily),
+                                ('fontSize', fontSize), ('style', style)), texto)
+
+    def escribir(self):
+        """
+        Cierra el elemento raíz y el archivo
+        """
+        self.archivo.write("\n</svg>")
+        self.archivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        if tipo is None:
+            self.escribir()
+        else:
+            # Cierra y borra el temporal: la salida anterior no se toca
+            # (ver salida.py)
+            self.archivo.__exit__(tipo, valor, traza)
+
+
+def textoPuntos(puntos):
+    """
+    Genera el texto 'x,y' de cada punto: los strings se dejan igual y los
+    pares (x, y) se escriben con dos decimales
+    """
+    for p in puntos:
+        if isinstance(p, str):
+            yield p
+        else:
+            yield f"{p[0]:.2f},{p[1]:.2f}"
 
-    tramos = []
+
+def obtenerTramos(modelo):
+    """
+    Devuelve (dists, alts, sects) con una fila para el origen y otra por tramo:
+      - dists, alts: array('d') con //tramo/distancia y //tramo/coordenadas/altitud
+        (la distancia ausente se calcula con geodesia.distanciasTramos)
+      - sects: bytearray con //tramo/sector (SIN_SECTOR si el tramo no tiene)
+    El origen tiene distancia 0.0 y el sector del primer tramo.
+    """
+    n = len(modelo)
 
     # Altitud y sector del Punto origen
-    altitud_origen = raiz.find('.//uniovi:ubicacion/uniovi:origen/uniovi:altitud', ns)
-    if altitud_origen is not None and altitud_origen.text:
-        alt_origen = float(altitud_origen.text.strip().replace(",", "."))
-    else:
-        alt_origen = 0.0
-    
-    primer_sector_el = raiz.find('.//uniovi:trazado/uniovi:tramo[1]/uniovi:sector', ns)
-    try:
-        sector_origen = int(primer_sector_el.text.strip()) if (primer_sector_el is not None and primer_sector_el.text) else None
-    except ValueError:
-        sector_origen = None
+    alt_origen = modelo.origen.altitud if modelo.origen is not None else 0.0
+    sector_origen = modelo.sectores[0] if n else SIN_SECTOR
 
-    tramos.append({"dist": 0.0, "alt": alt_origen, "sector": sector_origen})
+    dists = array('d', [0.0])
+    alts = array('d', [alt_origen])
+    sects = bytearray([sector_origen])
 
-    # Altitudes y sectores del resto de puntos
-    for tramo in raiz.findall('.//uniovi:trazado/uniovi:tramo', ns):
-        distancia = tramo.find('uniovi:distancia', ns)
-        dist_val = float(distancia.text.strip().replace(",", ".")) if (distancia is not None and distancia.text) else 0.0
+    # Altitudes y sectores del resto de puntos. Las distancias ausentes se
+    # calculan con las coordenadas (0.0 si tampoco hay coordenadas)
+    distancias = modelo.distancias
+    if any(d != d for d in distancias):
+        calculadas = distanciasTramos(modelo)
+        distancias = [d if d == d else float(calculadas[i]) for i, d in enumerate(distancias)]
+    dists.extend(d if d == d else 0.0 for d in distancias)
+    alts.extend(modelo.altitudes)
+    sects.extend(modelo.sectores)
 
-        coordenadas = tramo.find('uniovi:coordenadas', ns)
-        altitud = coordenadas.find('uniovi:altitud', ns) if coordenadas is not None else None
-        alt_val  = float(altitud.text.strip().replace(",", ".")) if (altitud is not None and altitud.text) else 0.0
+    return dists, alts, sects
 
-        sector = tramo.find('uniovi:sector', ns)
-        try:
-            sect_val = int(sector.text.strip()) if (sector is not None and sector.text) else None
-        except ValueError:
-            sect_val = None
 
-        tramos.append({"dist": dist_val, "alt": alt_val, "sector": sect_val})
+@lru_cache(maxsize=8)
+def _formatoPuntos(n, decimales=2):
+    """
+    Plantilla '%.2f,%.2f %.2f,%.2f ...' para 'n' puntos (con 'decimales')
+    """
+    return " ".join([f"%.{decimales}f,%.{decimales}f"] * n)
 
-    return tramos
 
-def generarAltimetria(archivoXML, nombreSVG, cerrar_polilinea=True):
+def bloquesPuntos(xs, ys, decimales=2):
+    """
+    Genera el texto 'x,y x,y ...' de los puntos (xs[i], ys[i]) por bloques de
+    TAMAÑO_BLOQUE puntos, formateando cada bloque de una vez con '%'.
+    'xs' e 'ys' pueden ser array('d') o arrays de NumPy.
+    """
+    n = len(xs)
+    for i in range(0, n, TAMAÑO_BLOQUE):
+        j = min(i + TAMAÑO_BLOQUE, n)
+        if np is not None and isinstance(xs, np.ndarray):
+            valores = np.column_stack((xs[i:j], ys[i:j])).ravel().tolist()
+        else:
+            valores = [v for par in zip(xs[i:j], ys[i:j]) for v in par]
+        yield _formatoPuntos(j - i, decimales) % tuple(valores)
+
+
+def generarAltimetria(modelo, nombreSVG, cerrar_polilinea=True, flujo=True, usar_numpy=None,
+                      simplificacion=None, tolerancia=0.5, decimales=2, compresion=None,
+                      informar=print):
+    """
+    Genera 'nombreSVG' con el perfil de altitud del circuito y lo devuelve.
+    Con 'flujo' (por defecto) se escribe en streaming con SvgFlujo; si no,
+    se construye el árbol completo con Svg.
+    Con 'usar_numpy' (por defecto, si NumPy está instalado) los cálculos se
+    hacen sobre arrays completos; sin NumPy se usa Python puro. El SVG
+    generado es idéntico en ambos casos.
+    Con 'simplificacion' ("dp" o "vw") el perfil se simplifica con una
+    'tolerancia' en píxeles, conservando los límites de sector y el cierre.
+    'decimales' es la precisión (en píxeles) de los puntos del perfil.
+    Con 'compresion' (salida.Compresion) se escriben también
+    altimetria.svg.gz y .br en la misma pasada.
+    'informar' recibe los mensajes para el usuario (None: sin mensajes).
+    """
+    if usar_numpy is None:
+        usar_numpy = USAR_NUMPY
+    usar_numpy = usar_numpy and np is not None
 
     # 1) Datos
-    tramos = obtenerTramos(archivoXML)
-    if not tramos:
-        print("No se han encontrado tramos en el XML.")
+    dists, alts, sects = obtenerTramos(modelo)
+    if not dists:
+        if informar:
+            informar("No se han encontrado tramos en el XML.")
         return
+    if usar_numpy:
+        dists = np.frombuffer(dists, dtype=np.float64)
+        alts = np.frombuffer(alts, dtype=np.float64)
+        sects = np.frombuffer(sects, dtype=np.uint8)
+
+    with etapa("svg.calculo") as e:
+        # 2) Distancia acumulada (m)
+        if usar_numpy:
+            acum = np.cumsum(dists)  # suma secuencial, igual que el bucle
+        else:
+            acum = array('d')
+            s = 0.0
+            for d in dists:
+                s += d
+                acum.append(s)
+        total = float(acum[-1]) if len(acum) else 0.0
+
+        # 3) Rango altitudes
+        max_alt = float(alts.max()) if usar_numpy else max(alts)
+        if max_alt == 0.0:
+            max_alt = 1.0  # evita división por cero
+
+        # 4) Lienzo y márgenes (básico)
+        W, H = ANCHO, ALTO
+        ML, MR, MT, MB = 80, 40, 30, 60
+        plot_w, plot_h = W - ML - MR, H - MT - MB
+
+        # 5) Transformaciones a pantalla (valen para floats y para arrays de NumPy)
+        def fx(d_acum):
+            return ML + (d_acum/total)*plot_w if total > 0 else ML + 0.0 * d_acum
+
+        def fy(alt):
+            # 0m en la base, max_alt en la parte superior
+            return MT + (max_alt - alt) / (max_alt - 0.0) * plot_h
+
+        # 6) Puntos de la curva (cerrando con origen como punto final)
+        if usar_numpy:
+            x_vals, y_vals = acum, alts
+            if cerrar_polilinea:
+                x_vals = np.append(acum, total)
+                y_vals = np.append(alts, alts[0])
+            xs, ys = fx(x_vals), fy(y_vals)
+        else:
+            x_vals, y_vals = acum, alts
+            if cerrar_polilinea:
+                x_vals = chain(acum, [total])
+                y_vals = chain(alts, [alts[0]])
+            xs = array('d', map(fx, x_vals))
+            ys = array('d', map(fy, y_vals))
+
+        # -> Simplificación del perfil (opcional)
+        if simplificacion:
+            fijos = cambiosDeSector(sects)
+            conservados = simplificar(xs, ys, tolerancia, simplificacion, fijos)
+            if usar_numpy:
+                xs, ys = xs[conservados], ys[conservados]
+            else:
+                xs = array('d', (xs[i] for i in conservados))
+                ys = array('d', (ys[i] for i in conservados))
 
-    dists = [t["dist"] for t in tramos]
-    alts  = [t["alt"]  for t in tramos]
-    sects = [t["sector"] for t in tramos]
-
-    # 2) Distancia acumulada (m)
-    acum = []
-    s = 0.0
-    for d in dists:
-        s += d
-        acum.append(s)
-    total = acum[-1] if acum else 0.0
-
-    # 3) Rango altitudes
-    max_alt = max(alts) if alts else 1.0
-    if max_alt == 0.0:
-        max_alt = 1.0  # evita división por cero
-
-    # 4) Lienzo y márgenes (básico)
-    W, H = 1000, 400
-    ML, MR, MT, MB = 80, 40, 30, 60
-    plot_w, plot_h = W - ML - MR, H - MT - MB
-
-    # 5) Transformaciones a pantalla
-    def fx(d_acum):
-        return ML + (d_acum/total)*plot_w if total > 0 else ML
-
-    def fy(alt):
-        # 0m en la base, max_alt en la parte superior
-        return MT + (max_alt - alt) / (max_alt - 0.0) * plot_h
-
-    # 6) Puntos de la curva (cerrando con origen como punto final)
-    x_vals = acum[:]
-    y_vals = alts[:]
-    if cerrar_polilinea:
-        x_vals.append(total)
-        y_vals.append(alts[0])
-
-    pts = " ".join(f"{fx(x):.2f},{fy(y):.2f}" for x, y in zip(x_vals, y_vals))
+        e.elementos = len(xs)
 
     # 7) Preparar SVG
-    nuevoSVG = Svg()
-    # -> Fondo
-    nuevoSVG.addRect('0', '0', str(W), str(H), '#ffffff', '0', 'none')
-    # -> Título
-    nuevoSVG.addText('Altimetría', str(W//2), '24', 'Verdana', '16', 'text-anchor: middle;')
-
-    # 8) Referencias verticales
-    y_eje_x = fy(0.0)          # eje X a 0 m
-    y_top = fy(max_alt)        # parte superior (altitud máxima)
+    nuevoSVG = SvgFlujo(nombreSVG, W, H, compresion) if flujo else Svg(W, H)
+    # En streaming la construcción y la escritura son la misma etapa; SvgFlujo
+    # escribe el cierre al salir del with (si algo falla, descarta la salida)
+    with etapa("svg.escritura" if flujo else "svg.construccion"), (nuevoSVG if flujo else nullcontext()):
+        # -> Fondo
+        nuevoSVG.addRect('0', '0', str(W), str(H), '#ffffff', '0', 'none')
+        # -> Título
+        nuevoSVG.addText('Altimetría', str(W//2), '24', 'Verdana', '16', 'text-anchor: middle;')
+
+        # 8) Referencias verticales
+        y_eje_x = fy(0.0)          # eje X a 0 m
+        y_top = fy(max_alt)        # parte superior (altitud máxima)
     
-    # 9) Fondo rojo claro (área bajo la curva)
-    pts_fill = " ".join([
-        f"{ML:.2f},{y_eje_x:.2f}",         # base izquierda
-        pts,                                # curva
-        f"{(ML + plot_w):.2f},{y_eje_x:.2f}"  # base derecha
-    ])
-    nuevoSVG.addPolyline(pts_fill, 'none', '0', '#ffebee')  # rojo muy claro
-
-    # 10) Polilínea roja del perfil
-    nuevoSVG.addPolyline(pts, 'red', '2.5', 'none')
-
-    # 11) Divisores de SECTOR (gris claro) + etiquetas centradas debajo del eje X
-    color_sector = '#d0d0d0'
-    sector_bounds = []
-    last_sec = None
-    for i, sec in enumerate(sects):
-        if i == 0 or sec != last_sec:
-            sector_bounds.append((fx(acum[i]), sec))
-            last_sec = sec
-    sector_bounds.append((ML + plot_w, last_sec))  # borde derecho
-
-    # -> Líneas verticales completas
-    for x, _sec in sector_bounds:
-        nuevoSVG.addLine(f"{x:.2f}", f"{y_top:.2f}",
-                            f"{x:.2f}", f"{y_eje_x:.2f}",
-                            color_sector, '1')
-
-    # -> Etiquetas centradas entre límites consecutivos (debajo del eje X)
-    for (x1, sec_left), (x2, _sec_right) in zip(sector_bounds[:-1], sector_bounds[1:]):
-        x_mid = (x1 + x2) / 2.0
-        nuevoSVG.addText(f"S{sec_left}",
-                            f"{x_mid:.2f}", f"{(y_eje_x + 18):.2f}",
-                            'Verdana', '10', 'text-anchor: middle;')
-
-    # 12) Marca única en eje Y para altitud máxima
-    nuevoSVG.addLine(str(ML - 6), f"{y_top:.2f}", str(ML), f"{y_top:.2f}", '#000000', '1')
-    nuevoSVG.addText(f"{max_alt:.0f}", str(ML - 10), f"{y_top + 4:.2f}",
-                        'Verdana', '11', 'text-anchor: end;')
+        # 9) Fondo rojo claro (área bajo la curva)
+        pts_fill = chain(
+            [(ML, y_eje_x)],                    # base izquierda
+            bloquesPuntos(xs, ys, decimales),   # curva
+            [(ML + plot_w, y_eje_x)]            # base derecha
+        )
+        nuevoSVG.addPolyline(pts_fill, 'none', '0', '#ffebee')  # rojo muy claro
+
+        # 10) Polilínea roja del perfil
+        nuevoSVG.addPolyline(bloquesPuntos(xs, ys, decimales), 'red', '2.5', 'none')
+
+        # 11) Divisores de SECTOR (gris claro) + etiquetas centradas debajo del eje X
+        color_sector = '#d0d0d0'
+        if usar_numpy:
+            cambios = np.flatnonzero(np.concatenate(([True], sects[1:] != sects[:-1])))
+            sector_bounds = list(zip(fx(acum[cambios]).tolist(), sects[cambios].tolist()))
+        else:
+            sector_bounds = []
+            last_sec = None
+            for i, sec in enumerate(sects):
+                if i == 0 or sec != last_sec:
+                    sector_bounds.append((fx(acum[i]), sec))
+                    last_sec = sec
+        sector_bounds.append((ML + plot_w, sects[-1]))  # borde derecho
+
+        # -> Líneas verticales completas
+        for x, _sec in sector_bounds:
+            nuevoSVG.addLine(f"{x:.2f}", f"{y_top:.2f}",
+                                f"{x:.2f}", f"{y_eje_x:.2f}",
+                                color_sector, '1')
+
+        # -> Etiquetas centradas entre límites consecutivos (debajo del eje X)
+        for (x1, sec_left), (x2, _sec_right) in zip(sector_bounds[:-1], sector_bounds[1:]):
+            x_mid = (x1 + x2) / 2.0
+            nuevoSVG.addText(f"S{sec_left or None}",
+                                f"{x_mid:.2f}", f"{(y_eje_x + 18):.2f}",
+                                'Verdana', '10', 'text-anchor: middle;')
+
+        # 12) Marca única en eje Y para altitud máxima
+        nuevoSVG.addLine(str(ML - 6), f"{y_top:.2f}", str(ML), f"{y_top:.2f}", '#000000', '1')
+        nuevoSVG.addText(f"{max_alt:.0f}", str(ML - 10), f"{y_top + 4:.2f}",
+                            'Verdana', '11', 'text-anchor: end;')
     
-    # 13) Ejes
-    # -> Eje X (0 m)
-    nuevoSVG.addLine(str(ML), f"{y_eje_x:.2f}", str(ML + plot_w), f"{y_eje_x:.2f}", '#000000', '1.5')
-    # -> Eje Y (0 → max_alt)
-    nuevoSVG.addLine(str(ML), f"{y_eje_x:.2f}", str(ML), f"{y_top:.2f}", '#000000', '1.5')
+        # 13) Ejes
+        # -> Eje X (0 m)
+        nuevoSVG.addLine(str(ML), f"{y_eje_x:.2f}", str(ML + plot_w), f"{y_eje_x:.2f}", '#000000', '1.5')
+        # -> Eje Y (0 → max_alt)
+        nuevoSVG.addLine(str(ML), f"{y_eje_x:.2f}", str(ML), f"{y_top:.2f}", '#000000', '1.5')
 
-    # 14) Guardar
-    nuevoSVG.escribir(nombreSVG)
-    print("Creado el archivo:", nombreSVG)
+    # 14) Guardar (en streaming ya está escrito)
+    if not flujo:
+        nuevoSVG.escribir(nombreSVG, compresion)
+    if informar:
+        informar("Creado el archivo:", nombreSVG)
+    return nombreSVG
 
 
 def main():
+    configurar()
     archivoXML = "circuitoEsquema.xml"
     nombreSVG  = "altimetria.svg"
 
-    generarAltimetria(archivoXML, nombreSVG, cerrar_polilinea=True)
+    try:
+        modelo = cargarCircuito(archivoXML)
+    except ErrorCircuito as e:
+        print(e)
+        return
+
+    generarAltimetria(modelo, nombreSVG, cerrar_polilinea=True)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
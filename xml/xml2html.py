@@ -6,10 +6,134 @@ Genera InfoCircuito.html a partir de circuitoEsquema.xml(NS http://www.uniovi.es
 @author: Marcelo Díez Domínguez UO293820
 """
 
+import json
+import os
 import xml.etree.ElementTree as ET
+from contextlib import nullcontext
+from functools import lru_cache
 from pathlib import Path
 import re
 
+from circuito import cargarCircuito, ErrorCircuito
+from salida import abrirSalida, abrirSalidaAtomica, escaparTexto, escaparAtributoHtml
+from medios import CacheMedios, ErrorMedio, sondear
+from instrumentacion import etapa, configurar
+
+# Versión del conversor (invalida las salidas de construccion.py si cambia)
+VERSION = "1.1"
+
+# Elementos sin etiqueta de cierre (los mismos que ElementTree con method="html")
+VACIOS = frozenset(ET.HTML_EMPTY)
+
+# Tamaño de presentación de las fotos para los srcset con anchos (ancho completo)
+SIZES = "100vw"
+
+# Atributos de carga diferida de las imágenes (están fuera de la primera pantalla)
+CARGA_DIFERIDA = [("loading", "lazy"), ("decoding", "async")]
+
+# ---------- Rutas de los medios ----------
+
+def normalize_media_src(src):
+    """
+    Garantiza que 'src' apunte a ../multimedia/<archivo>.
+    - Si el XML trae solo 'foto.jpg' → ../multimedia/foto.jpg
+    - Si trae 'multimedia/foto.jpg' → ../multimedia/foto.jpg (normaliza)
+    - Si ya viene '../multimedia/foto.jpg' → se respeta.
+    """
+    MEDIA_BASE = "../multimedia"
+
+    if not src:
+        return src
+    s = src.strip()
+
+    # Si ya empieza por ../multimedia/, no tocamos
+    if s.startswith("../multimedia/"):
+        return s
+
+    # Si viene con otra carpeta (p.ej. 'multimedia/foto.jpg' o 'imgs/foto.jpg')
+    # nos quedamos con el nombre base y lo pegamos a ../multimedia/
+    name = Path(s).name
+    return f"{MEDIA_BASE}/{name}"
+
+def picture_sources(src_full, alt, imagen=None, medida=None):
+    """
+    Devuelve ([atributos de cada <source>], atributos del <img>) de un
+    <picture> a partir de 'src_full', como listas de pares (nombre, valor).
+    Sin 'imagen': versiones -movil (<= 465px), -tablet (<= 799px) y la base
+    (>= 800px) por media query. Con 'imagen' (entrada del manifiesto de
+    imagenes.py): un <source> por tipo (WebP primero) con los anchos reales
+    de sus variantes en el srcset, y width/height en el <img>. Sin
+    'imagen', el width/height sale de 'medida' (sondeo de medios.py) si se
+    da. El <img> se carga y decodifica de forma diferida (loading="lazy",
+    decoding="async"). Sin 'alt' se usa el nombre base.
+    """
+    # Normaliza la ruta base al directorio ../multimedia/
+    p = Path(normalize_media_src(src_full))  # ../multimedia/foto.jpg
+    parent_dir = p.parent.as_posix()         # ../multimedia
+    stem = p.stem                            # 'foto'
+    ext = p.suffix or ".jpg"                 # '.jpg' por defecto
+    base = f"{parent_dir}/{stem}{ext}"       # 'foto.jpg'
+    img = [("src", base), ("alt", alt or stem)]
+
+    if not imagen:
+        movil = f"{parent_dir}/{stem}-movil{ext}"    # 'foto-movil.jpg'
+        tablet = f"{parent_dir}/{stem}-tablet{ext}"  # 'foto-tablet.jpg'
+        sources = [[("media", "(max-width: 465px)"), ("srcset", movil)],
+                   [("media", "(max-width: 799px)"), ("srcset", tablet)],
+                   [("media", "(min-width: 800px)"), ("srcset", base)]]
+        if medida:
+            img += [("width", str(medida["ancho"])), ("height", str(medida["alto"]))]
+        img += CARGA_DIFERIDA
+        return sources, img
+
+    # Variantes por tipo (sin anchos repetidos, de menor a mayor)
+    tipos = {}
+    for v in imagen["variantes"]:
+        tipos.setdefault(v["tipo"], {}).setdefault(v["ancho"], v["archivo"])
+    sources = []
+    for tipo in sorted(tipos, key=lambda t: t != "image/webp"):
+        srcset = ", ".join(f"{parent_dir}/{archivo} {ancho}w"
+                           for ancho, archivo in sorted(tipos[tipo].items()))
+        sources.append([("type", tipo), ("srcset", srcset), ("sizes", SIZES)])
+    img += [("width", str(imagen["ancho"])), ("height", str(imagen["alto"]))]
+    img += CARGA_DIFERIDA
+    return sources, img
+
+def video_sources(mp4_src, webm_src=None):
+    """
+    Devuelve las rutas (mp4, webm) de un <video>; sin 'webm_src' se infiere
+    cambiando la extensión de 'mp4_src' a .webm.
+    """
+    mp4_src = normalize_media_src(mp4_src)
+    if webm_src:
+        webm_src = normalize_media_src(webm_src)
+    else:
+        webm_src = Path(mp4_src).with_suffix(".webm").as_posix()
+    return mp4_src, webm_src
+
+def image_attributes(src, alt, medida=None):
+    """
+    Atributos de un <img> suelto (sin variantes): width/height de 'medida'
+    si se da y carga diferida.
+    """
+    atributos = [("src", src), ("alt", alt)]
+    if medida:
+        atributos += [("width", str(medida["ancho"])), ("height", str(medida["alto"]))]
+    return atributos + CARGA_DIFERIDA
+
+def video_attributes(medida=None, poster=None):
+    """
+    Atributos de un <video>: solo se precargan los metadatos
+    (preload="metadata"), con width/height de 'medida' (sondeo de
+    medios.py) y la imagen 'poster' si se dan.
+    """
+    atributos = [("controls", "controls"), ("preload", "metadata")]
+    if medida:
+        atributos += [("width", str(medida["ancho"])), ("height", str(medida["alto"]))]
+    if poster:
+        atributos.append(("poster", normalize_media_src(poster)))
+    return atributos
+
 class Html:
     def __init__(self, lang, titulo, css_href, css2_href, icon_href, nombreCircuito):
         self.html = ET.Element("html", lang=lang)
@@ -80,6 +204,15 @@ class Html:
         li.text = f"{label}: {value}"
         return li
 
+    def add_li(self, ul, text):
+        """
+        Añade un elemento <li> con el texto 'text' al elemento <ul> especificado
+        y lo devuelve (p.ej. para colgar de él una sublista).
+        """
+        li = ET.SubElement(ul, "li")
+        li.text = text
+        return li
+
     def add_table(self, parent, caption_text, columns):
         """
         Crea una tabla accesible con <caption>, <thead> y <tbody>.
@@ -135,27 +268,11 @@ class Html:
 
     def _normalize_media_src(self, src: str) -> str:
         """
-        Garantiza que 'src' apunte a ../multimedia/<archivo>.
-        - Si el XML trae solo 'foto.jpg' → ../multimedia/foto.jpg
-        - Si trae 'multimedia/foto.jpg' → ../multimedia/foto.jpg (normaliza)
-        - Si ya viene '../multimedia/foto.jpg' → se respeta.
+        Garantiza que 'src' apunte a ../multimedia/<archivo> (ver normalize_media_src).
         """
-        MEDIA_BASE = "../multimedia"
-
-        if not src:
-            return src
-        s = src.strip()
-
-        # Si ya empieza por ../multimedia/, no tocamos
-        if s.startswith("../multimedia/"):
-            return s
+        return normalize_media_src(src)
 
-        # Si viene con otra carpeta (p.ej. 'multimedia/foto.jpg' o 'imgs/foto.jpg')
-        # nos quedamos con el nombre base y lo pegamos a ../multimedia/
-        name = Path(s).name
-        return f"{MEDIA_BASE}/{name}"
-
-    def add_picture(self, parent, src_full, alt):
+    def add_picture(self, parent, src_full, alt, imagen=None, medida=None):
         """
         Añade un elemento <picture> con 3 elementos <source> adaptativos y el elemento <img> base, y lo devuelve.
 
@@ -164,45 +281,37 @@ class Html:
           - 'multimedia/foto-tablet.jpg' (<= 799px)
           - 'multimedia/foto.jpg'        (>= 800px)
         El atributo alt se toma del parámetro 'alt' (si no se da, usa el nombre base).
+        Con 'imagen' (entrada del manifiesto de imagenes.py) se usan las
+        variantes reales con sus anchos y el <img> lleva width y height
+        (o los de 'medida', el sondeo de la foto). Ver picture_sources.
         """
-        # Normaliza la ruta base al directorio ../multimedia/
-        src_full = self._normalize_media_src(src_full)
-        p = Path(src_full)                   # ../multimedia/foto.jpg
-        parent_dir = p.parent.as_posix()     # ../multimedia
-        stem = p.stem                        # 'foto'
-        ext = p.suffix or ".jpg"             # '.jpg' por defecto
-
-        movil = f"{stem}-movil{ext}"         # 'foto-movil.jpg'
-        tablet = f"{stem}-tablet{ext}"       # 'foto-tablet.jpg'
-        base = f"{stem}{ext}"                # 'foto.jpg'
-
-        def join_dir(filename):
-            return f"{parent_dir}/{filename}"
-
+        sources, img = picture_sources(src_full, alt, imagen, medida)
         picture = ET.SubElement(parent, "picture")
-        ET.SubElement(picture, "source", media="(max-width: 465px)", srcset=join_dir(movil))
-        ET.SubElement(picture, "source", media="(max-width: 799px)", srcset=join_dir(tablet))
-        ET.SubElement(picture, "source", media="(min-width: 800px)", srcset=join_dir(base))
-        ET.SubElement(picture, "img", src=join_dir(base), alt=(alt or stem))
+        for atributos in sources:
+            ET.SubElement(picture, "source", dict(atributos))
+        ET.SubElement(picture, "img", dict(img))
         return picture
     
-    def add_video(self, parent, mp4_src, webm_src=None):
+    def add_image(self, parent, src, alt, medida=None):
+        """
+        Añade un elemento <img> con la ruta 'src' tal cual (p. ej. altimetria.svg)
+        dentro del elemento 'parent' y lo devuelve.
+        """
+        return ET.SubElement(parent, "img", dict(image_attributes(src, alt, medida)))
+
+    def add_video(self, parent, mp4_src, webm_src=None, medida=None, poster=None):
         """
         Añade un bloque con los elementos necesarios como el siguiente:
-          <video controls preload="auto">
+          <video controls preload="metadata" width="..." height="..." poster="...">
             <source src="xxx.mp4" type="video/mp4"/>
             <source src="xxx.webm" type="video/webm"/>
           </video>
 
         Si 'webm_src' es None, se infiere cambiando la extensión de 'mp4_src' a .webm.
+        width/height salen de 'medida' (sondeo del vídeo) y poster de 'poster'.
         """
-        mp4_src = self._normalize_media_src(mp4_src)
-        if webm_src:
-            webm_src = self._normalize_media_src(webm_src)
-        else:
-            webm_src = Path(mp4_src).with_suffix(".webm").as_posix()
-
-        video = ET.SubElement(parent, "video", controls="controls", preload="auto")
+        mp4_src, webm_src = video_sources(mp4_src, webm_src)
+        video = ET.SubElement(parent, "video", dict(video_attributes(medida, poster)))
         ET.SubElement(video, "source", src=mp4_src, type="video/mp4")
         ET.SubElement(video, "source", src=webm_src, type="video/webm")
         return video
@@ -216,15 +325,311 @@ class Html:
         """
         tree = ET.ElementTree(self.html)
         # 'indent' mejora la legibilidad (si está disponible en tu versión de Python)
-        try:
-            ET.indent(tree)  # Python 3.9+
-        except Exception:
-            pass
-        html_str = ET.tostring(self.html, encoding="unicode", method="html")
+        with etapa("html.indent"):
+            try:
+                ET.indent(tree)  # Python 3.9+
+            except Exception:
+                pass
+        with etapa("html.serializacion"):
+            html_str = ET.tostring(self.html, encoding="unicode", method="html")
         return "<!DOCTYPE html>\n" + html_str
 
-    def write(self, filename):
-        Path(filename).write_text(self._serialize(), encoding="utf-8")
+    def write(self, filename, compresion=None):
+        texto = self._serialize()
+        with etapa("html.escritura"):
+            if compresion is not None:
+                with abrirSalida(filename, compresion) as f:
+                    f.write(texto)
+            else:
+                Path(filename).write_text(texto, encoding="utf-8")
+
+# ---------- Escritura en streaming ----------
+
+@lru_cache(maxsize=None)
+def _sangria(nivel):
+    return "\n" + "  " * nivel
+
+def _texto(texto):
+    return escaparTexto(texto) if texto else ""
+
+def _atributos(atributos):
+    return "".join(f' {nombre}="{escaparAtributoHtml(valor)}"' for nombre, valor in atributos)
+
+@lru_cache(maxsize=None)
+def _cabecera(lang, titulo, css_href, css2_href, icon_href):
+    """
+    Partes fijas del documento, ya escapadas: hasta el texto de <title> y
+    desde él hasta la apertura de <main> (con la indentación de ET.indent)
+    """
+    antes = ("<!DOCTYPE html>\n"
+             f"<html{_atributos((('lang', lang),))}>\n"
+             "  <head>\n"
+             '    <meta charset="UTF-8">\n'
+             "    <title>")
+    despues = ("</title>\n"
+               '    <meta name="description" content="Informe HTML generado desde circuitoEsquema.xml">\n'
+               '    <meta name="viewport" content="width=device-width, initial-scale=1.0">\n'
+               f"    <link{_atributos((('rel', 'stylesheet'), ('type', 'text/css'), ('href', css_href)))}>\n"
+               f"    <link{_atributos((('rel', 'stylesheet'), ('href', css2_href)))}>\n"
+               f"    <link{_atributos((('rel', 'icon'), ('type', 'image/png'), ('href', icon_href)))}>\n"
+               "  </head>\n"
+               "  <body>\n"
+               "    <header>\n"
+               f"      <h1>{_texto(titulo)}</h1>\n"
+               "    </header>\n"
+               "    <main>")
+    return antes, despues
+
+@lru_cache(maxsize=256)
+def _plantillaFila(col_ids, nivel):
+    """
+    Plantilla (str.format) de una fila <tr> de nivel 'nivel' con una celda
+    <td headers="..."> por columna de 'col_ids'
+    """
+    if not col_ids:
+        return "<tr></tr>"
+    # Las llaves de los ids se duplican para que format no las interprete
+    celdas = "".join(_sangria(nivel + 1) + "<td"
+                     + _atributos((("headers", cid),)).replace("{", "{{").replace("}", "}}")
+                     + ">{}</td>" for cid in col_ids)
+    return f"<tr>{celdas}{_sangria(nivel)}</tr>"
+
+class _Nodo(object):
+    """
+    Elemento de HtmlFlujo: etiqueta, nivel de anidamiento, texto en blanco
+    pendiente de escribir (None si ya se escribió texto) y si tiene hijos
+    """
+    __slots__ = ("etiqueta", "nivel", "texto", "hijos")
+
+    def __init__(self, etiqueta, nivel, texto=""):
+        self.etiqueta = etiqueta
+        self.nivel = nivel
+        self.texto = texto
+        self.hijos = False
+
+class HtmlFlujo(object):
+    """
+    Escritor de HTML en streaming con la misma interfaz que Html.
+
+    Cada elemento se escribe en el archivo en cuanto se añade, con la misma
+    estructura e indentación que Html.write (ET.indent y method="html"), sin
+    construir el árbol. Las partes fijas (DOCTYPE, <head> y cabecera) se
+    guardan ya escapadas y las filas de cada tabla salen de una plantilla.
+
+    Un elemento se cierra al añadir un hijo a uno de sus antecesores, así que
+    solo se puede añadir a elementos abiertos (si no, ValueError). Los
+    elementos con texto (h2, h3, p, add_li_label_value, filas), los enlaces y
+    los bloques <picture> y <video> se escriben ya cerrados.
+    """
+
+    def __init__(self, nombreArchivo, lang, titulo, css_href, css2_href, icon_href, nombreCircuito,
+                 compresion=None):
+        """
+        Abre el archivo y escribe las partes fijas hasta <main>. El archivo
+        se escribe en un temporal que solo sustituye a la salida al cerrarlo
+        sin errores. Con 'compresion' se escriben también sus .gz/.br (ver
+        salida.abrirSalidaAtomica)
+        """
+        self.archivo = abrirSalidaAtomica(nombreArchivo, compresion)
+        antes, despues = _cabecera(lang, titulo, css_href, css2_href, icon_href)
+        self.archivo.write(antes + _texto(titulo + " - " + nombreCircuito) + despues)
+
+        self.html = _Nodo("html", 0)
+        self.body = _Nodo("body", 1)
+        self.main = _Nodo("main", 2)
+        self.html.hijos = self.body.hijos = True
+        self.pila = [self.html, self.body, self.main]
+
+    # ---------- Elementos abiertos ----------
+
+    def _prefijo(self, parent):
+        """
+        Cierra los elementos abiertos dentro de 'parent' y devuelve lo que
+        precede a su nuevo hijo (la sangría, salvo tras un texto)
+        """
+        pila = self.pila
+        nivel = parent.nivel
+        if len(pila) <= nivel or pila[nivel] is not parent:
+            raise ValueError(f"El elemento <{parent.etiqueta}> ya está cerrado")
+        while len(pila) > nivel + 1:
+            self._cerrar(pila.pop())
+        prefijo = _sangria(nivel + 1) if parent.hijos or parent.texto is not None else ""
+        parent.hijos = True
+        return prefijo
+
+    def _cerrar(self, nodo):
+        cierre = _sangria(nodo.nivel) if nodo.hijos else (nodo.texto or "")
+        if nodo.etiqueta not in VACIOS:
+            cierre += f"</{nodo.etiqueta}>"
+        self.archivo.write(cierre)
+
+    def _abrir(self, parent, etiqueta, atributos=(), texto=None):
+        """
+        Escribe la apertura de un elemento que admite hijos y lo devuelve
+        """
+        prefijo = self._prefijo(parent)
+        nodo = _Nodo(etiqueta, parent.nivel + 1)
+        if texto and texto.strip():
+            self.archivo.write(f"{prefijo}<{etiqueta}{_atributos(atributos)}>{escaparTexto(texto)}")
+            nodo.texto = None
+        else:
+            self.archivo.write(f"{prefijo}<{etiqueta}{_atributos(atributos)}>")
+            nodo.texto = texto or ""
+        self.pila.append(nodo)
+        return nodo
+
+    def _hoja(self, parent, etiqueta, atributos=(), texto=None):
+        """
+        Escribe un elemento completo (sin hijos) y lo devuelve ya cerrado
+        """
+        prefijo = self._prefijo(parent)
+        cierre = "" if etiqueta in VACIOS else f"</{etiqueta}>"
+        self.archivo.write(f"{prefijo}<{etiqueta}{_atributos(atributos)}>{_texto(texto)}{cierre}")
+        return _Nodo(etiqueta, parent.nivel + 1)
+
+    # ---------- Constructores de bloques ----------
+
+    def add_section(self):
+        """
+        Añade un elemento <section> abierto
+        """
+        return self._abrir(self.main, "section")
+
+    def add_h2(self, parent, title_text):
+        """
+        Añade un elemento <h2> (cerrado)
+        """
+        return self._hoja(parent, "h2", texto=title_text)
+
+    def add_h3(self, parent, title_text):
+        """
+        Añade un elemento <h3> (cerrado)
+        """
+        return self._hoja(parent, "h3", texto=title_text)
+
+    def add_paragraph(self, parent, text):
+        """
+        Añade un elemento <p> (cerrado)
+        """
+        return self._hoja(parent, "p", texto=text)
+
+    def add_unordered_list(self, parent):
+        """
+        Añade un elemento <ul> abierto
+        """
+        return self._abrir(parent, "ul")
+
+    def add_li_label_value(self, ul, label, value):
+        """
+        Añade un elemento <li>label: value</li> (cerrado)
+        """
+        return self._hoja(ul, "li", texto=f"{label}: {value}")
+
+    def add_li(self, ul, text):
+        """
+        Añade un elemento <li> abierto con el texto 'text'
+        """
+        return self._abrir(ul, "li", texto=text)
+
+    def add_table(self, parent, caption_text, columns):
+        """
+        Escribe <table>, <caption> y <thead>, y abre <tbody>. Devuelve (table, tbody, col_ids)
+        """
+        table = self._abrir(parent, "table")
+        self._hoja(table, "caption", texto=caption_text)
+        thead = self._abrir(table, "thead")
+        trh = self._abrir(thead, "tr")
+
+        col_ids = []
+        for col in columns:
+            cid, label = (col["id"], col["label"]) if isinstance(col, dict) else col
+            self._hoja(trh, "th", (("scope", "col"), ("id", cid)), label)
+            col_ids.append(cid)
+
+        tbody = self._abrir(table, "tbody")
+        return table, tbody, col_ids
+
+    def add_table_row_with_headers(self, tbody, values, col_ids):
+        """
+        Añade una fila <tr> (cerrada) con la plantilla de sus columnas
+        """
+        prefijo = self._prefijo(tbody)
+        values = values[:len(col_ids)]
+        plantilla = _plantillaFila(tuple(col_ids[:len(values)]), tbody.nivel + 1)
+        self.archivo.write(prefijo + plantilla.format(*map(_texto, values)))
+        return _Nodo("tr", tbody.nivel + 1)
+
+    def add_aside(self):
+        """
+        Añade un elemento <aside> abierto
+        """
+        return self._abrir(self.main, "aside")
+
+    def add_link_item(self, ul, href):
+        """
+        Añade un elemento <li><a href="...">href</a></li> (cerrado)
+        """
+        prefijo = self._prefijo(ul)
+        nivel = ul.nivel + 1
+        self.archivo.write(f"{prefijo}<li>{_sangria(nivel + 1)}<a{_atributos((('href', href),))}>"
+                           f"{_texto(href)}</a>{_sangria(nivel)}</li>")
+        return _Nodo("li", nivel)
+
+    def add_picture(self, parent, src_full, alt, imagen=None, medida=None):
+        """
+        Añade un bloque <picture> (cerrado) como Html.add_picture
+        """
+        sources, img = picture_sources(src_full, alt, imagen, medida)
+        prefijo = self._prefijo(parent)
+        nivel = parent.nivel + 1
+        interior = _sangria(nivel + 1)
+        partes = [prefijo, "<picture>"]
+        for atributos in sources:
+            partes += (interior, "<source", _atributos(atributos), ">")
+        partes += (interior, "<img", _atributos(img), ">", _sangria(nivel), "</picture>")
+        self.archivo.write("".join(partes))
+        return _Nodo("picture", nivel)
+
+    def add_image(self, parent, src, alt, medida=None):
+        """
+        Añade un elemento <img> como Html.add_image
+        """
+        return self._hoja(parent, "img", image_attributes(src, alt, medida))
+
+    def add_video(self, parent, mp4_src, webm_src=None, medida=None, poster=None):
+        """
+        Añade un bloque <video> (cerrado) como Html.add_video
+        """
+        mp4_src, webm_src = video_sources(mp4_src, webm_src)
+        prefijo = self._prefijo(parent)
+        nivel = parent.nivel + 1
+        interior = _sangria(nivel + 1)
+        self.archivo.write(f'{prefijo}<video{_atributos(video_attributes(medida, poster))}>'
+                           f'{interior}<source{_atributos((("src", mp4_src), ("type", "video/mp4")))}>'
+                           f'{interior}<source{_atributos((("src", webm_src), ("type", "video/webm")))}>'
+                           f"{_sangria(nivel)}</video>")
+        return _Nodo("video", nivel)
+
+    # ---------- Salida ----------
+
+    def write(self):
+        """
+        Cierra los elementos abiertos y el archivo
+        """
+        while self.pila:
+            self._cerrar(self.pila.pop())
+        self.archivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        if tipo is None:
+            self.write()
+        else:
+            # Cierra y borra el temporal: la salida anterior no se toca
+            # (ver salida.py)
+            self.archivo.__exit__(tipo, valor, traza)
 
 # ---------- Lógica para conversión de formatos ----------
 
@@ -249,184 +654,292 @@ def iso8601_to_str(iso_str):
 
     return f"{h:02d} horas, {mi:02d} minutos y {s_txt} segundos"
 
+def segundos_to_str(segundos):
+    """
+    Convierte un tiempo de vuelta o de sector en segundos a 'M:SS.mmm'.
+    """
+    mi, s = divmod(round(segundos * 1000), 60000)
+    return f"{mi}:{s / 1000:06.3f}"
+
+def cargar_tiempos(tiempos):
+    """
+    Devuelve los tiempos de telemetria.py como diccionario: 'tiempos' puede
+    ser ya el diccionario o la ruta de tiempos.json.
+    """
+    if tiempos is None or isinstance(tiempos, dict):
+        return tiempos
+    with open(tiempos, encoding="utf-8") as f:
+        return json.load(f)
+
+def cargar_imagenes(imagenes):
+    """
+    Devuelve las entradas del manifiesto de imagenes.py (nombre de la foto
+    -> variantes): 'imagenes' puede ser ya el manifiesto o su ruta.
+    """
+    if imagenes is None:
+        return {}
+    if not isinstance(imagenes, dict):
+        with open(imagenes, encoding="utf-8") as f:
+            imagenes = json.load(f)
+    return imagenes.get("imagenes", {})
+
 # ---------- Lógica de extracción y generación ----------
 
-def generar_html(archivo_xml="circuitoEsquema.xml", archivo_html="InfoCircuito.html"):
+def generar_html(modelo, archivo_html="InfoCircuito.html", tiempos=None, flujo=True, imagenes=None,
+                 sondeo=True, altimetria=None, kml=None, compresion=None, medida_altimetria=None,
+                 informar=print, guardar_medios=False):
     """
-    Lee 'archivo_xml' (namespace http://www.uniovi.es) y genera 'archivo_html'.
-    Se usan expresiones XPath y se excluyen:
+    Genera 'archivo_html' a partir del ModeloCircuito 'modelo' (ver circuito.py)
+    y lo devuelve.
+    Con 'flujo' (por defecto) se escribe en streaming con HtmlFlujo; si no,
+    se construye el árbol completo con Html. El HTML es idéntico.
+    Con 'imagenes' (manifiesto de imagenes.py, diccionario o ruta) las fotos
+    usan las variantes generadas, con sus anchos y dimensiones reales.
+    Con 'sondeo' (por defecto) se leen las cabeceras de las fotos y los
+    vídeos del directorio multimedia (../multimedia respecto al HTML, con la
+    caché de medios.py) para su width/height y el poster de los vídeos. La
+    caché solo se escribe (multimedia/.medios.json) con 'guardar_medios':
+    por defecto generar el HTML no modifica el directorio multimedia (p.ej.
+    desde varios hilos, ver orquestador.py).
+    Con 'altimetria' y/o 'kml' (rutas relativas al HTML de altimetria.svg y
+    circuito.kml) se añade una sección con la altimetría y el enlace al KML.
+    Con 'medida_altimetria' ({'ancho', 'alto'}) la altimetría no se sondea
+    (p.ej. si se está generando a la vez, ver orquestador.py).
+    Con 'tiempos' (salida de telemetria.py, diccionario o ruta de tiempos.json)
+    se añade una sección con los tiempos por vuelta y sector de cada piloto.
+    Con 'compresion' (salida.Compresion) se escriben también
+    InfoCircuito.html.gz y .br en la misma pasada.
+    'informar' recibe los mensajes para el usuario (None: sin mensajes).
+    Se excluyen:
       - ubicación/origen
       - trazado/tramo
     """
-    # Cargar XML
-    try:
-        tree = ET.parse(archivo_xml)
-    except FileNotFoundError:
-        raise SystemExit(f"No se encuentra el archivo: {archivo_xml}")
-    except ET.ParseError as e:
-        raise SystemExit(f"Error de sintaxis en el XML: {e}")
-
-    root = tree.getroot()
-    ns = {"u": "http://www.uniovi.es"}  # namespace del documento
-
-    # ---------- XPaths (solo lo que el XML proporcione) ----------
+    # ---------- Datos (solo lo que el XML proporcione) ----------
     # Identificación del circuito
-    nombre = root.findtext(".//u:nombre", default="", namespaces=ns)
-    pais = root.findtext(".//u:pais", default="", namespaces=ns)
-    localidad = root.findtext(".//u:localidad", default="", namespaces=ns)
+    nombre = modelo.nombre
+    pais = modelo.pais
+    localidad = modelo.localidad
 
     # Medidas ( con atributo unidades )
-    long_elem = root.find(".//u:longitudCircuito", ns)
-    anch_elem = root.find(".//u:anchuraMedia", ns)
-
-    longitud = (long_elem.text or "").strip() if long_elem is not None else ""
-    long_uni = long_elem.get("unidades", "") if long_elem is not None else ""
+    longitud = modelo.longitudCircuito.valor
+    long_uni = modelo.longitudCircuito.unidades
 
-    anchura = (anch_elem.text or "").strip() if anch_elem is not None else ""
-    anch_uni = anch_elem.get("unidades", "") if anch_elem is not None else ""
+    anchura = modelo.anchuraMedia.valor
+    anch_uni = modelo.anchuraMedia.unidades
 
     # Información de carrera
-    fecha = root.findtext(".//u:carrera/u:fecha", default="", namespaces=ns)
-    hora_es = root.findtext(".//u:carrera/u:horaEspaña", default="", namespaces=ns)
-    vueltas = root.findtext(".//u:carrera/u:vueltas", default="", namespaces=ns)
-    patrocinador = root.findtext(".//u:carrera/u:patrocinador", default="", namespaces=ns)
+    carrera = modelo.carrera
+    fecha = carrera.fecha
+    hora_es = carrera.horaEspaña
+    vueltas = carrera.vueltas
+    patrocinador = carrera.patrocinador
 
-    vencedor = root.findtext(".//u:carrera/u:resultado/u:vencedor", default="", namespaces=ns)
-    tiempo = root.findtext(".//u:carrera/u:resultado/u:tiempo", default="", namespaces=ns)
+    vencedor = carrera.vencedor
+    tiempo = carrera.tiempo
 
     # Clasificación mundial (posiciones)
-    posiciones = []
-    for pos in root.findall(".//u:carrera/u:clasificacionMundial/u:posicion", ns):
-        numero = (pos.get("numero") or "").strip()
-        piloto = pos.findtext("u:piloto", default="", namespaces=ns)
-        if numero or piloto:
-            posiciones.append((numero, piloto))
+    posiciones = carrera.posiciones
     
     # Referencias
-    refs = [n.text.strip() for n in root.findall(".//u:referencias/u:ref", ns) if (n.text or "").strip()]
-    if not refs:
-        refs = [n.text.strip() for n in root.findall(".//referencias/ref") if (n.text or "").strip()]
+    refs = modelo.referencias
     
     # Media
-    fotos = root.findall(".//u:media/u:fotos/u:foto", ns)
-    videos = root.findall(".//u:media/u:videos/u:video", ns)
+    fotos = modelo.fotos
+    videos = modelo.videos
 
+    # Tiempos de la telemetría y variantes de las fotos (opcionales)
+    tiempos = cargar_tiempos(tiempos)
+    imagenes = cargar_imagenes(imagenes)
+    medios = None
+    if sondeo:
+        medios = CacheMedios(os.path.join(os.path.dirname(os.path.abspath(archivo_html)),
+                                          os.pardir, "multimedia"))
 
     # ---------- Construcción del HTML ----------
-    doc = Html(lang="es",
-                titulo="MotoGP Desktop",
-                css_href="../estilo/estilo.css",
-                css2_href="../estilo/layout.css",
-                icon_href="../multimedia/icon.png",
-                nombreCircuito=nombre)
-
-    # Sección: Datos del circuito
-    sec_datos = doc.add_section()
-    doc.add_h2(sec_datos, "Datos del circuito")
-
-    ul = doc.add_unordered_list(sec_datos)
-
-    if nombre:
-        doc.add_li_label_value(ul, "Nombre", nombre)
-    if pais:
-        doc.add_li_label_value(ul, "País", pais)
-    if localidad:
-        doc.add_li_label_value(ul, "Localidad", localidad)
-    if longitud:
-        doc.add_li_label_value(ul, "Longitud del circuito", f"{longitud} {long_uni}".strip())
-    if anchura:
-        doc.add_li_label_value(ul, "Anchura media", f"{anchura} {anch_uni}".strip())
-
-    # Sección: Carrera (ul + sub-ul en Resultado)
-    sec_carrera = doc.add_section()
-    doc.add_h2(sec_carrera, "Carrera")
-
-    ul_car = doc.add_unordered_list(sec_carrera)
-
-    if fecha:
-        doc.add_li_label_value(ul_car, "Fecha", fecha)
-
-    if hora_es:
-        doc.add_li_label_value(ul_car, "Hora (España)", hora_es)
-
-    if vueltas:
-        doc.add_li_label_value(ul_car, "Vueltas", vueltas)
-
-    if patrocinador:
-        doc.add_li_label_value(ul_car, "Patrocinador", patrocinador)
-
-    # Sublista para Resultado
-    if vencedor or tiempo:
-        # Crea el <li> "Resultado:" sin valor
-        li_res = ET.SubElement(ul_car, "li")
-        li_res.text = "Resultado:"  # sin valor aquí
-
-        # sublista dentro de Resultado
-        sub = doc.add_unordered_list(li_res)
-
-        if vencedor:
-            doc.add_li_label_value(sub, "Vencedor", vencedor)
-
-        if tiempo:
-            tiempo_fmt = iso8601_to_str(tiempo)  # típico en carreras
-            doc.add_li_label_value(sub, "Tiempo", tiempo_fmt)
-
-    # Sección: Clasificación mundial
-    if posiciones:
-        doc.add_h3(sec_carrera, "Clasificación mundial")
-
-        cols = [
-            ("th-posicion", "Posición"),
-            ("th-piloto",   "Piloto"),
-        ]
-        table, tbody, col_ids = doc.add_table(
-            parent=sec_carrera,
-            caption_text="Clasificación mundial al finalizar la carrera",
-            columns=cols
-        )
-        for pos_num, pil in posiciones:
-            doc.add_table_row_with_headers(tbody, [pos_num, pil], col_ids)
-
-    # Sección media
-    if fotos or videos:
-        sec_media = doc.add_section()
-        doc.add_h2(sec_media, "Media")
-
-        # ----- Fotos -----
-        if fotos:
-            doc.add_h3(sec_media, "Fotos")
-            for f in fotos:
-                ruta = (f.text or "").strip()  # p.ej. "multimedia/curva1.jpg"
-                alt = (f.get("descripción") or "").strip()
-                if ruta:
-                    doc.add_picture(sec_media, ruta, alt)
-
-        # ----- Videos -----
-        if videos:
-            doc.add_h3(sec_media, "Videos")
-            for v in videos:
-                ruta_mp4 = (v.text or "").strip()  # p.ej. "multimedia/highlights.mp4"
-                if ruta_mp4:
-                    # El .webm se infiere automáticamente si no lo pasas
-                    doc.add_video(sec_media, ruta_mp4)
+    cabecera = dict(lang="es",
+                    titulo="MotoGP Desktop",
+                    css_href="../estilo/estilo.css",
+                    css2_href="../estilo/layout.css",
+                    icon_href="../multimedia/icon.png",
+                    nombreCircuito=nombre)
+    doc = HtmlFlujo(archivo_html, compresion=compresion, **cabecera) if flujo else Html(**cabecera)
+    # En streaming la construcción y la escritura son la misma etapa; HtmlFlujo
+    # escribe el cierre al salir del with (si algo falla, descarta la salida)
+    with etapa("html.escritura" if flujo else "html.construccion"), (doc if flujo else nullcontext()):
+
+        # Sección: Datos del circuito
+        sec_datos = doc.add_section()
+        doc.add_h2(sec_datos, "Datos del circuito")
+
+        ul = doc.add_unordered_list(sec_datos)
+
+        if nombre:
+            doc.add_li_label_value(ul, "Nombre", nombre)
+        if pais:
+            doc.add_li_label_value(ul, "País", pais)
+        if localidad:
+            doc.add_li_label_value(ul, "Localidad", localidad)
+        if longitud:
+            doc.add_li_label_value(ul, "Longitud del circuito", f"{longitud} {long_uni}".strip())
+        if anchura:
+            doc.add_li_label_value(ul, "Anchura media", f"{anchura} {anch_uni}".strip())
+
+        # Sección: Carrera (ul + sub-ul en Resultado)
+        sec_carrera = doc.add_section()
+        doc.add_h2(sec_carrera, "Carrera")
+
+        ul_car = doc.add_unordered_list(sec_carrera)
+
+        if fecha:
+            doc.add_li_label_value(ul_car, "Fecha", fecha)
+
+        if hora_es:
+            doc.add_li_label_value(ul_car, "Hora (España)", hora_es)
+
+        if vueltas:
+            doc.add_li_label_value(ul_car, "Vueltas", vueltas)
+
+        if patrocinador:
+            doc.add_li_label_value(ul_car, "Patrocinador", patrocinador)
+
+        # Sublista para Resultado
+        if vencedor or tiempo:
+            # Crea el <li> "Resultado:" sin valor
+            li_res = doc.add_li(ul_car, "Resultado:")  # sin valor aquí
+
+            # sublista dentro de Resultado
+            sub = doc.add_unordered_list(li_res)
+
+            if vencedor:
+                doc.add_li_label_value(sub, "Vencedor", vencedor)
+
+            if tiempo:
+                tiempo_fmt = iso8601_to_str(tiempo)  # típico en carreras
+                doc.add_li_label_value(sub, "Tiempo", tiempo_fmt)
+
+        # Sección: Clasificación mundial
+        if posiciones:
+            doc.add_h3(sec_carrera, "Clasificación mundial")
+
+            cols = [
+                ("th-posicion", "Posición"),
+                ("th-piloto",   "Piloto"),
+            ]
+            table, tbody, col_ids = doc.add_table(
+                parent=sec_carrera,
+                caption_text="Clasificación mundial al finalizar la carrera",
+                columns=cols
+            )
+            for pos_num, pil in posiciones:
+                doc.add_table_row_with_headers(tbody, [pos_num, pil], col_ids)
+
+        # Sección: Tiempos por vuelta (telemetría)
+        if tiempos and tiempos.get("pilotos"):
+            sec_tiempos = doc.add_section()
+            doc.add_h2(sec_tiempos, "Tiempos por vuelta")
+            sectores = tiempos.get("sectores", [])
+
+            for n, (piloto, datos) in enumerate(tiempos["pilotos"].items(), 1):
+                vueltas_piloto = datos.get("vueltas", [])
+                if not vueltas_piloto:
+                    continue
+                doc.add_h3(sec_tiempos, piloto)
+
+                cols = [(f"th-vuelta-{n}", "Vuelta"), (f"th-tiempo-{n}", "Tiempo")]
+                cols += [(f"th-sector-{n}-{i}", f"Sector {s}") for i, s in enumerate(sectores, 1)]
+                table, tbody, col_ids = doc.add_table(
+                    parent=sec_tiempos,
+                    caption_text=f"Tiempos por vuelta y sector de {piloto}",
+                    columns=cols
+                )
+                for v in vueltas_piloto:
+                    valores = [str(v["numero"]), segundos_to_str(v["tiempo"])]
+                    valores += [segundos_to_str(t) for t in v["sectores"]]
+                    doc.add_table_row_with_headers(tbody, valores, col_ids)
+
+                mejor = datos.get("mejorVuelta")
+                # Sin esa vuelta entre las de la tabla (tiempos.json editado) no hay párrafo
+                mejor_tiempo = next((v["tiempo"] for v in vueltas_piloto if v["numero"] == mejor), None)
+                if mejor and mejor_tiempo is not None:
+                    doc.add_paragraph(sec_tiempos,
+                                      f"Mejor vuelta: {mejor} ({segundos_to_str(mejor_tiempo)})")
+
+        # Sección: Trazado (altimetría y KML generados junto al HTML)
+        if altimetria or kml:
+            sec_trazado = doc.add_section()
+            doc.add_h2(sec_trazado, "Trazado")
+            if altimetria:
+                medida = medida_altimetria
+                if sondeo and medida is None:
+                    try:
+                        medida = sondear(os.path.join(os.path.dirname(os.path.abspath(archivo_html)),
+                                                      altimetria))
+                    except (OSError, ErrorMedio):
+                        pass
+                doc.add_image(sec_trazado, altimetria, f"Altimetría del circuito {nombre}", medida)
+            if kml:
+                doc.add_link_item(doc.add_unordered_list(sec_trazado), href=kml)
+
+        # Sección media
+        if fotos or videos:
+            sec_media = doc.add_section()
+            doc.add_h2(sec_media, "Media")
+
+            # ----- Fotos -----
+            if fotos:
+                doc.add_h3(sec_media, "Fotos")
+                for f in fotos:
+                    ruta = f.ruta  # p.ej. "multimedia/curva1.jpg"
+                    alt = f.descripcion
+                    if ruta:
+                        archivo = Path(ruta.strip()).name
+                        imagen = imagenes.get(archivo)
+                        medida = medios.sondear(archivo) if medios and not imagen else None
+                        doc.add_picture(sec_media, ruta, alt, imagen, medida)
+
+            # ----- Videos -----
+            if videos:
+                doc.add_h3(sec_media, "Videos")
+                for v in videos:
+                    ruta_mp4 = v.ruta  # p.ej. "multimedia/highlights.mp4"
+                    if ruta_mp4:
+                        # El .webm se infiere automáticamente si no lo pasas
+                        archivo = Path(ruta_mp4.strip()).name
+                        doc.add_video(sec_media, ruta_mp4,
+                                      medida=medios and medios.sondear(archivo),
+                                      poster=medios and medios.poster(archivo))
     
-    # Sección (aside) referencias
-    if refs:
-        aside = doc.add_aside()
-        doc.add_h2(aside, "Referencias")
-        ul_refs = doc.add_unordered_list(aside)
-        for url in refs:
-            doc.add_link_item(ul_refs, href=url)
-
-    # Guardar
-    doc.write(archivo_html)
-    print(f"Archivo HTML generado: {archivo_html}")
+        # Sección (aside) referencias
+        if refs:
+            aside = doc.add_aside()
+            doc.add_h2(aside, "Referencias")
+            ul_refs = doc.add_unordered_list(aside)
+            for url in refs:
+                doc.add_link_item(ul_refs, href=url)
+
+    # Guardar (en streaming ya está escrito)
+    if not flujo:
+        doc.write(archivo_html, compresion)
+    if medios is not None and guardar_medios:
+        medios.guardar()
+    if informar:
+        informar(f"Archivo HTML generado: {archivo_html}")
+    return archivo_html
 
 def main():
+    configurar()
     archivoXML = "circuitoEsquema.xml"
     nombreHTML  = "InfoCircuito.html"
+    # Manifiesto de imagenes.py (si se han generado las variantes)
+    manifiesto = Path("../multimedia/imagenes.json")
+
+    try:
+        modelo = cargarCircuito(archivoXML)
+    except ErrorCircuito as e:
+        raise SystemExit(str(e))
 
-    generar_html(archivoXML, nombreHTML)
+    generar_html(modelo, nombreHTML, imagenes=manifiesto if manifiesto.exists() else None,
+                 guardar_medios=True)
 
 if __name__ == "__main__":
     main()
@@ -3,28 +3,64 @@
 Genera circuito.kml a partir de circuitoEsquema.xml (NS http://www.uniovi.es),
 siguiendo la estructura del ejemplo 02020-KML.py (clase Kml).
 
+Si el nombre de salida termina en .kmz, el KML se comprime en streaming
+dentro de un zip (doc.kml) junto con el icono del origen. Opcionalmente se
+añade un <gx:Track> con el instante de paso por cada punto, tomado de una
+vuelta de la telemetría (telemetria.py) o estimado a partir de la distancia.
+
 @version 1.0 22/Octubre/2025
 @author: Marcelo Díez Domínguez UO293820
 """
 
+import json
+import os
+import re
 import xml.etree.ElementTree as ET
+import zipfile
+from contextlib import nullcontext
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate, chain
+
+from circuito import cargarCircuito, formatearCoordenada, ErrorCircuito
+from salida import abrirSalidaAtomica, abrirSalidaBinaria, envolverSalida, escaparTexto, escribirUnidos
+from geodesia import distanciasTramos, distanciaCierre
+from exportar import decimales
+from instrumentacion import etapa, configurar
+from simplificacion import simplificar, proyectarMetros, cambiosDeSector
+
+# Versión del conversor (invalida las salidas de construccion.py si cambia)
+VERSION = "1.0"
+
+# Espacio de nombres de las extensiones de Google (gx:Track)
+NS_GX = "http://www.google.com/kml/ext/2.2"
+
+# Directorio de los archivos adjuntos dentro del KMZ
+DIRECTORIO_KMZ = "files"
+
+# Nivel de compresión por defecto del KMZ (zlib, 0-9)
+NIVEL_KMZ = 6
 
 class Kml(object):
 
-    def __init__(self):
+    def __init__(self, gx=False):
         """
-        Crea el elemento raíz y el espacio de nombres
+        Crea el elemento raíz y el espacio de nombres (y el de gx si se indica)
         """
-        self.raiz = ET.Element('kml', xmlns="http://www.opengis.net/kml/2.2")
+        atributos = {"xmlns:gx": NS_GX} if gx else {}
+        self.raiz = ET.Element('kml', xmlns="http://www.opengis.net/kml/2.2", **atributos)
         self.doc = ET.SubElement(self.raiz, 'Document')
 
-    def addPlacemark(self, nombre, descripcion, lon, lat, alt, modoAltitud="absolute"):
+    def addPlacemark(self, nombre, descripcion, lon, lat, alt, modoAltitud="absolute", icono=None):
         """
         Añade un elemento <Placemark> con puntos <Point>
+        (y un <Style> con el icono 'icono' si se indica)
         """
         pm = ET.SubElement(self.doc, 'Placemark')
         ET.SubElement(pm, 'name').text = '\n' + nombre + '\n'
         ET.SubElement(pm, 'description').text = '\n' + descripcion + '\n'
+        if icono:
+            estilo = ET.SubElement(ET.SubElement(pm, 'Style'), 'IconStyle')
+            ET.SubElement(ET.SubElement(estilo, 'Icon'), 'href').text = '\n' + icono + '\n'
         punto = ET.SubElement(pm, 'Point')
         ET.SubElement(punto, 'coordinates').text = '\n{},{},{}\n'.format(lon, lat, alt)
         ET.SubElement(punto, 'altitudeMode').text = '\n' + modoAltitud + '\n'
@@ -49,9 +85,25 @@ class Kml(object):
         ET.SubElement(linea, 'color').text = '\n' + color + '\n'
         ET.SubElement(linea, 'width').text = '\n' + ancho + '\n'
 
-    def escribir(self,nombreArchivoKML):
+    def addTrack(self, nombre, instantes, coordenadas, modoAltitud="absolute"):
+        """
+        Añade un <Placemark> con un <gx:Track>: un <when> por instante (ISO
+        8601) y un <gx:coord> por coordenada ('lon lat alt'), en el mismo orden
+        """
+        pm = ET.SubElement(self.doc, 'Placemark')
+        ET.SubElement(pm, 'name').text = '\n' + nombre + '\n'
+        track = ET.SubElement(pm, 'gx:Track')
+        ET.SubElement(track, 'altitudeMode').text = '\n' + modoAltitud + '\n'
+        for instante in instantes:
+            ET.SubElement(track, 'when').text = '\n' + instante + '\n'
+        for coordenada in coordenadas:
+            ET.SubElement(track, 'gx:coord').text = '\n' + coordenada + '\n'
+
+    def escribir(self,nombreArchivoKML, compresion=None):
         """
         Escribe el archivo KML con declaración y codificación
+        ('nombreArchivoKML' puede ser también un archivo binario abierto).
+        Con 'compresion' (salida.Compresion) se escriben también sus .gz/.br
         """
         arbol = ET.ElementTree(self.raiz)
 
@@ -59,8 +111,14 @@ class Kml(object):
         Introduce indentacióon y saltos de línea
         para generar XML en modo texto
         """
-        ET.indent(arbol)
-        arbol.write(nombreArchivoKML, encoding='utf-8', xml_declaration=True)
+        with etapa("kml.indent"):
+            ET.indent(arbol)
+        with etapa("kml.escritura"):
+            if compresion is not None:
+                with abrirSalidaBinaria(nombreArchivoKML, compresion) as archivo:
+                    arbol.write(archivo, encoding='utf-8', xml_declaration=True)
+            else:
+                arbol.write(nombreArchivoKML, encoding='utf-8', xml_declaration=True)
 
     """
     Mostrar el archivo .KML (para depurar)
@@ -107,116 +165,429 @@ class Kml(object):
             print("Atributos = ", hijo.attrib)
 
 
-def obtenerCoordenadas(archivoXML):
+class KmlFlujo(object):
     """
-    Extrae las coordenadas de cada <tramo>/<coordenadas> y devuelve una lista
-    de strings 'lon,lat,alt' en formato KML
+    Escritor de KML en streaming con la misma interfaz que Kml.
+
+    Cada elemento se escribe en el archivo en cuanto se añade, con la misma
+    estructura e indentación que Kml.escribir, y las coordenadas de
+    addLineString pueden llegar desde cualquier iterable de strings
+    'lon,lat,alt', que se escribe por bloques sin unirlo entero en memoria.
     """
-    try:
-        arbol = ET.parse(archivoXML)
-    except IOError:
-        print("No se encuentra el archivo ", archivoXML)
-        return[]
-    except ET.ParseError:
-        print("Error procesando el archivo XML ", archivoXML)
-        return[]
-    
-    ns = {'uniovi': 'http://www.uniovi.es'}
-    raiz = arbol.getroot()
 
-    coordenadas = []
+    def __init__(self, nombreArchivoKML, archivo=None, gx=False, compresion=None):
+        """
+        Abre el archivo (o usa el flujo de texto 'archivo') y escribe la
+        declaración y los elementos raíz. El archivo se escribe en un
+        temporal que solo sustituye a la salida al cerrarlo sin errores.
+        Con 'compresion' se escriben también sus .gz/.br (ver
+        salida.abrirSalidaAtomica)
+        """
+        self.archivo = archivo if archivo is not None else abrirSalidaAtomica(nombreArchivoKML, compresion)
+        gx = f' xmlns:gx="{NS_GX}"' if gx else ''
+        self.archivo.write("<?xml version='1.0' encoding='utf-8'?>\n"
+                           f'<kml xmlns="http://www.opengis.net/kml/2.2"{gx}>\n'
+                           '  <Document>')
+
+    def _elemento(self, sangria, etiqueta, texto):
+        """
+        Escribe <etiqueta> con su texto entre saltos de línea (formato de Kml)
+        """
+        self.archivo.write(f"\n{sangria}<{etiqueta}>\n{escaparTexto(texto)}\n</{etiqueta}>")
+
+    def addPlacemark(self, nombre, descripcion, lon, lat, alt, modoAltitud="absolute", icono=None):
+        """
+        Añade un elemento <Placemark> con puntos <Point>
+        (y un <Style> con el icono 'icono' si se indica)
+        """
+        self.archivo.write("\n    <Placemark>")
+        self._elemento("      ", "name", nombre)
+        self._elemento("      ", "description", descripcion)
+        if icono:
+            self.archivo.write("\n      <Style>\n        <IconStyle>\n          <Icon>")
+            self._elemento("            ", "href", icono)
+            self.archivo.write("\n          </Icon>\n        </IconStyle>\n      </Style>")
+        self.archivo.write("\n      <Point>")
+        self._elemento("        ", "coordinates", '{},{},{}'.format(lon, lat, alt))
+        self._elemento("        ", "altitudeMode", modoAltitud)
+        self.archivo.write("\n      </Point>\n    </Placemark>")
+
+    def addLineString(self, nombre, extrude, tesela, listaCoordenadas, modoAltitud, color, ancho):
+        """
+        Añade un elemento <Placemark> con un <LineString>.
+        'listaCoordenadas' es un string o un iterable de strings 'lon,lat,alt'
+        """
+        self._elemento("    ", "name", nombre)
+        self.archivo.write("\n    <Placemark>\n      <LineString>")
+        self._elemento("        ", "extrude", extrude)
+        self._elemento("        ", "tessellation", tesela)
+
+        self.archivo.write("\n        <coordinates>\n")
+        if isinstance(listaCoordenadas, str):
+            self.archivo.write(escaparTexto(listaCoordenadas))
+        else:
+            escribirUnidos(self.archivo, listaCoordenadas, "\n", escaparTexto)
+        self.archivo.write("\n</coordinates>")
+
+        self._elemento("        ", "altitudeMode", modoAltitud)
+        self.archivo.write("\n      </LineString>\n      <Style>\n        <LineStyle>")
+        self._elemento("          ", "color", color)
+        self._elemento("          ", "width", ancho)
+        self.archivo.write("\n        </LineStyle>\n      </Style>\n    </Placemark>")
+
+    def addTrack(self, nombre, instantes, coordenadas, modoAltitud="absolute"):
+        """
+        Añade un <Placemark> con un <gx:Track>. 'instantes' y 'coordenadas'
+        son iterables (se recorren una vez, sin guardarlos)
+        """
+        self.archivo.write("\n    <Placemark>")
+        self._elemento("      ", "name", nombre)
+        self.archivo.write("\n      <gx:Track>")
+        self._elemento("        ", "altitudeMode", modoAltitud)
+        for instante in instantes:
+            self._elemento("        ", "when", instante)
+        for coordenada in coordenadas:
+            self._elemento("        ", "gx:coord", coordenada)
+        self.archivo.write("\n      </gx:Track>\n    </Placemark>")
+
+    def escribir(self):
+        """
+        Cierra los elementos raíz y el archivo
+        """
+        self.archivo.write("\n  </Document>\n</kml>")
+        self.archivo.close()
 
-    # Recorrer cada <tramo> en orden
-    for tramo in raiz.findall('.//uniovi:tramo', ns):
-        coordenada = tramo.find('uniovi:coordenadas', ns)
-        if coordenada is not None:
-            longitud = coordenada.find('uniovi:longitud', ns)
-            latitud = coordenada.find('uniovi:latitud', ns)
-            altitud = coordenada.find('uniovi:altitud', ns)
+    def __enter__(self):
+        return self
 
-            lon_val = (longitud.text.strip() if longitud is not None and longitud.text else "0")
-            lat_val = (latitud.text.strip() if latitud is not None and latitud.text else "0")
-            alt_val = (altitud.text.strip() if altitud is not None and altitud.text else "0")
+    def __exit__(self, tipo, valor, traza):
+        if tipo is None:
+            self.escribir()
+        else:
+            # Cierra y borra el temporal: la salida anterior no se toca
+            # (ver salida.py)
+            self.archivo.__exit__(tipo, valor, traza)
 
-            coordenadas.append(f"{lon_val},{lat_val},{alt_val}")
-    return coordenadas
 
-def obtenerOrigen(archivoXML):
+class KmzFlujo(KmlFlujo):
     """
-    Devuelve (lon, lat, alt) del <ubicacion>/<origen>, o None si no hay datos.
+    KmlFlujo que escribe el KML comprimido como doc.kml dentro de un KMZ
+    (zip), en streaming: el KML no llega a existir sin comprimir. Los
+    archivos añadidos con addArchivo (p.ej. iconos) se guardan al final.
     """
-    try:
-        arbol = ET.parse(archivoXML)
-    except IOError:
-        print("No se encuentra el archivo ", archivoXML)
-        return[]
-    except ET.ParseError:
-        print("Error procesando el archivo XML ", archivoXML)
-        return[]
-
-    ns = {'uniovi': 'http://www.uniovi.es'}
-    raiz = arbol.getroot()
-
-    longitud = raiz.find('.//uniovi:ubicacion/uniovi:origen/uniovi:longitud', ns)
-    latitud = raiz.find('.//uniovi:ubicacion/uniovi:origen/uniovi:latitud', ns)
-    altitud = raiz.find('.//uniovi:ubicacion/uniovi:origen/uniovi:altitud', ns)
-
-    if longitud is None or latitud is None or longitud.text is None or latitud.text is None:
+
+    def __init__(self, nombreArchivoKMZ, nivel=NIVEL_KMZ, gx=False):
+        # El zip también se escribe en un temporal (ver KmlFlujo)
+        self.destino = abrirSalidaAtomica(nombreArchivoKMZ, binario=True)
+        self.zip = zipfile.ZipFile(self.destino, "w", zipfile.ZIP_DEFLATED, compresslevel=nivel)
+        self.adjuntos = []
+        # force_zip64: el tamaño del KML no se conoce de antemano
+        entrada = self.zip.open("doc.kml", "w", force_zip64=True)
+        super().__init__(nombreArchivoKMZ, archivo=envolverSalida(entrada), gx=gx)
+
+    def addArchivo(self, ruta):
+        """
+        Adjunta el archivo 'ruta' al KMZ. Devuelve la ruta relativa con la que
+        se referencia desde el KML.
+        """
+        nombre = f"{DIRECTORIO_KMZ}/{os.path.basename(ruta)}"
+        self.adjuntos.append((ruta, nombre))
+        return nombre
+
+    def escribir(self):
+        """
+        Cierra el KML (la entrada doc.kml), añade los adjuntos y cierra el zip
+        """
+        super().escribir()
+        for ruta, nombre in self.adjuntos:
+            # Las imágenes ya van comprimidas
+            self.zip.write(ruta, nombre, compress_type=zipfile.ZIP_STORED)
+        self.zip.close()
+        self.destino.close()
+
+    def __exit__(self, tipo, valor, traza):
+        super().__exit__(tipo, valor, traza)
+        if tipo is not None:
+            self.zip.close()
+            self.destino.__exit__(tipo, valor, traza)
+
+
+def _redondear(filas, precision):
+    """
+    Redondea las filas (lon, lat, alt) a los pasos 'precision' (grados, metros)
+    """
+    dg, dm = decimales(precision[0]), decimales(precision[1])
+    for lon, lat, alt in filas:
+        yield round(lon, dg), round(lat, dg), round(alt, dm)
+
+
+def iterarCoordenadas(modelo, indices=None, precision=None):
+    """
+    Genera los strings 'lon,lat,alt' de cada tramo del modelo en orden
+    (se omiten los tramos sin <coordenadas>). Si se indican 'indices', solo
+    los de esos tramos. Con 'precision' = (grados, metros), p.ej. (1e-6, 0.1),
+    los valores se redondean a esos pasos y se escriben sin ceros de más.
+    """
+    filas = zip(modelo.longitudes, modelo.latitudes, modelo.altitudes)
+    if indices is not None:
+        filas = ((modelo.longitudes[i], modelo.latitudes[i], modelo.altitudes[i]) for i in indices)
+    if precision is not None:
+        filas = _redondear(filas, precision)
+    for lon, lat, alt in filas:
+        if lon != lon:  # NaN: tramo sin <coordenadas>
+            continue
+        texto = f"{lon!r},{lat!r},{alt!r}"
+        if ".0," in texto or texto.endswith(".0"):
+            # Algún valor entero: se escribe sin '.0' como en el XML
+            texto = f"{formatearCoordenada(lon)},{formatearCoordenada(lat)},{formatearCoordenada(alt)}"
+        yield texto
+
+def obtenerCoordenadas(modelo):
+    """
+    Devuelve una lista de strings 'lon,lat,alt' en formato KML con las
+    coordenadas de cada tramo del modelo (se omiten los tramos sin <coordenadas>)
+    """
+    return list(iterarCoordenadas(modelo))
+
+def obtenerOrigen(modelo, precision=None):
+    """
+    Devuelve 'lon,lat,alt' del <ubicacion>/<origen>, o None si no hay datos.
+    Con 'precision' se redondea como en iterarCoordenadas.
+    """
+    origen = modelo.origen
+    if origen is None:
         return None
-    
-    lon_val = longitud.text.strip().replace(",", ".")
-    lat_val = latitud.text.strip().replace(",", ".")
-    alt_val = (altitud.text.strip().replace(",", ".") if (altitud is not None and altitud.text) else "0")
 
-    return (f"{lon_val},{lat_val},{alt_val}")
+    punto = (origen.longitud, origen.latitud, origen.altitud)
+    if precision is not None:
+        punto = next(_redondear([punto], precision))
+    return ",".join(formatearCoordenada(v) for v in punto)
 
 
-def main():
-    archivoXML = "circuitoEsquema.xml"
-    nombreKML  = "circuito.kml"
+def indicesSimplificados(modelo, metodo, tolerancia):
+    """
+    Índices de los tramos que se conservan al simplificar el trazado cerrado
+    (origen + tramos + origen) con 'metodo' ("dp" o "vw") y 'tolerancia' en
+    metros. Se conservan siempre el origen y los límites de sector.
+    """
+    validos = [i for i, lon in enumerate(modelo.longitudes) if lon == lon]
+    origen = modelo.origen
+    lons = [origen.longitud] + [modelo.longitudes[i] for i in validos] + [origen.longitud]
+    lats = [origen.latitud] + [modelo.latitudes[i] for i in validos] + [origen.latitud]
+    sectores = [modelo.sectores[validos[0]] if validos else 0]
+    sectores += [modelo.sectores[i] for i in validos]
+    sectores.append(sectores[-1])
 
-    # 1) Coordenadas de la polilínea (cada coordenada: "lon,lat,alt")
-    coordenadas = obtenerCoordenadas(archivoXML)
-    if not coordenadas:
-        print("No se encontraron coordenadas en el XML.")
-        return
+    xs, ys = proyectarMetros(lons, lats, origen.latitud)
+    conservados = simplificar(xs, ys, tolerancia, metodo, cambiosDeSector(sectores))
+    return [validos[k - 1] for k in conservados if 0 < k <= len(validos)]
+
+
+def _segundosISO(duracion):
+    """
+    Segundos de una duración ISO 8601 'PT#H#M#S' (None si no se entiende)
+    """
+    m = re.fullmatch(r"PT(?:(\d+)H)?(?:(\d+)M)?(?:(\d+(?:\.\d+)?)S)?", duracion or "")
+    if not m or not any(m.groups()):
+        return None
+    return int(m.group(1) or 0) * 3600 + int(m.group(2) or 0) * 60 + float(m.group(3) or 0)
 
-    # 2) Punto de origen ("lon,lat,alt")
-    origen = obtenerOrigen(archivoXML)
+
+def _inicioCarrera(carrera):
+    """
+    Instante (UTC) de la salida: fecha + hora de España, o el 1/1/1970 si faltan
+    """
+    try:
+        inicio = datetime.fromisoformat(f"{carrera.fecha}T{carrera.horaEspaña or '00:00:00'}")
+    except ValueError:
+        return datetime(1970, 1, 1, tzinfo=timezone.utc)
+    try:
+        from zoneinfo import ZoneInfo
+        return inicio.replace(tzinfo=ZoneInfo("Europe/Madrid")).astimezone(timezone.utc)
+    except Exception:  # sin base de datos de zonas horarias
+        return inicio.replace(tzinfo=timezone.utc)
+
+
+def _vueltaTelemetria(tiempos, piloto=None, vuelta=None):
+    """
+    Vuelta (diccionario de tiempos.json) de 'piloto' (por defecto, el
+    primero) número 'vuelta' (por defecto, su mejor vuelta)
+    """
+    if not isinstance(tiempos, dict):
+        with open(tiempos, encoding="utf-8") as f:
+            tiempos = json.load(f)
+    pilotos = tiempos.get("pilotos", {})
+    if piloto is None:
+        piloto = next((p for p, d in pilotos.items() if d.get("vueltas")), None)
+    datos = pilotos.get(piloto)
+    if not datos or not datos.get("vueltas"):
+        raise ValueError(f"No hay vueltas del piloto {piloto} en la telemetría")
+    numero = vuelta or datos.get("mejorVuelta")
+    for v in datos["vueltas"]:
+        if v["numero"] == numero:
+            return v
+    raise ValueError(f"No existe la vuelta {numero} del piloto {piloto}")
+
+
+def instantesTrack(modelo, indices=None, tiempos=None, piloto=None, vuelta=None):
+    """
+    Genera el instante ISO 8601 de paso por cada vértice del trazado cerrado
+    (origen, tramos con coordenadas o los de 'indices', origen).
+    Con 'tiempos' (tiempos.json de telemetria.py) se usa una vuelta real: el
+    instante se interpola por distancia dentro de cada sector. Si no, se
+    supone velocidad constante, con la duración media de vuelta de la
+    carrera (<tiempo> / <vueltas>) a partir de la hora de salida.
+    """
+    # Distancia de vuelta de cada tramo (las ausentes, calculadas)
+    distancias = modelo.distancias
+    if any(d != d for d in distancias):
+        calculadas = [c if c == c else 0.0 for c in distanciasTramos(modelo)]
+        distancias = [d if d == d else calculadas[i] for i, d in enumerate(distancias)]
+    acumuladas = list(accumulate(distancias))
+    total = (acumuladas[-1] if acumuladas else 0.0) + distanciaCierre(modelo)
+
+    # Tramos de sector: (distancia inicial, distancia final, instante inicial, duración)
+    if tiempos is not None:
+        datos = _vueltaTelemetria(tiempos, piloto, vuelta)
+        inicio = datetime.fromtimestamp(datos["inicio"], timezone.utc)
+        limites = [acumuladas[i] - distancias[i] for i in range(1, len(modelo))
+                   if modelo.sectores[i] != modelo.sectores[i - 1]]
+        duraciones = datos["sectores"]
+        if len(duraciones) != len(limites) + 1:
+            limites, duraciones = [], [datos["tiempo"]]
+    else:
+        inicio = _inicioCarrera(modelo.carrera)
+        carrera = _segundosISO(modelo.carrera.tiempo)
+        try:
+            vueltas = int(modelo.carrera.vueltas)
+        except ValueError:
+            vueltas = 0
+        limites, duraciones = [], [carrera / vueltas if carrera and vueltas else 100.0]
+    bordes = [0.0] + limites + [total]
+    comienzos = [0.0] + list(accumulate(duraciones))
+    tramos = list(zip(bordes, bordes[1:], comienzos, duraciones))
+
+    def instante(d):
+        k = 0
+        while k < len(tramos) - 1 and d >= tramos[k][1]:
+            k += 1
+        a, b, t0, dur = tramos[k]
+        t = t0 + ((d - a) / (b - a) * dur if b > a else 0.0)
+        return (inicio + timedelta(seconds=t)).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+    yield instante(0.0)
+    filas = indices if indices is not None else range(len(modelo))
+    for i in filas:
+        if modelo.longitudes[i] == modelo.longitudes[i]:
+            yield instante(acumuladas[i])
+    yield instante(total)
+
+
+def generarKml(modelo, nombreKML, flujo=True, simplificacion=None, tolerancia=1.0,
+               icono=None, nivel=NIVEL_KMZ, track=False, tiempos=None, piloto=None, vuelta=None,
+               precision=None, compresion=None, informar=print):
+    """
+    Genera 'nombreKML' con el origen y el trazado cerrado del circuito.
+    Devuelve 'nombreKML', o None si el modelo no tiene origen o coordenadas.
+    Con 'flujo' (por defecto) se escribe en streaming con KmlFlujo; si no,
+    se construye el árbol completo con Kml.
+    Con 'simplificacion' ("dp" o "vw") el trazado se simplifica con una
+    'tolerancia' en metros (ver simplificacion.py).
+    Si 'nombreKML' termina en .kmz se genera un KMZ comprimido con 'nivel'
+    que incluye el archivo 'icono' (icono del origen); en un KML el icono se
+    referencia con su ruta.
+    Con 'track' se añade un <gx:Track> con los instantes de instantesTrack
+    (de la vuelta 'vuelta' de 'piloto' en 'tiempos', si se indican).
+    Con 'precision' = (grados, metros) las coordenadas se cuantizan a esos
+    pasos (ver iterarCoordenadas).
+    Con 'compresion' (salida.Compresion) se escriben también circuito.kml.gz
+    y .br en la misma pasada (no en un KMZ, que ya va comprimido).
+    'informar' recibe los mensajes para el usuario (None: sin mensajes).
+    """
+    # 1) Punto de origen ("lon,lat,alt")
+    origen = obtenerOrigen(modelo, precision)
     if not origen:
-        print("No se encontró punto de origen en el XML.")
+        if informar:
+            informar("No se encontró punto de origen en el XML.")
         return
 
-    # 3) Construir la polilinea cerrada: origen + coordenadas + origen
-    vertices = [origen] + coordenadas + [origen]
-    cadena = "\n".join(vertices)
+    # 2) Coordenadas de la polilínea (cada coordenada: "lon,lat,alt")
+    if not any(lon == lon for lon in modelo.longitudes):
+        if informar:
+            informar("No se encontraron coordenadas en el XML.")
+        return
 
-    # 4) Crear el KML
-    kml = Kml()
+    # 3) Polilinea cerrada: origen + coordenadas + origen
+    indices = None
+    if simplificacion:
+        with etapa("kml.simplificacion") as e:
+            indices = indicesSimplificados(modelo, simplificacion, tolerancia)
+            e.elementos = len(indices)
+    kmz = nombreKML.lower().endswith(".kmz")
+    if flujo:
+        vertices = chain([origen], iterarCoordenadas(modelo, indices, precision), [origen])
+        kml = KmzFlujo(nombreKML, nivel, gx=track) if kmz else KmlFlujo(nombreKML, gx=track,
+                                                                      compresion=compresion)
+    else:
+        vertices = "\n".join([origen] + list(iterarCoordenadas(modelo, indices, precision)) + [origen])
+        kml = Kml(gx=track)
+
+    # En streaming la construcción y la escritura son la misma etapa; KmlFlujo
+    # escribe el cierre al salir del with (si algo falla, descarta la salida)
+    with etapa("kml.escritura" if flujo else "kml.construccion") as e, (kml if flujo else nullcontext()):
+        href = icono
+        if icono and kmz:
+            href = kml.addArchivo(icono) if flujo else f"{DIRECTORIO_KMZ}/{os.path.basename(icono)}"
+
+        # 4) Marcador del origen (desglosamos lon,lat,alt para el <Point>)
+        lon, lat, alt = origen.split(",")
+        kml.addPlacemark("Origen", "Punto de partida del circuito", lon, lat, alt, modoAltitud="absolute",
+                         icono=href)
+
+        # 5) Línea del trazado (circuito cerrado)
+        kml.addLineString(
+            nombre="Trazado del circuito",
+            extrude="1",
+            tesela="1",
+            listaCoordenadas=vertices,
+            modoAltitud="absolute",
+            color="#ff0000ff", # AABBGGRR (rojo opaco)
+            ancho="5"
+        )
+        e.elementos = len(indices) + 2 if indices is not None else len(modelo) + 2
+
+        # 6) Recorrido con tiempos (animación de la vuelta)
+        if track:
+            coordenadas = (c.replace(",", " ") for c in
+                           chain([origen], iterarCoordenadas(modelo, indices, precision), [origen]))
+            kml.addTrack("Vuelta", instantesTrack(modelo, indices, tiempos, piloto, vuelta), coordenadas)
+
+    # 7) Guardar (en streaming ya está escrito)
+    if not flujo and kmz:
+        with zipfile.ZipFile(nombreKML, "w", zipfile.ZIP_DEFLATED, compresslevel=nivel) as zf:
+            with zf.open("doc.kml", "w", force_zip64=True) as entrada:
+                kml.escribir(entrada)
+            if icono:
+                zf.write(icono, href, compress_type=zipfile.ZIP_STORED)
+    elif not flujo:
+        kml.escribir(nombreKML, compresion)
+    if informar:
+        informar("Creado el archivo:", nombreKML)
+    return nombreKML
+
+
+def main():
+    configurar()
+    archivoXML = "circuitoEsquema.xml"
+    nombreKML  = "circuito.kml"
 
-    # Marcador del origen (desglosamos lon,lat,alt para el <Point>)
     try:
-        lon, lat, alt = origen.split(",")
-    except ValueError:
-        print("Formato inesperado en el origen; se esperaba 'lon,lat,alt'")
+        modelo = cargarCircuito(archivoXML)
+    except ErrorCircuito as e:
+        print(e)
         return
-    
-    kml.addPlacemark("Origen", "Punto de partida del circuito", lon, lat, alt, modoAltitud="absolute")
-    
-    # 5) Línea del trazado (circuito cerrado)
-    kml.addLineString(
-        nombre="Trazado del circuito",
-        extrude="1",
-        tesela="1",
-        listaCoordenadas=cadena,                  
-        modoAltitud="absolute",
-        color="#ff0000ff", # AABBGGRR (rojo opaco)
-        ancho="5"
-    )
-
-    # 6) Guardar
-    kml.escribir(nombreKML)
-    print("Creado el archivo:", nombreKML)
+
+    generarKml(modelo, nombreKML)
 
 if __name__ == "__main__":
     main()